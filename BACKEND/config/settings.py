@@ -66,6 +66,7 @@ BASE_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -132,6 +133,9 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'FARAH261998'),
         'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # Connexions persistantes : réutilisées par les threads de l'exécuteur d'insights
+        'CONN_MAX_AGE': int(os.getenv('POSTGRES_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -224,6 +228,82 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', 'tvbz qmjg rvis wvnw')
 # ---------- CELERY ----------
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+CELERY_BEAT_SCHEDULE = {
+    # Partitions mensuelles à venir des tables de rapports
+    'ensure-report-partitions': {
+        'task': 'play_reports.ensure_partitions',
+        'schedule': 24 * 60 * 60,
+    },
+    # Anomalies des séries journalières (tous les tenants)
+    'detect-anomalies': {
+        'task': 'play_reports.detect_anomalies',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+# ---------- INSIGHTS ----------
+# Nombre de panneaux d'insights exécutés en parallèle (une connexion par thread)
+INSIGHTS_MAX_WORKERS = int(os.getenv('INSIGHTS_MAX_WORKERS', 8))
+# Nombre maximal de requêtes SQL autorisées pour une requête d'insights
+INSIGHTS_QUERY_BUDGET = int(os.getenv('INSIGHTS_QUERY_BUDGET', 60))
+# API batch : nombre maximal de panneaux et budget de requêtes partagé
+INSIGHTS_BATCH_MAX_PANELS = int(os.getenv('INSIGHTS_BATCH_MAX_PANELS', 20))
+INSIGHTS_BATCH_QUERY_BUDGET = int(os.getenv('INSIGHTS_BATCH_QUERY_BUDGET', 200))
+
+# ---------- LOOKER STUDIO ----------
+# Nombre maximal de lignes par page et taille des lots lus sur le curseur serveur
+LOOKER_MAX_ROWS = int(os.getenv('LOOKER_MAX_ROWS', 100000))
+LOOKER_FETCH_SIZE = int(os.getenv('LOOKER_FETCH_SIZE', 2000))
+# Cache des réponses (clé versionnée par DataVersion) : durée et taille maximale
+LOOKER_CACHE_TTL = int(os.getenv('LOOKER_CACHE_TTL', 3600))
+LOOKER_CACHE_MAX_BYTES = int(os.getenv('LOOKER_CACHE_MAX_BYTES', 5 * 1024 * 1024))
+
+# ---------- EXPORTS ----------
+# Lots lus sur le curseur serveur, stockage des exports asynchrones et bucket
+# GCS cible (vide : répertoire local EXPORT_ROOT/gcs en substitut)
+EXPORT_FETCH_SIZE = int(os.getenv('EXPORT_FETCH_SIZE', 5000))
+EXPORT_ROOT = Path(os.getenv('EXPORT_ROOT', BASE_DIR / 'media' / 'exports'))
+EXPORT_GCS_BUCKET = os.getenv('EXPORT_GCS_BUCKET', '')
+
+# ---------- PARTITIONS ----------
+# Nombre de mois créés à l'avance (conversion : commande `partitions convert`)
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
+
+# ---------- DIMENSIONS ----------
+# Nombre de clés de dimensions (encodage par dictionnaire) gardées en mémoire
+DIMENSION_KEY_CACHE_SIZE = int(os.getenv('DIMENSION_KEY_CACHE_SIZE', 200000))
+
+# ---------- REVENUS ----------
+# Devise de reporting des faits de revenus (taux chargés par load_fx_rates)
+REPORTING_CURRENCY = os.getenv('REPORTING_CURRENCY', 'USD')
+
+# ---------- STORE ----------
+# Compteurs conservés par résumé mensuel des termes de recherche (Space-Saving)
+SEARCH_TERM_SKETCH_CAPACITY = int(os.getenv('SEARCH_TERM_SKETCH_CAPACITY', 200))
+
+# ---------- ANOMALIES ----------
+# Fenêtre d'historique, jours réévalués à chaque passage, seuil du score
+# robuste (écarts MAD) et nombre de séries traitées par lot NumPy
+ANOMALY_WINDOW_DAYS = int(os.getenv('ANOMALY_WINDOW_DAYS', 28))
+ANOMALY_DETECT_DAYS = int(os.getenv('ANOMALY_DETECT_DAYS', 7))
+ANOMALY_THRESHOLD = float(os.getenv('ANOMALY_THRESHOLD', 3.5))
+ANOMALY_BATCH_SIZE = int(os.getenv('ANOMALY_BATCH_SIZE', 2000))
+
+# ---------- PRÉVISIONS ----------
+# Historique utilisé pour un ajustement complet, délai au-delà duquel une
+# série prolongée est réajustée entièrement et séries par lot NumPy
+FORECAST_HISTORY_DAYS = int(os.getenv('FORECAST_HISTORY_DAYS', 365))
+FORECAST_REFIT_DAYS = int(os.getenv('FORECAST_REFIT_DAYS', 28))
+FORECAST_BATCH_SIZE = int(os.getenv('FORECAST_BATCH_SIZE', 1000))
+
+# ---------- CACHE ----------
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_CACHE_URL', 'redis://localhost:6379/1'),
+        'TIMEOUT': 300,
+    }
+}
 
 # ---------- SESSION ----------
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
@@ -71,9 +71,25 @@ from play_reports.controllers.insights_controller import (
     installs_insights,
     packages_list,
      reviews_insights,
+    review_sentiment_insights,
+    subscription_cohorts_insights,
     crashes_insights,
+    crash_stability_insights,
+    store_funnel_insights,
+    approx_insights,
+    anomalies_insights,
+    forecast_insights,
+    report_query,
     ratings_insights,
-    ai_analysis
+    ai_analysis,
+    insights_batch,
+)
+
+from play_reports.controllers.export_controller import (
+    export_report,
+    export_jobs,
+    export_job_detail,
+    export_job_download,
 )
 
 urlpatterns = [
@@ -176,9 +192,25 @@ urlpatterns = [
  
     path('insights/reviews', reviews_insights, name='insights_reviews'),
     path('insights/reviews/', reviews_insights, name='insights_reviews_slash'),
+    path('insights/reviews/sentiment', review_sentiment_insights, name='insights_review_sentiment'),
+    path('insights/reviews/sentiment/', review_sentiment_insights, name='insights_review_sentiment_slash'),
+    path('insights/subscriptions/cohorts', subscription_cohorts_insights, name='insights_subscription_cohorts'),
+    path('insights/subscriptions/cohorts/', subscription_cohorts_insights, name='insights_subscription_cohorts_slash'),
     
     path('insights/crashes', crashes_insights, name='insights_crashes'),
     path('insights/crashes/', crashes_insights, name='insights_crashes_slash'),
+    path('insights/crashes/stability', crash_stability_insights, name='insights_crash_stability'),
+    path('insights/crashes/stability/', crash_stability_insights, name='insights_crash_stability_slash'),
+    path('insights/store_performance/funnel', store_funnel_insights, name='insights_store_funnel'),
+    path('insights/store_performance/funnel/', store_funnel_insights, name='insights_store_funnel_slash'),
+    path('insights/approx', approx_insights, name='insights_approx'),
+    path('insights/approx/', approx_insights, name='insights_approx_slash'),
+    path('insights/anomalies', anomalies_insights, name='insights_anomalies'),
+    path('insights/anomalies/', anomalies_insights, name='insights_anomalies_slash'),
+    path('insights/forecast', forecast_insights, name='insights_forecast'),
+    path('insights/forecast/', forecast_insights, name='insights_forecast_slash'),
+    path('insights/query', report_query, name='insights_query'),
+    path('insights/query/', report_query, name='insights_query_slash'),
     
     path('insights/ratings', ratings_insights, name='insights_ratings'),
     path('insights/ratings/', ratings_insights, name='insights_ratings_slash'),
@@ -186,6 +218,19 @@ urlpatterns = [
     path('insights/ai_analysis', ai_analysis, name='insights_ai_analysis'),
     path('insights/ai_analysis/', ai_analysis, name='insights_ai_analysis_slash'),
 
+    path('insights/batch', insights_batch, name='insights_batch'),
+    path('insights/batch/', insights_batch, name='insights_batch_slash'),
+
+    # Exports (jobs avant <report_type>)
+    path('exports/jobs', export_jobs, name='export_jobs'),
+    path('exports/jobs/', export_jobs, name='export_jobs_slash'),
+    path('exports/jobs/<int:job_id>', export_job_detail, name='export_job_detail'),
+    path('exports/jobs/<int:job_id>/', export_job_detail, name='export_job_detail_slash'),
+    path('exports/jobs/<int:job_id>/download', export_job_download, name='export_job_download'),
+    path('exports/jobs/<int:job_id>/download/', export_job_download, name='export_job_download_slash'),
+    path('exports/<str:report_type>', export_report, name='export_report'),
+    path('exports/<str:report_type>/', export_report, name='export_report_slash'),
+
     # Temporary diagnostics
     path('insights/ping', lambda request: JsonResponse({'success': True, 'message': 'insights URLConf loaded'}), name='insights_ping'),
     path('insights/ping/', lambda request: JsonResponse({'success': True, 'message': 'insights URLConf loaded (slash)'}), name='insights_ping_slash'),
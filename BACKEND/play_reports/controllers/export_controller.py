@@ -0,0 +1,197 @@
+import logging
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.authentication import SessionAuthentication
+
+from play_reports.models import Client, ExportJob
+from play_reports.services.export_service import export_service, ExportError
+from play_reports.services.report_service import list_available_reports
+from play_reports.tasks import run_export_job
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def _resolve_tenant(request):
+    """Retourne (tenant, None) ou (None, Response d'erreur)."""
+    try:
+        client = Client.objects.select_related('tenant').get(user=request.user)
+    except Client.DoesNotExist:
+        return None, Response({'success': False, 'error': 'Client not found.'}, status=404)
+    if not client.tenant:
+        return None, Response({'success': False, 'error': 'No tenant configured.'}, status=400)
+    return client.tenant, None
+
+
+def _export_params(data):
+    """
+    Paramètres communs (query string ou corps JSON) : dates, package, champs,
+    format. Le format est lu dans `export_format` : `format` est réservé par
+    DRF à la négociation de contenu (URL_FORMAT_OVERRIDE) et renverrait 404.
+    """
+    start = data.get('start_date')
+    end = data.get('end_date')
+    start_date = parse_date(start) if start else None
+    end_date = parse_date(end) if end else None
+    if (start and start_date is None) or (end and end_date is None):
+        raise ExportError('Invalid date format, expected YYYY-MM-DD.')
+
+    fields = data.get('fields')
+    if isinstance(fields, str):
+        fields = [name.strip() for name in fields.split(',') if name.strip()]
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'package_name': data.get('package_name') or None,
+        'fields': fields or None,
+        'export_format': data.get('export_format') or 'csv',
+    }
+
+
+def _serialize_job(job):
+    return {
+        'id': job.id,
+        'report_type': job.report_type,
+        'format': job.export_format,
+        'destination': job.destination,
+        'status': job.status,
+        'start_date': job.start_date,
+        'end_date': job.end_date,
+        'package_name': job.package_name,
+        'row_count': job.row_count,
+        'size_bytes': job.size_bytes,
+        'location': job.location if job.destination == ExportJob.Destination.GCS else None,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def export_report(request, report_type):
+    """
+    GET /api/exports/<report_type>?start_date=&end_date=&package_name=&fields=a,b&export_format=csv|parquet
+    Streame le rapport du tenant (CSV par lots ou Parquet par groupes de lignes)
+    directement depuis un curseur serveur.
+    """
+    tenant, error = _resolve_tenant(request)
+    if error:
+        return error
+
+    try:
+        params = _export_params(request.query_params)
+        sql, sql_params, columns = export_service.prepare(report_type, tenant.id, **params)
+    except ExportError as e:
+        return Response({'success': False, 'error': str(e)}, status=400)
+
+    export_format = params['export_format']
+    response = StreamingHttpResponse(
+        export_service.stream(export_format, sql, sql_params, columns),
+        content_type=CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{report_type}.{export_format}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@api_view(['GET', 'POST'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def export_jobs(request):
+    """
+    GET  /api/exports/jobs : derniers exports asynchrones du tenant.
+    POST /api/exports/jobs
+    Body: {"report_type": "...", "export_format": "csv|parquet", "destination": "local|gcs",
+           "start_date": "...", "end_date": "...", "package_name": "...", "fields": [...]}
+    Crée un ExportJob exécuté par Celery (exports volumineux).
+    """
+    tenant, error = _resolve_tenant(request)
+    if error:
+        return error
+
+    if request.method == 'GET':
+        jobs = ExportJob.objects.filter(tenant=tenant)[:50]
+        return Response({'success': True, 'jobs': [_serialize_job(job) for job in jobs]})
+
+    body = request.data if isinstance(request.data, dict) else {}
+    report_type = body.get('report_type')
+    if report_type not in list_available_reports():
+        return Response({'success': False, 'error': f'Unknown report_type: {report_type}'}, status=400)
+    destination = body.get('destination', ExportJob.Destination.LOCAL)
+    if destination not in ExportJob.Destination.values:
+        return Response({'success': False, 'error': f'Unknown destination: {destination}'}, status=400)
+
+    try:
+        params = _export_params(body)
+        # Validation immédiate : un job invalide n'est jamais mis en file
+        export_service.prepare(report_type, tenant.id, **params)
+    except ExportError as e:
+        return Response({'success': False, 'error': str(e)}, status=400)
+
+    job = ExportJob.objects.create(
+        tenant=tenant,
+        requested_by=request.user,
+        report_type=report_type,
+        export_format=params['export_format'],
+        destination=destination,
+        start_date=params['start_date'],
+        end_date=params['end_date'],
+        package_name=params['package_name'] or '',
+        fields=params['fields'] or [],
+    )
+    run_export_job.delay(job.id)
+    return Response({'success': True, 'job': _serialize_job(job)}, status=202)
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def export_job_detail(request, job_id):
+    """GET /api/exports/jobs/<id> : statut d'un export asynchrone."""
+    tenant, error = _resolve_tenant(request)
+    if error:
+        return error
+    try:
+        job = ExportJob.objects.get(id=job_id, tenant=tenant)
+    except ExportJob.DoesNotExist:
+        return Response({'success': False, 'error': 'Export not found.'}, status=404)
+    return Response({'success': True, 'job': _serialize_job(job)})
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def export_job_download(request, job_id):
+    """GET /api/exports/jobs/<id>/download : fichier d'un export local terminé."""
+    tenant, error = _resolve_tenant(request)
+    if error:
+        return error
+    try:
+        job = ExportJob.objects.get(
+            id=job_id, tenant=tenant,
+            status=ExportJob.Status.COMPLETED, destination=ExportJob.Destination.LOCAL,
+        )
+    except ExportJob.DoesNotExist:
+        return Response({'success': False, 'error': 'Export not available.'}, status=404)
+
+    path = export_service.job_path(job)
+    if not path.exists():
+        return Response({'success': False, 'error': 'Export file expired.'}, status=410)
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=path.name,
+        content_type=CONTENT_TYPES[job.export_format],
+    )
@@ -5,12 +5,30 @@ import requests
 from datetime import datetime, timedelta
 from typing import Optional
 
-from django.http import JsonResponse
-from django.db.models import Sum, Avg, Count, Q, Max
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Sum, Avg
 from django.db.models.functions import TruncMonth
 from django.utils.dateparse import parse_date
 import asyncio
 from play_reports.services.gcs_service import gcs_service
+from play_reports.services.dimension_dictionary_service import (
+    dimension_dictionary_service,
+    DIMENSION_CATALOG,
+)
+from play_reports.services.insights_executor import insights_executor, QueryBudgetExceeded
+from play_reports.services.insights_service import insights_service, PANEL_REGISTRY
+from play_reports.services.comparison_service import comparison_service
+from play_reports.services.review_sentiment_service import review_sentiment_service
+from play_reports.services.subscription_cohort_service import subscription_cohort_service, DEFAULT_HORIZON
+from play_reports.services.crash_rate_service import crash_rate_service, CRASH_RATE_THRESHOLD
+from play_reports.services.store_funnel_service import store_funnel_service
+from play_reports.services.metric_sketch_service import metric_sketch_service, SKETCH_CATALOG
+from play_reports.services.anomaly_service import anomaly_service, ANOMALY_SERIES
+from play_reports.services.forecast_service import forecast_service, FORECAST_SERIES
+from play_reports.services.report_planner import report_planner, ReportQueryError
+from play_reports.services.report_registry import get_definition
 import re
 
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
@@ -32,7 +50,6 @@ from play_reports.models import (
     google_play_earnings,
     google_play_store_performance_overview,
     google_play_subscription_cancellation_reasons,
-    google_play_buyers_7d_overview,
     google_play_reviews,
 )
 
@@ -58,6 +75,10 @@ def _require_params(request, required):
     return None
 
 
+def _wants_trace(request) -> bool:
+    return (request.query_params.get('trace') or '').lower() in ('1', 'true', 'yes')
+
+
 def _get_default_package_for_tenant(tenant) -> Optional[str]:
     """
     Aggregate distinct package names across overview + dimensioned models and
@@ -247,92 +268,20 @@ def dimensions_options(request):
     except Client.DoesNotExist:
         return Response({'success': False, 'error': 'Client not found.'}, status=404)
 
-    data = {}
-    if analysis_type == 'installs':
-        qs = google_play_installs_overview.objects.filter(tenant=tenant)
-        if package_name:
-            qs = qs.filter(package_name=package_name)
-        data = {
-            'countries': list(qs.values_list('country', flat=True).distinct().order_by('country')),
-            'app_versions': list(qs.values_list('app_version', flat=True).distinct().order_by('app_version')),
-            'devices': list(qs.values_list('device', flat=True).distinct().order_by('device')),
-            'os_versions': list(qs.values_list('os_version', flat=True).distinct().order_by('os_version')),
-        }
-    elif analysis_type == 'subscriptions':
-        qs = google_play_subscriptions_overview.objects.filter(tenant=tenant)
-        if package_name:
-            qs = qs.filter(package_name=package_name)
-        data = {
-            'countries': list(qs.values_list('country', flat=True).distinct().order_by('country')),
-            'product_ids': list(qs.values_list('product_id', flat=True).distinct().order_by('product_id')),
-            'base_plan_ids': list(qs.values_list('base_plan_id', flat=True).distinct().order_by('base_plan_id')),
-            'offer_ids': list(qs.values_list('offer_id', flat=True).distinct().order_by('offer_id')),
-        }
-    elif analysis_type == 'revenue':
-        qs = google_play_earnings.objects.filter(tenant=tenant)
-        # For revenue, package filtering is done via product_id contains, so we don't filter here
-        data = {
-            'buyer_countries': list(qs.values_list('buyer_country', flat=True).distinct().order_by('buyer_country')),
-            'currencies': list(qs.values_list('merchant_currency', flat=True).distinct().order_by('merchant_currency')),
-        }
-    elif analysis_type == 'crashes':
-        qs = google_play_crashes_overview.objects.filter(tenant=tenant)
-        if package_name:
-            qs = qs.filter(package_name=package_name)
-        data = {
-            'app_versions': list(qs.values_list('app_version', flat=True).distinct().order_by('app_version')),
-            'devices': list(qs.values_list('device', flat=True).distinct().order_by('device')),
-            'os_versions': list(qs.values_list('os_version', flat=True).distinct().order_by('os_version')),
-            'android_os_versions': list(qs.values_list('android_os_version', flat=True).distinct().order_by('android_os_version')),
-        }
-    elif analysis_type == 'ratings':
-        qs = google_play_ratings_overview.objects.filter(tenant=tenant)
-        if package_name:
-            qs = qs.filter(package_name=package_name)
-        data = {
-            'devices': list(qs.values_list('device', flat=True).distinct().order_by('device')),
-        }
-    elif analysis_type == 'reviews':
-        qs = google_play_reviews.objects.filter(tenant=tenant)
-        if package_name:
-            qs = qs.filter(package_name=package_name)
-        data = {
-            'devices': list(qs.values_list('device', flat=True).distinct().order_by('device')),
-            'languages': list(qs.values_list('reviewer_language', flat=True).distinct().order_by('reviewer_language')),
-            'star_ratings': [1, 2, 3, 4, 5],
-        }
-    elif analysis_type == 'store_performance':
-        qs = google_play_store_performance_overview.objects.filter(tenant=tenant)
-        if package_name:
-            qs = qs.filter(package_name=package_name)
-        data = {
-            'countries': list(qs.values_list('country', flat=True).distinct().order_by('country')),
-            'traffic_sources': list(qs.values_list('traffic_source', flat=True).distinct().order_by('traffic_source')),
-            'search_terms': list(qs.values_list('search_term', flat=True).distinct().order_by('search_term')),
-            'utm_sources': list(qs.values_list('utm_source', flat=True).distinct().order_by('utm_source')),
-            'utm_campaigns': list(qs.values_list('utm_campaign', flat=True).distinct().order_by('utm_campaign')),
-        }
-    elif analysis_type == 'cancellations':
-        qs = google_play_subscription_cancellation_reasons.objects.filter(tenant=tenant)
-        if package_name:
-            qs = qs.filter(package_name=package_name)
-        data = {
-            'countries': list(qs.values_list('country', flat=True).distinct().order_by('country')),
-            'cancellation_reasons': list(qs.values_list('cancellation_reason', flat=True).distinct().order_by('cancellation_reason')),
-            'cancellation_sub_reasons': list(qs.values_list('cancellation_sub_reason', flat=True).distinct().order_by('cancellation_sub_reason')),
-            'subscription_ids': list(qs.values_list('subscription_id', flat=True).distinct().order_by('subscription_id')),
-            'sku_ids': list(qs.values_list('sku_id', flat=True).distinct().order_by('sku_id')),
-        }
-    elif analysis_type == 'buyers7d':
-        qs = google_play_buyers_7d_overview.objects.filter(tenant=tenant)
-        # buyers7d n'a pas package_name dans le modèle d'overview
-        data = {
-            'countries': list(qs.values_list('country', flat=True).distinct().order_by('country')),
-            'acquisition_channels': list(qs.values_list('acquisition_channel', flat=True).distinct().order_by('acquisition_channel')),
-        }
-    else:
+    if analysis_type not in DIMENSION_CATALOG:
         return Response({'success': False, 'error': 'Invalid type'}, status=400)
 
+    # Lecture indexée du dictionnaire de dimensions ; repli sur les DISTINCT
+    # tant que le dictionnaire n'a pas été construit pour ce tenant.
+    data = dimension_dictionary_service.get_options(tenant, analysis_type, package_name)
+    if data is None:
+        data = dimension_dictionary_service.scan_options(tenant, analysis_type, package_name)
+    if analysis_type == 'reviews':
+        data['star_ratings'] = [1, 2, 3, 4, 5]
+    if analysis_type == 'store_performance':
+        # Termes dominants des résumés bornés plutôt que toutes les valeurs distinctes
+        data['search_terms'] = store_funnel_service.search_term_options(tenant, package_name)
+
     # Clean out empty/None values
     for k, v in list(data.items()):
         data[k] = [x for x in v if x]
@@ -346,7 +295,9 @@ def dimensions_options(request):
 def reviews_insights(request):
     """
     GET /api/insights/reviews?package_name=...&start=YYYY-MM-DD&end=YYYY-MM-DD
-    Optionnel: device, rating_min, rating_max, language, limit, offset
+    Optionnel: device, rating_min, rating_max, language, q, limit, offset
+    q: recherche plein texte (syntaxe websearch : "phrase", or, -exclu),
+    résultats triés par pertinence avec extraits surlignés.
     """
     err = _require_params(request, ['start', 'end'])
     if err: return err
@@ -393,64 +344,52 @@ def reviews_insights(request):
         if not package_name:
             return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
 
-    qs = google_play_reviews.objects.filter(
-        tenant=tenant,
-        package_name=package_name,
-        review_submit_date__date__gte=start,
-        review_submit_date__date__lte=end,
-    )
-    if device:
-        qs = qs.filter(device=device)
-    if language:
-        qs = qs.filter(reviewer_language=language)
-    if rating_min is not None:
-        qs = qs.filter(star_rating__gte=rating_min)
-    if rating_max is not None:
-        qs = qs.filter(star_rating__lte=rating_max)
-
-    # Compute counts/averages explicitly
-    # Note: avoid invalid aggregates like Sum(None) which raise OutputFieldIsNoneError
-    total_count = qs.count()
-    # Average rating over the period
-    avg_rating = qs.aggregate(avg=Avg('star_rating')).get('avg')
-
-    # Distribution by stars
-    star_breakdown = []
-    for s in [5, 4, 3, 2, 1]:
-        star_breakdown.append({
-            'star': s,
-            'count': qs.filter(star_rating=s).count(),
-        })
-
-    # Items (paginated)
-    items_qs = qs.order_by('-review_submit_date')[offset:offset+limit]
-    items = [
-        {
-            'review_id': r.review_id,
-            'date': r.review_submit_date.isoformat(),
-            'star_rating': r.star_rating,
-            'title': r.review_title,
-            'text': r.review_text[:1000] if r.review_text else None,
-            'device': r.device,
-            'language': r.reviewer_language,
-            'developer_reply_date': r.developer_reply_date.isoformat() if r.developer_reply_date else None,
-        }
-        for r in items_qs
-    ]
-
-    data = {
-        'package_name': package_name,
-        'start': str(start),
-        'end': str(end),
-        'totals': {
-            'reviews_count': total_count,
-            'avg_rating': avg_rating,
-        },
-        'breakdown': star_breakdown,
-        'items': items,
+    data = insights_service.reviews_panel(tenant, package_name, start, end, {
+        'device': device,
+        'language': language,
+        'rating_min': rating_min,
+        'rating_max': rating_max,
+        'q': (request.query_params.get('q') or '').strip() or None,
         'limit': limit,
         'offset': offset,
-    }
+    })
+    return Response({'success': True, 'data': data})
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def review_sentiment_insights(request):
+    """
+    GET /api/insights/reviews/sentiment?package_name=...&start=YYYY-MM-DD&end=YYYY-MM-DD
+    Optionnel: limit (mots-clés par liste, défaut 10)
+    Tendance de sentiment et principales plaintes, lues dans les agrégats journaliers.
+    """
+    err = _require_params(request, ['start', 'end'])
+    if err: return err
+
+    start = _parse_date(request.query_params.get('start'))
+    end = _parse_date(request.query_params.get('end'))
+    if not start or not end:
+        return Response({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+    try:
+        limit = min(int(request.query_params.get('limit') or 10), 100)
+    except Exception:
+        limit = 10
+
+    try:
+        client = Client.objects.select_related('tenant').get(user=request.user)
+        if not client.tenant:
+            return Response({'success': False, 'error': 'No tenant configured.'}, status=400)
+        tenant = client.tenant
+    except Client.DoesNotExist:
+        return Response({'success': False, 'error': 'Client not found.'}, status=404)
+
+    package_name = request.query_params.get('package_name') or _get_default_package_for_tenant(tenant)
+    if not package_name:
+        return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
+
+    data = review_sentiment_service.panel(tenant, package_name, start, end, limit)
     return Response({'success': True, 'data': data})
 
 
@@ -460,8 +399,8 @@ def reviews_insights(request):
 def buyers7d_insights(request):
     """
     GET /api/insights/buyers7d?start=YYYY-MM-DD&end=YYYY-MM-DD
-    Optionnel: country, acquisition_channel
-    Note: ce rapport n'exige pas package_name car le modèle d'overview ne contient pas ce champ.
+    Optionnel: package_name, country, acquisition_channel
+    Note: sans package_name, les acheteurs de tous les packages du tenant sont agrégés.
     """
     err = _require_params(request, ['start', 'end'])
     if err: return err
@@ -482,36 +421,11 @@ def buyers7d_insights(request):
     except Client.DoesNotExist:
         return Response({'success': False, 'error': 'Client not found.'}, status=404)
 
-    qs = google_play_buyers_7d_overview.objects.filter(
-        tenant=tenant,
-        date__gte=start,
-        date__lte=end,
-    )
-    if country: qs = qs.filter(country=country)
-    if acquisition_channel: qs = qs.filter(acquisition_channel=acquisition_channel)
-
-    agg = qs.aggregate(
-        store_listing_visitors=Sum('store_listing_visitors'),
-        installers=Sum('installers'),
-        buyers=Sum('buyers'),
-        repeat_buyers=Sum('repeat_buyers'),
-        avg_visitor_to_installer_rate=Avg('visitor_to_installer_rate'),
-        avg_installer_to_buyer_rate=Avg('installer_to_buyer_rate'),
-        avg_buyer_to_repeat_rate=Avg('buyer_to_repeat_rate'),
-    )
-
-    by_channel = list(
-        qs.values('acquisition_channel')
-          .annotate(buyers=Sum('buyers'))
-          .order_by('-buyers')[:5]
-    )
-
-    data = {
-        'start': str(start),
-        'end': str(end),
-        'totals': agg,
-        'top_channels_by_buyers': by_channel,
-    }
+    package_name = request.query_params.get('package_name') or None
+    data = insights_service.buyers7d_panel(tenant, package_name, start, end, {
+        'country': country,
+        'acquisition_channel': acquisition_channel,
+    })
     return Response({'success': True, 'data': data})
 
 
@@ -546,35 +460,13 @@ def cancellations_insights(request):
     except Client.DoesNotExist:
         return Response({'success': False, 'error': 'Client not found.'}, status=404)
 
-    qs = google_play_subscription_cancellation_reasons.objects.filter(
-        tenant=tenant,
-        package_name=package_name,
-        cancellation_date__gte=start,
-        cancellation_date__lte=end,
-    )
-    if country: qs = qs.filter(country=country)
-    if cancellation_reason: qs = qs.filter(cancellation_reason=cancellation_reason)
-    if cancellation_sub_reason: qs = qs.filter(cancellation_sub_reason=cancellation_sub_reason)
-    if subscription_id: qs = qs.filter(subscription_id=subscription_id)
-    if sku_id: qs = qs.filter(sku_id=sku_id)
-
-    agg = qs.aggregate(
-        total_cancellations=Sum('cancellation_count'),
-    )
-
-    top_reasons = list(
-        qs.values('cancellation_reason')
-          .annotate(count=Sum('cancellation_count'))
-          .order_by('-count')[:5]
-    )
-
-    data = {
-        'package_name': package_name,
-        'start': str(start),
-        'end': str(end),
-        'totals': agg,
-        'top_reasons': top_reasons,
-    }
+    data = insights_service.cancellations_panel(tenant, package_name, start, end, {
+        'country': country,
+        'cancellation_reason': cancellation_reason,
+        'cancellation_sub_reason': cancellation_sub_reason,
+        'subscription_id': subscription_id,
+        'sku_id': sku_id,
+    })
     return Response({'success': True, 'data': data})
 
 
@@ -611,39 +503,256 @@ def store_performance_insights(request):
     except Client.DoesNotExist:
         return Response({'success': False, 'error': 'Client not found.'}, status=404)
 
-    qs = google_play_store_performance_overview.objects.filter(
-        tenant=tenant,
-        package_name=package_name,
-        date__gte=start,
-        date__lte=end,
-    )
-    if country: qs = qs.filter(country=country)
-    if traffic_source: qs = qs.filter(traffic_source=traffic_source)
-    if search_term: qs = qs.filter(search_term=search_term)
-    if utm_source: qs = qs.filter(utm_source=utm_source)
-    if utm_campaign: qs = qs.filter(utm_campaign=utm_campaign)
-
-    agg = qs.aggregate(
-        store_listing_visitors=Sum('store_listing_visitors'),
-        store_listing_acquisitions=Sum('store_listing_acquisitions'),
-        avg_store_listing_conversion_rate=Avg('store_listing_conversion_rate'),
-    )
+    data = insights_service.store_performance_panel(tenant, package_name, start, end, {
+        'country': country,
+        'traffic_source': traffic_source,
+        'search_term': search_term,
+        'utm_source': utm_source,
+        'utm_campaign': utm_campaign,
+    })
+    return Response({'success': True, 'data': data})
 
-    top_traffic_sources = list(
-        qs.values('traffic_source')
-          .annotate(visitors=Sum('store_listing_visitors'))
-          .order_by('-visitors')[:5]
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def store_funnel_insights(request):
+    """
+    GET /api/insights/store_performance/funnel?package_name=...&start=YYYY-MM-DD&end=YYYY-MM-DD
+    Optionnel: traffic_source, limit (termes de recherche, défaut 10)
+    Entonnoir visiteurs -> acquisitions par mois et source de trafic (mois
+    complets couvrant la période) et termes de recherche dominants.
+    """
+    err = _require_params(request, ['start', 'end'])
+    if err: return err
+
+    start = _parse_date(request.query_params.get('start'))
+    end = _parse_date(request.query_params.get('end'))
+    if not start or not end:
+        return Response({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+    try:
+        limit = min(int(request.query_params.get('limit') or 10), 100)
+    except Exception:
+        return Response({'success': False, 'error': 'limit must be an integer.'}, status=400)
+
+    try:
+        client = Client.objects.select_related('tenant').get(user=request.user)
+        if not client.tenant:
+            return Response({'success': False, 'error': 'No tenant configured.'}, status=400)
+        tenant = client.tenant
+    except Client.DoesNotExist:
+        return Response({'success': False, 'error': 'Client not found.'}, status=404)
+
+    package_name = request.query_params.get('package_name') or _get_default_package_for_tenant(tenant)
+    if not package_name:
+        return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
+
+    data = store_funnel_service.panel(tenant, package_name, start, end, {
+        'traffic_source': request.query_params.get('traffic_source'),
+    }, limit=limit)
+    return Response({'success': True, 'data': data})
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def approx_insights(request):
+    """
+    GET /api/insights/approx?type=<installs|crashes|ratings|reviews>&package_name=...&start=YYYY-MM-DD&end=YYYY-MM-DD
+    Optionnel: fields (colonnes séparées par des virgules), quantiles (ex. 0.5,0.9,0.99)
+    Valeurs distinctes (HyperLogLog) et quantiles (KLL) approchés, fusionnés
+    depuis les résumés journaliers, avec leurs bornes d'erreur.
+    """
+    err = _require_params(request, ['type', 'start', 'end'])
+    if err: return err
+
+    analysis_type = request.query_params.get('type')
+    if analysis_type not in SKETCH_CATALOG:
+        return Response({'success': False, 'error': 'Invalid type'}, status=400)
+    start = _parse_date(request.query_params.get('start'))
+    end = _parse_date(request.query_params.get('end'))
+    if not start or not end:
+        return Response({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+    fields = [f.strip() for f in (request.query_params.get('fields') or '').split(',') if f.strip()]
+    try:
+        fractions = tuple(
+            float(q) for q in (request.query_params.get('quantiles') or '0.5,0.9,0.99').split(',') if q.strip()
+        )
+    except ValueError:
+        return Response({'success': False, 'error': 'quantiles must be numbers between 0 and 1.'}, status=400)
+    if not fractions or any(not 0 <= q <= 1 for q in fractions):
+        return Response({'success': False, 'error': 'quantiles must be numbers between 0 and 1.'}, status=400)
+
+    try:
+        client = Client.objects.select_related('tenant').get(user=request.user)
+        if not client.tenant:
+            return Response({'success': False, 'error': 'No tenant configured.'}, status=400)
+        tenant = client.tenant
+    except Client.DoesNotExist:
+        return Response({'success': False, 'error': 'Client not found.'}, status=404)
+
+    package_name = request.query_params.get('package_name') or _get_default_package_for_tenant(tenant)
+    if not package_name:
+        return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
+
+    data = metric_sketch_service.panel(tenant, analysis_type, package_name, start, end, fields, fractions)
+    return Response({'success': True, 'data': data})
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def anomalies_insights(request):
+    """
+    GET /api/insights/anomalies
+    Optionnel: package_name (défaut : tous les packages), start, end (YYYY-MM-DD),
+    type (installs|crashes|ratings), metric, direction (spike|drop), limit (défaut 100), offset
+    Anomalies détectées après chaque synchronisation, les plus récentes d'abord.
+    """
+    start = end = None
+    if request.query_params.get('start'):
+        start = _parse_date(request.query_params.get('start'))
+    if request.query_params.get('end'):
+        end = _parse_date(request.query_params.get('end'))
+    if (request.query_params.get('start') and not start) or (request.query_params.get('end') and not end):
+        return Response({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+    report_type = request.query_params.get('type')
+    if report_type and report_type not in ANOMALY_SERIES:
+        return Response({'success': False, 'error': 'Invalid type'}, status=400)
+    direction = request.query_params.get('direction')
+    if direction and direction not in ('spike', 'drop'):
+        return Response({'success': False, 'error': 'direction must be spike or drop.'}, status=400)
+    try:
+        limit = min(int(request.query_params.get('limit') or 100), 500)
+        offset = max(int(request.query_params.get('offset') or 0), 0)
+    except Exception:
+        return Response({'success': False, 'error': 'limit and offset must be integers.'}, status=400)
+
+    try:
+        client = Client.objects.select_related('tenant').get(user=request.user)
+        if not client.tenant:
+            return Response({'success': False, 'error': 'No tenant configured.'}, status=400)
+        tenant = client.tenant
+    except Client.DoesNotExist:
+        return Response({'success': False, 'error': 'Client not found.'}, status=404)
+
+    data = anomaly_service.list_anomalies(
+        tenant, request.query_params.get('package_name'), start, end, {
+            'report_type': report_type,
+            'metric': request.query_params.get('metric'),
+            'direction': direction,
+        }, limit=limit, offset=offset,
     )
+    return Response({'success': True, 'data': data})
 
-    data = {
-        'package_name': package_name,
-        'start': str(start),
-        'end': str(end),
-        'totals': agg,
-        'top_traffic_sources_by_visitors': top_traffic_sources,
-    }
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def forecast_insights(request):
+    """
+    GET /api/insights/forecast?package_name=...
+    Optionnel: metric (installs|revenue, défaut : les deux), horizon (30 ou 90, défaut 30)
+    Prévisions journalières mises en cache après chaque synchronisation
+    (Holt-Winters amorti ou saisonnier naïf) avec intervalle à 95 %.
+    """
+    metric = request.query_params.get('metric')
+    if metric and metric not in FORECAST_SERIES:
+        return Response({'success': False, 'error': 'metric must be installs or revenue.'}, status=400)
+    try:
+        horizon = int(request.query_params.get('horizon') or 30)
+    except Exception:
+        horizon = None
+    if horizon not in (30, 90):
+        return Response({'success': False, 'error': 'horizon must be 30 or 90.'}, status=400)
+
+    try:
+        client = Client.objects.select_related('tenant').get(user=request.user)
+        if not client.tenant:
+            return Response({'success': False, 'error': 'No tenant configured.'}, status=400)
+        tenant = client.tenant
+    except Client.DoesNotExist:
+        return Response({'success': False, 'error': 'Client not found.'}, status=404)
+
+    package_name = request.query_params.get('package_name') or _get_default_package_for_tenant(tenant)
+    if not package_name:
+        return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
+
+    data = forecast_service.get(tenant, package_name, [metric] if metric else None, horizon)
     return Response({'success': True, 'data': data})
 
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def report_query(request):
+    """
+    GET /api/insights/query?report=<type de rapport>&metrics=daily_crashes,daily_anrs:avg
+    Optionnel: dimensions (séparées par des virgules), start, end (YYYY-MM-DD),
+    package_name (défaut : package par défaut si le rapport en a un),
+    <dimension>=<valeur> (filtres), order (alias, préfixe '-'), limit (défaut 100, max 1000)
+    Requête générique planifiée par report_planner sur le registre des rapports :
+    l'agrégat précalculé ou l'index retenu est renvoyé dans 'plan'.
+    """
+    err = _require_params(request, ['report', 'metrics'])
+    if err: return err
+
+    report_type = request.query_params.get('report')
+    definition = get_definition(report_type)
+    if definition is None:
+        return Response({'success': False, 'error': 'Invalid report'}, status=400)
+    start = end = None
+    if request.query_params.get('start'):
+        start = _parse_date(request.query_params.get('start'))
+    if request.query_params.get('end'):
+        end = _parse_date(request.query_params.get('end'))
+    if (request.query_params.get('start') and not start) or (request.query_params.get('end') and not end):
+        return Response({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+    try:
+        limit = min(int(request.query_params.get('limit') or 100), 1000)
+    except Exception:
+        return Response({'success': False, 'error': 'limit must be an integer.'}, status=400)
+    metrics = [m.strip() for m in request.query_params.get('metrics').split(',') if m.strip()]
+    dimensions = [d.strip() for d in (request.query_params.get('dimensions') or '').split(',') if d.strip()]
+    filters = {
+        field: request.query_params.get(field)
+        for field in definition['dimensions'] if request.query_params.get(field)
+    }
+
+    try:
+        client = Client.objects.select_related('tenant').get(user=request.user)
+        if not client.tenant:
+            return Response({'success': False, 'error': 'No tenant configured.'}, status=400)
+        tenant = client.tenant
+    except Client.DoesNotExist:
+        return Response({'success': False, 'error': 'Client not found.'}, status=404)
+
+    package_name = request.query_params.get('package_name')
+    if not package_name and definition['package']:
+        package_name = _get_default_package_for_tenant(tenant)
+        if not package_name:
+            return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
+
+    try:
+        rows, plan = report_planner.query(
+            report_type, tenant, dimensions, metrics, package_name=package_name, start=start, end=end,
+            filters=filters, order_by=request.query_params.get('order'), limit=limit,
+        )
+    except ReportQueryError as e:
+        return Response({'success': False, 'error': str(e)}, status=400)
+
+    return Response({
+        'success': True,
+        'data': {
+            'report': report_type,
+            'package_name': package_name,
+            'start': str(start) if start else None,
+            'end': str(end) if end else None,
+            'rows': rows,
+            'plan': report_planner.explain(plan),
+        }
+    })
+
 @api_view(['GET'])
 @authentication_classes([JWTAuthentication, SessionAuthentication])
 @permission_classes([IsAuthenticated])
@@ -682,69 +791,12 @@ def installs_insights(request):
         if not package_name:
             return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
 
-    qs = google_play_installs_overview.objects.filter(
-        tenant=tenant,
-        package_name=package_name,
-        date__gte=start,
-        date__lte=end,
-    )
-    if country: qs = qs.filter(country=country)
-    if app_version: qs = qs.filter(app_version=app_version)
-    if device: qs = qs.filter(device=device)
-    if os_version: qs = qs.filter(os_version=os_version)
-
-    agg = qs.aggregate(
-        current_device_installs=Sum('current_device_installs'),
-        installs_on_active_devices=Sum('installs_on_active_devices'),
-        daily_device_installs=Sum('daily_device_installs'),
-        daily_device_uninstalls=Sum('daily_device_uninstalls'),
-        daily_device_upgrades=Sum('daily_device_upgrades'),
-        total_user_installs=Sum('total_user_installs'),
-        daily_user_installs=Sum('daily_user_installs'),
-        daily_user_uninstalls=Sum('daily_user_uninstalls'),
-    )
-
-    # Net installs
-    net_user_installs = (agg.get('daily_user_installs') or 0) - (agg.get('daily_user_uninstalls') or 0)
-
-    # Top countries (if not already filtered)
-    top_countries = []
-    if not country:
-        top_countries = list(
-            qs.values('country')
-              .annotate(installs=Sum('daily_user_installs'))
-              .order_by('-installs')[:5]
-        )
-
-    # Additional breakdowns for richer insights
-    top_devices = list(
-        qs.values('device')
-          .annotate(installs=Sum('daily_user_installs'))
-          .order_by('-installs')[:5]
-    )
-    top_os_versions = list(
-        qs.values('os_version')
-          .annotate(installs=Sum('daily_user_installs'))
-          .order_by('-installs')[:5]
-    )
-    # App versions breakdown (useful to detect anomalies by version)
-    top_app_versions = list(
-        qs.values('app_version')
-          .annotate(installs=Sum('daily_user_installs'))
-          .order_by('-installs')[:5]
-    )
-
-    data = {
-        'package_name': package_name,
-        'start': str(start),
-        'end': str(end),
-        'totals': agg,
-        'net_user_installs': net_user_installs,
-        'top_countries': top_countries,
-        'top_devices_by_installs': top_devices,
-        'top_os_versions_by_installs': top_os_versions,
-        'top_app_versions_by_installs': top_app_versions,
-    }
+    data = insights_service.installs_panel(tenant, package_name, start, end, {
+        'country': country,
+        'app_version': app_version,
+        'device': device,
+        'os_version': os_version,
+    })
     return Response({'success': True, 'data': data})
 
 
@@ -779,54 +831,24 @@ def ai_analysis(request):
         except Client.DoesNotExist:
             return Response({'success': False, 'error': 'Client not found.'}, status=404)
 
-        def get_tenant_filtered_queryset(model, date_field='date'):
-            """Helper to get tenant-filtered queryset with fallback"""
-            qs = model.objects.filter(
-                tenant=tenant,
-                package_name=package_name,
-                **{f'{date_field}__gte': start_date, f'{date_field}__lte': end_date}
-            )
-            if not qs.exists():
-                qs = model.objects.filter(
-                    package_name=package_name,
-                    **{f'{date_field}__gte': start_date, f'{date_field}__lte': end_date}
-                )
-            return qs
-
-        # 1. Installations Analysis
-        installs_qs = get_tenant_filtered_queryset(google_play_installs_overview)
-        installs = installs_qs.aggregate(
-            total_installs=Sum('daily_user_installs'),
-            total_uninstalls=Sum('daily_user_uninstalls'),
-            avg_install_rate=Avg('daily_user_installs'),
-            current_installs=Max('current_device_installs')
-        )
-        
-        # 2. Ratings Analysis
-        ratings_qs = get_tenant_filtered_queryset(google_play_ratings_overview)
-        ratings = ratings_qs.aggregate(
-            avg_rating=Avg('daily_average_rating'),
-            total_ratings=Count('id'),  # Using count of records as a proxy for total ratings
-            avg_rating_delta=Avg('total_average_rating')  # Using total_average_rating as a fallback
-        )
-        
-        # 3. Crashes Analysis
-        crashes_qs = get_tenant_filtered_queryset(google_play_crashes_overview)
-        crashes = crashes_qs.aggregate(
-            total_crashes=Sum('daily_crashes'),
-            total_anrs=Sum('daily_anrs'),
-            avg_daily_crashes=Avg('daily_crashes')
-        )
-        
-        # 4. Reviews Analysis
-        reviews_qs = get_tenant_filtered_queryset(google_play_reviews, 'review_submit_date')
-        reviews = reviews_qs.aggregate(
-            avg_rating=Avg('star_rating'),
-            total_reviews=Count('id'),
-            positive_reviews=Count('id', filter=Q(star_rating__gte=4)),
-            negative_reviews=Count('id', filter=Q(star_rating__lte=2))
-        )
-        reviews['sentiment_score'] = (reviews.get('positive_reviews', 0) - reviews.get('negative_reviews', 0)) / max(1, reviews.get('total_reviews', 1))
+        # Agrégations et comparaisons indépendantes : exécutées en parallèle
+        panel_args = (tenant, package_name, start_date, end_date)
+        comparison_args = (tenant, package_name, start_date, end_date, prev_start_date, prev_end_date)
+        metrics, trace = insights_executor.run({
+            'installs': lambda: insights_service.installs_metrics(*panel_args),
+            'ratings': lambda: insights_service.ratings_metrics(*panel_args),
+            'crashes': lambda: insights_service.crashes_metrics(*panel_args),
+            'reviews': lambda: insights_service.reviews_metrics(*panel_args),
+            'anomalies': lambda: anomaly_service.list_anomalies(*panel_args, limit=20)['items'],
+            **{
+                f'{report}_comparison': (lambda report=report: comparison_service.compare(report, *comparison_args))
+                for report in ('installs', 'ratings', 'crashes', 'reviews')
+            },
+        })
+        installs = metrics['installs']
+        ratings = metrics['ratings']
+        crashes = metrics['crashes']
+        reviews = metrics['reviews']
 
         # Generate analysis
         analysis = {
@@ -838,15 +860,26 @@ def ai_analysis(request):
                 'crashes': crashes,
                 'reviews': reviews
             },
-            'trends': generate_trends(tenant, package_name, start_date, end_date, prev_start_date, prev_end_date),
-            'recommendations': generate_recommendations(installs, ratings, crashes, reviews)
+            'trends': generate_trends({
+                report: metrics[f'{report}_comparison']
+                for report in ('installs', 'ratings', 'crashes', 'reviews')
+            }),
+            'recommendations': generate_recommendations(installs, ratings, crashes, reviews),
+            # Écarts détectés sur les séries journalières (médiane/MAD)
+            'anomalies': metrics['anomalies'],
         }
 
-        return JsonResponse({
+        response = {
             'success': True,
             'analysis': analysis
-        })
+        }
+        if _wants_trace(request):
+            response['trace'] = trace
+        return JsonResponse(response)
 
+    except QueryBudgetExceeded as e:
+        logger.warning(f"AI Analysis query budget exceeded: {str(e)}")
+        return JsonResponse({'success': False, 'error': str(e)}, status=503)
     except Exception as e:
         logger.error(f"AI Analysis error: {str(e)}", exc_info=True)
         return JsonResponse({
@@ -868,11 +901,16 @@ def generate_performance_summary(installs, ratings, crashes, reviews):
         trend = "↑" if rating_delta > 0 else "↓" if rating_delta < 0 else "→"
         summary.append(f"⭐ Average rating: {ratings['avg_rating']:.1f}/5 (from {ratings.get('total_ratings', 0):,} ratings) {trend}")
     
-    # Crash metrics
-    if crashes.get('avg_daily_crashes'):
-        crash_rate = crashes['avg_daily_crashes'] or 0
-        status = "⚠️" if crash_rate > 0.05 else "✅"
-        summary.append(f"{status} Crash rate: {crash_rate:.2%} ({crashes.get('total_crashes', 0):,} crashes)")
+    # Crash metrics (plantages rapportés aux appareils actifs)
+    if crashes.get('crash_rate') is not None:
+        crash_rate = crashes['crash_rate']
+        status = "⚠️" if crash_rate > CRASH_RATE_THRESHOLD else "✅"
+        summary.append(
+            f"{status} Crash rate: {crash_rate:.2%} of active devices "
+            f"({crashes.get('crashes_per_1k', 0):.1f} per 1k, {crashes.get('total_crashes') or 0:,} crashes)"
+        )
+    elif crashes.get('total_crashes'):
+        summary.append(f"💥 Crashes: {crashes['total_crashes']:,} (active devices unknown)")
     
     # Review metrics
     if reviews.get('total_reviews', 0) > 0:
@@ -881,14 +919,23 @@ def generate_performance_summary(installs, ratings, crashes, reviews):
     
     return summary
 
-def generate_trends(tenant, package_name, start_date, end_date, prev_start_date, prev_end_date):
-    """Generate trend analysis compared to previous period"""
-    # This is a simplified implementation - you might want to add more sophisticated trend analysis
+def generate_trends(comparisons):
+    """
+    Generate trend analysis compared to previous period.
+
+    `comparisons` maps installs/ratings/crashes/reviews to the output of
+    comparison_service.compare (current vs previous window, one query each).
+    """
+    installs = comparisons['installs']
+    ratings = comparisons['ratings']
+    crashes = comparisons['crashes']
+    reviews = comparisons['reviews']
     return {
-        'install_trend': 'stable',  # Implement actual trend calculation
-        'rating_trend': 'improving',
-        'crash_trend': 'decreasing',
-        'review_sentiment_trend': 'improving'
+        'install_trend': comparison_service.trend_label(installs['installs'], labels=('increasing', 'decreasing')),
+        'rating_trend': comparison_service.trend_label(ratings['avg_rating']),
+        'crash_trend': comparison_service.trend_label(crashes['crashes'], labels=('increasing', 'decreasing')),
+        'review_sentiment_trend': comparison_service.trend_label(reviews['sentiment']),
+        'comparison': comparisons,
     }
 
 def generate_recommendations(installs, ratings, crashes, reviews):
@@ -906,8 +953,8 @@ def generate_recommendations(installs, ratings, crashes, reviews):
         recommendations.append("⭐ Améliorez vos notes : Analysez les retours utilisateurs et corrigez les problèmes récurrents signalés dans les avis.")
     
     # Crash recommendations
-    crash_rate = crashes.get('avg_daily_crashes', 0) or 0
-    if crash_rate > 0.05:  # 5% crash rate threshold
+    crash_rate = crashes.get('crash_rate') or 0
+    if crash_rate > CRASH_RATE_THRESHOLD:  # seuil Android vitals
         recommendations.append("⚠️ Stabilité à améliorer : Votre application plante trop souvent. Vérifiez les rapports de plantage et corrigez les bogues critiques.")
     
     # Review sentiment recommendations
@@ -933,7 +980,7 @@ def generate_detailed_description(installs, ratings, crashes, reviews):
     total_ratings = ratings.get('total_ratings', 0) or 0
     
     # Crash metrics
-    crash_rate = crashes.get('avg_daily_crashes', 0) or 0
+    crash_rate = crashes.get('crash_rate')
     total_crashes = crashes.get('total_crashes', 0) or 0
     
     # Review metrics
@@ -969,12 +1016,14 @@ def generate_detailed_description(installs, ratings, crashes, reviews):
     # Crash analysis
     if total_crashes > 0:
         crash_analysis = f"Stabilité : "
-        if crash_rate <= 0.01:
-            crash_analysis += f"Excellente stabilité avec seulement {crash_rate:.1%} de plantages quotidiens."
-        elif crash_rate <= 0.05:
-            crash_analysis += f"Stabilité moyenne avec {crash_rate:.1%} de plantages quotidiens."
+        if crash_rate is None:
+            crash_analysis += f"{total_crashes:,} plantages (appareils actifs inconnus, taux non calculable)."
+        elif crash_rate <= CRASH_RATE_THRESHOLD / 2:
+            crash_analysis += f"Excellente stabilité avec seulement {crash_rate:.2%} d'appareils actifs touchés."
+        elif crash_rate <= CRASH_RATE_THRESHOLD:
+            crash_analysis += f"Stabilité moyenne avec {crash_rate:.2%} d'appareils actifs touchés."
         else:
-            crash_analysis += f"Attention : taux de plantage élevé à {crash_rate:.1%} nécessitant une intervention."
+            crash_analysis += f"Attention : taux de plantage élevé à {crash_rate:.2%} des appareils actifs nécessitant une intervention."
         description_parts.append(crash_analysis)
     
     # Review sentiment analysis
@@ -1003,7 +1052,7 @@ def concise_insights(request):
 
     Returns a compact, structured summary combining installs and ratings essentials
     for the authenticated tenant and selected package. Includes deltas vs previous
-    period of same length.
+    period of same length. Pass trace=1 to include per-panel timings.
     """
     # Validate params
     err = _require_params(request, ['start', 'end'])
@@ -1040,77 +1089,20 @@ def concise_insights(request):
     except Exception:
         return Response({'success': False, 'error': 'Invalid date range.'}, status=400)
 
-    # Helpers mirroring ai_analysis DB aggregation but returning only essentials
-    def build_installs(s_date, e_date):
-        qs = google_play_installs_overview.objects.filter(
-            tenant=tenant,
-            package_name=package_name,
-            date__gte=s_date,
-            date__lte=e_date,
-        )
-        if not qs.exists():
-            qs = google_play_installs_overview.objects.filter(
-                package_name=package_name,
-                date__gte=s_date,
-                date__lte=e_date,
-            )
-        agg = qs.aggregate(
-            daily_user_installs=Sum('daily_user_installs'),
-            daily_user_uninstalls=Sum('daily_user_uninstalls'),
-            total_user_installs=Sum('total_user_installs'),
-        )
-        net = (agg.get('daily_user_installs') or 0) - (agg.get('daily_user_uninstalls') or 0)
-        top_countries = list(qs.values('country').annotate(installs=Sum('daily_user_installs')).order_by('-installs')[:5])
-        top_devices = list(qs.values('device').annotate(installs=Sum('daily_user_installs')).order_by('-installs')[:5])
-        top_os = list(qs.values('os_version').annotate(installs=Sum('daily_user_installs')).order_by('-installs')[:5])
-        top_app_versions = list(qs.values('app_version').annotate(installs=Sum('daily_user_installs')).order_by('-installs')[:5])
-        return {
-            'totals': {
-                'daily_user_installs': agg.get('daily_user_installs') or 0,
-                'daily_user_uninstalls': agg.get('daily_user_uninstalls') or 0,
-                'net_user_installs': net,
-                'total_user_installs': agg.get('total_user_installs') or 0,
-            },
-            'top': {
-                'countries': top_countries,
-                'devices': top_devices,
-                'os_versions': top_os,
-                'app_versions': top_app_versions,
-            }
-        }
-
-    def build_ratings(s_date, e_date):
-        qs = google_play_ratings_overview.objects.filter(
-            tenant=tenant,
-            package_name=package_name,
-            date__gte=s_date,
-            date__lte=e_date,
-        )
-        if not qs.exists():
-            qs = google_play_ratings_overview.objects.filter(
-                package_name=package_name,
-                date__gte=s_date,
-                date__lte=e_date,
-            )
-        agg = qs.aggregate(
-            daily_avg=Avg('daily_average_rating'),
-            total_avg=Avg('total_average_rating'),
-        )
-        top_devices = list(qs.values('device').annotate(avg_rating=Avg('daily_average_rating')).order_by('-avg_rating')[:5])
-        return {
-            'averages': {
-                'daily_avg': agg.get('daily_avg'),
-                'total_avg': agg.get('total_avg'),
-            },
-            'top': {
-                'devices_by_avg_rating': top_devices,
-            }
-        }
-
-    curr_i = build_installs(start, end)
-    curr_r = build_ratings(start, end)
-    prev_i = build_installs(prev_start, prev_end)
-    prev_r = build_ratings(prev_start, prev_end)
+    # Périodes courante et précédente calculées en parallèle
+    try:
+        panels, trace = insights_executor.run({
+            'curr_installs': lambda: insights_service.installs_summary(tenant, package_name, start, end),
+            'curr_ratings': lambda: insights_service.ratings_summary(tenant, package_name, start, end),
+            'prev_installs': lambda: insights_service.installs_summary(tenant, package_name, prev_start, prev_end),
+            'prev_ratings': lambda: insights_service.ratings_summary(tenant, package_name, prev_start, prev_end),
+        })
+    except QueryBudgetExceeded as e:
+        return Response({'success': False, 'error': str(e)}, status=503)
+    curr_i = panels['curr_installs']
+    curr_r = panels['curr_ratings']
+    prev_i = panels['prev_installs']
+    prev_r = panels['prev_ratings']
 
     # Deltas
     deltas_installs = {
@@ -1145,7 +1137,10 @@ def concise_insights(request):
         }
     }
 
-    return JsonResponse({'success': True, 'data': payload})
+    response = {'success': True, 'data': payload}
+    if _wants_trace(request):
+        response['trace'] = trace
+    return JsonResponse(response)
 
 @api_view(['GET'])
 @authentication_classes([JWTAuthentication, SessionAuthentication])
@@ -1827,41 +1822,52 @@ def subscriptions_insights(request):
     except Client.DoesNotExist:
         return Response({'success': False, 'error': 'Client not found.'}, status=404)
 
-    qs = google_play_subscriptions_overview.objects.filter(
-        tenant=tenant,
-        package_name=package_name,
-        date__gte=start,
-        date__lte=end,
-    )
-    if country: qs = qs.filter(country=country)
-    if product_id: qs = qs.filter(product_id=product_id)
-    if base_plan_id: qs = qs.filter(base_plan_id=base_plan_id)
-    if offer_id: qs = qs.filter(offer_id=offer_id)
-
-    agg = qs.aggregate(
-        new_subscribers=Sum('new_subscribers'),
-        cancelled_subscribers=Sum('cancelled_subscribers'),
-        active_subscribers=Sum('active_subscribers'),
-    )
+    data = insights_service.subscriptions_panel(tenant, package_name, start, end, {
+        'country': country,
+        'product_id': product_id,
+        'base_plan_id': base_plan_id,
+        'offer_id': offer_id,
+    })
+    return Response({'success': True, 'data': data})
 
-    churn = None
-    if (agg.get('new_subscribers') or 0) > 0:
-        churn = (agg.get('cancelled_subscribers') or 0) / max(1, (agg.get('new_subscribers') or 0))
 
-    top_products = list(
-        qs.values('product_id')
-          .annotate(new_subscribers=Sum('new_subscribers'))
-          .order_by('-new_subscribers')[:5]
-    )
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def subscription_cohorts_insights(request):
+    """
+    GET /api/insights/subscriptions/cohorts?package_name=...&start=YYYY-MM-DD&end=YYYY-MM-DD
+    Optionnel: product_id, base_plan_id, horizon (mois, défaut 12)
+    Churn mensuel et cohortes, lus dans les agrégats mensuels précalculés.
+    """
+    err = _require_params(request, ['start', 'end'])
+    if err: return err
 
-    data = {
-        'package_name': package_name,
-        'start': str(start),
-        'end': str(end),
-        'totals': agg,
-        'approx_churn_ratio_cancel_over_new': churn,
-        'top_products_by_new_subscribers': top_products,
-    }
+    start = _parse_date(request.query_params.get('start'))
+    end = _parse_date(request.query_params.get('end'))
+    if not start or not end:
+        return Response({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+    try:
+        horizon = min(int(request.query_params.get('horizon') or DEFAULT_HORIZON), 36)
+    except Exception:
+        horizon = DEFAULT_HORIZON
+
+    try:
+        client = Client.objects.select_related('tenant').get(user=request.user)
+        if not client.tenant:
+            return Response({'success': False, 'error': 'No tenant configured.'}, status=400)
+        tenant = client.tenant
+    except Client.DoesNotExist:
+        return Response({'success': False, 'error': 'Client not found.'}, status=404)
+
+    package_name = request.query_params.get('package_name') or _get_default_package_for_tenant(tenant)
+    if not package_name:
+        return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
+
+    data = subscription_cohort_service.panel(tenant, package_name, start, end, {
+        'product_id': request.query_params.get('product_id'),
+        'base_plan_id': request.query_params.get('base_plan_id'),
+    }, horizon=horizon)
     return Response({'success': True, 'data': data})
 
 
@@ -1871,7 +1877,8 @@ def subscriptions_insights(request):
 def revenue_insights(request):
     """
     GET /api/insights/revenue?start=YYYY-MM-DD&end=YYYY-MM-DD
-    Optionnel: package_name (si présent dans product_id), buyer_country, currency
+    Optionnel: package_name, buyer_country, currency (devise d'origine),
+    source (earnings | estimated_sales). Montants dans REPORTING_CURRENCY.
     """
     err = _require_params(request, ['start', 'end'])
     if err: return err
@@ -1884,6 +1891,9 @@ def revenue_insights(request):
     package_name = request.query_params.get('package_name')
     buyer_country = request.query_params.get('buyer_country')
     currency = request.query_params.get('currency')  # merchant currency
+    source = request.query_params.get('source') or 'earnings'
+    if source not in ('earnings', 'estimated_sales'):
+        return Response({'success': False, 'error': 'Invalid source. Use earnings or estimated_sales.'}, status=400)
 
     try:
         client = Client.objects.select_related('tenant').get(user=request.user)
@@ -1893,39 +1903,11 @@ def revenue_insights(request):
     except Client.DoesNotExist:
         return Response({'success': False, 'error': 'Client not found.'}, status=404)
 
-    qs = google_play_earnings.objects.filter(
-        tenant=tenant,
-        transaction_date__gte=start,
-        transaction_date__lte=end,
-    )
-
-    if package_name:
-        qs = qs.filter(product_id__icontains=package_name)
-    if buyer_country:
-        qs = qs.filter(buyer_country=buyer_country)
-    if currency:
-        qs = qs.filter(merchant_currency=currency)
-
-    agg = qs.aggregate(
-        gross_merchant=Sum('amount_merchant_currency'),
-        gross_buyer=Sum('amount_buyer_currency'),
-        avg_conversion_rate=Avg('currency_conversion_rate'),
-        tax_amount=Sum('tax_amount'),
-        service_fee_amount=Sum('service_fee_amount'),
-    )
-
-    top_countries = list(
-        qs.values('buyer_country')
-          .annotate(amount=Sum('amount_merchant_currency'))
-          .order_by('-amount')[:5]
-    )
-
-    data = {
-        'start': str(start),
-        'end': str(end),
-        'totals': agg,
-        'top_countries_by_revenue': top_countries,
-    }
+    data = insights_service.revenue_panel(tenant, package_name, start, end, {
+        'buyer_country': buyer_country,
+        'currency': currency,
+        'source': source,
+    })
     return Response({'success': True, 'data': data})
 
 
@@ -1964,48 +1946,50 @@ def crashes_insights(request):
         if not package_name:
             return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
 
-    qs = google_play_crashes_overview.objects.filter(
-        tenant=tenant,
-        package_name=package_name,
-        date__gte=start,
-        date__lte=end,
-    )
-    if app_version: qs = qs.filter(app_version=app_version)
-    if device: qs = qs.filter(device=device)
-    if os_version: qs = qs.filter(os_version=os_version)
-    if android_os_version: qs = qs.filter(android_os_version=android_os_version)
-
-    agg = qs.aggregate(
-        daily_crashes=Sum('daily_crashes'),
-        daily_anrs=Sum('daily_anrs'),
-    )
+    data = insights_service.crashes_panel(tenant, package_name, start, end, {
+        'app_version': app_version,
+        'device': device,
+        'os_version': os_version,
+        'android_os_version': android_os_version,
+    })
+    return Response({'success': True, 'data': data})
 
-    top_versions = list(
-        qs.values('app_version')
-          .annotate(crashes=Sum('daily_crashes'))
-          .order_by('-crashes')[:5]
-    )
 
-    top_devices = list(
-        qs.values('device')
-          .annotate(crashes=Sum('daily_crashes'))
-          .order_by('-crashes')[:5]
-    )
-    top_android_os_versions = list(
-        qs.values('android_os_version')
-          .annotate(crashes=Sum('daily_crashes'))
-          .order_by('-crashes')[:5]
-    )
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def crash_stability_insights(request):
+    """
+    GET /api/insights/crashes/stability?package_name=...&start=YYYY-MM-DD&end=YYYY-MM-DD
+    Optionnel: limit (versions, défaut 5), min_devices (défaut 100)
+    Plantages pour 1000 appareils actifs, tendance et pires versions.
+    """
+    err = _require_params(request, ['start', 'end'])
+    if err: return err
 
-    data = {
-        'package_name': package_name,
-        'start': str(start),
-        'end': str(end),
-        'totals': agg,
-        'top_versions_by_crashes': top_versions,
-        'top_devices_by_crashes': top_devices,
-        'top_android_os_versions_by_crashes': top_android_os_versions,
-    }
+    start = _parse_date(request.query_params.get('start'))
+    end = _parse_date(request.query_params.get('end'))
+    if not start or not end:
+        return Response({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+    try:
+        limit = min(int(request.query_params.get('limit') or 5), 50)
+        min_devices = max(int(request.query_params.get('min_devices') or 100), 0)
+    except Exception:
+        return Response({'success': False, 'error': 'limit and min_devices must be integers.'}, status=400)
+
+    try:
+        client = Client.objects.select_related('tenant').get(user=request.user)
+        if not client.tenant:
+            return Response({'success': False, 'error': 'No tenant configured.'}, status=400)
+        tenant = client.tenant
+    except Client.DoesNotExist:
+        return Response({'success': False, 'error': 'Client not found.'}, status=404)
+
+    package_name = request.query_params.get('package_name') or _get_default_package_for_tenant(tenant)
+    if not package_name:
+        return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
+
+    data = crash_rate_service.panel(tenant, package_name, start, end, limit=limit, min_devices=min_devices)
     return Response({'success': True, 'data': data})
 
 
@@ -2041,31 +2025,140 @@ def ratings_insights(request):
         if not package_name:
             return Response({'success': False, 'error': 'No packages found for tenant.'}, status=404)
 
-    qs = google_play_ratings_overview.objects.filter(
-        tenant=tenant,
-        package_name=package_name,
-        date__gte=start,
-        date__lte=end,
-    )
-    if device: qs = qs.filter(device=device)
+    data = insights_service.ratings_panel(tenant, package_name, start, end, {
+        'device': device,
+    })
+    return Response({'success': True, 'data': data})
 
-    agg = qs.aggregate(
-        daily_avg=Avg('daily_average_rating'),
-        total_avg=Avg('total_average_rating'),
-    )
 
-    # Averages by device for highlight
-    top_devices_avg = list(
-        qs.values('device')
-          .annotate(avg_rating=Avg('daily_average_rating'))
-          .order_by('-avg_rating')[:5]
-    )
+# Filtres numériques des panneaux (les autres sont transmis tels quels)
+_INT_PANEL_FILTERS = {'rating_min', 'rating_max', 'limit', 'offset'}
 
-    data = {
-        'package_name': package_name,
-        'start': str(start),
-        'end': str(end),
-        'averages': agg,
-        'top_devices_by_avg_rating': top_devices_avg,
+
+def _panel_filters(panel_type, params):
+    filters = {}
+    for key in PANEL_REGISTRY[panel_type]['filters']:
+        value = params.get(key)
+        if value in (None, ''):
+            continue
+        if key in _INT_PANEL_FILTERS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                continue
+        filters[key] = value
+    return filters
+
+
+@api_view(['POST'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def insights_batch(request):
+    """
+    POST /api/insights/batch
+    Body: {
+        "start": "YYYY-MM-DD", "end": "YYYY-MM-DD", "package_name": "<optionnel>",
+        "panels": [{"id": "installs", "type": "installs", "params": {...}}, ...]
     }
-    return Response({'success': True, 'data': data})
+    Chaque panneau peut surcharger start, end et package_name dans ses params.
+
+    Le tenant et le package par défaut sont résolus une seule fois, les panneaux
+    sont exécutés en parallèle et la réponse JSON est streamée au fil de leur
+    complétion : {"success": true, "panels": {<id>: {...}}, "trace": {...}}.
+    """
+    body = request.data if isinstance(request.data, dict) else {}
+    specs = body.get('panels')
+    if not isinstance(specs, list) or not specs:
+        return Response({'success': False, 'error': 'panels must be a non-empty list.'}, status=400)
+    max_panels = getattr(settings, 'INSIGHTS_BATCH_MAX_PANELS', 20)
+    if len(specs) > max_panels:
+        return Response({'success': False, 'error': f'Too many panels (max {max_panels}).'}, status=400)
+
+    # Resolve tenant
+    try:
+        client = Client.objects.select_related('tenant').get(user=request.user)
+        if not client.tenant:
+            return Response({'success': False, 'error': 'No tenant configured.'}, status=400)
+        tenant = client.tenant
+    except Client.DoesNotExist:
+        return Response({'success': False, 'error': 'Client not found.'}, status=404)
+
+    default_package = None
+    default_package_resolved = False
+    panels = {}
+    errors = {}
+
+    for index, spec in enumerate(specs):
+        spec = spec if isinstance(spec, dict) else {}
+        panel_type = spec.get('type')
+        panel_id = str(spec.get('id') or panel_type or index)
+        params = spec.get('params') if isinstance(spec.get('params'), dict) else {}
+
+        if panel_id in panels or panel_id in errors:
+            return Response({'success': False, 'error': f'Duplicate panel id: {panel_id}'}, status=400)
+        if panel_type not in PANEL_REGISTRY:
+            errors[panel_id] = f'Invalid panel type: {panel_type}'
+            continue
+
+        start = _parse_date(params.get('start') or body.get('start'))
+        end = _parse_date(params.get('end') or body.get('end'))
+        if not start or not end:
+            errors[panel_id] = 'Invalid date format. Use YYYY-MM-DD.'
+            continue
+
+        package_mode = PANEL_REGISTRY[panel_type]['package']
+        package_name = params.get('package_name') or body.get('package_name')
+        if package_mode == 'none':
+            package_name = None
+        elif not package_name and package_mode == 'required':
+            errors[panel_id] = 'Missing required params: package_name'
+            continue
+        elif not package_name and package_mode == 'default':
+            # Package par défaut inféré une seule fois pour tout le batch
+            if not default_package_resolved:
+                default_package = _get_default_package_for_tenant(tenant)
+                default_package_resolved = True
+            if not default_package:
+                errors[panel_id] = 'No packages found for tenant.'
+                continue
+            package_name = default_package
+
+        builder = getattr(insights_service, PANEL_REGISTRY[panel_type]['builder'])
+        filters = _panel_filters(panel_type, params)
+        panels[panel_id] = (
+            lambda builder=builder, package_name=package_name, start=start, end=end, filters=filters:
+                builder(tenant, package_name, start, end, filters)
+        )
+
+    include_trace = _wants_trace(request) or bool(body.get('trace'))
+    max_queries = getattr(settings, 'INSIGHTS_BATCH_QUERY_BUDGET', None)
+
+    def stream():
+        def encode(value):
+            return json.dumps(value, cls=DjangoJSONEncoder)
+
+        yield '{"success": true, "panels": {'
+        separator = ''
+        for panel_id, error in errors.items():
+            yield f'{separator}{encode(panel_id)}: {encode({"success": False, "error": error})}'
+            separator = ', '
+
+        panel_traces = []
+        for panel_id, data, error, panel_trace in insights_executor.iter_completed(panels, max_queries=max_queries):
+            panel_traces.append(panel_trace)
+            if error is not None:
+                logger.error("insights_batch: panel %s failed: %s", panel_id, error)
+                entry = {'success': False, 'error': str(error)}
+            else:
+                entry = {'success': True, 'data': data}
+            yield f'{separator}{encode(panel_id)}: {encode(entry)}'
+            separator = ', '
+
+        yield '}'
+        if include_trace:
+            yield f', "trace": {encode({"panels": panel_traces})}'
+        yield '}'
+
+    response = StreamingHttpResponse(stream(), content_type='application/json')
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -2,9 +2,21 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.db import connection
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import StreamingHttpResponse, HttpResponseNotModified
+from rest_framework.utils.encoders import JSONEncoder
+from play_reports.services.compression_service import compression_service
+from play_reports.services.data_version_service import data_version_service
+from play_reports.services.looker_cache_service import looker_cache_service
+from play_reports.services.looker_query_builder import looker_query_builder, LookerQueryError
+from play_reports.models import Client
 from datetime import datetime, date
+import base64
+import hashlib
+import json
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -41,8 +53,16 @@ class LookerConnectorView(APIView):
             }
         ]
 
+        # Premium : toutes les autres tables de rapports (schéma dérivé du modèle)
+        basic_tables = {src['table'] for src in basic_sources}
         premium_sources = [
-            # Premium-only tables peuvent être ajoutées ici plus tard
+            {
+                'table': table,
+                'display_name': f"Google Play - {looker_query_builder.get_spec(table)['verbose_name']}",
+                'description': 'Rapport Google Play',
+                'category': 'google_play'
+            }
+            for table in looker_query_builder.table_names() if table not in basic_tables
         ]
 
         if subscription_plan in ['premium', 'enterprise']:
@@ -134,6 +154,141 @@ class LookerConnectorView(APIView):
             schema['semantics']['isReaggregatable'] = True
         return schema
 
+    def encode_cursor(self, date_value, row_id):
+        """
+        Curseur opaque de pagination : dernière (date, id) renvoyée. La date
+        est gardée en pleine précision (microsecondes, fuseau) : tronquée à la
+        seconde, la comparaison (date, id) < curseur sauterait ou répéterait
+        des lignes d'un champ horodatage en limite de page.
+        """
+        if isinstance(date_value, (date, datetime)):
+            date_value = date_value.isoformat()
+        payload = json.dumps([date_value, row_id])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            date_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            return [date_value, int(row_id)]
+        except (ValueError, TypeError):
+            return None
+
+    def iter_batches(self, query, params):
+        """
+        Lit le résultat par lots depuis un curseur serveur nommé (fetchmany) :
+        la mémoire reste constante quel que soit le volume exporté.
+        Produit (colonnes, lignes).
+        """
+        fetch_size = getattr(settings, 'LOOKER_FETCH_SIZE', 2000)
+        with transaction.atomic():
+            connection.ensure_connection()
+            # Curseur nommé psycopg2 = curseur côté serveur PostgreSQL
+            with connection.connection.cursor(name=f'looker_{uuid.uuid4().hex}') as cursor:
+                cursor.itersize = fetch_size
+                cursor.execute(query, params)
+                columns = None
+                while True:
+                    rows = cursor.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    if columns is None:
+                        columns = [col[0] for col in cursor.description]
+                    yield columns, rows
+
+    def encode_rows_chunk(self, encoder, columns, rows, fields):
+        """Format 'rows' : un objet JSON par ligne."""
+        encoded = []
+        for row in rows:
+            row_data = dict(zip(columns, row))
+            if fields != ['*']:
+                row_data = {k: row_data[k] for k in fields if k in row_data}
+            encoded.append(encoder.encode(self.clean_row_for_looker(row_data)))
+        return ','.join(encoded)
+
+    def encode_columnar_chunk(self, encoder, columns, rows, output_columns):
+        """Format 'columnar' : un tableau de valeurs par colonne, noms envoyés une fois."""
+        positions = [columns.index(name) for name in output_columns]
+        values = []
+        for position in positions:
+            column_values = [row[position] for row in rows]
+            if column_values and isinstance(next((v for v in column_values if v is not None), None), (date, datetime)):
+                column_values = [self.format_date_for_looker(v) for v in column_values]
+            values.append(column_values)
+        return encoder.encode(values)
+
+    def output_columns(self, columns, fields):
+        if fields != ['*']:
+            return [name for name in fields if name in columns]
+        internal_fields = ['id', 'tenant_id', 'created_at', 'updated_at', 'user_id']
+        return [name for name in columns if name not in internal_fields]
+
+    def stream_rows(self, query, params, fields, date_field, schema, limit, payload_format='rows',
+                    offset=0, state=None):
+        """
+        Génère la réponse JSON au fil des lots lus sur le curseur serveur.
+        `state` reçoit le nombre de lignes et l'éventuelle erreur (mise en cache).
+        """
+        encoder = JSONEncoder()
+        columnar = payload_format == 'columnar'
+        if columnar:
+            yield '{"schema": ' + encoder.encode(schema) + ', "format": "columnar"'
+        else:
+            yield '{"schema": ' + encoder.encode(schema) + ', "rows": ['
+
+        count = 0
+        last_key = None
+        error = None
+        try:
+            for columns, rows in self.iter_batches(query, params):
+                date_position = columns.index(date_field) if date_field in columns else None
+                id_position = columns.index('id') if 'id' in columns else None
+                last_row = rows[-1]
+                last_key = (
+                    last_row[date_position] if date_position is not None else None,
+                    last_row[id_position] if id_position is not None else None,
+                )
+                if columnar:
+                    output_columns = self.output_columns(columns, fields)
+                    if not count:
+                        yield ', "columns": ' + encoder.encode(output_columns) + ', "chunks": ['
+                    yield (',' if count else '') + self.encode_columnar_chunk(encoder, columns, rows, output_columns)
+                else:
+                    yield (',' if count else '') + self.encode_rows_chunk(encoder, columns, rows, fields)
+                count += len(rows)
+        except Exception as e:
+            logger.error(f"Erreur pendant le streaming des données Looker: {str(e)}", exc_info=True)
+            error = str(e)
+
+        if state is not None:
+            state.update({'row_count': count, 'error': error})
+
+        next_cursor = None
+        if error is None and count >= limit and last_key and last_key[1] is not None:
+            next_cursor = self.encode_cursor(*last_key)
+        tail = {'next_cursor': next_cursor, 'row_count': count}
+        if error is None and count >= limit and next_cursor is None:
+            # Résultats agrégés (sans id) : pagination par offset
+            tail['next_offset'] = offset + count
+        if error:
+            tail['error'] = f'Erreur lors de la récupération des données: {error}'
+        if columnar and not count:
+            yield ', "columns": [], "chunks": ['
+        yield '], ' + encoder.encode(tail)[1:]
+
+    def resolve_tenant_id(self, user):
+        client = Client.objects.filter(user=user).only('tenant_id').first()
+        return client.tenant_id if client else None
+
+    def compute_etag(self, table_name, query_params, payload_format, data_version):
+        """ETag dérivé de la requête et de la version des données de la table."""
+        key = json.dumps(
+            [table_name, query_params, payload_format, data_version],
+            sort_keys=True, default=str
+        )
+        return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
     def get(self, request, table_name=None):
         """Gère les requêtes GET pour les métadonnées"""
         try:
@@ -142,10 +297,18 @@ class LookerConnectorView(APIView):
                 available_sources = self.get_available_data_sources(subscription_plan)
                 return Response({'success': True, 'data': {'sources': available_sources}})
 
+            try:
+                spec = looker_query_builder.get_spec(table_name)
+            except LookerQueryError as e:
+                return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
             return Response({
                 'success': True,
                 'data': {
                     'table': table_name,
+                    'schema': spec['schema'],
+                    'fields': [field['schema'] for field in spec['fields'].values()],
+                    'date_fields': spec['date_fields'],
                     'message': 'Utilisez POST pour récupérer les données et le schéma'
                 }
             })
@@ -166,90 +329,85 @@ class LookerConnectorView(APIView):
             if not source_info:
                 return Response({'error': 'Accès non autorisé à cette source de données'}, status=status.HTTP_403_FORBIDDEN)
 
+            tenant_id = self.resolve_tenant_id(request.user)
+            if tenant_id is None:
+                return Response({'error': 'Aucun tenant associé à cet utilisateur'}, status=status.HTTP_403_FORBIDDEN)
+
             query_params = request.data.get('query_params', {})
-            limit = min(int(query_params.get('limit', 1000)), 10000)
+            max_rows = getattr(settings, 'LOOKER_MAX_ROWS', 100000)
+            limit = max(1, min(int(query_params.get('limit', 1000)), max_rows))
             offset = int(query_params.get('offset', 0))
             start_date = query_params.get('start_date')
             end_date = query_params.get('end_date') or start_date
             package_name = query_params.get('package_name')
-            date_field = query_params.get('date_field', 'date')
-
-            # Configuration des tables
-            tables_config = {
-                'google_play_crashes_overview': {
-                    'fields': ['date', 'package_name', 'device', 'daily_crashes', 'daily_anrs'],
-                    'schema': [
-                        self._create_field_schema('date', 'STRING', 'DIMENSION', 'YEAR_MONTH_DAY'),
-                        self._create_field_schema('package_name', 'STRING', 'DIMENSION'),
-                        self._create_field_schema('device', 'STRING', 'DIMENSION'),
-                        self._create_field_schema('daily_crashes', 'NUMBER', 'METRIC', None, True),
-                        self._create_field_schema('daily_anrs', 'NUMBER', 'METRIC', None, True)
-                    ]
-                },
-                'google_play_installs_overview': {
-                    'fields': [
-                        'date', 'package_name', 'country', 'language', 'carrier',
-                         'installs_on_active_devices',
-                        'daily_device_installs', 'daily_user_installs', 'daily_user_uninstalls'
-                    ],
-                    'schema': [
-                        self._create_field_schema('date', 'STRING', 'DIMENSION', 'YEAR_MONTH_DAY'),
-                        self._create_field_schema('package_name', 'STRING', 'DIMENSION'),
-                        self._create_field_schema('country', 'STRING', 'DIMENSION'),
-                        self._create_field_schema('language', 'STRING', 'DIMENSION'),
-                        self._create_field_schema('carrier', 'STRING', 'DIMENSION'),
-                        self._create_field_schema('installs_on_active_devices', 'NUMBER', 'METRIC', None, True),
-                        self._create_field_schema('daily_device_installs', 'NUMBER', 'METRIC', None, True),
-                        self._create_field_schema('daily_user_installs', 'NUMBER', 'METRIC', None, True),
-                        self._create_field_schema('daily_user_uninstalls', 'NUMBER', 'METRIC', None, True)
-                    ]
-                },
-                'google_play_ratings_overview': {
-                    'fields': ['date', 'package_name', 'daily_average_rating', 'total_average_rating'],
-                    'schema': [
-                        self._create_field_schema('date', 'STRING', 'DIMENSION', 'YEAR_MONTH_DAY'),
-                        self._create_field_schema('package_name', 'STRING', 'DIMENSION'),
-                        self._create_field_schema('daily_average_rating', 'NUMBER', 'METRIC', None, True),
-                        self._create_field_schema('total_average_rating', 'NUMBER', 'METRIC', None, True)
-                    ]
-                }
-            }
-
-            table_config = tables_config.get(table_name, {'fields': ['*'], 'schema': []})
-            fields = table_config['fields']
-
-            # Construction de la requête SQL
-            select_fields = ', '.join(fields) if fields != ['*'] else '*'
-            query = f"SELECT {select_fields} FROM {table_name} WHERE 1=1"
-            params = []
-
-            if start_date:
-                query += f" AND {date_field} >= %s"
-                params.append(start_date)
-            if end_date and end_date != start_date:
-                query += f" AND {date_field} <= %s"
-                params.append(end_date)
-            if package_name:
-                query += " AND package_name = %s"
-                params.append(package_name)
-
-            query += f" ORDER BY {date_field} DESC LIMIT %s OFFSET %s"
-            params.extend([limit, offset])
-
-            # Exécution de la requête
-            with connection.cursor() as cursor:
-                cursor.execute(query, params)
-                columns = [col[0] for col in cursor.description]
-                rows = cursor.fetchall()
-
-                result_rows = []
-                for row in rows:
-                    row_data = dict(zip(columns, row))
-                    if fields != ['*']:
-                        row_data = {k: v for k, v in row_data.items() if k in fields}
-                    result_rows.append(row_data)
-
-            return Response({'schema': table_config['schema'], 'rows': result_rows})
+            payload_format = query_params.get('format', 'rows')
+            if payload_format not in ('rows', 'columnar'):
+                return Response({'error': "format doit valoir 'rows' ou 'columnar'"}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Requête construite depuis le modèle : tenant obligatoire, champs
+            # et champ date validés, identifiants quotés.
+            try:
+                spec = looker_query_builder.get_spec(table_name)
+                date_field = looker_query_builder.date_field(spec, query_params.get('date_field'))
+                aggregation = None
+                if query_params.get('dimensions') or query_params.get('metrics'):
+                    # Mode agrégé : GROUP BY côté serveur au lieu des lignes brutes
+                    aggregation = looker_query_builder.parse_aggregation(spec, query_params)
+                    dimensions, metrics = aggregation
+                    fields = dimensions + [name for name, _ in metrics]
+                else:
+                    fields = looker_query_builder.select_fields(spec, query_params.get('fields'))
+                query, params = looker_query_builder.build(
+                    spec, tenant_id, fields, date_field,
+                    start_date=start_date, end_date=end_date, package_name=package_name,
+                    keyset=None if aggregation else self.decode_cursor(query_params.get('cursor')),
+                    limit=limit, offset=offset, aggregation=aggregation,
+                )
+            except LookerQueryError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            schema = [spec['fields'][name]['schema'] for name in fields]
+            if query_params.get('cursor') and not aggregation:
+                offset = 0
+
+            # ETag : identique tant que la table n'a pas été resynchronisée
+            data_version = data_version_service.current(spec['table_name'], tenant_id)
+            etag = self.compute_etag(spec['table_name'], query_params, payload_format, data_version)
+            encoding = compression_service.negotiate(request.META.get('HTTP_ACCEPT_ENCODING'))
+            representation_etag = f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+            if representation_etag in [tag.strip() for tag in if_none_match.split(',')]:
+                not_modified = HttpResponseNotModified()
+                not_modified['ETag'] = representation_etag
+                return not_modified
+
+            # Cache des résultats : la clé change à chaque fin de synchronisation
+            cache_key = looker_cache_service.build_key(
+                tenant_id, spec['table_name'], query_params, data_version
+            )
+            cached_body = looker_cache_service.get(cache_key)
+            if cached_body is not None:
+                body = iter([cached_body])
+            else:
+                stream_state = {}
+                body = looker_cache_service.tee(
+                    self.stream_rows(
+                        query, params, fields, date_field, schema, limit, payload_format,
+                        offset=offset, state=stream_state
+                    ),
+                    cache_key, stream_state
+                )
+            if encoding:
+                body = compression_service.compress_stream(body, encoding)
+
+            response = StreamingHttpResponse(body, content_type='application/json')
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Vary'] = 'Accept-Encoding'
+            response['ETag'] = representation_etag
+            response['Cache-Control'] = 'private, no-cache'
+            response['X-Cache'] = 'HIT' if cached_body is not None else 'MISS'
+            return response
 
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des données: {str(e)}", exc_info=True)
@@ -264,6 +422,11 @@ class DebugTableStructureView(APIView):
     def get(self, request, table_name):
         """Retourne la structure et un échantillon de données de la table spécifiée"""
         try:
+            spec = looker_query_builder.get_spec(table_name)
+            client = Client.objects.filter(user=request.user).only('tenant_id').first()
+            if client is None:
+                return Response({'error': 'Aucun tenant associé à cet utilisateur'}, status=403)
+
             with connection.cursor() as cursor:
                 if connection.vendor == 'postgresql':
                     cursor.execute("""
@@ -271,10 +434,13 @@ class DebugTableStructureView(APIView):
                         FROM information_schema.columns 
                         WHERE table_name = %s
                         ORDER BY ordinal_position
-                    """, [table_name])
+                    """, [spec['db_table']])
                     columns = [{'name': col[0], 'type': col[1]} for col in cursor.fetchall()]
 
-                    cursor.execute(f"SELECT * FROM {table_name} LIMIT 5")
+                    cursor.execute(
+                        f"SELECT * FROM {connection.ops.quote_name(spec['db_table'])} WHERE tenant_id = %s LIMIT 5",
+                        [client.tenant_id]
+                    )
                     sample_data = [
                         dict(zip([col[0] for col in cursor.description], row))
                         for row in cursor.fetchall()
@@ -291,5 +457,7 @@ class DebugTableStructureView(APIView):
                         'error': 'Base de données non supportée pour le débogage',
                         'vendor': connection.vendor
                     }, status=400)
+        except LookerQueryError as e:
+            return Response({'error': str(e), 'table': table_name}, status=404)
         except Exception as e:
             return Response({'error': str(e), 'table': table_name}, status=500)
@@ -0,0 +1,140 @@
+import csv
+import datetime
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from play_reports.models import Tenant, google_play_installs_overview
+from play_reports.services.acquisition_loader_service import acquisition_loader_service
+from play_reports.services.csv_service import csv_service
+from play_reports.services.dimension_encoding_service import dimension_encoding_service
+from play_reports.services.index_advisor_service import SYNTHETIC_GENERATORS
+
+PACKAGE = 'com.example.acquisition'
+CHANNELS = ['Google Play search', 'Google Play explore', 'Third-party referrers', 'Tracked channels (UTM)']
+COUNTRIES = ['FR', 'US', 'DE', 'TN', 'MA', 'GB', 'ES', 'IT', 'BR', 'IN']
+
+RETAINED_HEADER = [
+    'Date', 'Package Name', 'Store Listing Visitors', 'Installers', 'Visitor-to-Installer conversion rate',
+    'Installers retained for 1 day', 'Installer-to-1 day retention rate',
+    'Installers retained for 7 days', 'Installer-to-7 days retention rate',
+    'Installers retained for 15 days', 'Installer-to-15 days retention rate',
+    'Installers retained for 30 days', 'Installer-to-30 days retention rate',
+]
+BUYERS_HEADER = [
+    'Date', 'Package Name', 'Store Listing Visitors', 'Installers', 'Visitor-to-Installer conversion rate',
+    'Buyers', 'Installer-to-Buyer conversion rate', 'Repeat Buyers', 'Buyer-to-Repeat Buyer conversion rate',
+]
+DIMENSION_HEADERS = {'overview': None, 'channel': 'Acquisition Channel', 'country': 'Country'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le chargement des rapports d'acquisition (installateurs retenus, "
+        "acheteurs 7j) sur une année de fichiers journaliers synthétiques, "
+        "comparé au chemin installs. Exécuté dans une transaction annulée."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help="Nombre de jours synthétiques")
+        parser.add_argument('--batch', type=int, default=500, help="Taille des lots (comme la synchronisation)")
+
+    def handle(self, *args, **options):
+        days = options['days']
+        batch = options['batch']
+        first_day = datetime.date.today() - datetime.timedelta(days=days)
+        rng = random.Random(42)
+
+        with tempfile.TemporaryDirectory(prefix='acquisition_bench_') as directory, transaction.atomic():
+            tenant = Tenant.objects.create(name='acquisition-benchmark')
+            total_rows = 0
+            for report, header in (('retained_installers', RETAINED_HEADER), ('buyers_7d', BUYERS_HEADER)):
+                files = self._write_files(Path(directory), report, header, first_day, days, rng)
+                rows = 0
+                started = time.perf_counter()
+                for suffix, path in files:
+                    rows += self._load_file(report, path, suffix, tenant.id, batch)
+                elapsed = time.perf_counter() - started
+                total_rows = max(total_rows, rows)
+                self._report(report, len(files), rows, elapsed)
+
+            # Référence : même volume de lignes par le chemin installs (bulk_insert)
+            generator = SYNTHETIC_GENERATORS[google_play_installs_overview]
+            per_day = max(1, total_rows // days)
+            objects = [
+                generator(tenant, PACKAGE, first_day + datetime.timedelta(days=d), i)
+                for d in range(days) for i in range(per_day)
+            ]
+            started = time.perf_counter()
+            for index in range(0, len(objects), batch):
+                dimension_encoding_service.bulk_insert(
+                    google_play_installs_overview, objects[index:index + batch], ignore_conflicts=True
+                )
+            self._report('installs (référence)', 0, len(objects), time.perf_counter() - started)
+
+            transaction.set_rollback(True)
+
+    def _write_files(self, directory, report, header, first_day, days, rng):
+        """Un fichier par mois et par niveau (overview, channel, country)."""
+        files = []
+        months = {}
+        for offset in range(days):
+            day = first_day + datetime.timedelta(days=offset)
+            months.setdefault(day.strftime('%Y%m'), []).append(day)
+        for month, month_days in months.items():
+            for suffix, column in DIMENSION_HEADERS.items():
+                values = {'overview': [None], 'channel': CHANNELS, 'country': COUNTRIES}[suffix]
+                path = directory / f"{report}_{PACKAGE}_{month}_{suffix}.csv"
+                with open(path, 'w', newline='', encoding='utf-8') as handle:
+                    writer = csv.writer(handle)
+                    writer.writerow(header[:2] + ([column] if column else []) + header[2:])
+                    for day in month_days:
+                        for value in values:
+                            writer.writerow(
+                                [day.isoformat(), PACKAGE] + ([value] if column else [])
+                                + self._metrics(report, rng)
+                            )
+                files.append((suffix, path))
+        return files
+
+    def _metrics(self, report, rng):
+        visitors = rng.randint(500, 5000)
+        installers = rng.randint(50, visitors)
+        values = [visitors, installers, f"{installers / visitors:.2%}"]
+        if report == 'retained_installers':
+            retained = installers
+            for _ in range(4):
+                retained = rng.randint(0, retained)
+                values += [retained, f"{retained / installers:.2%}"]
+        else:
+            buyers = rng.randint(0, installers)
+            repeat = rng.randint(0, buyers)
+            values += [buyers, f"{buyers / installers:.2%}", repeat, f"{repeat / buyers:.2%}" if buyers else '']
+        return values
+
+    def _load_file(self, report, path, suffix, tenant_id, batch):
+        """Lecture identique à csv_service.process_by_batches, puis chargeur dédié."""
+        written = 0
+        with open(path, encoding='utf-8') as handle:
+            reader = csv.DictReader(handle)
+            reader.fieldnames = [csv_service.normalize_column_name(name) for name in reader.fieldnames]
+            rows = []
+            for row in reader:
+                rows.append(row)
+                if len(rows) >= batch:
+                    written += acquisition_loader_service.load(report, rows, tenant_id, suffix=suffix)[1]
+                    rows = []
+            if rows:
+                written += acquisition_loader_service.load(report, rows, tenant_id, suffix=suffix)[1]
+        return written
+
+    def _report(self, label, files, rows, elapsed):
+        rate = rows / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{label:<22} {files:>4} fichiers {rows:>9} lignes {elapsed * 1000:>10.1f} ms "
+            f"{rate:>10.0f} lignes/s {elapsed * 1e6 / max(1, rows):>7.1f} µs/ligne"
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from play_reports.services.crash_rate_service import crash_rate_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Taux de plantage : reconstruit CrashRateDaily (plantages pour 1000 "
+        "appareils actifs par jour et par version) à partir des rapports "
+        "crashes et installs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Tenant ciblé (défaut : tous)")
+
+    def handle(self, *args, **options):
+        written = crash_rate_service.rebuild(tenant_id=options['tenant'])
+        self.stdout.write(self.style.SUCCESS(f"{written} lignes de taux de plantage reconstruites"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from play_reports.services.anomaly_service import anomaly_service, ANOMALY_SERIES
+
+
+class Command(BaseCommand):
+    help = (
+        "Anomalies : évalue les séries journalières installs, crashes et notes "
+        "de tous les packages (médiane/MAD glissantes, base hebdomadaire) et "
+        "réécrit les anomalies des derniers jours."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Tenant ciblé (défaut : tous)")
+        parser.add_argument('--type', action='append', choices=sorted(ANOMALY_SERIES), dest='types',
+                            help="Type de rapport (répétable, défaut : tous)")
+
+    def handle(self, *args, **options):
+        counts = anomaly_service.run_all(tenant_id=options['tenant'], report_types=options['types'])
+        for report_type, count in counts.items():
+            self.stdout.write(f"{report_type:<10} {count} anomalie(s)")
+        self.stdout.write(self.style.SUCCESS(f"{sum(counts.values())} anomalies détectées"))
@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from play_reports.models import Tenant
+from play_reports.services.dimension_dictionary_service import (
+    dimension_dictionary_service,
+    DIMENSION_CATALOG,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit le dictionnaire de dimensions (rebuild) ou compare la latence "
+        "des options servies par DISTINCT et par le dictionnaire (benchmark)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['rebuild', 'benchmark'])
+        parser.add_argument('--tenant', type=int, help="ID du tenant (tous les tenants actifs par défaut)")
+        parser.add_argument('--type', dest='analysis_type', choices=sorted(DIMENSION_CATALOG), help="Type d'analyse (tous par défaut)")
+        parser.add_argument('--package', dest='package_name', help="Package à filtrer pour le benchmark")
+        parser.add_argument('--repeat', type=int, default=5, help="Nombre de répétitions par mesure")
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant']:
+            tenants = Tenant.objects.filter(id=options['tenant'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant']} introuvable")
+
+        analysis_types = [options['analysis_type']] if options['analysis_type'] else sorted(DIMENSION_CATALOG)
+
+        for tenant in tenants:
+            if options['action'] == 'rebuild':
+                self._rebuild(tenant, analysis_types)
+            else:
+                self._benchmark(tenant, analysis_types, options['package_name'], options['repeat'])
+
+    def _rebuild(self, tenant, analysis_types):
+        for analysis_type in analysis_types:
+            started = time.monotonic()
+            count = dimension_dictionary_service.refresh_analysis_type(tenant.id, analysis_type)
+            self.stdout.write(
+                f"tenant={tenant.id} type={analysis_type} values={count} "
+                f"duration_ms={(time.monotonic() - started) * 1000:.1f}"
+            )
+
+    def _benchmark(self, tenant, analysis_types, package_name, repeat):
+        for analysis_type in analysis_types:
+            scan_ms = self._measure(
+                lambda: dimension_dictionary_service.scan_options(tenant, analysis_type, package_name), repeat
+            )
+            dictionary_ms = self._measure(
+                lambda: dimension_dictionary_service.get_options(tenant, analysis_type, package_name), repeat
+            )
+            speedup = scan_ms / dictionary_ms if dictionary_ms else float('inf')
+            self.stdout.write(
+                f"tenant={tenant.id} type={analysis_type} "
+                f"distinct_median_ms={scan_ms:.1f} dictionary_median_ms={dictionary_ms:.1f} "
+                f"speedup=x{speedup:.1f}"
+            )
+
+    def _measure(self, func, repeat):
+        durations = []
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            func()
+            durations.append((time.perf_counter() - started) * 1000)
+        return statistics.median(durations)
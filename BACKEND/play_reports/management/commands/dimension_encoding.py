@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from play_reports.services.dimension_encoding_service import (
+    dimension_encoding_service,
+    ENCODABLE_TABLES,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stockage des dimensions par dictionnaire : encode (chaînes remplacées par "
+        "des clés entières, vue de compatibilité), decode (retour arrière) ou status."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['encode', 'decode', 'status'])
+        parser.add_argument('--table', choices=ENCODABLE_TABLES, help="Table ciblée (défaut : toutes)")
+
+    def handle(self, *args, **options):
+        tables = [options['table']] if options['table'] else list(ENCODABLE_TABLES)
+        action = options['action']
+
+        for table in tables:
+            if action == 'status':
+                state = 'encodée' if dimension_encoding_service.is_encoded(table) else 'chaînes'
+                self.stdout.write(f"{table}: {state}, {self._mb(dimension_encoding_service.size(table))}")
+                continue
+
+            before = dimension_encoding_service.size(table)
+            if action == 'encode':
+                changed = dimension_encoding_service.encode(table)
+            else:
+                changed = dimension_encoding_service.decode(table)
+            if not changed:
+                self.stdout.write(f"{table}: inchangée")
+                continue
+            # Les colonnes supprimées ne libèrent l'espace qu'après réécriture (VACUUM FULL)
+            self.stdout.write(
+                f"{table}: {action} ({self._mb(before)} -> {self._mb(dimension_encoding_service.size(table))}, "
+                f"VACUUM FULL recommandé)"
+            )
+
+    def _mb(self, size):
+        return f"{size / 1024 / 1024:.1f} Mo"
@@ -0,0 +1,93 @@
+import csv
+import datetime
+import os
+import random
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from play_reports.models import Tenant, google_play_estimatedSales
+from play_reports.services.estimated_sales_loader_service import estimated_sales_loader_service
+
+HEADER = [
+    'Order Number', 'Order Charged Date', 'Order Charged Timestamp', 'Financial Status', 'Device Model',
+    'Product Title', 'Product ID', 'Product Type', 'SKU ID', 'Currency of Sale', 'Item Price',
+    'Taxes Collected', 'Charged Amount', 'City of Buyer', 'State of Buyer', 'Postal Code of Buyer',
+    'Country of Buyer', 'Base Plan ID', 'Offer ID', 'Group ID', 'First USD 1M Eligible',
+    'Promotion ID', 'Coupon Value', 'Discount Rate', 'Featured Products ID', 'Price Experiment ID',
+]
+COUNTRIES = ['FR', 'US', 'DE', 'TN', 'MA', 'GB', 'ES', 'IT', 'BR', 'IN']
+CURRENCIES = ['EUR', 'USD', 'EUR', 'TND', 'MAD', 'GBP', 'EUR', 'EUR', 'BRL', 'INR']
+SKUS = ['premium_monthly', 'premium_yearly', 'coins_100', 'coins_500', 'remove_ads']
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le chargement en flux des ventes estimées sur un fichier "
+        "synthétique de plusieurs millions de commandes (avec doublons), "
+        "puis un second chargement du même fichier (chemin de déduplication). "
+        "Exécuté dans une transaction annulée."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2_000_000, help="Nombre de lignes synthétiques")
+        parser.add_argument('--duplicates', type=float, default=0.02, help="Part de lignes répétées (0..1)")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        rng = random.Random(42)
+
+        with tempfile.TemporaryDirectory(prefix='estimated_sales_bench_') as directory:
+            path = os.path.join(directory, 'salesreport_benchmark.csv')
+            started = time.perf_counter()
+            self._write_file(path, rows, options['duplicates'], rng)
+            self.stdout.write(
+                f"Fichier synthétique: {rows} lignes, {os.path.getsize(path) / 2**20:.1f} Mo "
+                f"en {time.perf_counter() - started:.1f} s"
+            )
+
+            with transaction.atomic():
+                tenant = Tenant.objects.create(name='estimated-sales-benchmark')
+                for label in ('premier chargement', 'rechargement'):
+                    started = time.perf_counter()
+                    staged, inserted, updated = estimated_sales_loader_service.load_file(path, tenant.id)
+                    self._report(label, staged, inserted, updated, time.perf_counter() - started)
+                stored = google_play_estimatedSales.objects.filter(tenant=tenant).count()
+                self.stdout.write(f"Commandes distinctes en base: {stored}")
+                transaction.set_rollback(True)
+
+    def _write_file(self, path, rows, duplicates, rng):
+        """Commandes réparties sur un mois ; une part est répétée (parfois remboursée)."""
+        first_day = datetime.date.today().replace(day=1) - datetime.timedelta(days=31)
+        with open(path, 'w', newline='', encoding='utf-8') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(HEADER)
+            for index in range(rows):
+                order = index
+                status = 'Charged'
+                if index and rng.random() < duplicates:
+                    order = rng.randrange(index)
+                    status = rng.choice(('Charged', 'Refund'))
+                day = first_day + datetime.timedelta(days=order % 28)
+                country = order % len(COUNTRIES)
+                price = 0.99 + (order % 50)
+                writer.writerow([
+                    f"GPA.{3300 + order % 100:04d}-{order:012d}", day.isoformat(),
+                    int(datetime.datetime.combine(day, datetime.time()).timestamp()) + order % 86400,
+                    status, f"device_{order % 300}", 'Premium', 'com.example.sales',
+                    'subscription' if order % 3 else 'inapp', SKUS[order % len(SKUS)],
+                    CURRENCIES[country], f"{price:.2f}", f"{price * 0.2:.2f}", f"{price * 1.2:.2f}",
+                    '', '', '', COUNTRIES[country], 'monthly' if order % 3 else '', '', '', 'No', '', '', '', '', '',
+                ])
+
+    def _report(self, label, staged, inserted, updated, elapsed):
+        # ru_maxrss est exprimé en Ko sous Linux
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        rate = staged / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{label:<20} {staged:>9} lues {inserted:>9} insérées {updated:>7} mises à jour "
+            f"{elapsed:>8.1f} s {rate:>10.0f} lignes/s  RSS max {peak_rss:.0f} Mo"
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from play_reports.services.forecast_service import forecast_service, FORECAST_SERIES
+
+
+class Command(BaseCommand):
+    help = (
+        "Prévisions : ajuste les séries d'installations et de revenus modifiées "
+        "depuis leur dernier ajustement (--full : réajustement complet de "
+        "toutes les séries)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Tenant ciblé (défaut : tous)")
+        parser.add_argument('--metric', action='append', choices=sorted(FORECAST_SERIES), dest='metrics',
+                            help="Métrique (répétable, défaut : toutes)")
+        parser.add_argument('--full', action='store_true', help="Réajuste toutes les séries, sans état en cache")
+
+    def handle(self, *args, **options):
+        written = forecast_service.rebuild(
+            tenant_id=options['tenant'], metrics=options['metrics'], full=options['full'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{written} prévisions écrites"))
@@ -0,0 +1,90 @@
+import datetime
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+
+from play_reports.models import Tenant
+from play_reports.services.index_advisor_service import index_advisor_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Analyse les requêtes des insights et du connecteur Looker (EXPLAIN ANALYZE) "
+        "et propose des index couvrants/BRIN : report (données réelles), "
+        "benchmark (jeu synthétique, transaction annulée) ou apply."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['report', 'benchmark', 'apply'])
+        parser.add_argument('--tenant', type=int, help="ID du tenant (report/apply)")
+        parser.add_argument('--package', dest='package_name', help="Package analysé (report/apply)")
+        parser.add_argument('--days', type=int, default=90, help="Période analysée / générée en jours")
+        parser.add_argument('--rows-per-day', type=int, default=200, help="Lignes synthétiques par jour et par table")
+        parser.add_argument('--drop', action='store_true', help="apply : supprime aussi les index redondants")
+
+    def handle(self, *args, **options):
+        if options['action'] == 'benchmark':
+            self._benchmark(options['days'], options['rows_per_day'])
+            return
+
+        if not options['tenant'] or not options['package_name']:
+            raise CommandError("--tenant et --package sont requis pour report/apply")
+        try:
+            tenant = Tenant.objects.get(id=options['tenant'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Tenant {options['tenant']} introuvable")
+
+        end = datetime.date.today()
+        start = end - datetime.timedelta(days=options['days'] - 1)
+        workload = index_advisor_service.capture_workload(tenant, options['package_name'], start, end)
+        proposals = index_advisor_service.propose(workload)
+
+        if options['action'] == 'report':
+            self._print_queries("Plans", index_advisor_service.explain_workload(workload))
+            self._print_proposals(proposals)
+            return
+
+        for applied in index_advisor_service.apply(proposals, drop=options['drop']):
+            self.stdout.write(f"{applied['sql']}  ({applied['duration_ms']:.0f} ms)")
+
+    def _benchmark(self, days, rows_per_day):
+        report = index_advisor_service.benchmark(days=days, rows_per_day=rows_per_day)
+
+        self.stdout.write("== Ingestion (µs/ligne)")
+        for table, before in report['ingest_before'].items():
+            after = report['ingest_after'][table]
+            self.stdout.write(
+                f"{table}: avant={before['us_per_row']:.1f} après={after['us_per_row']:.1f} "
+                f"({before['rows']} lignes)"
+            )
+
+        self._print_proposals(report['proposals'])
+
+        self.stdout.write("== Requêtes (ms, médiane par table)")
+        before = self._median_by_table(report['queries_before'])
+        after = self._median_by_table(report['queries_after'])
+        for table in sorted(before):
+            self.stdout.write(f"{table}: avant={before[table]:.2f} après={after.get(table, 0):.2f}")
+        self._print_queries("Plans après", report['queries_after'])
+
+    def _median_by_table(self, results):
+        by_table = {}
+        for result in results:
+            by_table.setdefault(result['table'], []).append(result['execution_ms'] or 0)
+        return {table: statistics.median(values) for table, values in by_table.items()}
+
+    def _print_proposals(self, proposals):
+        self.stdout.write("== Propositions")
+        if not proposals:
+            self.stdout.write("Aucune")
+        for proposal in proposals:
+            self.stdout.write(f"[{proposal['action']}] {proposal['sql']}  -- {proposal['reason']}")
+
+    def _print_queries(self, title, results):
+        self.stdout.write(f"== {title}")
+        for result in results:
+            scans = ', '.join(result['seq_scans']) or '-'
+            indexes = ', '.join(result['indexes_used']) or '-'
+            self.stdout.write(
+                f"{result['table']}: {result['execution_ms']:.2f} ms seq_scan={scans} index={indexes}"
+            )
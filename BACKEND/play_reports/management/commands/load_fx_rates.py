@@ -0,0 +1,54 @@
+import csv
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from play_reports.services.revenue_fact_service import revenue_fact_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Charge des taux de change journaliers depuis un CSV local "
+        "(colonnes date, currency, rate : valeur d'une unité de la devise "
+        "dans la devise de reporting REPORTING_CURRENCY) puis reconvertit les faits de revenus "
+        "des devises concernées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier CSV des taux")
+        parser.add_argument('--inverse', action='store_true',
+                            help="Les taux sont exprimés en unités de devise pour une unité de reporting")
+        parser.add_argument('--source', default='', help="Origine des taux (ex: ecb)")
+        parser.add_argument('--no-rebuild', action='store_true', help="Ne pas reconvertir les faits de revenus")
+
+    def handle(self, *args, **options):
+        rates = []
+        rejected = 0
+        with open(options['path'], newline='', encoding='utf-8-sig') as handle:
+            reader = csv.DictReader(handle)
+            reader.fieldnames = [re.sub(r'[^a-z]+', '_', name.lower()).strip('_') for name in reader.fieldnames or []]
+            missing = {'date', 'currency', 'rate'} - set(reader.fieldnames)
+            if missing:
+                raise CommandError(f"Colonnes manquantes: {', '.join(sorted(missing))}")
+            for row in reader:
+                day = parse_date((row['date'] or '').strip())
+                try:
+                    rate = float((row['rate'] or '').replace(',', '.'))
+                except ValueError:
+                    rate = 0
+                if day is None or rate <= 0 or not (row['currency'] or '').strip():
+                    rejected += 1
+                    continue
+                rates.append((day, row['currency'], 1 / rate if options['inverse'] else rate))
+
+        loaded = revenue_fact_service.load_rates(rates, options['source'])
+        self.stdout.write(self.style.SUCCESS(f"{loaded} taux chargés ({rejected} ligne(s) rejetée(s))"))
+
+        if rates and not options['no_rebuild']:
+            currencies = sorted({currency.strip().upper() for _, currency, _ in rates})
+            built = revenue_fact_service.rebuild(currencies=currencies, since=min(day for day, _, _ in rates))
+            self.stdout.write(f"{built} faits de revenus reconvertis ({', '.join(currencies)})")
+
+        for currency, (first, last) in revenue_fact_service.missing_rates().items():
+            self.stdout.write(self.style.WARNING(f"Taux manquant pour {currency} entre {first} et {last}"))
@@ -0,0 +1,87 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.utils.encoders import JSONEncoder
+
+from play_reports.controllers.looker_community_controller import LookerConnectorView
+from play_reports.services.compression_service import compression_service
+
+
+INSTALLS_COLUMNS = [
+    'date', 'package_name', 'country', 'language', 'carrier',
+    'installs_on_active_devices', 'daily_device_installs',
+    'daily_user_installs', 'daily_user_uninstalls', 'id',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare la taille et le temps de sérialisation des réponses Looker "
+        "(formats rows/columnar, sans compression, gzip, brotli) sur un jeu "
+        "synthétique de lignes installs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Nombre de lignes synthétiques")
+        parser.add_argument('--batch', type=int, default=2000, help="Taille des lots (LOOKER_FETCH_SIZE)")
+
+    def handle(self, *args, **options):
+        rows = self._synthetic_rows(options['rows'])
+        batch = options['batch']
+        batches = [rows[i:i + batch] for i in range(0, len(rows), batch)]
+        view = LookerConnectorView()
+        fields = INSTALLS_COLUMNS[:-1]
+
+        self.stdout.write(f"== {len(rows)} lignes, lots de {batch}")
+        for payload_format in ('rows', 'columnar'):
+            for encoding in [None] + compression_service.available_encodings():
+                started = time.perf_counter()
+                chunks = self._serialize(view, batches, fields, payload_format)
+                if encoding:
+                    chunks = compression_service.compress_stream(chunks, encoding)
+                size = 0
+                for chunk in chunks:
+                    size += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.stdout.write(
+                    f"{payload_format:<9} {encoding or 'identity':<9} "
+                    f"{size / 1024:>10.1f} Ko {elapsed_ms:>9.1f} ms"
+                )
+
+    def _serialize(self, view, batches, fields, payload_format):
+        """Reproduit le corps produit par LookerConnectorView.stream_rows."""
+        encoder = JSONEncoder()
+        if payload_format == 'columnar':
+            output_columns = view.output_columns(INSTALLS_COLUMNS, fields)
+            yield '{"schema": [], "format": "columnar", "columns": ' + encoder.encode(output_columns) + ', "chunks": ['
+            for index, rows in enumerate(batches):
+                yield (',' if index else '') + view.encode_columnar_chunk(encoder, INSTALLS_COLUMNS, rows, output_columns)
+        else:
+            yield '{"schema": [], "rows": ['
+            for index, rows in enumerate(batches):
+                yield (',' if index else '') + view.encode_rows_chunk(encoder, INSTALLS_COLUMNS, rows, fields)
+        yield '], "next_cursor": null, "row_count": 0}'
+
+    def _synthetic_rows(self, count):
+        rng = random.Random(42)
+        countries = ['FR', 'US', 'DE', 'TN', 'MA', 'GB', 'ES', 'IT']
+        languages = ['fr', 'en', 'de', 'ar', 'es', 'it']
+        carriers = ['Orange', 'SFR', 'Free', 'Verizon', 'Vodafone', 'Ooredoo']
+        today = datetime.date.today()
+        rows = []
+        for row_id in range(count, 0, -1):
+            rows.append((
+                today - datetime.timedelta(days=row_id % 365),
+                'com.example.app',
+                rng.choice(countries),
+                rng.choice(languages),
+                rng.choice(carriers),
+                rng.randint(0, 50000),
+                rng.randint(0, 500),
+                rng.randint(0, 400),
+                rng.randint(0, 100),
+                row_id,
+            ))
+        return rows
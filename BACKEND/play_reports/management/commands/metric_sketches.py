@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from play_reports.services.metric_sketch_service import metric_sketch_service, SKETCH_CATALOG
+
+
+class Command(BaseCommand):
+    help = (
+        "Résumés probabilistes : reconstruit MetricSketch (HyperLogLog des "
+        "dimensions, KLL des mesures) par package et par jour."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Tenant ciblé (défaut : tous)")
+        parser.add_argument('--type', action='append', choices=sorted(SKETCH_CATALOG), dest='types',
+                            help="Type de rapport (répétable, défaut : tous)")
+
+    def handle(self, *args, **options):
+        written = metric_sketch_service.rebuild(tenant_id=options['tenant'], report_types=options['types'])
+        self.stdout.write(self.style.SUCCESS(f"{written} résumés reconstruits"))
@@ -0,0 +1,95 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from play_reports.services.partition_service import partition_service, PARTITIONED_TABLES
+
+
+class Command(BaseCommand):
+    help = (
+        "Partitionnement mensuel des tables de rapports : convert (migration des "
+        "tables existantes), ensure (partitions à venir, reclassement DEFAULT), "
+        "status, explain (élagage d'une période), stage (table de chargement d'un "
+        "mois) ou swap (remplacement d'un mois par la table de chargement)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['convert', 'ensure', 'status', 'explain', 'stage', 'swap'])
+        parser.add_argument('--table', choices=sorted(PARTITIONED_TABLES), help="Table ciblée (défaut : toutes)")
+        parser.add_argument('--tenant', type=int, help="explain : ID du tenant ; stage, swap : tenant ré-importé")
+        parser.add_argument('--start', help="explain : début de période (YYYY-MM-DD)")
+        parser.add_argument('--end', help="explain : fin de période (YYYY-MM-DD)")
+        parser.add_argument('--month', help="stage, swap : mois remplacé (YYYY-MM)")
+        parser.add_argument('--staging', help="swap : table de chargement (créée par stage)")
+
+    def handle(self, *args, **options):
+        tables = [options['table']] if options['table'] else list(PARTITIONED_TABLES)
+        action = options['action']
+
+        if action == 'convert':
+            for table in tables:
+                converted = partition_service.convert(table)
+                self.stdout.write(f"{table}: {'convertie' if converted else 'déjà partitionnée'}")
+
+        elif action == 'ensure':
+            for table in tables:
+                if not partition_service.is_partitioned(table):
+                    self.stdout.write(f"{table}: non partitionnée")
+                    continue
+                created = partition_service.ensure_partitions(table) + partition_service.split_default(table)
+                months = ', '.join(f"{month:%Y-%m}" for month in created) or '-'
+                self.stdout.write(f"{table}: créées {months}")
+
+        elif action == 'status':
+            for table in tables:
+                if not partition_service.is_partitioned(table):
+                    self.stdout.write(f"== {table}: non partitionnée")
+                    continue
+                self.stdout.write(f"== {table}")
+                for partition in partition_service.status(table):
+                    self.stdout.write(
+                        f"{partition['partition']}: {partition['bounds']} "
+                        f"~{partition['rows']} lignes, {partition['bytes'] / 1024 / 1024:.1f} Mo"
+                    )
+
+        elif action == 'explain':
+            start = parse_date(options['start'] or '')
+            end = parse_date(options['end'] or '')
+            if not options['tenant'] or not start or not end:
+                raise CommandError("--tenant, --start et --end sont requis pour explain")
+            for table in tables:
+                if not partition_service.is_partitioned(table):
+                    continue
+                result = partition_service.explain_pruning(table, options['tenant'], start, end)
+                self.stdout.write(
+                    f"{table}: {len(result['scanned'])}/{result['partitions']} partitions lues "
+                    f"({', '.join(result['scanned']) or '-'})"
+                )
+
+        elif action == 'stage':
+            if not options['table'] or not options['month']:
+                raise CommandError("--table et --month sont requis pour stage")
+            staging, copied = partition_service.create_staging(
+                options['table'], self._month(options['month']), options['tenant']
+            )
+            self.stdout.write(
+                f"{options['table']}: {staging} créée ({copied} ligne(s) des autres tenants copiée(s))"
+            )
+
+        elif action == 'swap':
+            if not options['table'] or not options['month'] or not options['staging']:
+                raise CommandError("--table, --month et --staging sont requis pour swap")
+            try:
+                name = partition_service.swap_month(
+                    options['table'], self._month(options['month']), options['staging'], options['tenant']
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"{options['table']}: {name} remplacée")
+
+    def _month(self, value):
+        try:
+            return datetime.datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise CommandError("--month doit être au format YYYY-MM")
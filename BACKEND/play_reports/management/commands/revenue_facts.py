@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from play_reports.services.revenue_fact_service import revenue_fact_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Faits de revenus : reconstruit RevenueDaily (montants convertis dans "
+        "la devise de reporting) à partir des rapports earnings et ventes estimées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Tenant ciblé (défaut : tous)")
+
+    def handle(self, *args, **options):
+        built = revenue_fact_service.rebuild(tenant_id=options['tenant'])
+        self.stdout.write(self.style.SUCCESS(f"{built} faits de revenus reconstruits"))
+
+        for currency, (first, last) in revenue_fact_service.missing_rates().items():
+            self.stdout.write(self.style.WARNING(f"Taux manquant pour {currency} entre {first} et {last}"))
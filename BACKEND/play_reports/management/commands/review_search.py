@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from play_reports.services.review_search_service import review_search_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Recherche plein texte des avis : calcule search_vector des avis qui "
+        "n'en ont pas encore (avis antérieurs à l'indexation), par lots d'id."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        indexed = review_search_service.backfill(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{indexed} avis indexés"))
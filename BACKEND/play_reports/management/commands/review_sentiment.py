@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from play_reports.services.review_sentiment_service import review_sentiment_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Sentiment des avis : score les avis non analysés puis reconstruit les "
+        "agrégats journaliers (--force réanalyse tous les avis, ex. après une "
+        "modification du lexique)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Tenant ciblé (défaut : tous)")
+        parser.add_argument('--force', action='store_true', help="Réanalyser aussi les avis déjà scorés")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        scored = review_sentiment_service.rebuild(
+            tenant_id=options['tenant'], force=options['force'], batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f"{scored} avis analysés, agrégats reconstruits"))
@@ -0,0 +1,119 @@
+import bisect
+import datetime
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from play_reports.services.metric_sketch_service import metric_sketch_service, SKETCH_CATALOG
+from play_reports.services.sketch_service import HyperLogLog, KLL
+
+
+class Command(BaseCommand):
+    help = (
+        "Vérifie les bornes d'erreur des résumés. Sans --tenant : flux "
+        "synthétiques (cardinalités et distributions connues), résumés "
+        "journaliers fusionnés comme en production. Avec --tenant : compare "
+        "les réponses approchées aux valeurs exactes calculées en base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Tenant à contrôler sur ses données réelles")
+        parser.add_argument('--type', choices=sorted(SKETCH_CATALOG), default='installs')
+        parser.add_argument('--package', help="Package contrôlé (avec --tenant)")
+        parser.add_argument('--start', help="YYYY-MM-DD (avec --tenant)")
+        parser.add_argument('--end', help="YYYY-MM-DD (avec --tenant)")
+        parser.add_argument('--days', type=int, default=30, help="Jours synthétiques fusionnés")
+
+    def handle(self, *args, **options):
+        if options['tenant']:
+            self._check_tenant(options)
+        else:
+            self._check_synthetic(options['days'])
+
+    def _verdict(self, error, bound):
+        return self.style.SUCCESS('OK') if abs(error) <= bound else self.style.ERROR('HORS BORNE')
+
+    def _check_synthetic(self, days):
+        rng = random.Random(7)
+        bound = 3 * HyperLogLog().relative_error()
+        for cardinality in (100, 10_000, 1_000_000):
+            daily = []
+            for day in range(days):
+                sketch = HyperLogLog()
+                # Chaque jour voit une partie des valeurs : l'union couvre toute la population
+                for value in range(day, cardinality, max(1, days // 3)):
+                    sketch.update(f"device-{value}")
+                daily.append(sketch)
+            merged = daily[0]
+            for sketch in daily[1:]:
+                merged = merged.merge(sketch)
+            error = merged.count() / cardinality - 1
+            self.stdout.write(
+                f"HLL  {cardinality:>9} distincts  estimé {merged.count():>11.0f}  "
+                f"erreur {error:+.2%} (borne 99 % ±{bound:.2%}) {self._verdict(error, bound)}"
+            )
+
+        for label, draw in (
+            ('lognormale', lambda: rng.lognormvariate(3, 1)),
+            ('notes 1-5', lambda: float(rng.choices([1, 2, 3, 4, 5], [10, 5, 8, 20, 57])[0])),
+        ):
+            values, merged = [], None
+            for day in range(days):
+                sketch = KLL(seed=day)
+                for _ in range(20_000):
+                    value = draw()
+                    values.append(value)
+                    sketch.update(value)
+                merged = sketch if merged is None else merged.merge(sketch)
+            values.sort()
+            bound = merged.rank_error()
+            for fraction, estimate in zip((0.5, 0.9, 0.99), merged.quantiles((0.5, 0.9, 0.99))):
+                # Rang réel : intervalle [premier, dernier] des valeurs égales à l'estimation
+                low = bisect.bisect_left(values, estimate) / len(values)
+                high = bisect.bisect_right(values, estimate) / len(values)
+                error = 0 if low <= fraction <= high else min(low - fraction, high - fraction, key=abs)
+                self.stdout.write(
+                    f"KLL  {label:<10} p{fraction * 100:g}  estimé {estimate:>9.2f}  "
+                    f"erreur de rang {error:+.2%} (borne ±{bound:.2%}) {self._verdict(error, bound)}"
+                )
+
+    def _check_tenant(self, options):
+        if not (options['package'] and options['start'] and options['end']):
+            raise CommandError("--package, --start et --end sont requis avec --tenant")
+        start = datetime.date.fromisoformat(options['start'])
+        end = datetime.date.fromisoformat(options['end'])
+        report_type, package_name = options['type'], options['package']
+        spec = SKETCH_CATALOG[report_type]
+        qs = spec['model'].objects.annotate(day=TruncDate(spec['date'])).filter(
+            tenant_id=options['tenant'], package_name=package_name, day__gte=start, day__lte=end,
+        )
+        for field in spec['distinct']:
+            exact = qs.exclude(**{f"{field}__isnull": True}).exclude(**{field: ''}).aggregate(
+                n=Count(field, distinct=True))['n']
+            approx = metric_sketch_service.distinct_count(options['tenant'], report_type, package_name, field, start, end)
+            if not exact or approx['estimate'] is None:
+                self.stdout.write(f"HLL  {field:<20} exact {exact}  estimé {approx['estimate']}")
+                continue
+            error = approx['estimate'] / exact - 1
+            bound = 3 * approx['relative_error']
+            self.stdout.write(
+                f"HLL  {field:<20} exact {exact:>9}  estimé {approx['estimate']:>9}  "
+                f"erreur {error:+.2%} {self._verdict(error, bound)}"
+            )
+        for field in spec['quantiles']:
+            values = sorted(float(v) for v in qs.exclude(**{f"{field}__isnull": True}).values_list(field, flat=True))
+            approx = metric_sketch_service.quantiles(options['tenant'], report_type, package_name, field, start, end)
+            if not values or not approx['quantiles']:
+                self.stdout.write(f"KLL  {field:<20} aucune valeur")
+                continue
+            for label, estimate in approx['quantiles'].items():
+                fraction = float(label[1:]) / 100
+                low = bisect.bisect_left(values, estimate) / len(values)
+                high = bisect.bisect_right(values, estimate) / len(values)
+                error = 0 if low <= fraction <= high else min(low - fraction, high - fraction, key=abs)
+                self.stdout.write(
+                    f"KLL  {field:<20} {label:<5} estimé {estimate:>9.2f}  "
+                    f"erreur de rang {error:+.2%} {self._verdict(error, approx['rank_error'])}"
+                )
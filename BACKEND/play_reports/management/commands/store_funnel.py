@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from play_reports.services.store_funnel_service import store_funnel_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Entonnoir store : reconstruit StorePerformanceMonthly (visiteurs -> "
+        "acquisitions par mois et source de trafic) et les résumés bornés des "
+        "termes de recherche à partir des rapports de performance du store."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Tenant ciblé (défaut : tous)")
+
+    def handle(self, *args, **options):
+        written = store_funnel_service.rebuild(tenant_id=options['tenant'])
+        self.stdout.write(self.style.SUCCESS(f"{written} lignes d'entonnoir store reconstruites"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from play_reports.services.subscription_cohort_service import subscription_cohort_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Abonnements : reconstruit les agrégats mensuels (churn, cohortes) et "
+        "les raisons d'annulation mensuelles à partir des tables sources."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Tenant ciblé (défaut : tous)")
+
+    def handle(self, *args, **options):
+        written = subscription_cohort_service.rebuild(tenant_id=options['tenant'])
+        self.stdout.write(self.style.SUCCESS(f"{written} lignes mensuelles reconstruites"))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('play_reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DimensionValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_name', models.CharField(blank=True, default='', max_length=255)),
+                ('report_type', models.CharField(max_length=50)),
+                ('dimension', models.CharField(max_length=50)),
+                ('value', models.CharField(max_length=255)),
+                ('row_count', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dimension_values', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Valeur de dimension',
+                'verbose_name_plural': 'Valeurs de dimensions',
+                'db_table': 'dimension_value',
+                'ordering': ['report_type', 'dimension', 'value'],
+                'unique_together': {('tenant', 'report_type', 'package_name', 'dimension', 'value')},
+            },
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('play_reports', '0002_dimensionvalue'),
+    ]
+
+    operations = [
+        # Installs overview : index mono-colonne de dimensions remplacés par un
+        # index couvrant (tenant, package, date)
+        migrations.RemoveIndex(
+            model_name='google_play_installs_overview',
+            name='google_play_package_a4066f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_installs_overview',
+            name='google_play_device_da41a1_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_installs_overview',
+            name='google_play_app_ver_883dde_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_installs_overview',
+            name='google_play_os_vers_dce165_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_installs_overview',
+            name='google_play_country_e66acb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_installs_overview',
+            name='google_play_languag_435aa4_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_installs_overview',
+            name='google_play_carrier_84ddd4_idx',
+        ),
+        migrations.AddIndex(
+            model_name='google_play_installs_overview',
+            index=models.Index(fields=['tenant', 'package_name', 'date'], include=('daily_user_installs', 'daily_user_uninstalls', 'total_user_installs', 'current_device_installs'), name='installs_ov_tpd_cover_idx'),
+        ),
+
+        # Crashes overview
+        migrations.RemoveIndex(
+            model_name='google_play_crashes_overview',
+            name='google_play_package_72a91b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_crashes_overview',
+            name='google_play_device_d59df3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_crashes_overview',
+            name='google_play_app_ver_d1f5c5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_crashes_overview',
+            name='google_play_os_vers_699728_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_crashes_overview',
+            name='google_play_android_3dd22d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='google_play_crashes_overview',
+            index=models.Index(fields=['tenant', 'package_name', 'date'], include=('daily_crashes', 'daily_anrs'), name='crashes_ov_tpd_cover_idx'),
+        ),
+
+        # Ratings overview
+        migrations.RemoveIndex(
+            model_name='google_play_ratings_overview',
+            name='google_play_package_94cc0a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_ratings_overview',
+            name='google_play_device_8e254f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='google_play_ratings_overview',
+            index=models.Index(fields=['tenant', 'package_name', 'date'], include=('daily_average_rating', 'total_average_rating'), name='ratings_ov_tpd_cover_idx'),
+        ),
+
+        # Reviews : review_submit_date reste indexé via db_index sur le champ
+        migrations.RemoveIndex(
+            model_name='google_play_reviews',
+            name='google_play_tenant__f52e7e_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_reviews',
+            name='google_play_star_ra_51c489_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_reviews',
+            name='google_play_review__7eace9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='google_play_reviews',
+            name='google_play_package_3cf48e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='google_play_reviews',
+            index=models.Index(fields=['tenant', 'package_name', 'review_submit_date'], include=('star_rating',), name='reviews_tp_submit_cover_idx'),
+        ),
+    ]
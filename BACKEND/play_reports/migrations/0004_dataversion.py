@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-19 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('play_reports', '0003_report_covering_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_name', models.CharField(max_length=100)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='data_versions', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Version de données',
+                'verbose_name_plural': 'Versions de données',
+                'db_table': 'data_version',
+                'unique_together': {('tenant', 'table_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('play_reports', '0004_dataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(max_length=50)),
+                ('export_format', models.CharField(choices=[('csv', 'CSV'), ('parquet', 'Parquet')], default='csv', max_length=10)),
+                ('destination', models.CharField(choices=[('local', 'Fichier local'), ('gcs', 'Google Cloud Storage')], default='local', max_length=10)),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('package_name', models.CharField(blank=True, default='', max_length=255)),
+                ('fields', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('completed', 'Terminé'), ('failed', 'Échoué')], default='pending', max_length=20)),
+                ('location', models.CharField(blank=True, default='', max_length=1000)),
+                ('row_count', models.PositiveBigIntegerField(default=0)),
+                ('size_bytes', models.PositiveBigIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Export de rapport',
+                'verbose_name_plural': 'Exports de rapports',
+                'db_table': 'export_job',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['tenant', '-created_at'], name='export_job_tenant_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('play_reports', '0005_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DimensionKey',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('dimension', models.CharField(max_length=50)),
+                ('value', models.CharField(max_length=255)),
+            ],
+            options={
+                'verbose_name': 'Clé de dimension',
+                'verbose_name_plural': 'Clés de dimensions',
+                'db_table': 'dimension_key',
+                'unique_together': {('dimension', 'value')},
+            },
+        ),
+    ]
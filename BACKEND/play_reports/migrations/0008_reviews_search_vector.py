@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:50
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Schéma uniquement : les avis existants sont indexés après le
+    # déploiement par `python manage.py review_search`
+
+    dependencies = [
+        ('play_reports', '0007_dimensionkey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='google_play_reviews',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='google_play_reviews',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='reviews_search_gin_idx'),
+        ),
+    ]
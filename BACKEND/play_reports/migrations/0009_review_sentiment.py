@@ -0,0 +1,71 @@
+# Generated by Django 5.2.1 on 2026-10-19 16:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Schéma uniquement : les avis existants sont notés et agrégés après le
+    # déploiement par `python manage.py review_sentiment`
+
+    dependencies = [
+        ('play_reports', '0008_reviews_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='google_play_reviews',
+            name='sentiment_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='google_play_reviews',
+            name='sentiment_keywords',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='ReviewDailySentiment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_name', models.CharField(max_length=255)),
+                ('date', models.DateField()),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('positive_count', models.PositiveIntegerField(default=0)),
+                ('neutral_count', models.PositiveIntegerField(default=0)),
+                ('negative_count', models.PositiveIntegerField(default=0)),
+                ('sentiment_sum', models.FloatField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_daily_sentiments', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Sentiment journalier des avis',
+                'verbose_name_plural': 'Sentiments journaliers des avis',
+                'db_table': 'review_daily_sentiment',
+                'ordering': ['-date'],
+                'unique_together': {('tenant', 'package_name', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewDailyKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_name', models.CharField(max_length=255)),
+                ('date', models.DateField()),
+                ('keyword', models.CharField(max_length=100)),
+                ('mentions', models.PositiveIntegerField(default=0)),
+                ('positive_mentions', models.PositiveIntegerField(default=0)),
+                ('negative_mentions', models.PositiveIntegerField(default=0)),
+                ('sentiment_sum', models.FloatField(default=0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_daily_keywords', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Mot-clé journalier des avis',
+                'verbose_name_plural': 'Mots-clés journaliers des avis',
+                'db_table': 'review_daily_keyword',
+                'ordering': ['-date', '-mentions'],
+                'unique_together': {('tenant', 'package_name', 'date', 'keyword')},
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.1 on 2026-10-19 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('play_reports', '0009_review_sentiment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='google_play_retained_installers_overview',
+            name='package_name',
+            field=models.CharField(blank=True, db_index=True, default='', help_text="Package de l'application", max_length=255),
+        ),
+        migrations.AddField(
+            model_name='google_play_retained_installers_dimensioned',
+            name='package_name',
+            field=models.CharField(blank=True, db_index=True, default='', help_text="Package de l'application", max_length=255),
+        ),
+        migrations.AddField(
+            model_name='google_play_buyers_7d_overview',
+            name='package_name',
+            field=models.CharField(blank=True, db_index=True, default='', help_text="Package de l'application", max_length=255),
+        ),
+        migrations.AddField(
+            model_name='google_play_buyers_7d_dimensioned',
+            name='package_name',
+            field=models.CharField(blank=True, db_index=True, default='', help_text="Package de l'application", max_length=255),
+        ),
+        migrations.AddField(
+            model_name='google_play_buyers_7d_dimensioned',
+            name='visitor_to_installer_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Taux de conversion visiteur → installation (%)', max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='google_play_buyers_7d_dimensioned',
+            name='installer_to_buyer_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Taux de conversion installation → achat (%)', max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='google_play_buyers_7d_dimensioned',
+            name='buyer_to_repeat_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Taux de réachat (%)', max_digits=5, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='google_play_retained_installers_overview',
+            unique_together={('tenant', 'package_name', 'date', 'acquisition_channel', 'country')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='google_play_retained_installers_dimensioned',
+            unique_together={('tenant', 'package_name', 'date', 'dimension_type', 'dimension_value', 'retention_period')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='google_play_buyers_7d_overview',
+            unique_together={('tenant', 'package_name', 'date', 'acquisition_channel', 'country')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='google_play_buyers_7d_dimensioned',
+            unique_together={('tenant', 'package_name', 'date', 'dimension_type', 'dimension_value')},
+        ),
+    ]
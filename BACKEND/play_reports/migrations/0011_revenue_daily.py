@@ -0,0 +1,68 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Schéma uniquement : les données existantes sont agrégées après le
+    # déploiement par `python manage.py revenue_facts`
+
+    dependencies = [
+        ('play_reports', '0010_acquisition_package_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('currency', models.CharField(max_length=10)),
+                ('reporting_currency', models.CharField(max_length=10)),
+                ('rate', models.DecimalField(decimal_places=10, max_digits=20)),
+                ('source', models.CharField(blank=True, default='', max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Taux de change',
+                'verbose_name_plural': 'Taux de change',
+                'db_table': 'fx_rate',
+                'ordering': ['-date', 'currency'],
+                'unique_together': {('currency', 'reporting_currency', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RevenueDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('earnings', 'Earnings'), ('estimated_sales', 'Estimated sales')], max_length=20)),
+                ('package_name', models.CharField(max_length=255)),
+                ('date', models.DateField()),
+                ('country', models.CharField(default='', max_length=10)),
+                ('currency', models.CharField(default='', max_length=10)),
+                ('reporting_currency', models.CharField(max_length=10)),
+                ('transactions', models.PositiveIntegerField(default=0)),
+                ('unconverted_transactions', models.PositiveIntegerField(default=0)),
+                ('gross_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('refund_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('fee_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('net_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_daily', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Revenu journalier',
+                'verbose_name_plural': 'Revenus journaliers',
+                'db_table': 'revenue_daily',
+                'ordering': ['-date'],
+                'indexes': [
+                    models.Index(fields=['tenant', 'package_name', 'date'], name='revenue_daily_pkg_date_idx'),
+                    models.Index(fields=['tenant', 'source', 'date'], name='revenue_daily_source_date_idx'),
+                ],
+                'unique_together': {('tenant', 'source', 'package_name', 'date', 'country', 'currency')},
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Schéma uniquement : les données existantes sont agrégées après le
+    # déploiement par `python manage.py subscription_cohorts`
+
+    dependencies = [
+        ('play_reports', '0011_revenue_daily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubscriptionMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_name', models.CharField(max_length=255)),
+                ('product_id', models.CharField(max_length=255)),
+                ('base_plan_id', models.CharField(default='', max_length=100)),
+                ('month', models.DateField(help_text='Premier jour du mois')),
+                ('new_subscribers', models.PositiveIntegerField(default=0)),
+                ('cancelled_subscribers', models.PositiveIntegerField(default=0)),
+                ('active_start', models.PositiveIntegerField(default=0)),
+                ('active_end', models.PositiveIntegerField(default=0)),
+                ('days_observed', models.PositiveSmallIntegerField(default=0)),
+                ('reason_cancellations', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscription_monthly', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Abonnements mensuels',
+                'verbose_name_plural': 'Abonnements mensuels',
+                'db_table': 'subscription_monthly',
+                'ordering': ['-month'],
+                'unique_together': {('tenant', 'package_name', 'product_id', 'base_plan_id', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SubscriptionChurnReason',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_name', models.CharField(max_length=255)),
+                ('product_id', models.CharField(max_length=255)),
+                ('month', models.DateField(help_text='Premier jour du mois')),
+                ('cancellation_reason', models.CharField(max_length=50)),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscription_churn_reasons', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Raison de churn mensuelle',
+                'verbose_name_plural': 'Raisons de churn mensuelles',
+                'db_table': 'subscription_churn_reason',
+                'ordering': ['-month', '-cancellations'],
+                'unique_together': {('tenant', 'package_name', 'product_id', 'month', 'cancellation_reason')},
+            },
+        ),
+    ]
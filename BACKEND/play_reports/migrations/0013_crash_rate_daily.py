@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Schéma uniquement : les données existantes sont agrégées après le
+    # déploiement par `python manage.py crash_rates`
+
+    dependencies = [
+        ('play_reports', '0012_subscription_monthly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrashRateDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_name', models.CharField(max_length=255)),
+                ('date', models.DateField()),
+                ('app_version', models.CharField(default='', max_length=100)),
+                ('crashes', models.PositiveIntegerField(default=0)),
+                ('anrs', models.PositiveIntegerField(default=0)),
+                ('active_devices', models.PositiveIntegerField(default=0)),
+                ('crashes_per_1k', models.FloatField(blank=True, null=True)),
+                ('anrs_per_1k', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crash_rate_daily', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Taux de plantage journalier',
+                'verbose_name_plural': 'Taux de plantage journaliers',
+                'db_table': 'crash_rate_daily',
+                'ordering': ['-date'],
+                'indexes': [
+                    models.Index(fields=['tenant', 'package_name', 'date', '-crashes_per_1k'], include=['app_version', 'crashes', 'active_devices'], name='crash_rate_worst_idx'),
+                    models.Index(fields=['tenant', 'package_name', 'app_version', 'date'], include=['crashes', 'anrs', 'active_devices'], name='crash_rate_version_idx'),
+                ],
+                'unique_together': {('tenant', 'package_name', 'date', 'app_version')},
+            },
+        ),
+    ]
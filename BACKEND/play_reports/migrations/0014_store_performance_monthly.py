@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Schéma uniquement : les données existantes sont agrégées après le
+    # déploiement par `python manage.py store_funnel`
+
+    dependencies = [
+        ('play_reports', '0013_crash_rate_daily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorePerformanceMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_name', models.CharField(max_length=255)),
+                ('month', models.DateField(help_text='Premier jour du mois')),
+                ('traffic_source', models.CharField(default='', max_length=100)),
+                ('visitors', models.PositiveIntegerField(default=0)),
+                ('acquisitions', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='store_performance_monthly', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Entonnoir store mensuel',
+                'verbose_name_plural': 'Entonnoirs store mensuels',
+                'db_table': 'store_performance_monthly',
+                'ordering': ['-month'],
+                'unique_together': {('tenant', 'package_name', 'month', 'traffic_source')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTermSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_name', models.CharField(max_length=255)),
+                ('month', models.DateField(help_text='Premier jour du mois')),
+                ('capacity', models.PositiveIntegerField()),
+                ('total_visitors', models.BigIntegerField(default=0)),
+                ('distinct_terms', models.PositiveIntegerField(default=0)),
+                ('counters', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_term_sketches', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Résumé des termes de recherche',
+                'verbose_name_plural': 'Résumés des termes de recherche',
+                'db_table': 'search_term_sketch',
+                'ordering': ['-month'],
+                'unique_together': {('tenant', 'package_name', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-19 20:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Schéma uniquement : les données existantes sont agrégées après le
+    # déploiement par `python manage.py metric_sketches`
+
+    dependencies = [
+        ('play_reports', '0014_store_performance_monthly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(max_length=50)),
+                ('package_name', models.CharField(max_length=255)),
+                ('date', models.DateField()),
+                ('field', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('hll', 'Valeurs distinctes (HyperLogLog)'), ('kll', 'Quantiles (KLL)')], max_length=3)),
+                ('observations', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_sketches', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Résumé de métrique',
+                'verbose_name_plural': 'Résumés de métriques',
+                'db_table': 'metric_sketch',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['tenant', 'report_type', 'package_name', 'field', 'kind', 'date'], name='metric_sketch_range_idx')],
+                'unique_together': {('tenant', 'report_type', 'package_name', 'date', 'field', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-19 20:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('play_reports', '0015_metric_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Anomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(max_length=50)),
+                ('package_name', models.CharField(max_length=255)),
+                ('metric', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('value', models.FloatField()),
+                ('baseline', models.FloatField()),
+                ('scale', models.FloatField(help_text='Dispersion robuste (1,4826 x MAD)')),
+                ('score', models.FloatField()),
+                ('direction', models.CharField(choices=[('spike', 'Pic'), ('drop', 'Chute')], max_length=5)),
+                ('detected_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalies', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Anomalie',
+                'verbose_name_plural': 'Anomalies',
+                'db_table': 'anomaly',
+                'ordering': ['-date', '-score'],
+                'indexes': [models.Index(fields=['tenant', 'package_name', '-date'], name='anomaly_package_date_idx')],
+                'unique_together': {('tenant', 'package_name', 'metric', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-19 21:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('play_reports', '0016_anomaly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Forecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_name', models.CharField(max_length=255)),
+                ('metric', models.CharField(choices=[('installs', 'Installations'), ('revenue', 'Revenus')], max_length=20)),
+                ('method', models.CharField(choices=[('holt_winters', 'Holt-Winters amorti'), ('seasonal_naive', 'Saisonnier naïf')], max_length=20)),
+                ('fitted_through', models.DateField()),
+                ('history_days', models.PositiveIntegerField(default=0)),
+                ('params', models.JSONField(default=dict)),
+                ('points', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='play_reports.tenant')),
+            ],
+            options={
+                'verbose_name': 'Prévision',
+                'verbose_name_plural': 'Prévisions',
+                'db_table': 'forecast',
+                'ordering': ['package_name', 'metric'],
+                'unique_together': {('tenant', 'package_name', 'metric')},
+            },
+        ),
+    ]
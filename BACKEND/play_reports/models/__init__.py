@@ -35,6 +35,22 @@ from .google_play_sales import google_play_sales
 from .datasource import DataSource
 from .DataSourceSyncHistory import DataSourceSyncHistory
 from .FileTracking import FileTracking
+from .dimension_value import DimensionValue
+from .data_version import DataVersion
+from .export_job import ExportJob
+from .dimension_key import DimensionKey
+from .review_daily_sentiment import ReviewDailySentiment
+from .review_daily_keyword import ReviewDailyKeyword
+from .fx_rate import FxRate
+from .revenue_daily import RevenueDaily
+from .subscription_monthly import SubscriptionMonthly
+from .subscription_churn_reason import SubscriptionChurnReason
+from .crash_rate_daily import CrashRateDaily
+from .store_performance_monthly import StorePerformanceMonthly
+from .search_term_sketch import SearchTermSketch
+from .metric_sketch import MetricSketch
+from .anomaly import Anomaly
+from .forecast import Forecast
 
 
 
@@ -86,5 +102,21 @@ __all__ = [
 
 'FileTracking',
  'DataSource' ,
- 'DataSourceSyncHistory'  
+ 'DataSourceSyncHistory',
+ 'DimensionValue',
+ 'DataVersion',
+ 'ExportJob',
+ 'DimensionKey',
+ 'ReviewDailySentiment',
+ 'ReviewDailyKeyword',
+ 'FxRate',
+ 'RevenueDaily',
+ 'SubscriptionMonthly',
+ 'SubscriptionChurnReason',
+ 'CrashRateDaily',
+ 'StorePerformanceMonthly',
+ 'SearchTermSketch',
+ 'MetricSketch',
+ 'Anomaly',
+ 'Forecast'
 ]
\ No newline at end of file
@@ -0,0 +1,47 @@
+from django.db import models
+
+
+class Anomaly(models.Model):
+    """
+    Point anormal d'une série journalière (installs, crashes, notes).
+
+    Détecté après chaque synchronisation par comparaison à une base robuste
+    (médiane saisonnière hebdomadaire, sinon médiane glissante) et à une
+    dispersion MAD. score est l'écart normalisé (robust z-score).
+    """
+
+    DIRECTION_CHOICES = [
+        ('spike', "Pic"),
+        ('drop', "Chute"),
+    ]
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='anomalies'
+    )
+    report_type = models.CharField(max_length=50)
+    package_name = models.CharField(max_length=255)
+    metric = models.CharField(max_length=100)
+    date = models.DateField()
+
+    value = models.FloatField()
+    baseline = models.FloatField()
+    scale = models.FloatField(help_text="Dispersion robuste (1,4826 x MAD)")
+    score = models.FloatField()
+    direction = models.CharField(max_length=5, choices=DIRECTION_CHOICES)
+
+    detected_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'anomaly'
+        verbose_name = "Anomalie"
+        verbose_name_plural = "Anomalies"
+        unique_together = ('tenant', 'package_name', 'metric', 'date')
+        indexes = [
+            models.Index(fields=['tenant', 'package_name', '-date'], name='anomaly_package_date_idx'),
+        ]
+        ordering = ['-date', '-score']
+
+    def __str__(self):
+        return f"{self.package_name} {self.metric} {self.date} {self.direction} ({self.score:+.1f})"
@@ -0,0 +1,53 @@
+from django.db import models
+
+
+class CrashRateDaily(models.Model):
+    """
+    Taux de plantage par (tenant, package, jour, version).
+
+    Jointure crashes / installations calculée à l'ingestion :
+    crashes_per_1k = plantages pour 1000 appareils actifs
+    (installs_on_active_devices). app_version = '' porte la ligne globale
+    (rapports overview) ; les autres lignes viennent des rapports par version.
+    """
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='crash_rate_daily'
+    )
+    package_name = models.CharField(max_length=255)
+    date = models.DateField()
+    app_version = models.CharField(max_length=100, default='')
+
+    crashes = models.PositiveIntegerField(default=0)
+    anrs = models.PositiveIntegerField(default=0)
+    active_devices = models.PositiveIntegerField(default=0)
+    # Null lorsque le nombre d'appareils actifs est inconnu ou nul
+    crashes_per_1k = models.FloatField(null=True, blank=True)
+    anrs_per_1k = models.FloatField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'crash_rate_daily'
+        verbose_name = "Taux de plantage journalier"
+        verbose_name_plural = "Taux de plantage journaliers"
+        unique_together = ('tenant', 'package_name', 'date', 'app_version')
+        indexes = [
+            # Top-N des pires versions : lecture indexée, sommes couvertes
+            models.Index(
+                fields=['tenant', 'package_name', 'date', '-crashes_per_1k'],
+                name='crash_rate_worst_idx',
+                include=['app_version', 'crashes', 'active_devices'],
+            ),
+            models.Index(
+                fields=['tenant', 'package_name', 'app_version', 'date'],
+                name='crash_rate_version_idx',
+                include=['crashes', 'anrs', 'active_devices'],
+            ),
+        ]
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.package_name} {self.date} {self.app_version or 'all'}: {self.crashes_per_1k}"
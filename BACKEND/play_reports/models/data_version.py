@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class DataVersion(models.Model):
+    """
+    Version des données d'une table de rapport pour un tenant.
+
+    Incrémentée à la fin de chaque synchronisation ayant alimenté la table ;
+    sert de clé d'invalidation (ETag, caches) pour les lectures de rapports.
+    """
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='data_versions'
+    )
+    table_name = models.CharField(max_length=100)
+    version = models.PositiveBigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'data_version'
+        verbose_name = "Version de données"
+        verbose_name_plural = "Versions de données"
+        unique_together = ('tenant', 'table_name')
+
+    def __str__(self):
+        return f"{self.table_name} v{self.version} (tenant {self.tenant_id})"
@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class DimensionKey(models.Model):
+    """
+    Dictionnaire global des valeurs de dimensions (device, carrier, pays...)
+    des tables de faits à encodage par dictionnaire.
+
+    Contrairement à DimensionValue (statistiques par tenant pour les options
+    de filtres), une valeur n'y figure qu'une fois par dimension : les tables
+    de faits encodées stockent son identifiant entier (4 octets) à la place
+    de la chaîne.
+    """
+
+    id = models.AutoField(primary_key=True)
+    dimension = models.CharField(max_length=50)
+    value = models.CharField(max_length=255)
+
+    class Meta:
+        db_table = 'dimension_key'
+        verbose_name = "Clé de dimension"
+        verbose_name_plural = "Clés de dimensions"
+        unique_together = ('dimension', 'value')
+
+    def __str__(self):
+        return f"{self.dimension}={self.value} (#{self.id})"
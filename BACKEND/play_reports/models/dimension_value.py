@@ -0,0 +1,39 @@
+from django.db import models
+
+
+class DimensionValue(models.Model):
+    """
+    Dictionnaire des valeurs distinctes de dimensions par
+    (tenant, package, type de rapport, dimension), alimenté à l'ingestion.
+
+    L'identifiant sert aussi de clé de substitution entière compacte pour
+    les valeurs de dimension.
+    """
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='dimension_values'
+    )
+    # Vide pour les rapports sans package (revenus, acheteurs 7j)
+    package_name = models.CharField(max_length=255, blank=True, default='')
+    report_type = models.CharField(max_length=50)
+    dimension = models.CharField(max_length=50)
+    value = models.CharField(max_length=255)
+
+    # Nombre de lignes de la table de faits portant cette valeur
+    row_count = models.PositiveBigIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dimension_value'
+        verbose_name = "Valeur de dimension"
+        verbose_name_plural = "Valeurs de dimensions"
+        # L'ordre des colonnes sert aussi d'index pour la lecture des options
+        unique_together = ('tenant', 'report_type', 'package_name', 'dimension', 'value')
+        ordering = ['report_type', 'dimension', 'value']
+
+    def __str__(self):
+        return f"{self.report_type}.{self.dimension}={self.value} ({self.row_count})"
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db import models
+
+
+class ExportJob(models.Model):
+    """
+    Export asynchrone d'un rapport (CSV ou Parquet) pour un tenant, exécuté
+    par une tâche Celery et écrit dans le stockage d'export.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'En attente'
+        RUNNING = 'running', 'En cours'
+        COMPLETED = 'completed', 'Terminé'
+        FAILED = 'failed', 'Échoué'
+
+    class Format(models.TextChoices):
+        CSV = 'csv', 'CSV'
+        PARQUET = 'parquet', 'Parquet'
+
+    class Destination(models.TextChoices):
+        LOCAL = 'local', 'Fichier local'
+        GCS = 'gcs', 'Google Cloud Storage'
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='export_jobs'
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='export_jobs',
+        null=True, blank=True
+    )
+
+    # Paramètres de l'export
+    report_type = models.CharField(max_length=50)
+    export_format = models.CharField(max_length=10, choices=Format.choices, default=Format.CSV)
+    destination = models.CharField(max_length=10, choices=Destination.choices, default=Destination.LOCAL)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    package_name = models.CharField(max_length=255, blank=True, default='')
+    fields = models.JSONField(default=list, blank=True)
+
+    # Résultat
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    location = models.CharField(max_length=1000, blank=True, default='')
+    row_count = models.PositiveBigIntegerField(default=0)
+    size_bytes = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'export_job'
+        verbose_name = "Export de rapport"
+        verbose_name_plural = "Exports de rapports"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', '-created_at'], name='export_job_tenant_idx'),
+        ]
+
+    def __str__(self):
+        return f"Export {self.report_type} ({self.export_format}) - {self.status}"
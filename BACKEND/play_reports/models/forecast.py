@@ -0,0 +1,49 @@
+from django.db import models
+
+
+class Forecast(models.Model):
+    """
+    Prévision journalière mise en cache pour une série (tenant, package, métrique).
+
+    Ajustée après chaque synchronisation pour les seules séries ayant reçu
+    des données. params conserve les paramètres et l'état du modèle
+    (niveau, tendance, saisonnalité) pour prolonger l'ajustement jour par
+    jour sans tout recalculer ; points contient les HORIZON jours suivants.
+    """
+
+    METRIC_CHOICES = [
+        ('installs', "Installations"),
+        ('revenue', "Revenus"),
+    ]
+    METHOD_CHOICES = [
+        ('holt_winters', "Holt-Winters amorti"),
+        ('seasonal_naive', "Saisonnier naïf"),
+    ]
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='forecasts'
+    )
+    package_name = models.CharField(max_length=255)
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    method = models.CharField(max_length=20, choices=METHOD_CHOICES)
+
+    # Dernier jour observé intégré au modèle
+    fitted_through = models.DateField()
+    history_days = models.PositiveIntegerField(default=0)
+    params = models.JSONField(default=dict)
+    # [{'date', 'value', 'lower', 'upper'}] à partir du lendemain de fitted_through
+    points = models.JSONField(default=list)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'forecast'
+        verbose_name = "Prévision"
+        verbose_name_plural = "Prévisions"
+        unique_together = ('tenant', 'package_name', 'metric')
+        ordering = ['package_name', 'metric']
+
+    def __str__(self):
+        return f"{self.package_name} {self.metric} ({self.method}, jusqu'au {self.fitted_through})"
@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class FxRate(models.Model):
+    """
+    Taux de change journalier chargé localement (commande load_fx_rates).
+
+    rate = valeur d'une unité de `currency` exprimée dans
+    `reporting_currency`. Pour une date sans taux, le dernier taux connu
+    antérieur est utilisé lors de la construction des faits de revenus.
+    """
+
+    date = models.DateField()
+    currency = models.CharField(max_length=10)
+    reporting_currency = models.CharField(max_length=10)
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+    source = models.CharField(max_length=50, blank=True, default='')
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'fx_rate'
+        verbose_name = "Taux de change"
+        verbose_name_plural = "Taux de change"
+        unique_together = ('currency', 'reporting_currency', 'date')
+        ordering = ['-date', 'currency']
+
+    def __str__(self):
+        return f"{self.date} 1 {self.currency} = {self.rate} {self.reporting_currency}"
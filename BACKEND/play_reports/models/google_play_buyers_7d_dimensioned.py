@@ -18,6 +18,14 @@ class google_play_buyers_7d_dimensioned(models.Model):
     ]
 
     # Informations de base
+    package_name = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text=_("Package de l'application")
+    )
+    
     date = models.DateField(
         db_index=True,
         help_text=_("Date de début de la période de 7 jours")
@@ -58,6 +66,31 @@ class google_play_buyers_7d_dimensioned(models.Model):
         help_text=_("Nombre d'acheteurs récurrents")
     )
     
+    # Taux de conversion
+    visitor_to_installer_rate = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text=_("Taux de conversion visiteur → installation (%)")
+    )
+    
+    installer_to_buyer_rate = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text=_("Taux de conversion installation → achat (%)")
+    )
+    
+    buyer_to_repeat_rate = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text=_("Taux de réachat (%)")
+    )
+    
     # Relations
     tenant = models.ForeignKey(
         'Tenant',
@@ -74,7 +107,7 @@ class google_play_buyers_7d_dimensioned(models.Model):
         db_table = 'google_play_buyers_dimensioned'
         verbose_name = _("Acheteurs dimensionnés 7j")
         verbose_name_plural = _("Acheteurs dimensionnés 7j")
-        unique_together = ('tenant', 'date', 'dimension_type', 'dimension_value')
+        unique_together = ('tenant', 'package_name', 'date', 'dimension_type', 'dimension_value')
         ordering = ['-date', 'dimension_type', 'dimension_value']
         indexes = [
             models.Index(fields=['tenant', 'date']),
@@ -18,6 +18,14 @@ class google_play_buyers_7d_overview(models.Model):
     ]
 
     # Informations de base
+    package_name = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text=_("Package de l'application")
+    )
+    
     date = models.DateField(
         db_index=True,
         help_text=_("Date de début de la période de 7 jours")
@@ -98,7 +106,7 @@ class google_play_buyers_7d_overview(models.Model):
         db_table = 'google_play_buyers_overview'
         verbose_name = _("Aperçu des acheteurs 7j")
         verbose_name_plural = _("Aperçus des acheteurs 7j")
-        unique_together = ('tenant', 'date', 'acquisition_channel', 'country')
+        unique_together = ('tenant', 'package_name', 'date', 'acquisition_channel', 'country')
         ordering = ['-date', 'country', 'acquisition_channel']
         indexes = [
             models.Index(fields=['tenant', 'date']),
@@ -35,11 +35,11 @@ class google_play_crashes_overview(models.Model):
         )
         indexes = [
             models.Index(fields=['tenant', 'date']),
-            models.Index(fields=['package_name']),
-            models.Index(fields=['device']),
-            models.Index(fields=['app_version']),
-            models.Index(fields=['os_version']),
-            models.Index(fields=['android_os_version']),
+            models.Index(
+                fields=['tenant', 'package_name', 'date'],
+                include=['daily_crashes', 'daily_anrs'],
+                name='crashes_ov_tpd_cover_idx',
+            ),
         ]
         ordering = ['-date', 'package_name']
 
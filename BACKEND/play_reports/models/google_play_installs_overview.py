@@ -45,13 +45,16 @@ class google_play_installs_overview(models.Model):
         )
         indexes = [
             models.Index(fields=['tenant', 'date']),
-            models.Index(fields=['package_name']),
-            models.Index(fields=['device']),
-            models.Index(fields=['app_version']),
-            models.Index(fields=['os_version']),
-            models.Index(fields=['country']),
-            models.Index(fields=['language']),
-            models.Index(fields=['carrier']),
+            # Filtre des insights (tenant, package, période) ; les métriques
+            # incluses permettent des agrégats en index-only scan
+            models.Index(
+                fields=['tenant', 'package_name', 'date'],
+                include=[
+                    'daily_user_installs', 'daily_user_uninstalls',
+                    'total_user_installs', 'current_device_installs',
+                ],
+                name='installs_ov_tpd_cover_idx',
+            ),
         ]
         ordering = ['-date', 'package_name']
 
@@ -35,8 +35,11 @@ class google_play_ratings_overview(models.Model):
         db_table = 'google_play_ratings_overview'
         unique_together = ('tenant', 'package_name', 'date', 'device')
         indexes = [
-            models.Index(fields=['package_name', 'date']),
-            models.Index(fields=['device']),
+            models.Index(
+                fields=['tenant', 'package_name', 'date'],
+                include=['daily_average_rating', 'total_average_rating'],
+                name='ratings_ov_tpd_cover_idx',
+            ),
         ]
         ordering = ['-date', 'package_name']
 
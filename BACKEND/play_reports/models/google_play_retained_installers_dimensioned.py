@@ -25,6 +25,14 @@ class google_play_retained_installers_dimensioned(models.Model):
     ]
 
     # Informations de base
+    package_name = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text=_("Package de l'application")
+    )
+    
     date = models.DateField(
         db_index=True,
         help_text=_("Date de référence des données")
@@ -108,6 +116,7 @@ class google_play_retained_installers_dimensioned(models.Model):
         verbose_name_plural = _("Installateurs retenus dimensionnés")
         unique_together = (
             'tenant', 
+            'package_name',
             'date', 
             'dimension_type', 
             'dimension_value',
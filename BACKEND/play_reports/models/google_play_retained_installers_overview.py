@@ -18,6 +18,14 @@ class google_play_retained_installers_overview(models.Model):
     ]
 
     # Informations de base
+    package_name = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text=_("Package de l'application")
+    )
+    
     date = models.DateField(
         db_index=True,
         help_text=_("Date de référence des données")
@@ -133,7 +141,7 @@ class google_play_retained_installers_overview(models.Model):
         db_table = 'google_play_retained_installers_overview'
         verbose_name = _("Aperçu des installateurs retenus")
         verbose_name_plural = _("Aperçus des installateurs retenus")
-        unique_together = ('tenant', 'date', 'acquisition_channel', 'country')
+        unique_together = ('tenant', 'package_name', 'date', 'acquisition_channel', 'country')
         ordering = ['-date', 'country', 'acquisition_channel']
         indexes = [
             models.Index(fields=['tenant', 'date']),
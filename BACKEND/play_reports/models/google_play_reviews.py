@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 class google_play_reviews(models.Model):
@@ -29,6 +31,13 @@ class google_play_reviews(models.Model):
     reviewer_language = models.CharField(max_length=10, blank=True, null=True)
     device = models.CharField(max_length=255, blank=True, null=True)
     device_metadata = models.JSONField(default=dict, blank=True)
+
+    # Recherche plein texte (titre + texte, configuration selon la langue)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
+    # Sentiment lexical (-1..1) et mots-clés, calculés une fois à l'ingestion
+    sentiment_score = models.FloatField(null=True, blank=True)
+    sentiment_keywords = models.JSONField(default=list, blank=True)
     
     # Liens et références
     review_link = models.URLField(max_length=1000, null=True, blank=True)
@@ -51,10 +60,12 @@ class google_play_reviews(models.Model):
         verbose_name_plural = "Google Play Reviews"
         unique_together = ('tenant', 'package_name', 'review_submit_millis_since_epoch')
         indexes = [
-            models.Index(fields=['tenant', 'package_name']),
-            models.Index(fields=['star_rating']),
-            models.Index(fields=['review_submit_date']),
-            models.Index(fields=['package_name', 'star_rating']),
+            models.Index(
+                fields=['tenant', 'package_name', 'review_submit_date'],
+                include=['star_rating'],
+                name='reviews_tp_submit_cover_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='reviews_search_gin_idx'),
         ]
         ordering = ['-review_submit_date']
 
@@ -1,6 +1,9 @@
 from django.db import models
 
 class google_play_sales(models.Model):
+    # Obsolète : les rapports de ventes sont chargés dans
+    # google_play_estimatedSales ; table conservée pour l'historique, hors
+    # registre des rapports et du partitionnement.
     # Types de produits
     PRODUCT_TYPES = [
         ('inapp', 'In-app Purchase'),
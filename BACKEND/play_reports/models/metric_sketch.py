@@ -0,0 +1,52 @@
+from django.db import models
+
+
+class MetricSketch(models.Model):
+    """
+    Résumé probabiliste d'une colonne de rapport pour (tenant, package, jour).
+
+    - kind 'hll' : HyperLogLog des valeurs distinctes d'une dimension
+      (appareils, pays, versions...) ;
+    - kind 'kll' : quantiles KLL d'une mesure (notes, installations...).
+
+    Construit à l'ingestion pour les jours modifiés ; les résumés journaliers
+    se fusionnent sur n'importe quelle plage de dates, sans relire les lignes
+    de faits.
+    """
+
+    KIND_CHOICES = [
+        ('hll', "Valeurs distinctes (HyperLogLog)"),
+        ('kll', "Quantiles (KLL)"),
+    ]
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='metric_sketches'
+    )
+    report_type = models.CharField(max_length=50)
+    package_name = models.CharField(max_length=255)
+    date = models.DateField()
+    # Colonne résumée (dimension pour 'hll', mesure pour 'kll')
+    field = models.CharField(max_length=100)
+    kind = models.CharField(max_length=3, choices=KIND_CHOICES)
+
+    # Nombre d'observations (lignes distinctes pour 'hll', valeurs pour 'kll')
+    observations = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'metric_sketch'
+        verbose_name = "Résumé de métrique"
+        verbose_name_plural = "Résumés de métriques"
+        unique_together = ('tenant', 'report_type', 'package_name', 'date', 'field', 'kind')
+        indexes = [
+            models.Index(fields=['tenant', 'report_type', 'package_name', 'field', 'kind', 'date'],
+                         name='metric_sketch_range_idx'),
+        ]
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.report_type}/{self.package_name} {self.date} {self.kind}:{self.field}"
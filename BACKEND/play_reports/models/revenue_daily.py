@@ -0,0 +1,55 @@
+from django.db import models
+
+
+class RevenueDaily(models.Model):
+    """
+    Faits de revenus par (tenant, source, package, jour, pays, devise).
+
+    Construits à l'ingestion des rapports de revenus (earnings) et de ventes
+    estimées : package normalisé (product_id en minuscules) et montants
+    convertis dans la devise de reporting via FxRate. Les transactions sans
+    taux de change sont comptées dans unconverted_transactions et exclues
+    des montants convertis.
+    """
+
+    SOURCES = [
+        ('earnings', 'Earnings'),
+        ('estimated_sales', 'Estimated sales'),
+    ]
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='revenue_daily'
+    )
+    source = models.CharField(max_length=20, choices=SOURCES)
+    package_name = models.CharField(max_length=255)
+    date = models.DateField()
+    country = models.CharField(max_length=10, default='')
+    # Devise d'origine des montants (devise marchande ou de vente)
+    currency = models.CharField(max_length=10, default='')
+    reporting_currency = models.CharField(max_length=10)
+
+    transactions = models.PositiveIntegerField(default=0)
+    unconverted_transactions = models.PositiveIntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    refund_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    fee_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    net_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'revenue_daily'
+        verbose_name = "Revenu journalier"
+        verbose_name_plural = "Revenus journaliers"
+        unique_together = ('tenant', 'source', 'package_name', 'date', 'country', 'currency')
+        indexes = [
+            models.Index(fields=['tenant', 'package_name', 'date'], name='revenue_daily_pkg_date_idx'),
+            models.Index(fields=['tenant', 'source', 'date'], name='revenue_daily_source_date_idx'),
+        ]
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.source} {self.package_name} {self.date}: {self.net_amount} {self.reporting_currency}"
@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class ReviewDailyKeyword(models.Model):
+    """
+    Mots-clés des avis agrégés par (tenant, package, jour de dépôt).
+
+    negative_mentions compte les avis négatifs citant le mot-clé : c'est la
+    base du panneau « principales plaintes ».
+    """
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='review_daily_keywords'
+    )
+    package_name = models.CharField(max_length=255)
+    date = models.DateField()
+    keyword = models.CharField(max_length=100)
+
+    mentions = models.PositiveIntegerField(default=0)
+    positive_mentions = models.PositiveIntegerField(default=0)
+    negative_mentions = models.PositiveIntegerField(default=0)
+    sentiment_sum = models.FloatField(default=0)
+
+    class Meta:
+        db_table = 'review_daily_keyword'
+        verbose_name = "Mot-clé journalier des avis"
+        verbose_name_plural = "Mots-clés journaliers des avis"
+        unique_together = ('tenant', 'package_name', 'date', 'keyword')
+        ordering = ['-date', '-mentions']
+
+    def __str__(self):
+        return f"{self.package_name} {self.date}: {self.keyword} ({self.mentions})"
@@ -0,0 +1,39 @@
+from django.db import models
+
+
+class ReviewDailySentiment(models.Model):
+    """
+    Sentiment des avis agrégé par (tenant, package, jour de dépôt).
+
+    Recalculé à l'ingestion pour les seuls jours ayant reçu des avis nouveaux
+    ou modifiés, à partir du score lexical stocké sur chaque avis : les
+    tendances de sentiment ne relisent jamais le texte des avis.
+    """
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='review_daily_sentiments'
+    )
+    package_name = models.CharField(max_length=255)
+    date = models.DateField()
+
+    review_count = models.PositiveIntegerField(default=0)
+    # Répartition selon le score lexical (seuils : ReviewSentimentService)
+    positive_count = models.PositiveIntegerField(default=0)
+    neutral_count = models.PositiveIntegerField(default=0)
+    negative_count = models.PositiveIntegerField(default=0)
+    sentiment_sum = models.FloatField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'review_daily_sentiment'
+        verbose_name = "Sentiment journalier des avis"
+        verbose_name_plural = "Sentiments journaliers des avis"
+        unique_together = ('tenant', 'package_name', 'date')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.package_name} {self.date}: {self.review_count} avis"
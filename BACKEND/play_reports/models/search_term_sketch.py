@@ -0,0 +1,37 @@
+from django.db import models
+
+
+class SearchTermSketch(models.Model):
+    """
+    Termes de recherche les plus fréquents d'un package sur un mois.
+
+    Résumé Space-Saving de taille bornée (capacity compteurs) construit à
+    l'ingestion : seule la tête de distribution est conservée, la longue
+    traîne des termes n'est jamais matérialisée. Chaque compteur est
+    [terme, visiteurs, erreur max, {acquisitions}].
+    """
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='search_term_sketches'
+    )
+    package_name = models.CharField(max_length=255)
+    month = models.DateField(help_text="Premier jour du mois")
+
+    capacity = models.PositiveIntegerField()
+    total_visitors = models.BigIntegerField(default=0)
+    distinct_terms = models.PositiveIntegerField(default=0)
+    counters = models.JSONField(default=list)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'search_term_sketch'
+        verbose_name = "Résumé des termes de recherche"
+        verbose_name_plural = "Résumés des termes de recherche"
+        unique_together = ('tenant', 'package_name', 'month')
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.package_name} {self.month:%Y-%m} ({len(self.counters)}/{self.capacity})"
@@ -0,0 +1,41 @@
+from django.db import models
+
+
+class StorePerformanceMonthly(models.Model):
+    """
+    Entonnoir de la fiche Play Store par (tenant, package, mois, source de trafic).
+
+    Recalculé à l'ingestion des rapports de performance du store, pour les
+    seuls mois modifiés : visiteurs -> acquisitions, le taux de conversion
+    étant dérivé à la lecture (acquisitions / visiteurs) pour rester exact
+    quelle que soit l'agrégation demandée.
+    """
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='store_performance_monthly'
+    )
+    package_name = models.CharField(max_length=255)
+    month = models.DateField(help_text="Premier jour du mois")
+    # '' pour les lignes sans source de trafic (total de la fiche)
+    traffic_source = models.CharField(max_length=100, default='')
+
+    visitors = models.PositiveIntegerField(default=0)
+    acquisitions = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'store_performance_monthly'
+        verbose_name = "Entonnoir store mensuel"
+        verbose_name_plural = "Entonnoirs store mensuels"
+        unique_together = ('tenant', 'package_name', 'month', 'traffic_source')
+        ordering = ['-month']
+
+    @property
+    def conversion_rate(self):
+        return self.acquisitions / self.visitors if self.visitors else None
+
+    def __str__(self):
+        return f"{self.package_name} {self.month:%Y-%m} {self.traffic_source or '-'}"
@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class SubscriptionChurnReason(models.Model):
+    """Annulations agrégées par (tenant, package, produit, mois, raison)."""
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='subscription_churn_reasons'
+    )
+    package_name = models.CharField(max_length=255)
+    product_id = models.CharField(max_length=255)
+    month = models.DateField(help_text="Premier jour du mois")
+    cancellation_reason = models.CharField(max_length=50)
+    cancellations = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'subscription_churn_reason'
+        verbose_name = "Raison de churn mensuelle"
+        verbose_name_plural = "Raisons de churn mensuelles"
+        unique_together = ('tenant', 'package_name', 'product_id', 'month', 'cancellation_reason')
+        ordering = ['-month', '-cancellations']
+
+    def __str__(self):
+        return f"{self.package_name} {self.product_id} {self.month:%Y-%m} {self.cancellation_reason}: {self.cancellations}"
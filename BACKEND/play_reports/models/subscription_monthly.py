@@ -0,0 +1,44 @@
+from django.db import models
+
+
+class SubscriptionMonthly(models.Model):
+    """
+    Abonnements agrégés par (tenant, package, produit, plan de base, mois).
+
+    Recalculé à l'ingestion des rapports d'abonnements et de raisons
+    d'annulation, pour les seuls mois modifiés. Sert de base aux matrices de
+    churn et de cohortes : celles-ci ne relisent jamais les lignes
+    journalières.
+    """
+
+    tenant = models.ForeignKey(
+        'Tenant',
+        on_delete=models.CASCADE,
+        related_name='subscription_monthly'
+    )
+    package_name = models.CharField(max_length=255)
+    product_id = models.CharField(max_length=255)
+    # '' lorsque le rapport ne précise pas de plan de base
+    base_plan_id = models.CharField(max_length=100, default='')
+    month = models.DateField(help_text="Premier jour du mois")
+
+    new_subscribers = models.PositiveIntegerField(default=0)
+    cancelled_subscribers = models.PositiveIntegerField(default=0)
+    # Abonnés actifs au premier et au dernier jour observés du mois
+    active_start = models.PositiveIntegerField(default=0)
+    active_end = models.PositiveIntegerField(default=0)
+    days_observed = models.PositiveSmallIntegerField(default=0)
+    # Annulations du rapport de raisons (niveau produit, plan de base '')
+    reason_cancellations = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'subscription_monthly'
+        verbose_name = "Abonnements mensuels"
+        verbose_name_plural = "Abonnements mensuels"
+        unique_together = ('tenant', 'package_name', 'product_id', 'base_plan_id', 'month')
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.package_name} {self.product_id}/{self.base_plan_id or '-'} {self.month:%Y-%m}"
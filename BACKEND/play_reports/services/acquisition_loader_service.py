@@ -0,0 +1,266 @@
+import logging
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.apps import apps
+from django.utils.dateparse import parse_date
+
+logger = logging.getLogger(__name__)
+
+
+# Colonnes communes des rapports d'acquisition (en-têtes normalisés)
+COMMON_COLUMNS = {
+    'date': 'date',
+    'package_name': 'package_name',
+    'store_listing_visitors': 'store_listing_visitors',
+    'installers': 'installers',
+    'visitor_to_installer_conversion_rate': 'visitor_to_installer_rate',
+    'visitor_to_installer_rate': 'visitor_to_installer_rate',
+}
+
+RETAINED_COLUMNS = {
+    **COMMON_COLUMNS,
+    'benchmark_visitor_to_installer_conversion_rate': 'median_visitor_to_installer',
+    'peers_median_visitor_to_installer_conversion_rate': 'median_visitor_to_installer',
+    'median_visitor_to_installer': 'median_visitor_to_installer',
+}
+for _days, _suffix in ((1, 'day'), (7, 'days'), (15, 'days'), (30, 'days')):
+    RETAINED_COLUMNS[f'installers_retained_for_{_days}_{_suffix}'] = f'installers_retained_{_days}_{_suffix}'
+    RETAINED_COLUMNS[f'installers_retained_{_days}_{_suffix}'] = f'installers_retained_{_days}_{_suffix}'
+    RETAINED_COLUMNS[f'installer_to_{_days}_{_suffix}_retention_rate'] = f'retention_rate_{_days}_{_suffix}'
+    RETAINED_COLUMNS[f'retention_rate_{_days}_{_suffix}'] = f'retention_rate_{_days}_{_suffix}'
+
+BUYERS_COLUMNS = {
+    **COMMON_COLUMNS,
+    'buyers': 'buyers',
+    'repeat_buyers': 'repeat_buyers',
+    'installer_to_buyer_conversion_rate': 'installer_to_buyer_rate',
+    'installer_to_buyer_rate': 'installer_to_buyer_rate',
+    'buyer_to_repeat_buyer_conversion_rate': 'buyer_to_repeat_rate',
+    'buyer_to_repeat_rate': 'buyer_to_repeat_rate',
+}
+
+# Colonnes portant la valeur de la dimension, par type
+DIMENSION_COLUMNS = {
+    'acquisition_channel': ('acquisition_channel', 'channel'),
+    'country': ('country', 'country_region', 'play_country', 'buyer_country'),
+    'utm_source': ('utm_source',),
+    'utm_campaign': ('utm_campaign',),
+    'keyword': ('keyword', 'search_term'),
+}
+
+# Suffixe du fichier -> type de dimension
+SUFFIX_DIMENSIONS = {
+    'channel': 'acquisition_channel',
+    'acquisition_channel': 'acquisition_channel',
+    'country': 'country',
+    'play_country': 'country',
+    'utm_source': 'utm_source',
+    'utm_campaign': 'utm_campaign',
+    'keyword': 'keyword',
+}
+
+# Dimensions portées par les colonnes du modèle d'overview ; les autres vont
+# dans la table dimensionnée (dimension_type, dimension_value)
+OVERVIEW_DIMENSIONS = ('acquisition_channel', 'country')
+
+ACQUISITION_REPORTS = {
+    'retained_installers': {
+        'table_overview': 'google_play_retained_installers_overview',
+        'table_dimensioned': 'google_play_retained_installers_dimensioned',
+        'columns': RETAINED_COLUMNS,
+    },
+    'buyers_7d': {
+        'table_overview': 'google_play_buyers_7d_overview',
+        'table_dimensioned': 'google_play_buyers_7d_dimensioned',
+        'columns': BUYERS_COLUMNS,
+    },
+}
+
+RETENTION_PERIODS = ((1, 'day'), (7, 'days'), (15, 'days'), (30, 'days'))
+
+
+class AcquisitionLoaderService:
+    """
+    Chargement des rapports d'acquisition (installateurs retenus, acheteurs 7j).
+
+    Les lignes sont converties directement en instances (sans introspection
+    champ par champ), taux inclus : « 12.5% » et 0.125 donnent tous deux
+    12.50. Chaque lot est écrit par un seul INSERT ... ON CONFLICT DO UPDATE
+    sur la clé d'unicité du modèle : une resynchronisation remplace les
+    valeurs au lieu de dupliquer les lignes.
+
+    Les fichiers overview/channel/country alimentent la table d'overview
+    (dimension absente = ''), les fichiers utm/keyword la table dimensionnée ;
+    pour les installateurs retenus, celle-ci est au format long (une ligne
+    par période de rétention).
+    """
+
+    def normalize(self, column):
+        return re.sub(r'[^a-z0-9]+', '_', (column or '').lower()).strip('_')
+
+    def _clean(self, value):
+        if value is None:
+            return None
+        value = str(value).strip()
+        return value if value and value not in ('-', '—') else None
+
+    def _to_int(self, value):
+        value = self._clean(value)
+        if value is None:
+            return 0
+        try:
+            return max(0, int(float(value.replace(',', '').replace(' ', ''))))
+        except ValueError:
+            return 0
+
+    def _to_rate(self, value):
+        """Pourcentage à 2 décimales ; une fraction (0..1) sans « % » est convertie."""
+        value = self._clean(value)
+        if value is None:
+            return None
+        is_percent = value.endswith('%')
+        try:
+            rate = Decimal(value.rstrip('%').replace(',', '.').strip())
+        except InvalidOperation:
+            return None
+        if not is_percent and abs(rate) <= 1:
+            rate *= 100
+        return min(rate, Decimal('999.99')).quantize(Decimal('0.01'))
+
+    def _to_date(self, value):
+        value = self._clean(value)
+        if value is None:
+            return None
+        parsed = parse_date(value)
+        if parsed:
+            return parsed
+        for fmt in ('%Y%m%d', '%m/%d/%Y', '%b %d, %Y', '%d/%m/%Y'):
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                pass
+        return None
+
+    def _convert(self, field, value):
+        if field == 'date':
+            return self._to_date(value)
+        if field == 'package_name':
+            return self._clean(value) or ''
+        if field.endswith('_rate') or field.startswith('median_'):
+            return self._to_rate(value)
+        return self._to_int(value)
+
+    def _dimension_value(self, dimension, row):
+        for column in DIMENSION_COLUMNS[dimension]:
+            value = self._clean(row.get(column))
+            if value is not None:
+                if dimension == 'country':
+                    return value.upper()[:2]
+                if dimension == 'acquisition_channel':
+                    return self.normalize(value)[:50]
+                return value[:255]
+        return ''
+
+    def parse_rows(self, report, rows, dimension=None, default_package=None):
+        """Lignes CSV -> dicts de champs (date et package renseignés)."""
+        columns = ACQUISITION_REPORTS[report]['columns']
+        parsed = []
+        for row in rows:
+            row = {self.normalize(key): value for key, value in row.items() if key}
+            data = {field: self._convert(field, row.get(column))
+                    for column, field in columns.items() if column in row}
+            if not data.get('date'):
+                continue
+            data['package_name'] = data.get('package_name') or default_package or ''
+            if dimension:
+                data['_dimension_value'] = self._dimension_value(dimension, row)
+            parsed.append(data)
+        return parsed
+
+    def build_overview(self, model, tenant_id, parsed, dimension=None):
+        fields = {f.name for f in model._meta.concrete_fields}
+        objects = {}
+        for data in parsed:
+            values = {k: v for k, v in data.items() if k in fields}
+            values['acquisition_channel'] = data['_dimension_value'] if dimension == 'acquisition_channel' else ''
+            values['country'] = data['_dimension_value'] if dimension == 'country' else ''
+            key = (values['package_name'], values['date'], values['acquisition_channel'], values['country'])
+            # Doublons dans le lot : ON CONFLICT n'accepte qu'une ligne par clé
+            objects[key] = model(tenant_id=tenant_id, **values)
+        return list(objects.values())
+
+    def build_dimensioned(self, model, tenant_id, parsed, dimension):
+        fields = {f.name for f in model._meta.concrete_fields}
+        long_format = 'retention_period' in fields
+        objects = {}
+        for data in parsed:
+            base = {
+                'package_name': data['package_name'],
+                'date': data['date'],
+                'dimension_type': dimension,
+                'dimension_value': data['_dimension_value'],
+            }
+            if not long_format:
+                values = {k: v for k, v in data.items() if k in fields}
+                values.update(base)
+                objects[tuple(base.values())] = model(tenant_id=tenant_id, **values)
+                continue
+            installers = data.get('installers') or 0
+            for days, suffix in RETENTION_PERIODS:
+                retained = data.get(f'installers_retained_{days}_{suffix}')
+                rate = data.get(f'retention_rate_{days}_{suffix}')
+                if retained is None and rate is None:
+                    continue
+                if rate is None:
+                    rate = (Decimal(retained) * 100 / installers).quantize(Decimal('0.01')) if installers else Decimal('0')
+                objects[tuple(base.values()) + (days,)] = model(
+                    tenant_id=tenant_id, retention_period=days, installers=installers,
+                    installers_retained=retained or 0, retention_rate=rate, **base
+                )
+        return list(objects.values())
+
+    def upsert(self, model, objects):
+        if not objects:
+            return 0
+        unique_fields = list(model._meta.unique_together[0])
+        update_fields = [
+            f.name for f in model._meta.concrete_fields
+            if not f.primary_key and f.name not in unique_fields and f.name != 'created_at'
+        ]
+        model.objects.bulk_create(
+            objects, batch_size=2000,
+            update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields,
+        )
+        return len(objects)
+
+    def load(self, report, rows, tenant_id, suffix=None, default_package=None):
+        """Charge un lot de lignes ; retourne (table alimentée, lignes écrites)."""
+        spec = ACQUISITION_REPORTS[report]
+        dimension = SUFFIX_DIMENSIONS.get(suffix) if suffix and suffix != 'overview' else None
+        parsed = self.parse_rows(report, rows, dimension, default_package)
+
+        if dimension is None or dimension in OVERVIEW_DIMENSIONS:
+            table = spec['table_overview']
+            model = apps.get_model('play_reports', table)
+            objects = self.build_overview(model, tenant_id, parsed, dimension)
+        else:
+            table = spec['table_dimensioned']
+            model = apps.get_model('play_reports', table)
+            objects = self.build_dimensioned(model, tenant_id, parsed, dimension)
+        return table, self.upsert(model, objects)
+
+    def load_report(self, rows, tenant_id, report_info):
+        """Point d'entrée ProcessBucketService : (table, lignes écrites, mises à jour)."""
+        table, written = self.load(
+            report_info['reportType'], rows, tenant_id,
+            suffix=report_info.get('suffix'), default_package=report_info.get('appPackage'),
+        )
+        # Les conflits sont résolus par ON CONFLICT : insertions et mises à jour confondues
+        return table, written, 0
+
+
+acquisition_loader_service = AcquisitionLoaderService()
+
+__all__ = ["acquisition_loader_service", "AcquisitionLoaderService", "ACQUISITION_REPORTS"]
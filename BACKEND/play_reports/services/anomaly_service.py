@@ -0,0 +1,256 @@
+import logging
+import time
+import warnings
+from datetime import timedelta
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+
+from play_reports.models import (
+    google_play_installs_overview,
+    google_play_crashes_overview,
+    google_play_ratings_overview,
+    Anomaly,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Séries surveillées par rapport : métrique -> (sens recherché, échelle minimale,
+# plancher relatif de l'échelle). Le plancher évite qu'une série quasi
+# constante ne signale le moindre écart.
+ANOMALY_SERIES = {
+    'installs': {
+        'model': google_play_installs_overview,
+        'aggregate': 'SUM',
+        'metrics': {
+            'daily_device_installs': ('both', 1.0, 0.05),
+            'daily_device_uninstalls': ('spike', 1.0, 0.05),
+            'installs_on_active_devices': ('drop', 1.0, 0.01),
+        },
+    },
+    'crashes': {
+        'model': google_play_crashes_overview,
+        'aggregate': 'SUM',
+        'metrics': {
+            'daily_crashes': ('spike', 1.0, 0.05),
+            'daily_anrs': ('spike', 1.0, 0.05),
+        },
+    },
+    'ratings': {
+        'model': google_play_ratings_overview,
+        'aggregate': 'AVG',
+        'metrics': {
+            'daily_average_rating': ('drop', 0.05, 0.0),
+        },
+    },
+}
+
+# Facteur de cohérence MAD -> écart type pour une loi normale
+MAD_SCALE = 1.4826
+# Jours observés minimum dans la fenêtre pour évaluer un point
+MIN_HISTORY = 14
+# Semaines précédentes minimum pour utiliser la base saisonnière
+MIN_SEASONAL_POINTS = 2
+
+
+def detect(matrix, window, direction, min_scale, relative_floor, threshold):
+    """
+    Détection vectorisée sur une matrice (séries x jours), NaN = jour absent.
+
+    Pour chaque jour t >= window : base = médiane des mêmes jours de semaine
+    des semaines précédentes (si au moins MIN_SEASONAL_POINTS), sinon médiane
+    glissante des window jours précédents ; échelle = 1,4826 x MAD de la
+    fenêtre. Retourne (valeurs, base, échelle, score, masque) de forme
+    (séries x (jours - window)).
+    """
+    days = matrix.shape[1]
+    with warnings.catch_warnings():
+        # Tranches entièrement vides (séries récentes) : NaN attendus
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        windows = sliding_window_view(matrix, window, axis=1)[:, :days - window]
+        rolling = np.nanmedian(windows, axis=2)
+        mad = np.nanmedian(np.abs(windows - rolling[..., None]), axis=2)
+        history = np.sum(~np.isnan(windows), axis=2)
+        lags = np.stack(
+            [matrix[:, window - 7 * week:days - 7 * week] for week in range(1, window // 7 + 1)], axis=2
+        )
+        seasonal = np.nanmedian(lags, axis=2)
+        seasonal_points = np.sum(~np.isnan(lags), axis=2)
+
+    baseline = np.where(seasonal_points >= MIN_SEASONAL_POINTS, seasonal, rolling)
+    scale = np.fmax(MAD_SCALE * mad, np.fmax(min_scale, relative_floor * np.abs(baseline)))
+    values = matrix[:, window:]
+    score = (values - baseline) / scale
+
+    mask = ~np.isnan(score) & (history >= MIN_HISTORY)
+    if direction == 'spike':
+        mask &= score >= threshold
+    elif direction == 'drop':
+        mask &= score <= -threshold
+    else:
+        mask &= np.abs(score) >= threshold
+    return values, baseline, scale, score, mask
+
+
+class AnomalyService:
+    """
+    Détection d'anomalies sur les séries journalières installs, crashes et notes.
+
+    Une seule requête agrégée par rapport lit toutes les séries
+    (tenant, package) de la période en flux, triées ; elles sont empilées par
+    lots de ANOMALY_BATCH_SIZE dans des matrices NumPy et évaluées en bloc
+    (aucune requête ORM par package). Les anomalies des derniers
+    ANOMALY_DETECT_DAYS jours sont réécrites dans la table Anomaly.
+
+    Exécutée comme étape post-sync (tenant synchronisé) et chaque jour par
+    la tâche planifiée detect_anomalies (tous les tenants).
+    """
+
+    def window(self):
+        return getattr(settings, 'ANOMALY_WINDOW_DAYS', 28)
+
+    def detect_days(self):
+        return getattr(settings, 'ANOMALY_DETECT_DAYS', 7)
+
+    def threshold(self):
+        return getattr(settings, 'ANOMALY_THRESHOLD', 3.5)
+
+    def batch_size(self):
+        return getattr(settings, 'ANOMALY_BATCH_SIZE', 2000)
+
+    def report_type_for_table(self, table_name):
+        for report_type, spec in ANOMALY_SERIES.items():
+            if spec['model']._meta.db_table == table_name:
+                return report_type
+        return None
+
+    # ------------------------------------------------------------------
+    # Détection
+    # ------------------------------------------------------------------
+
+    def _series_batches(self, report_type, tenant_id, start, end):
+        """Lots (clés [(tenant, package)], {métrique: matrice séries x jours})."""
+        spec = ANOMALY_SERIES[report_type]
+        metrics = list(spec['metrics'])
+        qn = connection.ops.quote_name
+        table = qn(spec['model']._meta.db_table)
+        days = (end - start).days + 1
+        batch_size = self.batch_size()
+        params = {'start': start, 'end': end, 'tenant': tenant_id}
+        tenant_scope = "AND tenant_id = %(tenant)s" if tenant_id is not None else ""
+        columns = ', '.join(f"{spec['aggregate']}({qn(metric)})" for metric in metrics)
+        sql = (
+            f"SELECT tenant_id, package_name, date, {columns} "
+            f"FROM {table} WHERE date >= %(start)s AND date <= %(end)s {tenant_scope} "
+            f"GROUP BY 1, 2, 3 ORDER BY 1, 2, 3"
+        )
+
+        def empty():
+            return [], {metric: np.full((batch_size, days), np.nan) for metric in metrics}
+
+        keys, matrices = empty()
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql, params)
+            for tenant, package_name, day, *values in cursor:
+                if not keys or keys[-1] != (tenant, package_name):
+                    if len(keys) == batch_size:
+                        yield keys, matrices
+                        keys, matrices = empty()
+                    keys.append((tenant, package_name))
+                row, column = len(keys) - 1, (day - start).days
+                for metric, value in zip(metrics, values):
+                    if value is not None:
+                        matrices[metric][row, column] = float(value)
+        if keys:
+            yield keys, {metric: matrix[:len(keys)] for metric, matrix in matrices.items()}
+
+    def scan(self, report_type, tenant_id=None, end=None):
+        """Détecte les anomalies d'un rapport ; retourne le nombre d'anomalies écrites."""
+        spec = ANOMALY_SERIES[report_type]
+        qs = spec['model'].objects.all()
+        if tenant_id is not None:
+            qs = qs.filter(tenant_id=tenant_id)
+        end = end or qs.aggregate(last=Max('date'))['last']
+        if end is None:
+            return 0
+        window, detect_days, threshold = self.window(), self.detect_days(), self.threshold()
+        start = end - timedelta(days=window + detect_days - 1)
+        first_detected = end - timedelta(days=detect_days - 1)
+
+        started = time.perf_counter()
+        anomalies, series = [], 0
+        for keys, matrices in self._series_batches(report_type, tenant_id, start, end):
+            series += len(keys)
+            for metric, (direction, min_scale, relative_floor) in spec['metrics'].items():
+                values, baseline, scale, score, mask = detect(
+                    matrices[metric], window, direction, min_scale, relative_floor, threshold,
+                )
+                for row, offset in zip(*np.nonzero(mask)):
+                    tenant, package_name = keys[row]
+                    anomalies.append(Anomaly(
+                        tenant_id=tenant, report_type=report_type, package_name=package_name, metric=metric,
+                        date=first_detected + timedelta(days=int(offset)),
+                        value=float(values[row, offset]), baseline=float(baseline[row, offset]),
+                        scale=float(scale[row, offset]), score=float(score[row, offset]),
+                        direction='spike' if score[row, offset] > 0 else 'drop',
+                    ))
+
+        stale = Anomaly.objects.filter(report_type=report_type, date__gte=first_detected, date__lte=end)
+        if tenant_id is not None:
+            stale = stale.filter(tenant_id=tenant_id)
+        with transaction.atomic():
+            stale.delete()
+            Anomaly.objects.bulk_create(anomalies, batch_size=1000)
+
+        logger.info(
+            f"Anomalies {report_type}: {series} série(s), {len(anomalies)} anomalie(s) "
+            f"en {time.perf_counter() - started:.2f} s"
+        )
+        return len(anomalies)
+
+    def refresh(self, tenant_id, table_name):
+        """Étape post-sync : réévalue les séries du tenant pour le rapport alimenté."""
+        report_type = self.report_type_for_table(table_name)
+        if report_type is not None:
+            self.scan(report_type, tenant_id)
+
+    def run_all(self, tenant_id=None, report_types=None):
+        return {
+            report_type: self.scan(report_type, tenant_id)
+            for report_type in report_types or ANOMALY_SERIES
+        }
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def list_anomalies(self, tenant, package_name=None, start=None, end=None, filters=None, limit=100, offset=0):
+        filters = filters or {}
+        qs = Anomaly.objects.filter(tenant=tenant)
+        if package_name:
+            qs = qs.filter(package_name=package_name)
+        if start:
+            qs = qs.filter(date__gte=start)
+        if end:
+            qs = qs.filter(date__lte=end)
+        for field in ('report_type', 'metric', 'direction'):
+            if filters.get(field):
+                qs = qs.filter(**{field: filters[field]})
+        total = qs.count()
+        items = list(
+            qs.order_by('-date', '-score').values(
+                'id', 'report_type', 'package_name', 'metric', 'date', 'value', 'baseline', 'scale', 'score',
+                'direction', 'detected_at',
+            )[offset:offset + limit]
+        )
+        return {'total': total, 'items': items, 'limit': limit, 'offset': offset}
+
+
+anomaly_service = AnomalyService()
+
+__all__ = ["anomaly_service", "AnomalyService", "ANOMALY_SERIES", "detect"]
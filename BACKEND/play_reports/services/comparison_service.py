@@ -0,0 +1,215 @@
+import logging
+import statistics
+
+from django.db.models import Sum, Count, F
+from django.db.models.functions import TruncDate
+
+from play_reports.models import (
+    google_play_installs_overview,
+    google_play_ratings_overview,
+    google_play_crashes_overview,
+    ReviewDailySentiment,
+)
+from play_reports.services.review_sentiment_service import review_sentiment_service
+
+logger = logging.getLogger(__name__)
+
+
+def _reviews_from_source(tenant, package_name, start, end):
+    """Série des avis calculée sur google_play_reviews (période pas encore agrégée)."""
+    return {
+        row['date']: {
+            'reviews': row['review_count'],
+            'star_sum': row['rating_sum'],
+            'positive': row['positive_count'],
+            'negative': row['negative_count'],
+            'sentiment_sum': row['sentiment_sum'],
+        }
+        for row in review_sentiment_service.daily_from_reviews(tenant, package_name, start, end)
+    }
+
+
+# Séries comparées par rapport. 'sums' : agrégats additifs lus par jour ;
+# 'ratios' : métriques dérivées (numérateur, dénominateur) recalculées par
+# fenêtre pour éviter de moyenner des moyennes. 'fallback' : lecture de
+# repli quand la table ne contient aucune ligne pour les deux fenêtres.
+COMPARISON_SPECS = {
+    'installs': {
+        'model': google_play_installs_overview,
+        'date_field': 'date',
+        'sums': {
+            'installs': Sum('daily_user_installs'),
+            'uninstalls': Sum('daily_user_uninstalls'),
+        },
+        'ratios': {},
+    },
+    'ratings': {
+        'model': google_play_ratings_overview,
+        'date_field': 'date',
+        'sums': {
+            'rating_sum': Sum('daily_average_rating'),
+            'rating_count': Count('daily_average_rating'),
+        },
+        'ratios': {
+            'avg_rating': ('rating_sum', 'rating_count'),
+        },
+    },
+    'crashes': {
+        'model': google_play_crashes_overview,
+        'date_field': 'date',
+        'sums': {
+            'crashes': Sum('daily_crashes'),
+            'anrs': Sum('daily_anrs'),
+        },
+        'ratios': {},
+    },
+    # Avis : agrégats journaliers de sentiment précalculés à l'ingestion
+    'reviews': {
+        'model': ReviewDailySentiment,
+        'date_field': 'date',
+        'fallback': _reviews_from_source,
+        'sums': {
+            'reviews': Sum('review_count'),
+            'star_sum': Sum('rating_sum'),
+            'positive': Sum('positive_count'),
+            'negative': Sum('negative_count'),
+            'sentiment_sum': Sum('sentiment_sum'),
+        },
+        'ratios': {
+            'avg_rating': ('star_sum', 'reviews'),
+            'sentiment': ('sentiment_sum', 'reviews'),
+        },
+    },
+}
+
+# Variation relative en deçà de laquelle une tendance est considérée stable
+STABLE_THRESHOLD = 0.05
+
+
+class ComparisonService:
+    """
+    Compare une période à la période précédente de même durée.
+
+    Les deux fenêtres sont lues en une seule requête par rapport (séries
+    journalières sur [prev_start, end]) puis réparties par date : la
+    comparaison coûte autant qu'une lecture de la seule période courante.
+    """
+
+    def _to_float(self, value):
+        return float(value) if value is not None else None
+
+    def _daily_rows(self, spec, tenant, package_name, prev_start, end):
+        """Agrégats journaliers sur les deux fenêtres : {date: {nom: valeur}}."""
+        date_field = spec['date_field']
+        lookup = f'{date_field}__date' if spec.get('truncate') else date_field
+        qs = spec['model'].objects.filter(
+            tenant=tenant,
+            package_name=package_name,
+            **{f'{lookup}__gte': prev_start, f'{lookup}__lte': end}
+        )
+        if spec.get('truncate'):
+            qs = qs.annotate(day=TruncDate(date_field))
+        else:
+            qs = qs.annotate(day=F(date_field))
+        rows = [
+            (row['day'], row)
+            for row in qs.values('day').annotate(**spec['sums']).order_by()
+        ]
+        if not rows and spec.get('fallback'):
+            rows = list(spec['fallback'](tenant, package_name, prev_start, end).items())
+
+        return {
+            day: {name: self._to_float(row[name]) or 0.0 for name in spec['sums']}
+            for day, row in rows
+        }
+
+    def _window_series(self, daily, start, end, spec):
+        """Séries journalières (jours observés) d'une fenêtre, ratios inclus."""
+        days = sorted(d for d in daily if start <= d <= end)
+        series = {name: [daily[d][name] for d in days] for name in spec['sums']}
+        for name, (num, den) in spec['ratios'].items():
+            series[name] = [
+                daily[d][num] / daily[d][den] for d in days if daily[d][den]
+            ]
+        return series
+
+    def _window_value(self, series, name, spec):
+        if name in spec['ratios']:
+            num, den = spec['ratios'][name]
+            total_den = sum(series[den])
+            return sum(series[num]) / total_den if total_den else None
+        return sum(series[name]) if series[name] else None
+
+    def _slope(self, values):
+        """Pente des moindres carrés par jour observé."""
+        n = len(values)
+        if n < 2:
+            return None
+        mean_x = (n - 1) / 2
+        mean_y = sum(values) / n
+        var_x = sum((x - mean_x) ** 2 for x in range(n))
+        cov = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+        return cov / var_x if var_x else None
+
+    def _volatility(self, values):
+        """Coefficient de variation des valeurs journalières."""
+        if len(values) < 2:
+            return None
+        mean = statistics.fmean(values)
+        if not mean:
+            return None
+        return statistics.pstdev(values) / abs(mean)
+
+    def _metric(self, current, previous, values):
+        delta = None
+        pct_change = None
+        if current is not None and previous is not None:
+            delta = current - previous
+            if previous:
+                pct_change = delta / abs(previous)
+        return {
+            'current': current,
+            'previous': previous,
+            'delta': delta,
+            'pct_change': pct_change,
+            'slope': self._slope(values),
+            'volatility': self._volatility(values),
+        }
+
+    def compare(self, report, tenant, package_name, start, end, prev_start, prev_end):
+        """
+        Retourne, pour chaque métrique du rapport, la valeur courante et
+        précédente, le delta, la variation relative, ainsi que la pente et la
+        volatilité de la série journalière de la période courante.
+        """
+        spec = COMPARISON_SPECS[report]
+        daily = self._daily_rows(spec, tenant, package_name, prev_start, end)
+        current = self._window_series(daily, start, end, spec)
+        previous = self._window_series(daily, prev_start, prev_end, spec)
+
+        metrics = {}
+        for name in list(spec['sums']) + list(spec['ratios']):
+            metrics[name] = self._metric(
+                self._window_value(current, name, spec),
+                self._window_value(previous, name, spec),
+                current[name],
+            )
+        return metrics
+
+    def trend_label(self, metric, higher_is_better=True, labels=('improving', 'declining')):
+        """Traduit une comparaison en libellé de tendance."""
+        if metric['delta'] is None:
+            return 'insufficient_data'
+        change = metric['pct_change']
+        if change is None:
+            # Période précédente à zéro : on se base sur le signe du delta
+            change = 1 if metric['delta'] > 0 else -1 if metric['delta'] < 0 else 0
+        if abs(change) < STABLE_THRESHOLD:
+            return 'stable'
+        up = change > 0
+        return labels[0] if up == higher_is_better else labels[1]
+
+
+comparison_service = ComparisonService()
+
+__all__ = ["comparison_service", "ComparisonService", "COMPARISON_SPECS"]
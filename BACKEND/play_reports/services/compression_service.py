@@ -0,0 +1,68 @@
+import logging
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+class CompressionService:
+    """
+    Négociation et compression en flux (gzip, brotli si le module est
+    installé) des réponses streamées.
+    """
+
+    def available_encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def negotiate(self, accept_encoding):
+        """Retourne le meilleur encodage accepté par le client, ou None."""
+        accepted = {}
+        for part in (accept_encoding or '').split(','):
+            match = _ENCODING_RE.fullmatch(part)
+            if not match:
+                continue
+            name, quality = match.group(1).lower(), match.group(2)
+            try:
+                accepted[name] = float(quality) if quality is not None else 1.0
+            except ValueError:
+                continue
+
+        best, best_quality = None, 0.0
+        for encoding in self.available_encodings():
+            quality = accepted.get(encoding, accepted.get('*', 0.0))
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compressor(self, encoding, level=None):
+        if encoding == 'br':
+            return brotli.Compressor(quality=level if level is not None else 5)
+        if encoding == 'gzip':
+            # wbits=31 : en-tête et pied gzip
+            return zlib.compressobj(level if level is not None else 6, zlib.DEFLATED, 31)
+        raise ValueError(f"Encodage non supporté: {encoding}")
+
+    def compress_stream(self, chunks, encoding, level=None):
+        """Compresse un itérable de str/bytes en flux."""
+        compressor = self.compressor(encoding, level)
+        is_brotli = encoding == 'br'
+        for chunk in chunks:
+            data = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            out = compressor.process(data) if is_brotli else compressor.compress(data)
+            if out:
+                yield out
+        tail = compressor.finish() if is_brotli else compressor.flush()
+        if tail:
+            yield tail
+
+
+compression_service = CompressionService()
+
+__all__ = ["compression_service", "CompressionService"]
@@ -0,0 +1,200 @@
+import logging
+
+from django.db import connection, transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Max, Sum
+
+from play_reports.models import (
+    google_play_crashes_overview,
+    google_play_crashes_dimensioned,
+    google_play_installs_overview,
+    google_play_installs_dimensioned,
+    CrashRateDaily,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Une écriture dans l'une de ces tables réagrège les jours concernés
+CRASH_RATE_SOURCES = {
+    'google_play_crashes_overview': google_play_crashes_overview,
+    'google_play_crashes_dimensioned': google_play_crashes_dimensioned,
+    'google_play_installs_overview': google_play_installs_overview,
+    'google_play_installs_dimensioned': google_play_installs_dimensioned,
+}
+
+# Seuil « bad behavior » Android vitals : 1,09 % d'appareils actifs
+CRASH_RATE_THRESHOLD = 0.0109
+
+# Appareils actifs minimum pour classer une version (évite les versions confidentielles)
+MIN_ACTIVE_DEVICES = 100
+
+
+class CrashRateService:
+    """
+    Taux de plantage normalisés (CrashRateDaily).
+
+    Étape post-sync des rapports crashes et installs : les jours ayant reçu
+    des lignes depuis la dernière construction sont recalculés en SQL en
+    joignant, par (package, jour, version), les plantages aux appareils
+    actifs. Les panneaux lisent ensuite un taux réel (plantages pour 1000
+    appareils actifs) en une lecture indexée, sans jointure à la requête.
+    """
+
+    def _changed_days(self, tenant_id):
+        watermark = (
+            CrashRateDaily.objects.filter(tenant_id=tenant_id)
+            .aggregate(last=Max('updated_at'))['last']
+        )
+        days = set()
+        for model in CRASH_RATE_SOURCES.values():
+            qs = model.objects.filter(tenant_id=tenant_id)
+            if watermark is not None:
+                qs = qs.filter(updated_at__gt=watermark)
+            days.update(qs.values_list('date', flat=True).distinct().order_by())
+        return days
+
+    def aggregate_days(self, tenant_id, days):
+        """Recalcule les taux de plantage du tenant pour les jours donnés."""
+        days = sorted(days)
+        if not days:
+            return 0
+        qn = connection.ops.quote_name
+        tables = {name: qn(model._meta.db_table) for name, model in CRASH_RATE_SOURCES.items()}
+        rates = qn(CrashRateDaily._meta.db_table)
+        params = {'tenant': tenant_id, 'days': days}
+        scope = "tenant_id = %(tenant)s AND date = ANY(%(days)s::date[])"
+        version = "LEFT(COALESCE(app_version, ''), 100)"
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {rates} WHERE {scope}", params)
+            cursor.execute(
+                f"""
+                WITH crashes AS (
+                    SELECT package_name, date, '' AS app_version,
+                           SUM(daily_crashes) AS crashes, SUM(COALESCE(daily_anrs, 0)) AS anrs
+                    FROM {tables['google_play_crashes_overview']} WHERE {scope}
+                    GROUP BY 1, 2
+                    UNION ALL
+                    SELECT package_name, date, {version},
+                           SUM(daily_crashes), SUM(COALESCE(daily_anrs, 0))
+                    FROM {tables['google_play_crashes_dimensioned']}
+                    WHERE {scope} AND COALESCE(app_version, '') <> ''
+                    GROUP BY 1, 2, 3
+                ), devices AS (
+                    SELECT package_name, date, '' AS app_version,
+                           SUM(COALESCE(installs_on_active_devices, 0)) AS active_devices
+                    FROM {tables['google_play_installs_overview']} WHERE {scope}
+                    GROUP BY 1, 2
+                    UNION ALL
+                    SELECT package_name, date, {version},
+                           SUM(COALESCE(installs_on_active_devices, 0))
+                    FROM {tables['google_play_installs_dimensioned']}
+                    WHERE {scope} AND COALESCE(app_version, '') <> ''
+                    GROUP BY 1, 2, 3
+                )
+                INSERT INTO {rates} (tenant_id, package_name, date, app_version, crashes, anrs,
+                                     active_devices, crashes_per_1k, anrs_per_1k, updated_at)
+                SELECT %(tenant)s, c.package_name, c.date, c.app_version,
+                       GREATEST(c.crashes, 0), GREATEST(c.anrs, 0), GREATEST(COALESCE(d.active_devices, 0), 0),
+                       CASE WHEN d.active_devices > 0 THEN c.crashes * 1000.0 / d.active_devices END,
+                       CASE WHEN d.active_devices > 0 THEN c.anrs * 1000.0 / d.active_devices END,
+                       NOW()
+                FROM crashes c
+                LEFT JOIN devices d
+                  ON d.package_name = c.package_name AND d.date = c.date AND d.app_version = c.app_version
+                """,
+                params,
+            )
+            written = cursor.rowcount
+
+        logger.info(f"Taux de plantage tenant {tenant_id}: {len(days)} jour(s), {written} ligne(s)")
+        return written
+
+    def refresh(self, tenant_id, table_name):
+        """Étape post-sync : recalcule les jours modifiés (crashes ou installs)."""
+        if table_name not in CRASH_RATE_SOURCES:
+            return
+        days = self._changed_days(tenant_id)
+        if days:
+            self.aggregate_days(tenant_id, days)
+
+    def rebuild(self, tenant_id=None):
+        """Reconstruit tous les jours ayant des plantages (tous les tenants par défaut)."""
+        days = {}
+        for model in (google_play_crashes_overview, google_play_crashes_dimensioned):
+            qs = model.objects.all()
+            if tenant_id is not None:
+                qs = qs.filter(tenant_id=tenant_id)
+            for tenant, day in qs.values_list('tenant_id', 'date').distinct().order_by().iterator():
+                days.setdefault(tenant, set()).add(day)
+        return sum(self.aggregate_days(tenant, tenant_days) for tenant, tenant_days in days.items())
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def _rate(self, crashes, devices):
+        return crashes * 1000.0 / devices if devices else None
+
+    def summary(self, tenant, package_name, start, end):
+        """Taux global de la période : plantages / jours-appareils actifs."""
+        agg = CrashRateDaily.objects.filter(
+            tenant=tenant, package_name=package_name, app_version='',
+            date__gte=start, date__lte=end, active_devices__gt=0,
+        ).aggregate(crashes=Sum('crashes'), anrs=Sum('anrs'), devices=Sum('active_devices'))
+        devices = agg['devices'] or 0
+        per_1k = self._rate(agg['crashes'] or 0, devices)
+        return {
+            'crashes_per_1k': per_1k,
+            'anrs_per_1k': self._rate(agg['anrs'] or 0, devices),
+            'crash_rate': per_1k / 1000 if per_1k is not None else None,
+            'active_device_days': devices,
+        }
+
+    def worst_versions(self, tenant, package_name, start, end, limit=5, min_devices=MIN_ACTIVE_DEVICES):
+        """Versions au taux le plus élevé sur la période (appareils actifs suffisants)."""
+        rows = (
+            CrashRateDaily.objects.filter(
+                tenant=tenant, package_name=package_name, date__gte=start, date__lte=end,
+            ).exclude(app_version='')
+            .values('app_version')
+            .annotate(total_crashes=Sum('crashes'), device_days=Sum('active_devices'))
+            .filter(device_days__gte=min_devices)
+            .annotate(crashes_per_1k_devices=ExpressionWrapper(
+                F('total_crashes') * 1000.0 / F('device_days'), output_field=FloatField()
+            ))
+            .order_by('-crashes_per_1k_devices')[:limit]
+        )
+        return list(rows)
+
+    def panel(self, tenant, package_name, start, end, limit=5, min_devices=MIN_ACTIVE_DEVICES):
+        """Taux global, tendance journalière et pires versions."""
+        trend = [
+            {
+                'date': str(row['date']),
+                'crashes': row['crashes'],
+                'active_devices': row['active_devices'],
+                'crashes_per_1k': row['crashes_per_1k'],
+            }
+            for row in CrashRateDaily.objects.filter(
+                tenant=tenant, package_name=package_name, app_version='', date__gte=start, date__lte=end,
+            ).order_by('date').values('date', 'crashes', 'active_devices', 'crashes_per_1k')
+        ]
+        summary = self.summary(tenant, package_name, start, end)
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'totals': {
+                **summary,
+                'above_threshold': summary['crash_rate'] > CRASH_RATE_THRESHOLD if summary['crash_rate'] is not None else None,
+            },
+            'threshold': CRASH_RATE_THRESHOLD,
+            'trend': trend,
+            'worst_versions': self.worst_versions(tenant, package_name, start, end, limit, min_devices),
+        }
+
+
+crash_rate_service = CrashRateService()
+
+__all__ = ["crash_rate_service", "CrashRateService", "CRASH_RATE_THRESHOLD"]
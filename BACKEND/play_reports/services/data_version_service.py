@@ -0,0 +1,54 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from play_reports.models import DataVersion
+
+logger = logging.getLogger(__name__)
+
+
+class DataVersionService:
+    """
+    Versions des données par (tenant, table) : incrémentées en fin de
+    synchronisation, elles identifient l'état des données servies (ETag,
+    clés de cache).
+    """
+
+    def bump(self, tenant_id, table_name):
+        """
+        Incrémente la version d'une table (étape post-synchronisation).
+        update() ne déclenche pas auto_now : updated_at est renseigné explicitement.
+        """
+        table_name = (table_name or '').lower()
+        with transaction.atomic():
+            updated = DataVersion.objects.filter(
+                tenant_id=tenant_id, table_name=table_name
+            ).update(version=F('version') + 1, updated_at=timezone.now())
+            if not updated:
+                version, created = DataVersion.objects.get_or_create(
+                    tenant_id=tenant_id, table_name=table_name, defaults={'version': 1}
+                )
+                if not created:
+                    DataVersion.objects.filter(pk=version.pk).update(
+                        version=F('version') + 1, updated_at=timezone.now()
+                    )
+        logger.debug("data_version: bump tenant_id=%s table=%s", tenant_id, table_name)
+
+    def current(self, table_name, tenant_id=None):
+        """
+        Retourne la version courante d'une table sous forme de chaîne.
+        Sans tenant, la version agrège tous les tenants.
+        """
+        qs = DataVersion.objects.filter(table_name=(table_name or '').lower())
+        if tenant_id is not None:
+            qs = qs.filter(tenant_id=tenant_id)
+        agg = qs.aggregate(version=Sum('version'), updated_at=Max('updated_at'))
+        updated_at = agg['updated_at'].timestamp() if agg['updated_at'] else 0
+        return f"{agg['version'] or 0}-{int(updated_at)}"
+
+
+data_version_service = DataVersionService()
+
+__all__ = ["data_version_service", "DataVersionService"]
@@ -0,0 +1,252 @@
+import logging
+import time
+
+from django.apps import apps
+from django.db import connection, transaction
+
+from play_reports.models import DimensionValue
+
+logger = logging.getLogger(__name__)
+
+
+# Dimensions exposées par type d'analyse : clé d'option -> colonne de la table de faits.
+# 'package_field' vaut None pour les rapports sans package (filtrage non applicable).
+DIMENSION_CATALOG = {
+    'installs': {
+        'model': 'google_play_installs_overview',
+        'package_field': 'package_name',
+        'dimensions': {
+            'countries': 'country',
+            'app_versions': 'app_version',
+            'devices': 'device',
+            'os_versions': 'os_version',
+        },
+    },
+    'subscriptions': {
+        'model': 'google_play_subscriptions_overview',
+        'package_field': 'package_name',
+        'dimensions': {
+            'countries': 'country',
+            'product_ids': 'product_id',
+            'base_plan_ids': 'base_plan_id',
+            'offer_ids': 'offer_id',
+        },
+    },
+    'revenue': {
+        'model': 'google_play_earnings',
+        'package_field': None,
+        'dimensions': {
+            'buyer_countries': 'buyer_country',
+            'currencies': 'merchant_currency',
+        },
+    },
+    'crashes': {
+        'model': 'google_play_crashes_overview',
+        'package_field': 'package_name',
+        'dimensions': {
+            'app_versions': 'app_version',
+            'devices': 'device',
+            'os_versions': 'os_version',
+            'android_os_versions': 'android_os_version',
+        },
+    },
+    'ratings': {
+        'model': 'google_play_ratings_overview',
+        'package_field': 'package_name',
+        'dimensions': {
+            'devices': 'device',
+        },
+    },
+    'reviews': {
+        'model': 'google_play_reviews',
+        'package_field': 'package_name',
+        'dimensions': {
+            'devices': 'device',
+            'languages': 'reviewer_language',
+        },
+    },
+    'store_performance': {
+        'model': 'google_play_store_performance_overview',
+        'package_field': 'package_name',
+        'dimensions': {
+            'countries': 'country',
+            'traffic_sources': 'traffic_source',
+            # search_terms : longue traîne non bornée, servie par SearchTermSketch
+            'utm_sources': 'utm_source',
+            'utm_campaigns': 'utm_campaign',
+        },
+    },
+    'cancellations': {
+        'model': 'google_play_subscription_cancellation_reasons',
+        'package_field': 'package_name',
+        'dimensions': {
+            'countries': 'country',
+            'cancellation_reasons': 'cancellation_reason',
+            'cancellation_sub_reasons': 'cancellation_sub_reason',
+            'subscription_ids': 'subscription_id',
+            'sku_ids': 'sku_id',
+        },
+    },
+    'buyers7d': {
+        'model': 'google_play_buyers_7d_overview',
+        'package_field': 'package_name',
+        'dimensions': {
+            'countries': 'country',
+            'acquisition_channels': 'acquisition_channel',
+        },
+    },
+}
+
+# Longueur maximale d'une valeur stockée dans le dictionnaire
+MAX_VALUE_LENGTH = 255
+
+
+class DimensionDictionaryService:
+    """
+    Maintient le dictionnaire des valeurs de dimensions (DimensionValue).
+
+    Le dictionnaire est reconstruit table par table à la fin d'une
+    synchronisation, à partir d'un seul parcours de la table de faits, ce qui
+    permet de servir les options de filtres via une lecture indexée au lieu
+    de plusieurs DISTINCT sur les tables complètes.
+    """
+
+    def analysis_types_for_model(self, model_name):
+        """Retourne les types d'analyse alimentés par un modèle donné."""
+        model_name = (model_name or '').lower()
+        return [
+            analysis_type for analysis_type, entry in DIMENSION_CATALOG.items()
+            if entry['model'].lower() == model_name
+        ]
+
+    def get_options(self, tenant, analysis_type, package_name=None):
+        """
+        Lit les options depuis le dictionnaire.
+
+        Retourne None si le dictionnaire ne contient aucune valeur pour ce
+        périmètre, par exemple avant la première reconstruction (l'appelant se
+        rabat alors sur scan_options).
+        """
+        entry = DIMENSION_CATALOG.get(analysis_type)
+        if not entry:
+            return None
+
+        qs = DimensionValue.objects.filter(tenant=tenant, report_type=analysis_type, row_count__gt=0)
+        if package_name and entry['package_field']:
+            qs = qs.filter(package_name=package_name)
+
+        rows = list(
+            qs.values_list('dimension', 'value')
+              .distinct()
+              .order_by('dimension', 'value')
+        )
+        if not rows:
+            return None
+
+        column_to_key = {column: key for key, column in entry['dimensions'].items()}
+        data = {key: [] for key in entry['dimensions']}
+        for dimension, value in rows:
+            key = column_to_key.get(dimension)
+            if key:
+                data[key].append(value)
+        return data
+
+    def scan_options(self, tenant, analysis_type, package_name=None):
+        """Calcule les options directement sur la table de faits (DISTINCT par dimension)."""
+        entry = DIMENSION_CATALOG.get(analysis_type)
+        if not entry:
+            return None
+
+        model = apps.get_model('play_reports', entry['model'])
+        qs = model.objects.filter(tenant=tenant)
+        if package_name and entry['package_field']:
+            qs = qs.filter(**{entry['package_field']: package_name})
+
+        return {
+            key: [v for v in qs.values_list(column, flat=True).distinct().order_by(column) if v]
+            for key, column in entry['dimensions'].items()
+        }
+
+    def refresh(self, tenant_id, model_name):
+        """
+        Reconstruit les entrées du dictionnaire alimentées par `model_name`
+        pour un tenant. Retourne le nombre de valeurs distinctes enregistrées.
+        """
+        total = 0
+        for analysis_type in self.analysis_types_for_model(model_name):
+            total += self.refresh_analysis_type(tenant_id, analysis_type)
+        return total
+
+    def refresh_all(self, tenant_id):
+        """Reconstruit l'ensemble du dictionnaire pour un tenant."""
+        return sum(
+            self.refresh_analysis_type(tenant_id, analysis_type)
+            for analysis_type in DIMENSION_CATALOG
+        )
+
+    def refresh_analysis_type(self, tenant_id, analysis_type):
+        entry = DIMENSION_CATALOG[analysis_type]
+        model = apps.get_model('play_reports', entry['model'])
+        table = model._meta.db_table
+        qn = connection.ops.quote_name
+
+        package_expr = f"t.{qn(entry['package_field'])}" if entry['package_field'] else "''"
+        unpivot = ", ".join(
+            f"('{column}', t.{qn(column)}::text)" for column in entry['dimensions'].values()
+        )
+        # Un seul parcours de la table : les colonnes de dimension sont
+        # dépivotées en (dimension, valeur) puis comptées.
+        sql = f"""
+            SELECT COALESCE({package_expr}, '') AS package_name,
+                   d.dimension,
+                   LEFT(d.value, {MAX_VALUE_LENGTH}) AS value,
+                   COUNT(*) AS row_count
+            FROM {qn(table)} t
+            CROSS JOIN LATERAL (VALUES {unpivot}) AS d(dimension, value)
+            WHERE t.tenant_id = %s
+              AND d.value IS NOT NULL
+              AND d.value <> ''
+            GROUP BY 1, 2, 3
+        """
+
+        started = time.monotonic()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [tenant_id])
+            rows = cursor.fetchall()
+
+        objects = [
+            DimensionValue(
+                tenant_id=tenant_id,
+                package_name=package,
+                report_type=analysis_type,
+                dimension=dimension,
+                value=value,
+                row_count=row_count,
+            )
+            for package, dimension, value, row_count in rows
+        ]
+
+        with transaction.atomic():
+            # Les valeurs disparues sont conservées à 0 pour garder des
+            # identifiants stables (clés de substitution).
+            DimensionValue.objects.filter(
+                tenant_id=tenant_id, report_type=analysis_type
+            ).update(row_count=0)
+            DimensionValue.objects.bulk_create(
+                objects,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['tenant', 'report_type', 'package_name', 'dimension', 'value'],
+                update_fields=['row_count', 'updated_at'],
+            )
+
+        logger.info(
+            "dimension_dictionary: tenant_id=%s type=%s values=%s duration_ms=%.1f",
+            tenant_id, analysis_type, len(objects), (time.monotonic() - started) * 1000
+        )
+        return len(objects)
+
+
+dimension_dictionary_service = DimensionDictionaryService()
+
+__all__ = ["dimension_dictionary_service", "DimensionDictionaryService", "DIMENSION_CATALOG"]
@@ -0,0 +1,379 @@
+import logging
+import re
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+
+# Tables éligibles et colonnes de dimension encodables (celles présentes dans
+# le modèle sont encodées)
+ENCODABLE_TABLES = (
+    'google_play_installs_overview',
+    'google_play_installs_dimensioned',
+    'google_play_crashes_overview',
+    'google_play_crashes_dimensioned',
+    'google_play_ratings_overview',
+    'google_play_ratings_dimensioned',
+)
+ENCODABLE_DIMENSIONS = (
+    'device', 'carrier', 'os_version', 'android_os_version',
+    'app_version', 'country', 'language',
+)
+
+FACTS_SUFFIX = '_facts'
+
+
+class DimensionEncodingService:
+    """
+    Stockage des dimensions par dictionnaire (option par table).
+
+    Une table encodée est scindée en :
+      - `<table>_facts` : la table de faits, où chaque colonne de dimension
+        est remplacée par `<dimension>_key` (entier, DimensionKey.id) ; les
+        contraintes d'unicité et index portent sur ces clés ;
+      - `<table>` : une vue qui rejoint le dictionnaire et expose la forme
+        d'origine (lectures ORM, insights, connecteur inchangés). Une règle
+        reporte les DELETE de la vue sur `<table>_facts` (suppression d'un
+        tenant en cascade, purges par l'ORM).
+
+    L'ingestion écrit directement dans `<table>_facts` via `bulk_insert`, qui
+    résout les clés par un cache mémoire (une requête par lot pour les
+    valeurs inconnues). Une clé n'entre dans le cache qu'une fois sa
+    transaction validée, et `<dimension>_key` référence dimension_key.
+
+    La forme de stockage n'est pas mise en cache : encode/decode peuvent
+    être lancés depuis un autre processus (commande dimension_encoding), elle
+    est donc relue dans le catalogue à chaque lot.
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache_size(self):
+        return getattr(settings, 'DIMENSION_KEY_CACHE_SIZE', 200000)
+
+    def _qn(self, name):
+        return connection.ops.quote_name(name)
+
+    def model_for_table(self, table):
+        for model in apps.get_app_config('play_reports').get_models():
+            if model._meta.db_table == table:
+                return model
+        raise ValueError(f"Aucun modèle pour la table {table}")
+
+    def dimensions(self, model):
+        return [
+            field for field in model._meta.concrete_fields if field.name in ENCODABLE_DIMENSIONS
+        ]
+
+    # ------------------------------------------------------------------
+    # Table physique
+    # ------------------------------------------------------------------
+
+    def storage_table(self, table):
+        """Table physique d'une table de rapport : `<table>_facts` si encodée."""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [table + FACTS_SUFFIX])
+            encoded = cursor.fetchone()[0]
+        return table + FACTS_SUFFIX if encoded else table
+
+    def is_encoded(self, table):
+        return self.storage_table(table) != table
+
+    def invalidate(self):
+        with self._lock:
+            self._keys = {}
+
+    def _remember(self, resolved):
+        with self._lock:
+            if len(self._keys) + len(resolved) > self.cache_size:
+                self._keys = {}
+            self._keys.update(resolved)
+
+    # ------------------------------------------------------------------
+    # Dictionnaire
+    # ------------------------------------------------------------------
+
+    def resolve_keys(self, pairs):
+        """
+        Retourne {(dimension, valeur): id} pour les paires demandées. Les
+        valeurs absentes du cache sont créées puis relues en une requête.
+        """
+        keys = {}
+        missing = []
+        for pair in pairs:
+            key = self._keys.get(pair)
+            if key is None:
+                missing.append(pair)
+            else:
+                keys[pair] = key
+        if not missing:
+            return keys
+
+        dimensions = [dimension for dimension, _ in missing]
+        values = [value for _, value in missing]
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO dimension_key (dimension, value)
+                SELECT * FROM unnest(%s::text[], %s::text[])
+                ON CONFLICT (dimension, value) DO NOTHING
+            """, [dimensions, values])
+            cursor.execute("""
+                SELECT k.id, k.dimension, k.value
+                FROM dimension_key k
+                JOIN unnest(%s::text[], %s::text[]) AS m(dimension, value)
+                  ON k.dimension = m.dimension AND k.value = m.value
+            """, [dimensions, values])
+            resolved = {(dimension, value): key_id for key_id, dimension, value in cursor.fetchall()}
+
+        # Une clé insérée dans une transaction annulée n'existerait plus :
+        # elle n'est mise en cache qu'au commit (immédiatement hors transaction)
+        transaction.on_commit(lambda: self._remember(resolved))
+        keys.update(resolved)
+        return keys
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def bulk_insert(self, model, objects, ignore_conflicts=False, batch_size=1000):
+        """
+        Insère des instances non sauvegardées : bulk_create pour une table
+        classique, INSERT direct dans `<table>_facts` (clés résolues) pour une
+        table encodée. Retourne le nombre d'objets traités.
+        """
+        table = model._meta.db_table
+        if not self.is_encoded(table):
+            model.objects.bulk_create(objects, batch_size=batch_size, ignore_conflicts=ignore_conflicts)
+            return len(objects)
+
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        dimension_names = {field.name for field in self.dimensions(model)}
+        positions = [index for index, field in enumerate(fields) if field.name in dimension_names]
+        rows = []
+        pairs = set()
+        for obj in objects:
+            row = []
+            for field in fields:
+                value = field.pre_save(obj, True)
+                if field.name in dimension_names:
+                    value = None if value is None else str(value)
+                    if value is not None:
+                        pairs.add((field.name, value))
+                    row.append(value)
+                else:
+                    row.append(field.get_db_prep_save(value, connection))
+            rows.append(row)
+
+        # Chaînes remplacées par leurs clés
+        keys = self.resolve_keys(pairs)
+        for row in rows:
+            for index in positions:
+                if row[index] is not None:
+                    row[index] = keys[(fields[index].name, row[index])]
+
+        qn = self._qn
+        columns = ', '.join(
+            qn(f"{field.column}_key") if field.name in dimension_names else qn(field.column)
+            for field in fields
+        )
+        conflict = ' ON CONFLICT DO NOTHING' if ignore_conflicts else ''
+        sql = f"INSERT INTO {qn(table + FACTS_SUFFIX)} ({columns}) VALUES %s{conflict}"
+        with connection.cursor() as cursor:
+            execute_values(cursor.cursor, sql, rows, page_size=batch_size)
+        return len(objects)
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+
+    def _rewrite_columns(self, definition, mapping):
+        """Remplace les noms de colonnes d'une définition d'index ou de contrainte."""
+        for source, target in mapping.items():
+            definition = re.sub(rf'(?<![\w"])"?{source}"?(?![\w"])', target, definition)
+        return definition
+
+    def _dependent_definitions(self, cursor, table, columns):
+        """Contraintes d'unicité et index (hors clé primaire) portant sur des colonnes données."""
+        cursor.execute("""
+            SELECT c.conname, pg_get_constraintdef(c.oid)
+            FROM pg_constraint c
+            WHERE c.conrelid = %s::regclass AND c.contype = 'u'
+              AND EXISTS (
+                  SELECT 1 FROM pg_attribute a
+                  WHERE a.attrelid = c.conrelid AND a.attnum = ANY (c.conkey) AND a.attname = ANY (%s)
+              )
+        """, [table, columns])
+        constraints = cursor.fetchall()
+        cursor.execute("""
+            SELECT ic.relname, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            JOIN pg_class ic ON ic.oid = i.indexrelid
+            WHERE i.indrelid = %s::regclass
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+              AND EXISTS (
+                  SELECT 1 FROM pg_attribute a
+                  WHERE a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey) AND a.attname = ANY (%s)
+              )
+        """, [table, columns])
+        indexes = cursor.fetchall()
+        return constraints, indexes
+
+    def _view_sql(self, model, table):
+        qn = self._qn
+        dimension_names = {field.name for field in self.dimensions(model)}
+        select = []
+        joins = []
+        for field in model._meta.concrete_fields:
+            if field.name in dimension_names:
+                alias = qn(f"k_{field.column}")
+                select.append(f"{alias}.value AS {qn(field.column)}")
+                joins.append(
+                    f"LEFT JOIN dimension_key {alias} ON {alias}.id = f.{qn(field.column + '_key')}"
+                )
+            else:
+                select.append(f"f.{qn(field.column)}")
+        return (
+            f"CREATE VIEW {qn(table)} AS SELECT {', '.join(select)} "
+            f"FROM {qn(table + FACTS_SUFFIX)} f {' '.join(joins)}"
+        )
+
+    def _delete_rule_sql(self, table):
+        """Une vue avec jointures n'accepte pas DELETE : suppression reportée sur les faits."""
+        qn = self._qn
+        return (
+            f"CREATE RULE {qn(table + '_delete')} AS ON DELETE TO {qn(table)} "
+            f"DO INSTEAD DELETE FROM {qn(table + FACTS_SUFFIX)} WHERE id = OLD.id"
+        )
+
+    def encode(self, table):
+        """
+        Convertit une table en stockage encodé (transaction unique) : ajout et
+        remplissage des colonnes `<dimension>_key`, suppression des chaînes,
+        recréation des contraintes et index sur les clés, renommage en
+        `<table>_facts` et création de la vue (et de sa règle de suppression).
+        """
+        if table not in ENCODABLE_TABLES:
+            raise ValueError(f"Table non encodable: {table}")
+        if self.is_encoded(table):
+            return False
+
+        model = self.model_for_table(table)
+        columns = [field.column for field in self.dimensions(model)]
+        mapping = {column: self._qn(f"{column}_key") for column in columns}
+        qn = self._qn
+        with transaction.atomic(), connection.cursor() as cursor:
+            constraints, indexes = self._dependent_definitions(cursor, table, columns)
+            cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+
+            cursor.execute(
+                "INSERT INTO dimension_key (dimension, value) "
+                + " UNION ".join(
+                    f"SELECT DISTINCT %s::text, {qn(column)} FROM {qn(table)} WHERE {qn(column)} IS NOT NULL"
+                    for column in columns
+                )
+                + " ON CONFLICT (dimension, value) DO NOTHING",
+                [field.name for field in self.dimensions(model)]
+            )
+            for column in columns:
+                cursor.execute(f"ALTER TABLE {qn(table)} ADD COLUMN {qn(column + '_key')} integer")
+            cursor.execute(
+                f"UPDATE {qn(table)} t SET "
+                + ", ".join(
+                    f"{qn(column + '_key')} = (SELECT k.id FROM dimension_key k "
+                    f"WHERE k.dimension = %s AND k.value = t.{qn(column)})"
+                    for column in columns
+                ),
+                [field.name for field in self.dimensions(model)]
+            )
+            # La suppression des colonnes emporte les contraintes et index qui les utilisent
+            for column in columns:
+                cursor.execute(f"ALTER TABLE {qn(table)} DROP COLUMN {qn(column)}")
+            for name, definition in constraints:
+                cursor.execute(
+                    f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} "
+                    f"{self._rewrite_columns(definition, mapping)}"
+                )
+            for name, definition in indexes:
+                cursor.execute(self._rewrite_columns(definition, mapping))
+            # Supprimées avec les colonnes de clés lors du décodage
+            for column in columns:
+                cursor.execute(
+                    f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f'{table}_{column}_key_fk')} "
+                    f"FOREIGN KEY ({qn(column + '_key')}) REFERENCES dimension_key (id)"
+                )
+
+            cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(table + FACTS_SUFFIX)}")
+            cursor.execute(self._view_sql(model, table))
+            cursor.execute(self._delete_rule_sql(table))
+
+        self.invalidate()
+        logger.info("dimension_encoding: %s encodée (%s)", table, ', '.join(columns))
+        return True
+
+    def decode(self, table):
+        """Retour au stockage d'origine (chaînes dans la table de faits)."""
+        if not self.is_encoded(table):
+            return False
+
+        model = self.model_for_table(table)
+        dimension_fields = self.dimensions(model)
+        key_columns = [f"{field.column}_key" for field in dimension_fields]
+        mapping = {f"{field.column}_key": self._qn(field.column) for field in dimension_fields}
+        qn = self._qn
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DROP VIEW {qn(table)}")
+            cursor.execute(f"ALTER TABLE {qn(table + FACTS_SUFFIX)} RENAME TO {qn(table)}")
+            constraints, indexes = self._dependent_definitions(cursor, table, key_columns)
+
+            for field in dimension_fields:
+                cursor.execute(
+                    f"ALTER TABLE {qn(table)} ADD COLUMN {qn(field.column)} {field.db_type(connection)}"
+                )
+            cursor.execute(
+                f"UPDATE {qn(table)} t SET "
+                + ", ".join(
+                    f"{qn(field.column)} = (SELECT k.value FROM dimension_key k "
+                    f"WHERE k.id = t.{qn(field.column + '_key')})"
+                    for field in dimension_fields
+                )
+            )
+            for field in dimension_fields:
+                if not field.null:
+                    cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN {qn(field.column)} SET NOT NULL")
+                cursor.execute(f"ALTER TABLE {qn(table)} DROP COLUMN {qn(field.column + '_key')}")
+            for name, definition in constraints:
+                cursor.execute(
+                    f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} "
+                    f"{self._rewrite_columns(definition, mapping)}"
+                )
+            for name, definition in indexes:
+                cursor.execute(self._rewrite_columns(definition, mapping))
+
+        self.invalidate()
+        logger.info("dimension_encoding: %s décodée", table)
+        return True
+
+    def size(self, table):
+        """Taille totale (partitions et index compris) de la table physique."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COALESCE(SUM(pg_total_relation_size(relid)), 0) FROM pg_partition_tree(%s::regclass)",
+                [self.storage_table(table)]
+            )
+            return cursor.fetchone()[0]
+
+
+dimension_encoding_service = DimensionEncodingService()
+
+__all__ = [
+    "dimension_encoding_service", "DimensionEncodingService",
+    "ENCODABLE_TABLES", "ENCODABLE_DIMENSIONS",
+]
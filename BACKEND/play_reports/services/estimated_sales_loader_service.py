@@ -0,0 +1,257 @@
+import csv
+import io
+import logging
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, models, transaction
+from django.utils.dateparse import parse_date
+
+from play_reports.models import google_play_estimatedSales
+
+logger = logging.getLogger(__name__)
+
+
+# En-têtes du rapport (normalisés) dont le nom diffère du champ du modèle
+COLUMN_ALIASES = {
+    'postal_code_of_buyer': 'postcode_of_buyer',
+    'buyer_postal_code': 'postcode_of_buyer',
+    'order_charged_date_time': 'order_charged_date',
+    'sku_id_': 'sku_id',
+}
+
+# Clé de déduplication (contrainte d'unicité du modèle, hors tenant)
+ORDER_KEY = ('order_number', 'order_charged_date')
+
+STAGING_TABLE = 'estimated_sales_staging'
+
+# Une commande débitée puis remboursée apparaît sur deux lignes de même clé
+# et de même horodatage : le statut retenu est le premier de cette liste
+# présent dans financial_status (puis l'ordre alphabétique)
+STATUS_PRECEDENCE = ('chargeback', 'refund', 'cancel')
+
+# Marqueur NULL du COPY : absent des colonnes texte, dont les valeurs vides
+# doivent rester des chaînes vides (champs NOT NULL)
+COPY_NULL = '\\N'
+
+
+class _CopyStream:
+    """Fichier en lecture seule alimenté par un générateur de lignes CSV (COPY FROM STDIN)."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+class EstimatedSalesLoaderService:
+    """
+    Chargement en flux des rapports de ventes estimées (salesreport_YYYYMM).
+
+    Le CSV est lu ligne à ligne, converti puis envoyé par COPY dans une table
+    temporaire : la mémoire reste constante quelle que soit la taille du
+    fichier. La déduplication est ensembliste : les commandes absentes de la
+    table (anti-jointure sur tenant, order_number, order_charged_date) sont
+    insérées en une requête, et le statut financier des commandes déjà
+    chargées est mis à jour en une autre (remboursements).
+    """
+
+    def __init__(self):
+        self._fields = None
+
+    def normalize(self, column):
+        name = re.sub(r'[^a-z0-9]+', '_', (column or '').lower()).strip('_')
+        return COLUMN_ALIASES.get(name, name)
+
+    def fields(self):
+        """Champs chargés (hors id, tenant, horodatages), dans l'ordre du COPY."""
+        if self._fields is None:
+            self._fields = [
+                field for field in google_play_estimatedSales._meta.concrete_fields
+                if not field.primary_key and field.name not in ('tenant', 'created_at', 'updated_at')
+            ]
+        return self._fields
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+
+    def _to_date(self, value):
+        parsed = parse_date(value[:10]) if len(value) >= 10 else None
+        if parsed:
+            return parsed.isoformat()
+        for fmt in ('%b %d, %Y', '%m/%d/%Y', '%Y%m%d'):
+            try:
+                return datetime.strptime(value, fmt).date().isoformat()
+            except ValueError:
+                pass
+        return None
+
+    def convert(self, field, value):
+        """
+        Valeur CSV -> texte COPY. Seule une date absente ou illisible donne
+        None (écrit COPY_NULL) ; les nombres vides valent 0 et les textes
+        vides restent des chaînes vides.
+        """
+        value = (value or '').strip()
+        if isinstance(field, models.DateField):
+            return self._to_date(value) if value else None
+        if isinstance(field, models.DecimalField):
+            try:
+                number = Decimal(value.replace(',', '')) if value else Decimal(0)
+            except InvalidOperation:
+                number = Decimal(0)
+            return str(number.quantize(Decimal(1).scaleb(-field.decimal_places)))
+        if isinstance(field, (models.IntegerField, models.BigIntegerField)):
+            try:
+                return str(int(float(value.replace(',', '')))) if value else '0'
+            except ValueError:
+                return '0'
+        return value[:field.max_length] if field.max_length else value
+
+    def iter_copy_lines(self, handle):
+        """Lignes CSV converties, produites au fil de la lecture."""
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        if not header:
+            return
+        positions = {self.normalize(name): index for index, name in enumerate(header)}
+        columns = [(field, positions.get(field.name)) for field in self.fields()]
+        missing = [name for name in ORDER_KEY if positions.get(name) is None]
+        if missing:
+            raise ValueError(f"Colonnes obligatoires absentes du rapport: {', '.join(missing)}")
+
+        names = [field.name for field in self.fields()]
+        key_positions = [names.index(name) for name in ORDER_KEY]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        skipped = 0
+        for row in reader:
+            values = [
+                self.convert(field, row[index] if index is not None and index < len(row) else '')
+                for field, index in columns
+            ]
+            if not all(values[position] for position in key_positions):
+                skipped += 1
+                continue
+            writer.writerow([COPY_NULL if value is None else value for value in values])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if skipped:
+            logger.warning(f"Ventes estimées: {skipped} ligne(s) sans commande ou date ignorée(s)")
+
+    # ------------------------------------------------------------------
+    # Chargement
+    # ------------------------------------------------------------------
+
+    def _latest_order(self, alias):
+        """ORDER BY du DISTINCT ON : ligne la plus récente, puis statut final prioritaire."""
+        qn = connection.ops.quote_name
+        status = f"{alias}.{qn('financial_status')}"
+        rank = ' '.join(
+            f"WHEN strpos(lower({status}), '{keyword}') > 0 THEN {position}"
+            for position, keyword in enumerate(STATUS_PRECEDENCE)
+        )
+        return (
+            f"{alias}.{qn('order_charged_timestamp')} DESC, "
+            f"CASE {rank} ELSE {len(STATUS_PRECEDENCE)} END, {status}"
+        )
+
+    def load_file(self, path, tenant_id, encoding='utf-8-sig'):
+        """Charge un CSV de ventes estimées ; retourne (lignes lues, insérées, mises à jour)."""
+        with open(path, 'r', encoding=encoding, errors='ignore', newline='') as handle:
+            return self.load_stream(handle, tenant_id)
+
+    def load_stream(self, handle, tenant_id):
+        qn = connection.ops.quote_name
+        target = qn(google_play_estimatedSales._meta.db_table)
+        staging = qn(STAGING_TABLE)
+        columns = [qn(field.column) for field in self.fields()]
+        column_list = ', '.join(columns)
+        key_join = ' AND '.join(f"t.{qn(name)} = s.{qn(name)}" for name in ORDER_KEY)
+        key_list = ', '.join(f"s.{qn(name)}" for name in ORDER_KEY)
+        latest = self._latest_order('s')
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS"
+                f" SELECT {column_list} FROM {target} WITH NO DATA"
+            )
+            cursor.copy_expert(
+                f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                _CopyStream(self.iter_copy_lines(handle)),
+            )
+            cursor.execute(f"SELECT COUNT(*) FROM {staging}")
+            staged = cursor.fetchone()[0]
+            cursor.execute(f"ANALYZE {staging}")
+
+            # Nouvelles commandes : anti-jointure, une ligne par clé (la plus
+            # récente ; à horodatage égal, le remboursement)
+            cursor.execute(
+                f"""
+                INSERT INTO {target} ({column_list}, {qn('tenant_id')}, {qn('created_at')}, {qn('updated_at')})
+                SELECT DISTINCT ON ({key_list}) {', '.join(f's.{c}' for c in columns)}, %s, NOW(), NOW()
+                FROM {staging} s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {target} t WHERE t.{qn('tenant_id')} = %s AND {key_join}
+                )
+                ORDER BY {key_list}, {latest}
+                ON CONFLICT DO NOTHING
+                """,
+                [tenant_id, tenant_id],
+            )
+            inserted = cursor.rowcount
+
+            # Commandes connues dont le statut a changé (remboursement, annulation)
+            cursor.execute(
+                f"""
+                UPDATE {target} t
+                SET {qn('financial_status')} = s.{qn('financial_status')}, {qn('updated_at')} = NOW()
+                FROM (
+                    SELECT DISTINCT ON ({key_list}) s.*
+                    FROM {staging} s
+                    ORDER BY {key_list}, {latest}
+                ) s
+                WHERE t.{qn('tenant_id')} = %s AND {key_join}
+                  AND t.{qn('financial_status')} IS DISTINCT FROM s.{qn('financial_status')}
+                """,
+                [tenant_id],
+            )
+            updated = cursor.rowcount
+
+            # ON COMMIT DROP ne s'applique qu'au commit de la transaction
+            # englobante : la table est supprimée pour permettre un autre
+            # chargement dans la même transaction
+            cursor.execute(f"DROP TABLE {staging}")
+
+        logger.info(
+            f"Ventes estimées tenant {tenant_id}: {staged} lignes lues, "
+            f"{inserted} nouvelles commandes, {updated} statuts mis à jour"
+        )
+        return staged, inserted, updated
+
+    def load_report(self, path, tenant_id, report_info):
+        """Point d'entrée ProcessBucketService : (table, insérés, mis à jour)."""
+        _, inserted, updated = self.load_file(path, tenant_id)
+        return report_info['preferredTableName'], inserted, updated
+
+
+estimated_sales_loader_service = EstimatedSalesLoaderService()
+
+__all__ = ["estimated_sales_loader_service", "EstimatedSalesLoaderService"]
@@ -0,0 +1,236 @@
+import csv
+import io
+import logging
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from play_reports.models import ExportJob
+from play_reports.services.looker_query_builder import looker_query_builder, LookerQueryError
+from play_reports.services.report_service import get_model_for_report
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # dépendance optionnelle (format parquet)
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+
+class ExportError(ValueError):
+    """Paramètres d'export invalides ou format indisponible."""
+
+
+class _ChunkSink:
+    """Fichier en écriture seule dont le contenu est vidé au fil de l'eau."""
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._buffer.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+class ExportService:
+    """
+    Export en masse des tables de rapports d'un tenant.
+
+    Les requêtes sont produites par le LookerQueryBuilder (tenant obligatoire,
+    champs validés) et lues par lots sur un curseur serveur : le CSV et le
+    Parquet sont générés en flux, sans charger la période en mémoire. Les
+    exports asynchrones (ExportJob) écrivent le CSV via COPY TO STDOUT.
+    """
+
+    @property
+    def fetch_size(self):
+        return getattr(settings, 'EXPORT_FETCH_SIZE', 5000)
+
+    def parquet_available(self):
+        return pq is not None
+
+    def prepare(self, report_type, tenant_id, start_date=None, end_date=None,
+                package_name=None, fields=None, export_format='csv'):
+        """Valide les paramètres et retourne (sql, params, colonnes)."""
+        if export_format not in EXPORT_FORMATS:
+            raise ExportError(f"Format non supporté: {export_format}")
+        if export_format == 'parquet' and not self.parquet_available():
+            raise ExportError("Export parquet indisponible (pyarrow non installé)")
+
+        model = get_model_for_report(report_type)
+        if model is None:
+            raise ExportError(f"Type de rapport inconnu: {report_type}")
+        try:
+            spec = looker_query_builder.get_spec(model._meta.model_name)
+            columns = looker_query_builder.select_fields(spec, fields) if fields else list(spec['fields'])
+            date_field = looker_query_builder.date_field(spec)
+            sql, params = looker_query_builder.build(
+                spec, tenant_id, columns, date_field,
+                start_date=start_date, end_date=end_date, package_name=package_name,
+                limit=None, with_keys=False,
+            )
+        except LookerQueryError as e:
+            raise ExportError(str(e))
+        return sql, params, columns
+
+    def iter_batches(self, sql, params):
+        """Lots de lignes lus sur un curseur serveur nommé."""
+        with transaction.atomic():
+            connection.ensure_connection()
+            with connection.connection.cursor(name=f'export_{uuid.uuid4().hex}') as cursor:
+                cursor.itersize = self.fetch_size
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(self.fetch_size)
+                    if not rows:
+                        break
+                    yield rows
+
+    def iter_csv(self, sql, params, columns):
+        """CSV (en-tête compris) produit lot par lot."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        for rows in self.iter_batches(sql, params):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+
+    def iter_parquet(self, sql, params, columns):
+        """Parquet produit par groupes de lignes (un par lot lu)."""
+        sink = _ChunkSink()
+        writer = None
+        for rows in self.iter_batches(sql, params):
+            table = pa.Table.from_pydict(
+                {name: [row[index] for row in rows] for index, name in enumerate(columns)}
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(sink, table.schema, compression='snappy')
+            else:
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+        if writer is None:
+            writer = pq.ParquetWriter(sink, pa.schema([(name, pa.string()) for name in columns]))
+        writer.close()
+        yield sink.drain()
+
+    def stream(self, export_format, sql, params, columns):
+        if export_format == 'parquet':
+            return self.iter_parquet(sql, params, columns)
+        return self.iter_csv(sql, params, columns)
+
+    def copy_csv(self, sql, params, fileobj):
+        """Écrit le CSV via COPY TO STDOUT (le plus rapide pour les gros volumes)."""
+        with connection.cursor() as cursor:
+            query = cursor.mogrify(sql, params)
+            if isinstance(query, bytes):
+                query = query.decode()
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH CSV HEADER", fileobj)
+            return cursor.rowcount
+
+    # ------------------------------------------------------------------
+    # Exports asynchrones
+    # ------------------------------------------------------------------
+
+    def export_root(self):
+        return Path(getattr(settings, 'EXPORT_ROOT', Path(settings.MEDIA_ROOT) / 'exports'))
+
+    def job_path(self, job):
+        extension = 'parquet' if job.export_format == ExportJob.Format.PARQUET else 'csv'
+        return self.export_root() / str(job.tenant_id) / f"{job.report_type}_{job.id}.{extension}"
+
+    def run_job(self, job_id):
+        """Exécute un ExportJob (appelé par la tâche Celery)."""
+        job = ExportJob.objects.get(id=job_id)
+        job.status = ExportJob.Status.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+        path = self.job_path(job)
+        try:
+            sql, params, columns = self.prepare(
+                job.report_type, job.tenant_id, job.start_date, job.end_date,
+                job.package_name or None, job.fields or None, job.export_format,
+            )
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'wb') as fileobj:
+                if job.export_format == ExportJob.Format.CSV:
+                    job.row_count = self.copy_csv(sql, params, fileobj)
+                else:
+                    for chunk in self.iter_parquet(sql, params, columns):
+                        fileobj.write(chunk)
+
+            job.size_bytes = path.stat().st_size
+            if job.export_format == ExportJob.Format.PARQUET:
+                job.row_count = pq.ParquetFile(path).metadata.num_rows
+            job.location = self._publish(job, path)
+            job.status = ExportJob.Status.COMPLETED
+        except Exception as e:
+            logger.error(f"Export {job.id} échoué: {str(e)}", exc_info=True)
+            job.status = ExportJob.Status.FAILED
+            job.error = str(e)
+            if path.exists():
+                path.unlink()
+        job.finished_at = timezone.now()
+        job.save()
+        return job
+
+    def _publish(self, job, path):
+        """
+        Dépose le fichier selon la destination : chemin local, ou objet GCS
+        (bucket EXPORT_GCS_BUCKET ; sans bucket configuré, un répertoire local
+        reproduisant l'arborescence gs:// sert de substitut).
+        """
+        if job.destination != ExportJob.Destination.GCS:
+            return str(path)
+
+        object_name = f"exports/{job.tenant_id}/{path.name}"
+        bucket_name = getattr(settings, 'EXPORT_GCS_BUCKET', '')
+        if bucket_name:
+            from play_reports.services.gcs_service import gcs_service
+            gcs_service._check_initialized()
+            gcs_service.client.bucket(bucket_name).blob(object_name).upload_from_filename(str(path))
+            path.unlink()
+            return f"gs://{bucket_name}/{object_name}"
+
+        standin = self.export_root() / 'gcs' / object_name
+        standin.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, standin)
+        return str(standin)
+
+
+export_service = ExportService()
+
+__all__ = ["export_service", "ExportService", "ExportError", "EXPORT_FORMATS"]
@@ -0,0 +1,406 @@
+import itertools
+import logging
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from django.conf import settings
+from django.db import connection
+
+from play_reports.models import google_play_installs_overview, RevenueDaily, Forecast
+
+logger = logging.getLogger(__name__)
+
+
+# Séries prévues : table lue, expression de la valeur journalière, filtre
+# additionnel, valeur d'un jour absent (None : jour non observé) et tables
+# dont la synchronisation déclenche le réajustement.
+FORECAST_SERIES = {
+    'installs': {
+        'model': google_play_installs_overview,
+        'value': 'SUM(daily_user_installs)',
+        'filter': '',
+        'fill': None,
+        'tables': ('google_play_installs_overview',),
+    },
+    'revenue': {
+        # Faits déjà convertis dans la devise de reporting (RevenueDaily)
+        'model': RevenueDaily,
+        'value': 'SUM(net_amount)',
+        'filter': "AND source = 'earnings'",
+        'fill': 0.0,
+        'tables': ('google_play_earnings',),
+    },
+}
+
+SEASON = 7
+HORIZON = 90
+# Amortissement de la tendance : une pente récente ne s'extrapole pas sur 90 jours
+DAMPING = 0.98
+# Historique minimum (jours) pour Holt-Winters ; en deçà, saisonnier naïf
+MIN_HOLT_WINTERS_DAYS = 28
+# Grille (alpha, beta, gamma) évaluée en bloc sur toutes les séries du lot
+GRID = list(itertools.product((0.1, 0.3, 0.5, 0.8), (0.0, 0.05, 0.2), (0.05, 0.2, 0.5)))
+
+
+def run_holt_winters(values, lengths, level, trend, season, alpha, beta, gamma):
+    """
+    Récurrence Holt-Winters additive amortie, vectorisée sur les séries.
+
+    values (séries x jours) est aligné à gauche : la colonne 0 est le premier
+    jour à intégrer, les lengths premières colonnes de chaque série sont
+    réelles (NaN = jour non observé, le temps avance sans mise à jour). La
+    saisonnalité d'entrée a son indice 0 sur la colonne 0 ; celle de sortie
+    sur le lendemain du dernier jour intégré. Un niveau NaN démarre sur la
+    première observation.
+
+    Retourne (level, trend, season, sse, n) des erreurs à un pas.
+    """
+    level, trend, season = level.copy(), trend.copy(), season.copy()
+    sse = np.zeros(len(lengths))
+    count = np.zeros(len(lengths))
+    for t in range(values.shape[1]):
+        y = values[:, t]
+        slot = t % SEASON
+        s = season[:, slot]
+        active = t < lengths
+        observed = active & ~np.isnan(y)
+        start = observed & np.isnan(level)
+        fitted = observed & ~start
+        advance = active & ~observed & ~np.isnan(level)
+
+        level = np.where(start, y, level)
+        trend = np.where(start, 0.0, trend)
+        error = np.where(fitted, y - (level + DAMPING * trend + s), 0.0)
+        sse += error ** 2
+        count += fitted
+
+        damped = level + DAMPING * trend
+        new_level = np.where(fitted, alpha * (y - s) + (1 - alpha) * damped, np.where(advance, damped, level))
+        trend = np.where(
+            fitted, beta * (new_level - level) + (1 - beta) * DAMPING * trend,
+            np.where(advance, DAMPING * trend, trend),
+        )
+        season[:, slot] = np.where(fitted, gamma * (y - new_level) + (1 - gamma) * s, s)
+        level = new_level
+
+    shift = (np.arange(SEASON)[None, :] + (lengths % SEASON)[:, None]) % SEASON
+    return level, trend, np.take_along_axis(season, shift, axis=1), sse, count
+
+
+def fit_holt_winters(values, lengths):
+    """Ajustement par grille : meilleurs paramètres (SSE à un pas) par série."""
+    rows = len(lengths)
+    best = None
+    for alpha, beta, gamma in GRID:
+        params = tuple(np.full(rows, p) for p in (alpha, beta, gamma))
+        state = run_holt_winters(
+            values, lengths, np.full(rows, np.nan), np.zeros(rows), np.zeros((rows, SEASON)), *params,
+        )
+        if best is None:
+            best = [*params, *state]
+            continue
+        better = state[3] < best[6]
+        for index, candidate in enumerate((*params, *state)):
+            mask = better[:, None] if candidate.ndim == 2 else better
+            best[index] = np.where(mask, candidate, best[index])
+    alpha, beta, gamma, level, trend, season, sse, count = best
+    return {
+        'alpha': alpha, 'beta': beta, 'gamma': gamma,
+        'level': level, 'trend': trend, 'season': season,
+        'sse': sse, 'n': count,
+    }
+
+
+def project(level, trend, season, rmse, alpha, horizon=HORIZON):
+    """Prévisions et demi-largeurs d'intervalle à 95 % pour h = 1..horizon."""
+    steps = np.arange(1, horizon + 1)
+    damping = np.cumsum(DAMPING ** steps)
+    values = level[:, None] + damping[None, :] * trend[:, None] + season[:, (steps - 1) % SEASON]
+    width = 1.96 * rmse[:, None] * np.sqrt(1 + (steps[None, :] - 1) * alpha[:, None] ** 2)
+    return values, width
+
+
+class ForecastService:
+    """
+    Prévisions d'installations et de revenus par package (Forecast).
+
+    Étape post-sync : seules les séries dont des lignes ont été écrites
+    depuis leur dernier ajustement sont traitées, par lots, avec une requête
+    par lot. Une série qui reçoit de nouveaux jours prolonge simplement la
+    récurrence Holt-Winters depuis l'état mis en cache (paramètres
+    inchangés) ; elle est réajustée entièrement (grille de paramètres,
+    FORECAST_HISTORY_DAYS jours) si ses jours déjà intégrés ont été révisés,
+    ou tous les FORECAST_REFIT_DAYS jours. Les séries trop courtes utilisent
+    une prévision saisonnière naïve. L'endpoint ne fait qu'une lecture.
+    """
+
+    def history_days(self):
+        return getattr(settings, 'FORECAST_HISTORY_DAYS', 365)
+
+    def refit_days(self):
+        return getattr(settings, 'FORECAST_REFIT_DAYS', 28)
+
+    def batch_size(self):
+        return getattr(settings, 'FORECAST_BATCH_SIZE', 1000)
+
+    def metrics_for_table(self, table_name):
+        return [metric for metric, spec in FORECAST_SERIES.items() if table_name in spec['tables']]
+
+    # ------------------------------------------------------------------
+    # Lecture des séries
+    # ------------------------------------------------------------------
+
+    def _changed(self, tenant_id, metric, full=False):
+        """{package: (premier jour modifié, dernier jour modifié)} depuis le dernier ajustement."""
+        spec = FORECAST_SERIES[metric]
+        qn = connection.ops.quote_name
+        source = qn(spec['model']._meta.db_table)
+        forecasts = qn(Forecast._meta.db_table)
+        stale = "" if full else "AND (f.id IS NULL OR s.updated_at > f.updated_at)"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT s.package_name, MIN(s.date), MAX(s.date)
+                FROM {source} s
+                LEFT JOIN {forecasts} f
+                  ON f.tenant_id = s.tenant_id AND f.package_name = s.package_name AND f.metric = %(metric)s
+                WHERE s.tenant_id = %(tenant)s {spec['filter']} {stale}
+                GROUP BY 1
+                """,
+                {'tenant': tenant_id, 'metric': metric},
+            )
+            return {package_name: (first, last) for package_name, first, last in cursor.fetchall()}
+
+    def _load(self, tenant_id, metric, since, anchored=False):
+        """
+        Séries journalières denses {package: (premier jour, valeurs)} depuis
+        since[package], en une requête pour tout le lot. anchored : la série
+        commence à since[package] même si les premiers jours sont absents
+        (prolongation d'un état dont la saisonnalité est calée sur ce jour).
+        """
+        spec = FORECAST_SERIES[metric]
+        table = connection.ops.quote_name(spec['model']._meta.db_table)
+        params = {'tenant': tenant_id, 'packages': list(since), 'since': min(since.values())}
+        rows = {}
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(
+                f"SELECT package_name, date, {spec['value']} FROM {table}"
+                f" WHERE tenant_id = %(tenant)s AND package_name = ANY(%(packages)s) AND date >= %(since)s"
+                f" {spec['filter']} GROUP BY 1, 2 ORDER BY 1, 2",
+                params,
+            )
+            for package_name, day, value in cursor:
+                if day >= since[package_name] and value is not None:
+                    rows.setdefault(package_name, []).append((day, float(value)))
+
+        fill = np.nan if spec['fill'] is None else spec['fill']
+        series = {}
+        for package_name, points in rows.items():
+            first = since[package_name] if anchored else points[0][0]
+            values = np.full((points[-1][0] - first).days + 1, fill)
+            for day, value in points:
+                values[(day - first).days] = value
+            series[package_name] = (first, values)
+        return series
+
+    def _matrix(self, series):
+        lengths = np.array([len(values) for _, values in series])
+        matrix = np.full((len(series), max(lengths)), np.nan)
+        for row, (_, values) in enumerate(series):
+            matrix[row, :len(values)] = values
+        return matrix, lengths
+
+    # ------------------------------------------------------------------
+    # Ajustement
+    # ------------------------------------------------------------------
+
+    def _points(self, fitted_through, values, width):
+        return [
+            {
+                'date': (fitted_through + timedelta(days=step + 1)).isoformat(),
+                'value': round(max(float(value), 0.0), 2),
+                'lower': round(max(float(value - half), 0.0), 2),
+                'upper': round(max(float(value + half), 0.0), 2),
+            }
+            for step, (value, half) in enumerate(zip(values, width))
+        ]
+
+    def _holt_winters_objects(self, tenant_id, metric, keys, last_days, result, incremental, cached):
+        rmse = np.sqrt(result['sse'] / np.maximum(result['n'], 1))
+        values, width = project(result['level'], result['trend'], result['season'], rmse, result['alpha'])
+        objects = []
+        for row, package_name in enumerate(keys):
+            fitted_through = last_days[row]
+            previous = cached.get(package_name)
+            objects.append(Forecast(
+                tenant_id=tenant_id, package_name=package_name, metric=metric, method='holt_winters',
+                fitted_through=fitted_through,
+                history_days=(previous.history_days if incremental else 0) + int(result['length'][row]),
+                params={
+                    'alpha': float(result['alpha'][row]),
+                    'beta': float(result['beta'][row]),
+                    'gamma': float(result['gamma'][row]),
+                    'damping': DAMPING,
+                    'level': float(result['level'][row]),
+                    'trend': float(result['trend'][row]),
+                    'season': [float(value) for value in result['season'][row]],
+                    'sse': float(result['sse'][row]),
+                    'n': int(result['n'][row]),
+                    'rmse': float(rmse[row]),
+                    'full_fit_through': (
+                        previous.params['full_fit_through'] if incremental else fitted_through.isoformat()
+                    ),
+                },
+                points=self._points(fitted_through, values[row], width[row]),
+            ))
+        return objects
+
+    def _seasonal_naive(self, tenant_id, metric, package_name, first, values):
+        observed = np.nan_to_num(values)
+        last_week = observed[-SEASON:]
+        diffs = observed[SEASON:] - observed[:-SEASON]
+        rmse = float(np.sqrt(np.mean(diffs ** 2))) if len(diffs) else float(np.std(last_week))
+        steps = np.arange(HORIZON)
+        projected = last_week[steps % SEASON]
+        width = 1.96 * rmse * np.sqrt(1 + steps // SEASON)
+        fitted_through = first + timedelta(days=len(values) - 1)
+        return Forecast(
+            tenant_id=tenant_id, package_name=package_name, metric=metric, method='seasonal_naive',
+            fitted_through=fitted_through, history_days=len(values),
+            params={'rmse': rmse, 'full_fit_through': fitted_through.isoformat()},
+            points=self._points(fitted_through, projected, width),
+        )
+
+    def refit(self, tenant_id, metric, full=False):
+        """Réajuste les séries modifiées du tenant ; retourne le nombre de prévisions écrites."""
+        started = time.perf_counter()
+        changed = self._changed(tenant_id, metric, full)
+        if not changed:
+            return 0
+        cached = {} if full else {
+            forecast.package_name: forecast
+            for forecast in Forecast.objects.filter(tenant_id=tenant_id, metric=metric, package_name__in=list(changed))
+        }
+        history = self.history_days()
+        refit_days = self.refit_days()
+        incremental, complete = {}, {}
+        for package_name, (first_changed, last_changed) in changed.items():
+            previous = cached.get(package_name)
+            last = max(last_changed, previous.fitted_through) if previous else last_changed
+            if (
+                previous is not None and previous.method == 'holt_winters'
+                and first_changed > previous.fitted_through
+                and (last - date.fromisoformat(previous.params['full_fit_through'])).days < refit_days
+            ):
+                incremental[package_name] = previous.fitted_through + timedelta(days=1)
+            else:
+                complete[package_name] = last - timedelta(days=history - 1)
+
+        written = 0
+        batch_size = self.batch_size()
+        for since, is_incremental in ((incremental, True), (complete, False)):
+            packages = sorted(since)
+            for offset in range(0, len(packages), batch_size):
+                batch = {package_name: since[package_name] for package_name in packages[offset:offset + batch_size]}
+                series = self._load(tenant_id, metric, batch, anchored=is_incremental)
+                objects = self._fit_batch(tenant_id, metric, series, is_incremental, cached)
+                Forecast.objects.bulk_create(
+                    objects, batch_size=500, update_conflicts=True,
+                    unique_fields=['tenant', 'package_name', 'metric'],
+                    update_fields=['method', 'fitted_through', 'history_days', 'params', 'points', 'updated_at'],
+                )
+                written += len(objects)
+
+        logger.info(
+            f"Prévisions {metric} tenant {tenant_id}: {len(incremental)} prolongée(s), "
+            f"{len(complete)} réajustée(s) en {time.perf_counter() - started:.2f} s"
+        )
+        return written
+
+    def _fit_batch(self, tenant_id, metric, series, incremental, cached):
+        objects = []
+        if incremental:
+            keys = sorted(series)
+            if not keys:
+                return objects
+            matrix, lengths = self._matrix([series[key] for key in keys])
+            state = [cached[key].params for key in keys]
+            alpha, beta, gamma = (np.array([params[name] for params in state]) for name in ('alpha', 'beta', 'gamma'))
+            level, trend, season, sse, count = run_holt_winters(
+                matrix, lengths,
+                np.array([params['level'] for params in state]),
+                np.array([params['trend'] for params in state]),
+                np.array([params['season'] for params in state]),
+                alpha, beta, gamma,
+            )
+            result = {
+                'alpha': alpha, 'beta': beta, 'gamma': gamma, 'level': level, 'trend': trend, 'season': season,
+                'sse': sse + np.array([params['sse'] for params in state]),
+                'n': count + np.array([params['n'] for params in state]),
+                'length': lengths,
+            }
+            last_days = [series[key][0] + timedelta(days=int(length) - 1) for key, length in zip(keys, lengths)]
+            return self._holt_winters_objects(tenant_id, metric, keys, last_days, result, True, cached)
+
+        keys = sorted(key for key, (_, values) in series.items() if len(values) >= MIN_HOLT_WINTERS_DAYS)
+        for package_name, (first, values) in series.items():
+            if SEASON <= len(values) < MIN_HOLT_WINTERS_DAYS:
+                objects.append(self._seasonal_naive(tenant_id, metric, package_name, first, values))
+        if keys:
+            matrix, lengths = self._matrix([series[key] for key in keys])
+            result = fit_holt_winters(matrix, lengths)
+            result['length'] = lengths
+            last_days = [series[key][0] + timedelta(days=int(length) - 1) for key, length in zip(keys, lengths)]
+            objects += self._holt_winters_objects(tenant_id, metric, keys, last_days, result, False, cached)
+        return objects
+
+    def refresh(self, tenant_id, table_name):
+        """Étape post-sync : réajuste les séries alimentées par la table synchronisée."""
+        for metric in self.metrics_for_table(table_name):
+            self.refit(tenant_id, metric)
+
+    def rebuild(self, tenant_id=None, metrics=None, full=False):
+        """Ajuste les séries de tous les tenants (ou d'un seul)."""
+        written = 0
+        for metric in metrics or FORECAST_SERIES:
+            qs = FORECAST_SERIES[metric]['model'].objects.all()
+            if tenant_id is not None:
+                qs = qs.filter(tenant_id=tenant_id)
+            for tenant in qs.values_list('tenant_id', flat=True).distinct().order_by():
+                written += self.refit(tenant, metric, full)
+        return written
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def get(self, tenant, package_name, metrics=None, horizon=30):
+        forecasts = {}
+        for forecast in Forecast.objects.filter(
+            tenant=tenant, package_name=package_name, metric__in=list(metrics or FORECAST_SERIES),
+        ):
+            points = forecast.points[:horizon]
+            forecasts[forecast.metric] = {
+                'method': forecast.method,
+                'fitted_through': str(forecast.fitted_through),
+                'history_days': forecast.history_days,
+                'rmse': forecast.params.get('rmse'),
+                'total': {
+                    bound: round(sum(point[bound] for point in points), 2)
+                    for bound in ('value', 'lower', 'upper')
+                },
+                'points': points,
+                'updated_at': forecast.updated_at,
+            }
+        return {
+            'package_name': package_name,
+            'horizon': horizon,
+            'forecasts': forecasts,
+        }
+
+
+forecast_service = ForecastService()
+
+__all__ = ["forecast_service", "ForecastService", "FORECAST_SERIES"]
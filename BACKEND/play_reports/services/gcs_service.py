@@ -114,6 +114,21 @@ class GCSService:
             logger.error(f"❌ Erreur listage CSV {bucket_uri}:", exc_info=True)
             raise
 
+    async def list_report_files(self, bucket_uri):
+        """Fichiers de rapports : CSV et archives ZIP (ventes, revenus)."""
+        try:
+            files = await self.list_files(bucket_uri)
+            report_files = [
+                f for f in files
+                if f["name"].lower().endswith((".csv", ".zip"))
+                or f["content_type"] in ("text/csv", "application/csv", "application/zip")
+            ]
+            log_stats(f"📄 {len(report_files)} fichiers de rapports trouvés dans {bucket_uri}")
+            return report_files
+        except Exception as e:
+            logger.error(f"❌ Erreur listage rapports {bucket_uri}:", exc_info=True)
+            raise
+
     async def download_file(self, bucket_uri, file_path, local_path=None):
         self._check_initialized()
         bucket_name, _ = self.parse_bucket_uri(bucket_uri)
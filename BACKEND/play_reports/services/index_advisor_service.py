@@ -0,0 +1,453 @@
+import datetime
+import logging
+import random
+import re
+import time
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from play_reports.models import (
+    Tenant,
+    google_play_installs_overview,
+    google_play_crashes_overview,
+    google_play_ratings_overview,
+    google_play_reviews,
+)
+from play_reports.services.insights_service import insights_service, PANEL_REGISTRY
+from play_reports.services.comparison_service import comparison_service, COMPARISON_SPECS
+from play_reports.services.dimension_encoding_service import dimension_encoding_service
+
+logger = logging.getLogger(__name__)
+
+
+# Requêtes du connecteur Looker : lecture paginée des lignes d'une table
+# par package et période, triée par date.
+LOOKER_PATTERNS = {
+    'google_play_installs_overview': (
+        'date, package_name, country, language, carrier, installs_on_active_devices, '
+        'daily_device_installs, daily_user_installs, daily_user_uninstalls'
+    ),
+    'google_play_ratings_overview': 'date, package_name, daily_average_rating, total_average_rating',
+    'google_play_crashes_overview': 'date, package_name, device, daily_crashes, daily_anrs',
+}
+
+# Nombre maximal de colonnes ajoutées en INCLUDE d'un index couvrant
+MAX_INCLUDE_COLUMNS = 6
+
+# Corrélation physique minimale (pg_stats) pour proposer un index BRIN sur la date
+BRIN_MIN_CORRELATION = 0.9
+
+_TABLE_RE = re.compile(r'\bFROM\s+"?(\w+)"?', re.IGNORECASE)
+_EQ_RE = re.compile(r'"?(\w+)"?\."?(\w+)"?\s*=\s*')
+_RANGE_RE = re.compile(r'"?(\w+)"?\."?(\w+)"?(?:::date)?\s*(?:>=|<=|<|>|BETWEEN)\s*', re.IGNORECASE)
+_CAST_RANGE_RE = re.compile(r'\(\s*"?(\w+)"?\."?(\w+)"?\s+AT TIME ZONE[^)]*\)\s*(?:::date)?\s*(?:>=|<=|<|>)', re.IGNORECASE)
+_AGG_RE = re.compile(r'\b(?:SUM|AVG|MAX|MIN|COUNT)\(\s*"?(\w+)"?\."?(\w+)"?\s*\)', re.IGNORECASE)
+_BARE_RANGE_RE = re.compile(r'\b(\w*date\w*)\s*(?:>=|<=)\s*', re.IGNORECASE)
+_BARE_EQ_RE = re.compile(r'\b(tenant_id|package_name)\s*=\s*', re.IGNORECASE)
+_INDEX_COLUMNS_RE = re.compile(r'USING (\w+) \(([^)]*)\)(?: INCLUDE \(([^)]*)\))?', re.IGNORECASE)
+
+
+def _synthetic_installs(tenant, package_name, day, i):
+    return google_play_installs_overview(
+        tenant=tenant, package_name=package_name, date=day,
+        device=f'device-{i % 40}', app_version=f'{i % 12}.0', os_version=f'{8 + i % 7}',
+        country=f'C{i % 60}', language=f'l{i % 15}', carrier=f'carrier-{i % 25}',
+        current_device_installs=random.randint(0, 5000),
+        installs_on_active_devices=random.randint(0, 5000),
+        daily_device_installs=random.randint(0, 200),
+        daily_device_uninstalls=random.randint(0, 100),
+        daily_device_upgrades=random.randint(0, 50),
+        total_user_installs=random.randint(0, 10000),
+        daily_user_installs=random.randint(0, 200),
+        daily_user_uninstalls=random.randint(0, 100),
+    )
+
+
+def _synthetic_crashes(tenant, package_name, day, i):
+    return google_play_crashes_overview(
+        tenant=tenant, package_name=package_name, date=day,
+        device=f'device-{i % 40}', app_version=f'{i % 12}.0', os_version=f'{8 + i % 7}',
+        android_os_version=f'Android {8 + i % 7}',
+        daily_crashes=random.randint(0, 30), daily_anrs=random.randint(0, 10),
+    )
+
+
+def _synthetic_ratings(tenant, package_name, day, i):
+    return google_play_ratings_overview(
+        tenant=tenant, package_name=package_name, date=day, device=f'device-{i}',
+        daily_average_rating=round(random.uniform(1, 5), 2),
+        total_average_rating=round(random.uniform(3, 5), 2),
+    )
+
+
+def _synthetic_reviews(tenant, package_name, day, i):
+    submitted = timezone.make_aware(datetime.datetime.combine(day, datetime.time(hour=i % 24, minute=i % 60)))
+    millis = int(submitted.timestamp() * 1000) + i
+    return google_play_reviews(
+        tenant=tenant, package_name=package_name,
+        review_id=f'{tenant.id}:{package_name}:{millis}',
+        star_rating=random.randint(1, 5),
+        review_text='synthetic review',
+        review_submit_date=submitted,
+        review_submit_millis_since_epoch=millis,
+        reviewer_language='en', device=f'device-{i % 40}',
+    )
+
+
+SYNTHETIC_GENERATORS = {
+    google_play_installs_overview: _synthetic_installs,
+    google_play_crashes_overview: _synthetic_crashes,
+    google_play_ratings_overview: _synthetic_ratings,
+    google_play_reviews: _synthetic_reviews,
+}
+
+
+class IndexAdvisorService:
+    """
+    Conseiller d'index pour les tables de rapports.
+
+    Capture les requêtes réellement émises par les panneaux d'insights, les
+    comparaisons de période et le connecteur Looker, en déduit les motifs
+    d'accès (égalités, plage de dates, colonnes agrégées) et propose des index
+    composites couvrants ou BRIN, ainsi que la suppression des index inutiles.
+    """
+
+    # Capture de la charge
+
+    def capture_workload(self, tenant, package_name, start, end):
+        """Exécute les chemins de code des insights et retourne le SQL émis."""
+        period_days = (end - start).days + 1
+        prev_end = start - datetime.timedelta(days=1)
+        prev_start = prev_end - datetime.timedelta(days=period_days - 1)
+
+        workload = []
+        with CaptureQueriesContext(connection) as ctx:
+            for panel_type, entry in PANEL_REGISTRY.items():
+                builder = getattr(insights_service, entry['builder'])
+                try:
+                    with transaction.atomic():
+                        builder(tenant, package_name, start, end, {})
+                except Exception as e:
+                    logger.warning("index_advisor: panel %s skipped: %s", panel_type, e)
+            for report in COMPARISON_SPECS:
+                comparison_service.compare(report, tenant, package_name, start, end, prev_start, prev_end)
+        workload.extend(q['sql'] for q in ctx.captured_queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE')))
+
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for table, columns in LOOKER_PATTERNS.items():
+                sql = cursor.mogrify(
+                    f"SELECT {columns} FROM {qn(table)} WHERE tenant_id = %s AND date >= %s AND date <= %s "
+                    f"AND package_name = %s ORDER BY date DESC LIMIT %s OFFSET %s",
+                    [tenant.id, start, end, package_name, 1000, 0],
+                )
+                workload.append(sql.decode() if isinstance(sql, bytes) else sql)
+        return workload
+
+    def access_pattern(self, sql):
+        """Extrait (table, colonnes d'égalité, colonnes de plage, colonnes agrégées)."""
+        match = _TABLE_RE.search(sql)
+        if not match:
+            return None
+        table = match.group(1)
+        where = re.split(r'\bWHERE\b', sql, maxsplit=1, flags=re.IGNORECASE)
+        predicates = where[1] if len(where) > 1 else ''
+        predicates = re.split(r'\b(?:GROUP BY|ORDER BY|LIMIT)\b', predicates, maxsplit=1, flags=re.IGNORECASE)[0]
+
+        equalities = [col for tbl, col in _EQ_RE.findall(predicates) if tbl == table]
+        equalities += [col for col in _BARE_EQ_RE.findall(predicates)]
+        ranges = [col for tbl, col in _RANGE_RE.findall(predicates) if tbl == table]
+        ranges += [col for tbl, col in _CAST_RANGE_RE.findall(predicates) if tbl == table]
+        ranges += [col for col in _BARE_RANGE_RE.findall(predicates)]
+        aggregates = [col for tbl, col in _AGG_RE.findall(sql) if tbl == table and col != 'id']
+
+        return {
+            'table': table,
+            'equalities': list(dict.fromkeys(c for c in equalities if c not in ranges)),
+            'ranges': list(dict.fromkeys(ranges)),
+            'aggregates': list(dict.fromkeys(aggregates)),
+        }
+
+    # Plans d'exécution
+
+    def explain(self, sql):
+        """EXPLAIN ANALYZE d'une requête : temps d'exécution et types de nœuds."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+        plan = plan[0] if isinstance(plan, list) else plan
+
+        nodes = []
+
+        def walk(node):
+            nodes.append((node.get('Node Type'), node.get('Relation Name'), node.get('Index Name')))
+            for child in node.get('Plans', []):
+                walk(child)
+
+        walk(plan['Plan'])
+        return {
+            'execution_ms': plan.get('Execution Time'),
+            'planning_ms': plan.get('Planning Time'),
+            'seq_scans': sorted({rel for node, rel, _ in nodes if node == 'Seq Scan' and rel}),
+            'indexes_used': sorted({idx for _, _, idx in nodes if idx}),
+        }
+
+    def explain_workload(self, workload):
+        results = []
+        for sql in workload:
+            pattern = self.access_pattern(sql)
+            if not pattern:
+                continue
+            try:
+                with transaction.atomic():
+                    plan = self.explain(sql)
+            except Exception as e:
+                logger.warning("index_advisor: EXPLAIN failed: %s", e)
+                continue
+            results.append({'table': pattern['table'], 'sql': sql, **plan})
+        return results
+
+    # Index existants
+
+    def existing_indexes(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT i.indexname, i.indexdef, COALESCE(s.idx_scan, 0),
+                       pg_relation_size(quote_ident(i.indexname)::regclass)
+                FROM pg_indexes i
+                LEFT JOIN pg_stat_user_indexes s
+                  ON s.indexrelname = i.indexname AND s.relname = i.tablename
+                WHERE i.tablename = %s
+                """,
+                [table],
+            )
+            rows = cursor.fetchall()
+
+        indexes = []
+        for name, definition, scans, size in rows:
+            match = _INDEX_COLUMNS_RE.search(definition)
+            if not match:
+                continue
+            method, columns, include = match.groups()
+            indexes.append({
+                'name': name,
+                'method': method.lower(),
+                'columns': [c.strip().strip('"').split(' ')[0] for c in columns.split(',')],
+                'include': [c.strip().strip('"') for c in include.split(',')] if include else [],
+                'unique': 'UNIQUE' in definition.upper(),
+                'primary': name.endswith('_pkey'),
+                'scans': scans,
+                'size': size,
+            })
+        return indexes
+
+    def _column_correlation(self, table, column):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT correlation FROM pg_stats WHERE tablename = %s AND attname = %s",
+                [table, column],
+            )
+            row = cursor.fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def _table_columns(self, table):
+        with connection.cursor() as cursor:
+            return {col.name for col in connection.introspection.get_table_description(cursor, table)}
+
+    # Propositions
+
+    def propose(self, workload):
+        """Calcule les index à créer et à supprimer pour la charge capturée."""
+        patterns = defaultdict(lambda: {'equalities': defaultdict(int), 'ranges': defaultdict(int), 'aggregates': defaultdict(int), 'used': set()})
+        for sql in workload:
+            pattern = self.access_pattern(sql)
+            if not pattern:
+                continue
+            entry = patterns[pattern['table']]
+            for key in ('equalities', 'ranges', 'aggregates'):
+                for col in pattern[key]:
+                    entry[key][col] += 1
+                    entry['used'].add(col)
+
+        proposals = []
+        qn = connection.ops.quote_name
+        for table, entry in sorted(patterns.items()):
+            columns = self._table_columns(table)
+            existing = self.existing_indexes(table)
+
+            # Égalités : tenant d'abord, puis par fréquence décroissante
+            equalities = sorted(
+                (c for c in entry['equalities'] if c in columns),
+                key=lambda c: (c != 'tenant_id', -entry['equalities'][c], c),
+            )[:2]
+            ranges = sorted((c for c in entry['ranges'] if c in columns), key=lambda c: -entry['ranges'][c])[:1]
+            key_columns = equalities + ranges
+            include = sorted(
+                (c for c in entry['aggregates'] if c in columns and c not in key_columns),
+                key=lambda c: -entry['aggregates'][c],
+            )[:MAX_INCLUDE_COLUMNS]
+
+            if key_columns and not self._is_covered(existing, key_columns, include):
+                name = self._index_name(table, 'adv_cover_idx')
+                include_sql = f" INCLUDE ({', '.join(qn(c) for c in include)})" if include else ''
+                proposals.append({
+                    'table': table,
+                    'action': 'create',
+                    'name': name,
+                    'sql': f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(name)} ON {qn(table)} "
+                           f"({', '.join(qn(c) for c in key_columns)}){include_sql}",
+                    'reason': f"filtre {key_columns}, agrégats {include}",
+                })
+
+            # BRIN sur la date si la table est physiquement ordonnée par date
+            for column in ranges:
+                correlation = self._column_correlation(table, column)
+                has_brin = any(ix['method'] == 'brin' and ix['columns'] == [column] for ix in existing)
+                if correlation is not None and abs(correlation) >= BRIN_MIN_CORRELATION and not has_brin:
+                    name = self._index_name(table, f'{column}_brin')
+                    proposals.append({
+                        'table': table,
+                        'action': 'create',
+                        'name': name,
+                        'sql': f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(name)} ON {qn(table)} USING brin ({qn(column)})",
+                        'reason': f"corrélation {column}={correlation:.2f}",
+                    })
+
+            proposals.extend(self._redundant_indexes(table, existing, entry['used']))
+        return proposals
+
+    def _index_name(self, table, suffix):
+        short = table[len('google_play_'):] if table.startswith('google_play_') else table
+        return f"{short[:30]}_{suffix}"[:63]
+
+    def _is_covered(self, existing, key_columns, include):
+        for ix in existing:
+            if ix['method'] != 'btree':
+                continue
+            if ix['columns'][:len(key_columns)] == key_columns and set(include) <= set(ix['columns']) | set(ix['include']):
+                return True
+        return False
+
+    def _redundant_indexes(self, table, existing, used_columns):
+        """Index non uniques inutiles pour la charge ou préfixes d'un autre index."""
+        proposals = []
+        qn = connection.ops.quote_name
+        for ix in existing:
+            if ix['unique'] or ix['primary'] or ix['method'] != 'btree':
+                continue
+            leading = ix['columns'][0]
+            prefix_of = next(
+                (
+                    other['name'] for other in existing
+                    if other['name'] != ix['name'] and other['method'] == 'btree'
+                    and len(other['columns']) > len(ix['columns'])
+                    and other['columns'][:len(ix['columns'])] == ix['columns']
+                ),
+                None,
+            )
+            reason = None
+            if prefix_of:
+                reason = f"préfixe de {prefix_of}"
+            elif leading not in used_columns and leading not in ('tenant_id', 'id') and ix['scans'] == 0:
+                reason = f"colonne {leading} absente des prédicats, idx_scan=0"
+            if reason:
+                proposals.append({
+                    'table': table,
+                    'action': 'drop',
+                    'name': ix['name'],
+                    'sql': f"DROP INDEX CONCURRENTLY IF EXISTS {qn(ix['name'])}",
+                    'reason': f"{reason}, {ix['size'] // 1024} Ko",
+                })
+        return proposals
+
+    def apply(self, proposals, drop=False):
+        """Applique les propositions (CONCURRENTLY : hors transaction)."""
+        applied = []
+        with connection.cursor() as cursor:
+            for proposal in proposals:
+                if proposal['action'] == 'drop' and not drop:
+                    continue
+                started = time.monotonic()
+                cursor.execute(proposal['sql'])
+                applied.append({**proposal, 'duration_ms': (time.monotonic() - started) * 1000})
+        return applied
+
+    # Banc d'essai sur données synthétiques
+
+    def ingest_synthetic(self, tenant, package_name, first_day, days, rows_per_day):
+        """Insère un jeu synthétique et retourne le temps d'ingestion par table."""
+        timings = {}
+        for model, generator in SYNTHETIC_GENERATORS.items():
+            objects = [
+                generator(tenant, package_name, first_day + datetime.timedelta(days=d), i)
+                for d in range(days)
+                for i in range(rows_per_day)
+            ]
+            started = time.perf_counter()
+            dimension_encoding_service.bulk_insert(model, objects)
+            elapsed = (time.perf_counter() - started) * 1000
+            timings[model._meta.db_table] = {
+                'rows': len(objects),
+                'duration_ms': elapsed,
+                'us_per_row': elapsed * 1000 / max(1, len(objects)),
+            }
+        return timings
+
+    def benchmark(self, days=90, rows_per_day=200, package_name='com.example.synthetic'):
+        """
+        Compare ingestion et requêtes avant/après application des propositions.
+
+        Tout est exécuté dans une transaction annulée à la fin (PostgreSQL
+        supporte le DDL transactionnel) : aucune donnée ni index n'est conservé.
+        Les index sont verrouillés pendant l'exécution : à lancer sur une base
+        de recette.
+        """
+        tables = [model._meta.db_table for model in SYNTHETIC_GENERATORS]
+        start = datetime.date.today() - datetime.timedelta(days=days - 1)
+        end = datetime.date.today()
+        report = {}
+
+        with transaction.atomic():
+            tenant = Tenant.objects.create(name='index-advisor-benchmark')
+            report['ingest_before'] = self.ingest_synthetic(tenant, package_name, start, days, rows_per_day)
+            self._analyze(tables)
+
+            workload = [
+                sql for sql in self.capture_workload(tenant, package_name, start, end)
+                if (self.access_pattern(sql) or {}).get('table') in tables
+            ]
+            report['queries_before'] = self.explain_workload(workload)
+            report['proposals'] = [p for p in self.propose(workload) if p['table'] in tables]
+
+            with connection.cursor() as cursor:
+                for proposal in report['proposals']:
+                    # CONCURRENTLY est interdit dans une transaction
+                    cursor.execute(proposal['sql'].replace(' CONCURRENTLY', ''))
+            self._analyze(tables)
+
+            # Nouvelle période pour éviter les conflits d'unicité
+            report['ingest_after'] = self.ingest_synthetic(
+                tenant, package_name, start - datetime.timedelta(days=days), days, rows_per_day
+            )
+            self._analyze(tables)
+            report['queries_after'] = self.explain_workload(workload)
+
+            transaction.set_rollback(True)
+
+        logger.info("index_advisor benchmark: %s proposals on %s", len(report['proposals']), tables)
+        return report
+
+    def _analyze(self, tables):
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(f"ANALYZE {qn(table)}")
+
+
+index_advisor_service = IndexAdvisorService()
+
+__all__ = ["index_advisor_service", "IndexAdvisorService"]
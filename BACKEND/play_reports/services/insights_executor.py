@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Levée lorsqu'une requête d'insights dépasse son budget de requêtes SQL."""
+
+
+class QueryBudget:
+    """
+    Compteur de requêtes SQL partagé entre les panneaux d'une même requête
+    HTTP. Chaque thread l'installe sur sa propre connexion via
+    connection.execute_wrapper.
+    """
+
+    def __init__(self, max_queries=None):
+        self.max_queries = max_queries
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.used += 1
+            used = self.used
+        if self.max_queries is not None and used > self.max_queries:
+            raise QueryBudgetExceeded(
+                f"Budget de requêtes dépassé ({self.max_queries} requêtes maximum)"
+            )
+        return execute(sql, params, many, context)
+
+
+class InsightsExecutor:
+    """
+    Exécute des panneaux d'insights indépendants en parallèle.
+
+    Chaque panneau est une fonction synchrone exécutée dans un thread du pool ;
+    Django attribuant une connexion par thread, les agrégations partent sur des
+    connexions distinctes (conservées entre requêtes grâce à CONN_MAX_AGE).
+    Le temps de réponse est ainsi borné par le panneau le plus lent.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or getattr(settings, 'INSIGHTS_MAX_WORKERS', 8)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='insights',
+        )
+
+    def _run_panel(self, name, func, budget):
+        close_old_connections()
+        started = time.perf_counter()
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        try:
+            with connection.execute_wrapper(budget), connection.execute_wrapper(count_queries):
+                result = func()
+            return result, {
+                'panel': name,
+                'status': 'ok',
+                'queries': queries,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            }
+        except Exception as e:
+            e.insights_trace = {
+                'panel': name,
+                'status': 'error',
+                'error': str(e),
+                'queries': queries,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            }
+            raise
+        finally:
+            close_old_connections()
+
+    async def gather(self, panels, max_queries=None):
+        """
+        Exécute les panneaux {nom: callable} en parallèle.
+
+        Retourne (résultats, trace). La première erreur d'un panneau est
+        relevée une fois tous les panneaux terminés.
+        """
+        if max_queries is None:
+            max_queries = getattr(settings, 'INSIGHTS_QUERY_BUDGET', None)
+        budget = QueryBudget(max_queries)
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+
+        names = list(panels)
+        outcomes = await asyncio.gather(
+            *(
+                loop.run_in_executor(self._pool, self._run_panel, name, panels[name], budget)
+                for name in names
+            ),
+            return_exceptions=True,
+        )
+
+        results = {}
+        panel_traces = []
+        first_error = None
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, BaseException):
+                panel_traces.append(getattr(outcome, 'insights_trace', {'panel': name, 'status': 'error'}))
+                first_error = first_error or outcome
+                continue
+            results[name], panel_trace = outcome
+            panel_traces.append(panel_trace)
+
+        trace = {
+            'total_ms': round((time.perf_counter() - started) * 1000, 1),
+            'queries': budget.used,
+            'query_budget': max_queries,
+            'panels': panel_traces,
+        }
+        logger.info("insights trace: %s", trace)
+
+        if first_error is not None:
+            raise first_error
+        return results, trace
+
+    def iter_completed(self, panels, max_queries=None):
+        """
+        Exécute les panneaux {nom: callable} en parallèle et les restitue dans
+        l'ordre de complétion : (nom, résultat, erreur, trace du panneau).
+        Utilisé pour streamer une réponse sans attendre le panneau le plus lent.
+        """
+        if max_queries is None:
+            max_queries = getattr(settings, 'INSIGHTS_QUERY_BUDGET', None)
+        budget = QueryBudget(max_queries)
+        futures = {
+            self._pool.submit(self._run_panel, name, func, budget): name
+            for name, func in panels.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result, panel_trace = future.result()
+                yield name, result, None, panel_trace
+            except Exception as e:
+                yield name, None, e, getattr(e, 'insights_trace', {'panel': name, 'status': 'error'})
+
+    def run(self, panels, max_queries=None):
+        """Point d'entrée synchrone utilisé par les vues DRF."""
+        return async_to_sync(self.gather)(panels, max_queries=max_queries)
+
+
+insights_executor = InsightsExecutor()
+
+__all__ = ["insights_executor", "InsightsExecutor", "QueryBudget", "QueryBudgetExceeded"]
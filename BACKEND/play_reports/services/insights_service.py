@@ -0,0 +1,498 @@
+import logging
+
+from django.db.models import Sum, Avg, Count, Max
+
+from play_reports.models import (
+    google_play_installs_overview,
+    google_play_ratings_overview,
+    google_play_crashes_overview,
+    google_play_reviews,
+    google_play_buyers_7d_overview,
+    RevenueDaily,
+)
+from play_reports.services.review_search_service import review_search_service
+from play_reports.services.review_sentiment_service import review_sentiment_service, DAILY_FIELDS
+from play_reports.services.revenue_fact_service import revenue_fact_service
+from play_reports.services.crash_rate_service import crash_rate_service
+from play_reports.services.store_funnel_service import store_funnel_service
+from play_reports.services.report_planner import report_planner
+
+logger = logging.getLogger(__name__)
+
+
+class InsightsService:
+    """
+    Agrégations des panneaux d'insights.
+
+    Chaque méthode est indépendante (aucun état partagé) afin de pouvoir être
+    exécutée en parallèle par l'exécuteur d'insights. Les requêtes sont
+    toujours filtrées par tenant.
+    """
+
+    def _period_queryset(self, model, tenant, package_name, start_date, end_date, date_field='date'):
+        return model.objects.filter(
+            tenant=tenant,
+            package_name=package_name,
+            **{f'{date_field}__gte': start_date, f'{date_field}__lte': end_date}
+        )
+
+    def _dimension_filters(self, filters, fields):
+        """Filtres d'égalité renseignés parmi les dimensions du panneau."""
+        filters = filters or {}
+        return {field: filters[field] for field in fields if filters.get(field)}
+
+    # Panneaux ai_analysis
+
+    def installs_metrics(self, tenant, package_name, start_date, end_date):
+        return self._period_queryset(
+            google_play_installs_overview, tenant, package_name, start_date, end_date
+        ).aggregate(
+            total_installs=Sum('daily_user_installs'),
+            total_uninstalls=Sum('daily_user_uninstalls'),
+            avg_install_rate=Avg('daily_user_installs'),
+            current_installs=Max('current_device_installs')
+        )
+
+    def ratings_metrics(self, tenant, package_name, start_date, end_date):
+        return self._period_queryset(
+            google_play_ratings_overview, tenant, package_name, start_date, end_date
+        ).aggregate(
+            avg_rating=Avg('daily_average_rating'),
+            total_ratings=Count('id'),  # Nombre de lignes utilisé comme approximation du nombre de notes
+            avg_rating_delta=Avg('total_average_rating')
+        )
+
+    def crashes_metrics(self, tenant, package_name, start_date, end_date):
+        metrics = self._period_queryset(
+            google_play_crashes_overview, tenant, package_name, start_date, end_date
+        ).aggregate(
+            total_crashes=Sum('daily_crashes'),
+            total_anrs=Sum('daily_anrs'),
+            avg_daily_crashes=Avg('daily_crashes')
+        )
+        # Taux réel : plantages rapportés aux appareils actifs (CrashRateDaily)
+        stability = crash_rate_service.summary(tenant, package_name, start_date, end_date)
+        metrics['crash_rate'] = stability['crash_rate']
+        metrics['crashes_per_1k'] = stability['crashes_per_1k']
+        return metrics
+
+    def reviews_metrics(self, tenant, package_name, start_date, end_date):
+        # Agrégats journaliers précalculés à l'ingestion (calculés sur les
+        # avis tant que la période n'est pas agrégée)
+        daily = review_sentiment_service.daily(tenant, package_name, start_date, end_date)
+        agg = {name: sum(row[name] or 0 for row in daily) for name in DAILY_FIELDS}
+        total = agg['review_count']
+        return {
+            'avg_rating': agg['rating_sum'] / total if total else None,
+            'total_reviews': total,
+            'positive_reviews': agg['positive_count'],
+            'negative_reviews': agg['negative_count'],
+            'sentiment_score': agg['sentiment_sum'] / total if total else 0,
+        }
+
+    # Panneaux concise_insights
+
+    def installs_summary(self, tenant, package_name, start_date, end_date):
+        qs = self._period_queryset(google_play_installs_overview, tenant, package_name, start_date, end_date)
+        agg = qs.aggregate(
+            daily_user_installs=Sum('daily_user_installs'),
+            daily_user_uninstalls=Sum('daily_user_uninstalls'),
+            total_user_installs=Sum('total_user_installs'),
+        )
+        net = (agg.get('daily_user_installs') or 0) - (agg.get('daily_user_uninstalls') or 0)
+        top_countries = list(qs.values('country').annotate(installs=Sum('daily_user_installs')).order_by('-installs')[:5])
+        top_devices = list(qs.values('device').annotate(installs=Sum('daily_user_installs')).order_by('-installs')[:5])
+        top_os = list(qs.values('os_version').annotate(installs=Sum('daily_user_installs')).order_by('-installs')[:5])
+        top_app_versions = list(qs.values('app_version').annotate(installs=Sum('daily_user_installs')).order_by('-installs')[:5])
+        return {
+            'totals': {
+                'daily_user_installs': agg.get('daily_user_installs') or 0,
+                'daily_user_uninstalls': agg.get('daily_user_uninstalls') or 0,
+                'net_user_installs': net,
+                'total_user_installs': agg.get('total_user_installs') or 0,
+            },
+            'top': {
+                'countries': top_countries,
+                'devices': top_devices,
+                'os_versions': top_os,
+                'app_versions': top_app_versions,
+            }
+        }
+
+    def ratings_summary(self, tenant, package_name, start_date, end_date):
+        qs = self._period_queryset(google_play_ratings_overview, tenant, package_name, start_date, end_date)
+        agg = qs.aggregate(
+            daily_avg=Avg('daily_average_rating'),
+            total_avg=Avg('total_average_rating'),
+        )
+        top_devices = list(qs.values('device').annotate(avg_rating=Avg('daily_average_rating')).order_by('-avg_rating')[:5])
+        return {
+            'averages': {
+                'daily_avg': agg.get('daily_avg'),
+                'total_avg': agg.get('total_avg'),
+            },
+            'top': {
+                'devices_by_avg_rating': top_devices,
+            }
+        }
+
+    # Panneaux des endpoints /insights/<type>
+    #
+    # Chaque panneau reçoit un contexte déjà résolu (tenant, package, période)
+    # et un dict de filtres optionnels ; il retourne le bloc 'data' de l'endpoint.
+
+    def installs_panel(self, tenant, package_name, start, end, filters=None):
+        filters = self._dimension_filters(filters, ('country', 'app_version', 'device', 'os_version'))
+        scope = dict(package_name=package_name, start=start, end=end, filters=filters)
+
+        agg = report_planner.aggregate('installs_overview', tenant, [
+            'current_device_installs', 'installs_on_active_devices', 'daily_device_installs',
+            'daily_device_uninstalls', 'daily_device_upgrades', 'total_user_installs',
+            'daily_user_installs', 'daily_user_uninstalls',
+        ], **scope)
+
+        # Installations nettes
+        net_user_installs = (agg.get('daily_user_installs') or 0) - (agg.get('daily_user_uninstalls') or 0)
+
+        def top(dimension):
+            return report_planner.breakdown(
+                'installs_overview', tenant, dimension, 'daily_user_installs', 'installs', **scope
+            )
+
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'totals': agg,
+            'net_user_installs': net_user_installs,
+            # Top pays (si non déjà filtré)
+            'top_countries': [] if filters.get('country') else top('country'),
+            'top_devices_by_installs': top('device'),
+            'top_os_versions_by_installs': top('os_version'),
+            'top_app_versions_by_installs': top('app_version'),
+        }
+
+    def ratings_panel(self, tenant, package_name, start, end, filters=None):
+        filters = self._dimension_filters(filters, ('device',))
+        scope = dict(package_name=package_name, start=start, end=end, filters=filters)
+
+        agg = report_planner.aggregate('ratings_overview', tenant, [
+            {'name': 'daily_average_rating', 'as': 'daily_avg'},
+            {'name': 'total_average_rating', 'as': 'total_avg'},
+        ], **scope)
+        top_devices_avg = report_planner.breakdown(
+            'ratings_overview', tenant, 'device', 'daily_average_rating', 'avg_rating', **scope
+        )
+
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'averages': agg,
+            'top_devices_by_avg_rating': top_devices_avg,
+        }
+
+    def crashes_panel(self, tenant, package_name, start, end, filters=None):
+        filters = self._dimension_filters(filters, ('app_version', 'device', 'os_version', 'android_os_version'))
+        scope = dict(package_name=package_name, start=start, end=end, filters=filters)
+
+        # Sans filtre, les totaux sont lus dans CrashRateDaily (voir report_registry)
+        agg = report_planner.aggregate('crashes_overview', tenant, ['daily_crashes', 'daily_anrs'], **scope)
+
+        def top(dimension):
+            return report_planner.breakdown(
+                'crashes_overview', tenant, dimension, 'daily_crashes', 'crashes', **scope
+            )
+
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'totals': agg,
+            'stability': crash_rate_service.summary(tenant, package_name, start, end),
+            'top_versions_by_crashes': top('app_version'),
+            'worst_versions_by_crash_rate': crash_rate_service.worst_versions(tenant, package_name, start, end),
+            'top_devices_by_crashes': top('device'),
+            'top_android_os_versions_by_crashes': top('android_os_version'),
+        }
+
+    def reviews_panel(self, tenant, package_name, start, end, filters=None):
+        filters = filters or {}
+        limit = filters.get('limit') or 10
+        offset = filters.get('offset') or 0
+
+        qs = google_play_reviews.objects.filter(
+            tenant=tenant,
+            package_name=package_name,
+            review_submit_date__date__gte=start,
+            review_submit_date__date__lte=end,
+        )
+        if filters.get('device'):
+            qs = qs.filter(device=filters['device'])
+        if filters.get('language'):
+            qs = qs.filter(reviewer_language=filters['language'])
+        if filters.get('rating_min') is not None:
+            qs = qs.filter(star_rating__gte=filters['rating_min'])
+        if filters.get('rating_max') is not None:
+            qs = qs.filter(star_rating__lte=filters['rating_max'])
+        search = filters.get('q')
+        if search:
+            # Recherche plein texte (index GIN) : tri par pertinence
+            qs = review_search_service.search(qs, search, filters.get('language'))
+
+        total_count = qs.count()
+        avg_rating = qs.aggregate(avg=Avg('star_rating')).get('avg')
+
+        # Répartition par nombre d'étoiles
+        star_breakdown = []
+        for s in [5, 4, 3, 2, 1]:
+            star_breakdown.append({
+                'star': s,
+                'count': qs.filter(star_rating=s).count(),
+            })
+
+        items_qs = (qs if search else qs.order_by('-review_submit_date'))[offset:offset+limit]
+        items = [
+            {
+                'review_id': r.review_id,
+                'date': r.review_submit_date.isoformat(),
+                'star_rating': r.star_rating,
+                'title': r.review_title,
+                'text': r.review_text[:1000] if r.review_text else None,
+                'device': r.device,
+                'language': r.reviewer_language,
+                'developer_reply_date': r.developer_reply_date.isoformat() if r.developer_reply_date else None,
+                **({
+                    'rank': r.rank,
+                    'title_headline': r.title_headline,
+                    'text_headline': r.text_headline,
+                } if search else {}),
+            }
+            for r in items_qs
+        ]
+
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'totals': {
+                'reviews_count': total_count,
+                'avg_rating': avg_rating,
+            },
+            'breakdown': star_breakdown,
+            'items': items,
+            'q': search or None,
+            'limit': limit,
+            'offset': offset,
+        }
+
+    def store_performance_panel(self, tenant, package_name, start, end, filters=None):
+        filters = self._dimension_filters(
+            filters, ('country', 'traffic_source', 'search_term', 'utm_source', 'utm_campaign')
+        )
+        scope = dict(package_name=package_name, start=start, end=end, filters=filters)
+
+        agg = report_planner.aggregate('store_performance_overview', tenant, [
+            'store_listing_visitors',
+            'store_listing_acquisitions',
+            {'name': 'store_listing_conversion_rate', 'as': 'avg_store_listing_conversion_rate'},
+        ], **scope)
+        top_traffic_sources = report_planner.breakdown(
+            'store_performance_overview', tenant, 'traffic_source', 'store_listing_visitors', 'visitors', **scope
+        )
+
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'totals': agg,
+            'top_traffic_sources_by_visitors': top_traffic_sources,
+            # Résumés mensuels bornés : mois couvrant la période, visiteurs estimés
+            'top_search_terms': store_funnel_service.top_search_terms(tenant, package_name, start, end),
+        }
+
+    def cancellations_panel(self, tenant, package_name, start, end, filters=None):
+        filters = self._dimension_filters(
+            filters, ('country', 'cancellation_reason', 'cancellation_sub_reason', 'subscription_id', 'sku_id')
+        )
+        scope = dict(package_name=package_name, start=start, end=end, filters=filters)
+
+        agg = report_planner.aggregate('subscription_cancellations', tenant, [
+            {'name': 'cancellation_count', 'as': 'total_cancellations'},
+        ], **scope)
+        top_reasons = report_planner.breakdown(
+            'subscription_cancellations', tenant, 'cancellation_reason', 'cancellation_count', 'count', **scope
+        )
+
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'totals': agg,
+            'top_reasons': top_reasons,
+        }
+
+    def subscriptions_panel(self, tenant, package_name, start, end, filters=None):
+        filters = self._dimension_filters(filters, ('country', 'product_id', 'base_plan_id', 'offer_id'))
+        scope = dict(package_name=package_name, start=start, end=end, filters=filters)
+
+        agg = report_planner.aggregate('subscriptions_overview', tenant, [
+            'new_subscribers', 'cancelled_subscribers', 'active_subscribers',
+        ], **scope)
+
+        churn = None
+        if (agg.get('new_subscribers') or 0) > 0:
+            churn = (agg.get('cancelled_subscribers') or 0) / max(1, (agg.get('new_subscribers') or 0))
+
+        # Période en mois entiers : lu dans SubscriptionMonthly
+        top_products = report_planner.breakdown(
+            'subscriptions_overview', tenant, 'product_id', 'new_subscribers', 'new_subscribers', **scope
+        )
+
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'totals': agg,
+            'approx_churn_ratio_cancel_over_new': churn,
+            'top_products_by_new_subscribers': top_products,
+        }
+
+    def revenue_panel(self, tenant, package_name, start, end, filters=None):
+        filters = filters or {}
+        # Faits précalculés : montants convertis dans la devise de reporting
+        reporting_currency = revenue_fact_service.reporting_currency()
+        qs = RevenueDaily.objects.filter(
+            tenant=tenant,
+            source=filters.get('source') or 'earnings',
+            reporting_currency=reporting_currency,
+            date__gte=start,
+            date__lte=end,
+        )
+        if package_name:
+            qs = qs.filter(package_name=revenue_fact_service.normalize_package(package_name))
+        if filters.get('buyer_country'):
+            qs = qs.filter(country=filters['buyer_country'].upper())
+        if filters.get('currency'):
+            qs = qs.filter(currency=filters['currency'].upper())
+
+        agg = qs.aggregate(
+            transactions=Sum('transactions'),
+            unconverted_transactions=Sum('unconverted_transactions'),
+            gross_amount=Sum('gross_amount'),
+            refund_amount=Sum('refund_amount'),
+            tax_amount=Sum('tax_amount'),
+            service_fee_amount=Sum('fee_amount'),
+            net_amount=Sum('net_amount'),
+        )
+        top_countries = list(
+            qs.values('country')
+              .annotate(amount=Sum('net_amount'))
+              .order_by('-amount')[:5]
+        )
+
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'reporting_currency': reporting_currency,
+            'totals': agg,
+            'top_countries_by_revenue': top_countries,
+        }
+
+    def buyers7d_panel(self, tenant, package_name, start, end, filters=None):
+        filters = filters or {}
+        base = google_play_buyers_7d_overview.objects.filter(
+            tenant=tenant,
+            date__gte=start,
+            date__lte=end,
+        )
+        if package_name:
+            base = base.filter(package_name=package_name)
+        # Lignes chargées par fichier : overview (canal et pays vides), canal
+        # (pays vide) ou pays (canal vide) ; un seul niveau est lu pour ne
+        # pas compter deux fois les mêmes acheteurs.
+        qs = base.filter(
+            country=filters.get('country') or '',
+            acquisition_channel=filters.get('acquisition_channel') or '',
+        )
+
+        agg = qs.aggregate(
+            store_listing_visitors=Sum('store_listing_visitors'),
+            installers=Sum('installers'),
+            buyers=Sum('buyers'),
+            repeat_buyers=Sum('repeat_buyers'),
+            avg_visitor_to_installer_rate=Avg('visitor_to_installer_rate'),
+            avg_installer_to_buyer_rate=Avg('installer_to_buyer_rate'),
+            avg_buyer_to_repeat_rate=Avg('buyer_to_repeat_rate'),
+        )
+        by_channel = list(
+            base.filter(country='').exclude(acquisition_channel='')
+              .values('acquisition_channel')
+              .annotate(buyers=Sum('buyers'))
+              .order_by('-buyers')[:5]
+        )
+
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'totals': agg,
+            'top_channels_by_buyers': by_channel,
+        }
+
+
+# Panneaux disponibles pour l'API batch.
+# 'package' : 'default' (package inféré si absent), 'required', 'optional' ou 'none'.
+PANEL_REGISTRY = {
+    'installs': {
+        'builder': 'installs_panel',
+        'package': 'default',
+        'filters': ['country', 'app_version', 'device', 'os_version'],
+    },
+    'ratings': {
+        'builder': 'ratings_panel',
+        'package': 'default',
+        'filters': ['device'],
+    },
+    'crashes': {
+        'builder': 'crashes_panel',
+        'package': 'default',
+        'filters': ['app_version', 'device', 'os_version', 'android_os_version'],
+    },
+    'reviews': {
+        'builder': 'reviews_panel',
+        'package': 'default',
+        'filters': ['device', 'language', 'rating_min', 'rating_max', 'q', 'limit', 'offset'],
+    },
+    'store_performance': {
+        'builder': 'store_performance_panel',
+        'package': 'required',
+        'filters': ['country', 'traffic_source', 'search_term', 'utm_source', 'utm_campaign'],
+    },
+    'cancellations': {
+        'builder': 'cancellations_panel',
+        'package': 'required',
+        'filters': ['country', 'cancellation_reason', 'cancellation_sub_reason', 'subscription_id', 'sku_id'],
+    },
+    'subscriptions': {
+        'builder': 'subscriptions_panel',
+        'package': 'required',
+        'filters': ['country', 'product_id', 'base_plan_id', 'offer_id'],
+    },
+    'revenue': {
+        'builder': 'revenue_panel',
+        'package': 'optional',
+        'filters': ['buyer_country', 'currency', 'source'],
+    },
+    'buyers7d': {
+        'builder': 'buyers7d_panel',
+        'package': 'optional',
+        'filters': ['country', 'acquisition_channel'],
+    },
+}
+
+
+insights_service = InsightsService()
+
+__all__ = ["insights_service", "InsightsService", "PANEL_REGISTRY"]
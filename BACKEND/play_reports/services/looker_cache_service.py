@@ -0,0 +1,77 @@
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class LookerCacheService:
+    """
+    Cache des réponses du connecteur Looker Studio.
+
+    La clé intègre la version des données de la table (DataVersion) : la fin
+    d'une synchronisation incrémente la version, les anciennes entrées ne
+    sont plus jamais lues et expirent d'elles-mêmes (LOOKER_CACHE_TTL).
+    Le cache est une optimisation : une indisponibilité de Redis est
+    journalisée et la requête part sur PostgreSQL.
+    """
+
+    key_prefix = 'looker:v1'
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'LOOKER_CACHE_TTL', 3600)
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, 'LOOKER_CACHE_MAX_BYTES', 5 * 1024 * 1024)
+
+    def build_key(self, tenant_id, table_name, query_params, data_version):
+        """
+        Clé (tenant, table, champs, période, package, page, format...) :
+        l'ensemble des paramètres de la requête, normalisés.
+        """
+        digest = hashlib.sha1(
+            json.dumps(query_params, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"{self.key_prefix}:{tenant_id or 0}:{table_name}:{data_version}:{digest}"
+
+    def get(self, key):
+        try:
+            return cache.get(key)
+        except Exception as e:
+            logger.warning("looker cache: lecture impossible (%s)", e)
+            return None
+
+    def set(self, key, body):
+        try:
+            cache.set(key, body, self.ttl)
+        except Exception as e:
+            logger.warning("looker cache: écriture impossible (%s)", e)
+
+    def tee(self, chunks, key, state):
+        """
+        Relaie un flux de chunks str et le met en cache une fois terminé, si
+        aucune erreur n'a été signalée dans `state` et que la taille reste
+        sous LOOKER_CACHE_MAX_BYTES.
+        """
+        parts = []
+        size = 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size > self.max_bytes:
+                    parts = None
+                else:
+                    parts.append(chunk)
+            yield chunk
+        if parts is not None and not state.get('error'):
+            self.set(key, ''.join(parts))
+
+
+looker_cache_service = LookerCacheService()
+
+__all__ = ["looker_cache_service", "LookerCacheService"]
@@ -0,0 +1,292 @@
+import logging
+import threading
+
+from django.db import connection, models
+
+from play_reports.services.report_registry import default_aggregation, definition_for_model
+from play_reports.services.report_service import REPORT_MODEL_MAPPING, get_model_for_report
+
+logger = logging.getLogger(__name__)
+
+
+# Champs techniques jamais exposés au connecteur
+INTERNAL_FIELDS = {'id', 'tenant', 'created_at', 'updated_at', 'user', 'search_vector'}
+
+# Champs « package » reconnus, par ordre de préférence
+PACKAGE_FIELDS = ('package_name', 'package_id')
+
+# Mode agrégé : fonctions autorisées ; les moyennes ne s'additionnent pas
+AGGREGATIONS = {'sum': 'SUM', 'avg': 'AVG', 'min': 'MIN', 'max': 'MAX', 'count': 'COUNT'}
+
+NUMERIC_FIELDS = (
+    models.IntegerField, models.BigIntegerField, models.SmallIntegerField,
+    models.PositiveIntegerField, models.PositiveBigIntegerField, models.PositiveSmallIntegerField,
+    models.DecimalField, models.FloatField,
+)
+
+
+class LookerQueryError(ValueError):
+    """Paramètre de requête Looker invalide (champ, table ou agrégation)."""
+
+
+class LookerQueryBuilder:
+    """
+    Construit les requêtes du connecteur Looker Studio à partir du _meta des
+    modèles de rapports.
+
+    Toute requête est filtrée par tenant_id (les index (tenant, date) sont
+    utilisés), les colonnes et le champ date sont validés contre le modèle et
+    les identifiants SQL sont quotés par le backend. Les schémas générés sont
+    mis en cache par table pour la durée de vie du processus.
+    """
+
+    def __init__(self):
+        self._specs = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Schéma
+    # ------------------------------------------------------------------
+
+    def table_names(self):
+        """Tables exposables : un modèle par entrée de REPORT_MODEL_MAPPING."""
+        names = []
+        for report_type in REPORT_MODEL_MAPPING:
+            model = get_model_for_report(report_type)
+            if model is not None:
+                names.append(model._meta.model_name)
+        return names
+
+    def get_spec(self, table_name):
+        """Retourne la description (mise en cache) d'une table, ou lève LookerQueryError."""
+        key = (table_name or '').lower()
+        spec = self._specs.get(key)
+        if spec is not None:
+            return spec
+        with self._lock:
+            if not self._specs:
+                for report_type in REPORT_MODEL_MAPPING:
+                    model = get_model_for_report(report_type)
+                    if model is not None:
+                        spec = self._build_spec(model)
+                        self._specs[model._meta.model_name] = spec
+                        self._specs.setdefault(model._meta.db_table.lower(), spec)
+        spec = self._specs.get(key)
+        if spec is None:
+            raise LookerQueryError(f"Table inconnue: {table_name}")
+        return spec
+
+    def _build_spec(self, model):
+        fields = {}
+        date_fields = []
+        for field in model._meta.concrete_fields:
+            if field.name in INTERNAL_FIELDS or isinstance(field, models.JSONField):
+                continue
+            fields[field.name] = {
+                'column': field.column,
+                'schema': self._field_schema(field),
+            }
+            if isinstance(field, (models.DateField, models.DateTimeField)):
+                date_fields.append(field.name)
+
+        # Colonnes par défaut, date et package déclarés au registre des rapports
+        report_type, definition = definition_for_model(model._meta.model_name)
+        definition = definition or {}
+        defaults = [
+            name for name in definition.get('default_fields') or fields if name in fields
+        ]
+        if 'package' in definition:
+            package_field = definition['package']
+        else:
+            package_field = next((name for name in PACKAGE_FIELDS if name in fields), None)
+        default_date = definition.get('date')
+        if default_date not in date_fields:
+            default_date = 'date' if 'date' in date_fields else (date_fields[0] if date_fields else None)
+        return {
+            'model': model,
+            'report_type': report_type,
+            'definition': definition,
+            'table_name': model._meta.model_name,
+            'db_table': model._meta.db_table,
+            'verbose_name': str(model._meta.verbose_name),
+            'fields': fields,
+            'default_fields': defaults,
+            'date_fields': date_fields,
+            'default_date_field': default_date,
+            'package_field': package_field,
+            'schema': [fields[name]['schema'] for name in defaults],
+        }
+
+    def _field_schema(self, field):
+        name = field.name
+        if isinstance(field, models.DateTimeField):
+            schema = self._schema(name, 'STRING', 'DIMENSION', 'YEAR_MONTH_DAY_SECOND')
+        elif isinstance(field, models.DateField):
+            schema = self._schema(name, 'STRING', 'DIMENSION', 'YEAR_MONTH_DAY')
+        elif isinstance(field, models.BooleanField):
+            schema = self._schema(name, 'BOOLEAN', 'DIMENSION')
+        elif isinstance(field, NUMERIC_FIELDS) and not field.choices and not self._is_identifier(name):
+            schema = self._schema(name, 'NUMBER', 'METRIC')
+            schema['semantics']['isReaggregatable'] = 'average' not in name
+        else:
+            schema = self._schema(name, 'NUMBER' if isinstance(field, NUMERIC_FIELDS) else 'STRING', 'DIMENSION')
+        return schema
+
+    def _is_identifier(self, name):
+        return name.endswith(('_id', '_timestamp', '_millis_since_epoch', '_code'))
+
+    def _schema(self, name, data_type, concept_type, semantic_type=None):
+        schema = {
+            'name': name,
+            'dataType': data_type,
+            'semantics': {
+                'conceptType': concept_type
+            }
+        }
+        if semantic_type:
+            schema['semantics']['semanticType'] = semantic_type
+        return schema
+
+    def clear_cache(self):
+        with self._lock:
+            self._specs = {}
+
+    # ------------------------------------------------------------------
+    # Validation
+    # ------------------------------------------------------------------
+
+    def select_fields(self, spec, requested=None):
+        """Colonnes demandées, validées contre le modèle (défaut : colonnes de la table)."""
+        if not requested:
+            return list(spec['default_fields'])
+        if not isinstance(requested, list):
+            raise LookerQueryError("fields doit être une liste")
+        unknown = [name for name in requested if name not in spec['fields']]
+        if unknown:
+            raise LookerQueryError(f"Champs inconnus: {', '.join(map(str, unknown))}")
+        return list(dict.fromkeys(requested))
+
+    def date_field(self, spec, requested=None):
+        if not requested:
+            if spec['default_date_field'] is None:
+                raise LookerQueryError(f"Aucun champ date pour {spec['table_name']}")
+            return spec['default_date_field']
+        if requested not in spec['date_fields']:
+            raise LookerQueryError(f"date_field invalide: {requested}")
+        return requested
+
+    def parse_aggregation(self, spec, query_params):
+        """
+        dimensions : liste de champs ; metrics : liste de noms ou d'objets
+        {"name": ..., "aggregation": "sum|avg|min|max|count"}.
+        Retourne (dimensions, [(métrique, fonction SQL)]).
+        """
+        dimensions = query_params.get('dimensions') or []
+        metrics = query_params.get('metrics') or []
+        if not isinstance(dimensions, list) or not isinstance(metrics, list):
+            raise LookerQueryError("dimensions et metrics doivent être des listes")
+
+        concept_types = {
+            name: field['schema']['semantics']['conceptType'] for name, field in spec['fields'].items()
+        }
+        for dimension in dimensions:
+            if concept_types.get(dimension) != 'DIMENSION':
+                raise LookerQueryError(f"Dimension inconnue: {dimension}")
+
+        parsed_metrics = []
+        for metric in metrics:
+            if isinstance(metric, dict):
+                name = metric.get('name')
+                aggregation = (metric.get('aggregation') or '').lower()
+            else:
+                name, aggregation = metric, ''
+            if concept_types.get(name) != 'METRIC':
+                raise LookerQueryError(f"Métrique inconnue: {name}")
+            if not aggregation:
+                aggregation = default_aggregation(spec['definition'], name)
+            if aggregation not in AGGREGATIONS:
+                raise LookerQueryError(f"Agrégation non supportée: {aggregation}")
+            parsed_metrics.append((name, AGGREGATIONS[aggregation]))
+
+        if not parsed_metrics:
+            raise LookerQueryError("Au moins une métrique est requise en mode agrégé")
+        return list(dict.fromkeys(dimensions)), parsed_metrics
+
+    # ------------------------------------------------------------------
+    # SQL
+    # ------------------------------------------------------------------
+
+    def build(self, spec, tenant_id, fields, date_field, start_date=None, end_date=None,
+              package_name=None, keyset=None, limit=1000, offset=0, aggregation=None,
+              with_keys=True):
+        """
+        Retourne (sql, params). `aggregation` vaut (dimensions, métriques) en
+        mode agrégé ; sinon l'id est sélectionné pour la pagination par clé
+        (sauf with_keys=False, exports). limit=None lit toute la période.
+        """
+        if tenant_id is None:
+            raise LookerQueryError("Aucun tenant associé à cet utilisateur")
+
+        qn = connection.ops.quote_name
+        column = lambda name: qn(spec['fields'][name]['column'])
+        date_column = column(date_field)
+
+        if aggregation:
+            dimensions, metrics = aggregation
+            select = [f"{column(name)} AS {qn(name)}" for name in dimensions]
+            select += [f"{function}({column(name)}) AS {qn(name)}" for name, function in metrics]
+        elif with_keys:
+            # (date, id) toujours lus : ils forment le curseur de la page suivante
+            keys = fields if date_field in fields else fields + [date_field]
+            select = [f"{column(name)} AS {qn(name)}" for name in keys] + [qn('id')]
+        else:
+            select = [f"{column(name)} AS {qn(name)}" for name in fields]
+
+        where = [f"{qn('tenant_id')} = %s"]
+        params = [tenant_id]
+        # Les bornes portent sur le jour : un champ datetime est comparé à sa date
+        date_expr = date_column
+        if spec['fields'][date_field]['schema']['semantics'].get('semanticType') == 'YEAR_MONTH_DAY_SECOND':
+            date_expr = f"{date_column}::date"
+        if start_date:
+            where.append(f"{date_expr} >= %s")
+            params.append(start_date)
+        if end_date:
+            where.append(f"{date_expr} <= %s")
+            params.append(end_date)
+        if package_name:
+            if not spec['package_field']:
+                raise LookerQueryError(f"package_name non disponible pour {spec['table_name']}")
+            where.append(f"{column(spec['package_field'])} = %s")
+            params.append(package_name)
+
+        if aggregation:
+            dimensions, _ = aggregation
+            order_by = [
+                f"{column(name)} DESC" if name == date_field else column(name) for name in dimensions
+            ]
+            tail = ''
+            if dimensions:
+                tail = f" GROUP BY {', '.join(column(name) for name in dimensions)}" \
+                       f" ORDER BY {', '.join(order_by)}"
+        else:
+            # Pagination par clé (date, id) : coût constant quelle que soit la page.
+            if keyset:
+                where.append(f"({date_column}, {qn('id')}) < (%s, %s)")
+                params.extend(keyset)
+                offset = 0
+            tail = f" ORDER BY {date_column} DESC, {qn('id')} DESC"
+
+        sql = (
+            f"SELECT {', '.join(select)} FROM {qn(spec['db_table'])}"
+            f" WHERE {' AND '.join(where)}{tail}"
+        )
+        if limit is not None:
+            sql += " LIMIT %s OFFSET %s"
+            params.extend([limit, offset])
+        return sql, params
+
+
+looker_query_builder = LookerQueryBuilder()
+
+__all__ = ["looker_query_builder", "LookerQueryBuilder", "LookerQueryError", "AGGREGATIONS"]
@@ -0,0 +1,437 @@
+import datetime
+import json
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from play_reports.services.dimension_encoding_service import dimension_encoding_service
+
+logger = logging.getLogger(__name__)
+
+
+# Tables de faits partitionnées par mois : {table: colonne de partitionnement}
+PARTITIONED_TABLES = {
+    'google_play_installs_overview': 'date',
+    'google_play_installs_dimensioned': 'date',
+    'google_play_crashes_overview': 'date',
+    'google_play_crashes_dimensioned': 'date',
+    'google_play_ratings_overview': 'date',
+    'google_play_ratings_dimensioned': 'date',
+    'google_play_earnings': 'transaction_date',
+}
+
+_COLUMNS_RE = re.compile(r'^(UNIQUE|PRIMARY KEY)\s*\((.*)\)(.*)$', re.S)
+
+
+class PartitionService:
+    """
+    Partitionnement déclaratif PostgreSQL (RANGE mensuel) des grosses tables
+    de rapports.
+
+    Chaque table partitionnée a une partition par mois (`<table>_pYYYYMM`)
+    et une partition DEFAULT qui recueille les lignes hors plage ; ces
+    lignes sont déplacées dans leur partition mensuelle par `refresh`
+    (étape post-synchronisation). Les requêtes filtrées sur la date
+    n'ouvrent que les partitions de la période (élagage à la planification),
+    et un mois ré-importé peut être remplacé d'un bloc (`swap_month`).
+
+    Contraintes PostgreSQL : la clé primaire et les contraintes d'unicité
+    incluent la colonne de partitionnement (ajoutée si absente) ; l'id
+    reste alimenté par une séquence propre à la table parente.
+    """
+
+    @property
+    def months_ahead(self):
+        return getattr(settings, 'PARTITION_MONTHS_AHEAD', 3)
+
+    # ------------------------------------------------------------------
+    # Utilitaires
+    # ------------------------------------------------------------------
+
+    def _qn(self, name):
+        return connection.ops.quote_name(name)
+
+    def month_start(self, value):
+        return datetime.date(value.year, value.month, 1)
+
+    def next_month(self, month):
+        return datetime.date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+    def partition_name(self, table, month):
+        return f"{table}_p{month:%Y%m}"
+
+    def default_partition_name(self, table):
+        return f"{table}_default"
+
+    def partition_column(self, table):
+        column = PARTITIONED_TABLES.get(table)
+        if column is None:
+            raise ValueError(f"Table non partitionnable: {table}")
+        return column
+
+    def storage_table(self, table):
+        """Table parente physique (`<table>_facts` pour une table encodée par dictionnaire)."""
+        return dimension_encoding_service.storage_table(table)
+
+    def is_partitioned(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [self.storage_table(table)])
+            row = cursor.fetchone()
+        return bool(row) and row[0] == 'p'
+
+    def _months_between(self, first, last):
+        month = self.month_start(first)
+        last = self.month_start(last)
+        while month <= last:
+            yield month
+            month = self.next_month(month)
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+
+    def _table_definition(self, cursor, table):
+        """Index et contraintes (unicité, clés étrangères) à recréer sur la table parente."""
+        cursor.execute("""
+            SELECT conname, contype, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype IN ('u', 'f')
+            ORDER BY contype DESC, conname
+        """, [table])
+        constraints = cursor.fetchall()
+        cursor.execute("""
+            SELECT i.indexname, i.indexdef
+            FROM pg_indexes i
+            WHERE i.tablename = %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint c
+                  WHERE c.conindid = to_regclass(quote_ident(i.schemaname) || '.' || quote_ident(i.indexname))
+              )
+            ORDER BY i.indexname
+        """, [table])
+        indexes = cursor.fetchall()
+        return constraints, indexes
+
+    def _with_partition_column(self, definition, column):
+        """Ajoute la colonne de partitionnement à une contrainte d'unicité."""
+        match = _COLUMNS_RE.match(definition)
+        if not match:
+            return definition
+        columns = [name.strip() for name in match.group(2).split(',')]
+        if column not in [name.strip('"') for name in columns]:
+            columns.append(self._qn(column))
+        return f"{match.group(1)} ({', '.join(columns)}){match.group(3)}"
+
+    def convert(self, table):
+        """
+        Convertit une table en table partitionnée par mois (transaction unique) :
+        renommage, création de la parente, partitions couvrant les données
+        existantes et les mois à venir, copie, puis index et contraintes.
+        """
+        column = self.partition_column(table)
+        if self.is_partitioned(table):
+            logger.info("partition: %s déjà partitionnée", table)
+            return False
+        if dimension_encoding_service.is_encoded(table):
+            raise ValueError(f"{table} est encodée par dictionnaire : la partitionner avant l'encodage")
+
+        legacy = f"{table}_legacy"
+        sequence = f"{table}_id_seq"
+        qn = self._qn
+        with transaction.atomic(), connection.cursor() as cursor:
+            constraints, indexes = self._table_definition(cursor, table)
+            cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+            cursor.execute(f"SELECT MIN({qn(column)}), MAX({qn(column)}), COALESCE(MAX(id), 0) FROM {qn(table)}")
+            first, last, max_id = cursor.fetchone()
+
+            cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+            # L'identité (ou la séquence serial) de l'ancienne table est libérée :
+            # la parente reçoit sa propre séquence sous le même nom.
+            cursor.execute(f"ALTER TABLE {qn(legacy)} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+            cursor.execute(f"ALTER TABLE {qn(legacy)} ALTER COLUMN id DROP DEFAULT")
+            cursor.execute(f"DROP SEQUENCE IF EXISTS {qn(sequence)}")
+            cursor.execute(
+                f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS "
+                f"INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS) "
+                f"PARTITION BY RANGE ({qn(column)})"
+            )
+            cursor.execute(f"CREATE SEQUENCE {qn(sequence)}")
+            cursor.execute(f"ALTER SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id")
+            cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)", [sequence])
+            cursor.execute("SELECT setval(%s::regclass, %s, %s)", [sequence, max(max_id, 1), max_id > 0])
+
+            today = datetime.date.today()
+            first = first or today
+            horizon = self.next_month(self.month_start(today))
+            for _ in range(self.months_ahead - 1):
+                horizon = self.next_month(horizon)
+            for month in self._months_between(first, max(last or today, horizon)):
+                self._create_partition(cursor, table, month)
+            cursor.execute(
+                f"CREATE TABLE {qn(self.default_partition_name(table))} PARTITION OF {qn(table)} DEFAULT"
+            )
+
+            cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}")
+            cursor.execute(f"DROP TABLE {qn(legacy)}")
+
+            # Index et contraintes créés après la copie (et après la suppression
+            # de l'ancienne table, dont ils reprennent les noms)
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(column)})")
+            for name, contype, definition in constraints:
+                if contype == 'u':
+                    definition = self._with_partition_column(definition, column)
+                cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+            for name, definition in indexes:
+                cursor.execute(definition)
+
+        logger.info("partition: %s convertie (%s -> %s)", table, first, last)
+        return True
+
+    def convert_all(self, tables=None):
+        return [table for table in (tables or PARTITIONED_TABLES) if self.convert(table)]
+
+    # ------------------------------------------------------------------
+    # Maintenance des partitions
+    # ------------------------------------------------------------------
+
+    def _create_partition(self, cursor, table, month):
+        qn = self._qn
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {qn(self.partition_name(table, month))} "
+            f"PARTITION OF {qn(self.storage_table(table))} FOR VALUES FROM (%s) TO (%s)",
+            [month, self.next_month(month)]
+        )
+
+    def existing_months(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT c.relname
+                FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass
+            """, [self.storage_table(table)])
+            names = [row[0] for row in cursor.fetchall()]
+        prefix = f"{table}_p"
+        return {
+            datetime.datetime.strptime(name[len(prefix):], '%Y%m').date()
+            for name in names if name.startswith(prefix) and name[len(prefix):].isdigit()
+        }
+
+    def ensure_partitions(self, table, months_ahead=None):
+        """Crée les partitions du mois courant et des mois à venir."""
+        months_ahead = self.months_ahead if months_ahead is None else months_ahead
+        month = self.month_start(datetime.date.today())
+        months = [month]
+        for _ in range(months_ahead):
+            month = self.next_month(month)
+            months.append(month)
+        return self._add_months(table, [m for m in months if m not in self.existing_months(table)])
+
+    def split_default(self, table):
+        """Déplace les lignes de la partition DEFAULT vers des partitions mensuelles."""
+        column = self.partition_column(table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT DISTINCT date_trunc('month', {self._qn(column)})::date "
+                f"FROM {self._qn(self.default_partition_name(table))}"
+            )
+            months = sorted(row[0] for row in cursor.fetchall())
+        return self._add_months(table, months)
+
+    def _add_months(self, table, months):
+        """
+        Ajoute des partitions mensuelles. Les lignes du mois déjà présentes
+        dans la partition DEFAULT y sont d'abord déplacées (PostgreSQL refuse
+        sinon la création).
+        """
+        column = self.partition_column(table)
+        default = self.default_partition_name(table)
+        storage = self.storage_table(table)
+        qn = self._qn
+        created = []
+        for month in months:
+            bounds = [month, self.next_month(month)]
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT EXISTS (SELECT 1 FROM {qn(default)} "
+                    f"WHERE {qn(column)} >= %s AND {qn(column)} < %s)", bounds
+                )
+                if not cursor.fetchone()[0]:
+                    self._create_partition(cursor, table, month)
+                else:
+                    name = self.partition_name(table, month)
+                    cursor.execute(f"ALTER TABLE {qn(storage)} DETACH PARTITION {qn(default)}")
+                    self._create_partition(cursor, table, month)
+                    cursor.execute(
+                        f"WITH moved AS (DELETE FROM {qn(default)} "
+                        f"WHERE {qn(column)} >= %s AND {qn(column)} < %s RETURNING *) "
+                        f"INSERT INTO {qn(name)} SELECT * FROM moved", bounds
+                    )
+                    cursor.execute(f"ALTER TABLE {qn(storage)} ATTACH PARTITION {qn(default)} DEFAULT")
+            created.append(month)
+        if created:
+            logger.info("partition: %s +%s partition(s)", table, len(created))
+        return created
+
+    def refresh(self, tenant_id, table_name):
+        """
+        Étape post-synchronisation : partitions à venir et reclassement des
+        lignes tombées dans la partition DEFAULT. Sans effet sur une table
+        non partitionnée.
+        """
+        table = (table_name or '').lower()
+        if table not in PARTITIONED_TABLES or not self.is_partitioned(table):
+            return []
+        return self.ensure_partitions(table) + self.split_default(table)
+
+    def ensure_all(self):
+        return {
+            table: self.ensure_partitions(table) + self.split_default(table)
+            for table in PARTITIONED_TABLES if self.is_partitioned(table)
+        }
+
+    # ------------------------------------------------------------------
+    # Ré-import d'un mois
+    # ------------------------------------------------------------------
+
+    def _month_tenants(self, cursor, relation, column, month):
+        cursor.execute(
+            f"SELECT DISTINCT tenant_id FROM {self._qn(relation)} "
+            f"WHERE {self._qn(column)} >= %s AND {self._qn(column)} < %s",
+            [month, self.next_month(month)]
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def create_staging(self, table, month, tenant_id=None):
+        """
+        Crée une table de chargement pour un mois, avec la contrainte CHECK
+        de la plage : l'attachement ultérieur n'a pas à re-vérifier les lignes.
+
+        Pour le ré-import d'un seul tenant (`tenant_id`), les lignes du mois
+        des autres tenants y sont copiées : la partition remplacée les
+        contient aussi. Sans tenant, la table est vide et doit recevoir les
+        lignes de tous les tenants. Retourne (table de chargement, lignes copiées).
+        """
+        column = self.partition_column(table)
+        month = self.month_start(month)
+        staging = f"{self.partition_name(table, month)}_staging"
+        storage = self.storage_table(table)
+        qn = self._qn
+        copied = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {qn(staging)}")
+            cursor.execute(
+                f"CREATE TABLE {qn(staging)} (LIKE {qn(storage)} "
+                f"INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            )
+            cursor.execute(
+                f"ALTER TABLE {qn(staging)} ADD CONSTRAINT {qn(staging + '_range')} "
+                f"CHECK ({qn(column)} >= %s AND {qn(column)} < %s)",
+                [month, self.next_month(month)]
+            )
+            if tenant_id is not None:
+                cursor.execute(
+                    f"INSERT INTO {qn(staging)} SELECT * FROM {qn(storage)} "
+                    f"WHERE {qn(column)} >= %s AND {qn(column)} < %s AND tenant_id <> %s",
+                    [month, self.next_month(month), tenant_id]
+                )
+                copied = cursor.rowcount
+        return staging, copied
+
+    def swap_month(self, table, month, staging, tenant_id=None):
+        """
+        Remplace la partition d'un mois par une table de chargement
+        (DETACH / ATTACH dans une transaction) ; l'ancienne partition est supprimée.
+
+        La partition contient les lignes de tous les tenants : le remplacement
+        est refusé si un tenant présent dans le mois (hors `tenant_id`, le
+        tenant ré-importé) est absent de la table de chargement.
+        """
+        column = self.partition_column(table)
+        month = self.month_start(month)
+        name = self.partition_name(table, month)
+        storage = self.storage_table(table)
+        qn = self._qn
+        with transaction.atomic(), connection.cursor() as cursor:
+            missing = (
+                self._month_tenants(cursor, storage, column, month)
+                - self._month_tenants(cursor, staging, column, month)
+                - {tenant_id}
+            )
+            if missing:
+                raise ValueError(
+                    f"{staging} ne couvre pas les tenants {', '.join(map(str, sorted(missing)))} "
+                    f"présents en {month:%Y-%m} (voir create_staging)"
+                )
+            if month in self.existing_months(table):
+                cursor.execute(f"ALTER TABLE {qn(storage)} DETACH PARTITION {qn(name)}")
+                cursor.execute(f"DROP TABLE {qn(name)}")
+            else:
+                # Lignes du mois tombées dans DEFAULT : remplacées par la table de chargement
+                cursor.execute(
+                    f"DELETE FROM {qn(self.default_partition_name(table))} "
+                    f"WHERE {qn(column)} >= %s AND {qn(column)} < %s",
+                    [month, self.next_month(month)]
+                )
+            cursor.execute(
+                f"ALTER TABLE {qn(storage)} ATTACH PARTITION {qn(staging)} FOR VALUES FROM (%s) TO (%s)",
+                [month, self.next_month(month)]
+            )
+            cursor.execute(f"ALTER TABLE {qn(staging)} RENAME TO {qn(name)}")
+            cursor.execute(f"ALTER TABLE {qn(name)} DROP CONSTRAINT IF EXISTS {qn(staging + '_range')}")
+        logger.info("partition: %s %s remplacée", table, name)
+        return name
+
+    # ------------------------------------------------------------------
+    # Observabilité
+    # ------------------------------------------------------------------
+
+    def status(self, table):
+        """Partitions d'une table avec leurs bornes et leur volume estimé."""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint,
+                       pg_total_relation_size(c.oid)
+                FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass
+                ORDER BY c.relname
+            """, [self.storage_table(table)])
+            return [
+                {'partition': name, 'bounds': bounds, 'rows': max(rows, 0), 'bytes': size}
+                for name, bounds, rows, size in cursor.fetchall()
+            ]
+
+    def explain_pruning(self, table, tenant_id, start, end):
+        """
+        EXPLAIN d'une lecture (tenant, période) : partitions effectivement
+        parcourues parmi l'ensemble des partitions de la table.
+        """
+        column = self.partition_column(table)
+        qn = self._qn
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"EXPLAIN (FORMAT JSON) SELECT COUNT(*) FROM {qn(table)} "
+                f"WHERE tenant_id = %s AND {qn(column)} >= %s AND {qn(column)} <= %s",
+                [tenant_id, start, end]
+            )
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        scanned = set()
+
+        def walk(node):
+            if node.get('Relation Name'):
+                scanned.add(node['Relation Name'])
+            for child in node.get('Plans', []):
+                walk(child)
+
+        walk(plan[0]['Plan'])
+        total = len(self.status(table))
+        return {'table': table, 'scanned': sorted(scanned), 'partitions': total}
+
+
+partition_service = PartitionService()
+
+__all__ = ["partition_service", "PartitionService", "PARTITIONED_TABLES"]
@@ -31,6 +31,22 @@ from play_reports.models import FileTracking
 import hashlib
 from play_reports.services.gcs_service import GCSService 
 from play_reports.services.csv_service import CSVService 
+from play_reports.services.dimension_dictionary_service import dimension_dictionary_service
+from play_reports.services.data_version_service import data_version_service
+from play_reports.services.partition_service import partition_service
+from play_reports.services.dimension_encoding_service import dimension_encoding_service
+from play_reports.services.reviews_loader_service import reviews_loader_service
+from play_reports.services.acquisition_loader_service import acquisition_loader_service
+from play_reports.services.review_sentiment_service import review_sentiment_service
+from play_reports.services.estimated_sales_loader_service import estimated_sales_loader_service
+from play_reports.services.revenue_fact_service import revenue_fact_service
+from play_reports.services.subscription_cohort_service import subscription_cohort_service
+from play_reports.services.crash_rate_service import crash_rate_service
+from play_reports.services.store_funnel_service import store_funnel_service
+from play_reports.services.metric_sketch_service import metric_sketch_service
+from play_reports.services.anomaly_service import anomaly_service
+from play_reports.services.forecast_service import forecast_service
+from play_reports.services.report_registry import model_name
 # Configuration du logger principal
 
 import logging
@@ -86,28 +102,63 @@ class ProcessBucketService:
 
         logger.info(f"Service initialisé pour le tenant {self.tenant_id}, DataSource {getattr(data_source, 'id', 'inconnu')}")
 
+        # Tables ayant reçu des lignes pendant la synchronisation en cours
+        self.touched_tables = set()
+
+        # Étapes exécutées en fin de synchronisation, une fois par table alimentée.
+        # Signature: stage(tenant_id, table_name)
+        self.post_sync_stages = [
+            partition_service.refresh,
+            dimension_dictionary_service.refresh,
+            review_sentiment_service.refresh,
+            revenue_fact_service.refresh,
+            subscription_cohort_service.refresh,
+            crash_rate_service.refresh,
+            store_funnel_service.refresh,
+            metric_sketch_service.refresh,
+            anomaly_service.refresh,
+            forecast_service.refresh,
+            data_version_service.bump,
+        ]
+
+        # Chargeurs dédiés, sélectionnés par la clé 'loader' du mapping.
+        # Signature: loader(rows, tenant_id, report_info) -> (table, insérés, mis à jour)
+        self.loaders = {
+            'reviews': reviews_loader_service.load_report,
+            'acquisition': acquisition_loader_service.load_report,
+        }
+
+        # Chargeurs de fichier entier (COPY en flux), sélectionnés par la clé 'file_loader'.
+        # Signature: loader(local_path, tenant_id, report_info) -> (table, insérés, mis à jour)
+        self.file_loaders = {
+            'estimated_sales': estimated_sales_loader_service.load_report,
+        }
+
+        # Tables cibles : modèles déclarés au registre des rapports (report_registry)
         self.file_to_table_mapping = [
             # Reviews
             {
                 'regex': r'^reviews/reviews_([\w\.]+)_(\d{6})\.csv$',
-                'table': 'google_play_reviews',
+                'table': model_name('reviews'),
                 'type': 'csv',
                 'report_type': 'reviews',
+                'loader': 'reviews',
                 'capture_groups': {'app_package': 1, 'report_period': 2}
             },
-            # Sales
+            # Sales (ventes estimées, une ligne par commande)
             {
                 'regex': r'^sales/salesreport_(\d{6})\.zip$',
-                'table': 'google_play_sales',
+                'table': model_name('estimated_sales'),
                 'type': 'zip',
                 'inner_csv_regex': r'^salesreport_\d{6}\.csv$',
-                'report_type': 'sales',
+                'report_type': 'estimated_sales',
+                'file_loader': 'estimated_sales',
                 'capture_groups': {'report_period': 1}
             },
             # Earnings
             {
                 'regex': r'^earnings/earnings_(\d{6})\.zip$',
-                'table': 'google_play_earnings',
+                'table': model_name('earnings'),
                 'type': 'zip',
                 'inner_csv_regex': r'^earnings_\d{6}\.csv$',
                 'report_type': 'earnings',
@@ -116,7 +167,7 @@ class ProcessBucketService:
             # Invoice Billing
             {
                 'regex': r'^invoice_billing_reports/invoice_billing_report_(\d{6})\.zip$',
-                'table': 'google_play_invoice',
+                'table': model_name('invoice'),
                 'type': 'zip',
                 'inner_csv_regex': r'^invoice_billing_report_\d{6}\.csv$',
                 'report_type': 'invoice_billing',
@@ -134,8 +185,8 @@ class ProcessBucketService:
             # Installs
             {
                 'regex': r'^stats/installs/installs_([\w\.]+)_(\d{6})(?:_(overview|country|device|app_version|carrier|language|os_version))?\.csv$',
-                'table_overview': 'google_play_installs_overview',
-                'table_dimensioned': 'google_play_installs_dimensioned',
+                'table_overview': model_name('installs_overview'),
+                'table_dimensioned': model_name('installs_dimensioned'),
                 'type': 'csv',
                 'report_type': 'installs',
                 'capture_groups': {
@@ -147,8 +198,8 @@ class ProcessBucketService:
             # Crashes
             {
                 'regex': r'^stats/crashes/crashes_([\w\.]+)_(\d{6})(?:_(overview|app_version|device|os_version|android_os_version))?\.csv$',
-                'table_overview': 'google_play_crashes_overview',
-                'table_dimensioned': 'google_play_crashes_dimensioned',
+                'table_overview': model_name('crashes_overview'),
+                'table_dimensioned': model_name('crashes_dimensioned'),
                 'type': 'csv',
                 'report_type': 'crashes',
                 'capture_groups': {
@@ -160,8 +211,8 @@ class ProcessBucketService:
             # Ratings
             {
                 'regex': r'^stats/ratings/ratings_([\w\.]+)_(\d{6})(?:_(overview|country|device|app_version|carrier|language|os_version|android_os_version))?\.csv$',
-                'table_overview': 'google_play_ratings_overview',
-                'table_dimensioned': 'google_play_ratings_dimensioned',
+                'table_overview': model_name('ratings_overview'),
+                'table_dimensioned': model_name('ratings_dimensioned'),
                 'type': 'csv',
                 'report_type': 'ratings',
                 'capture_groups': {'app_package': 1, 'report_period': 2, 'suffix': 3}
@@ -169,8 +220,8 @@ class ProcessBucketService:
             # Ratings v2
             {
                 'regex': r'^stats/ratings_v2/ratings_v2_([\w\.]+)_(\d{6})(?:_(overview|country|device|app_version|carrier|language|os_version|android_os_version))?\.csv$',
-                'table_overview': 'google_play_ratings_overview',
-                'table_dimensioned': 'google_play_ratings_dimensioned',
+                'table_overview': model_name('ratings_overview'),
+                'table_dimensioned': model_name('ratings_dimensioned'),
                 'type': 'csv',
                 'report_type': 'ratings_v2',
                 'capture_groups': {'app_package': 1, 'report_period': 2, 'suffix': 3}
@@ -178,8 +229,8 @@ class ProcessBucketService:
             # Subscriptions
             {
                 'regex': r'^financial-stats/subscriptions/subscriptions_([\w\.]+)_([\w\-]+)_(\d{6})(?:_(overview|country))?\.csv$',
-                'table_overview': 'google_play_subscriptions_overview',
-                'table_dimensioned': 'google_play_subscriptions_dimensioned',
+                'table_overview': model_name('subscriptions_overview'),
+                'table_dimensioned': model_name('subscriptions_dimensioned'),
                 'type': 'csv',
                 'report_type': 'subscriptions',
                 'capture_groups': {'app_package': 1, 'subscription_id': 2, 'report_period': 3, 'suffix': 4}
@@ -187,8 +238,8 @@ class ProcessBucketService:
             # Store Performance
             {
                 'regex': r'^stats/store_performance/store_performance_([\w\.]+)_(\d{6})(?:_(overview|country|traffic_source|search_term))?\.csv$',
-                'table_overview': 'google_play_store_performance_overview',
-                'table_dimensioned': 'google_play_store_performance_dimensioned',
+                'table_overview': model_name('store_performance_overview'),
+                'table_dimensioned': model_name('store_performance_dimensioned'),
                 'type': 'csv',
                 'report_type': 'store_performance',
                 'capture_groups': {'app_package': 1, 'report_period': 2, 'suffix': 3}
@@ -196,7 +247,7 @@ class ProcessBucketService:
             # Subscription Cancellation
             {
                 'regex': r'^financial-stats/subscription_cancellation_reasons/subscription_cancellation_reasons_([\w\.]+)_([\w\-]+)_(\d{6})\.csv$',
-                'table': 'google_play_subscription_cancellation_reasons',
+                'table': model_name('subscription_cancellations'),
                 'type': 'csv',
                 'report_type': 'subscription_cancellation_reasons',
                 'capture_groups': {'app_package': 1, 'subscription_id': 2, 'report_period': 3}
@@ -204,10 +255,30 @@ class ProcessBucketService:
             # Promotional Content
             {
                 'regex': r'^promotional_content/promotional_content_([\w\.]+)_(\d{6})\.csv$',
-                'table': 'google_play_promotional_content',
+                'table': model_name('promotional_content'),
                 'type': 'csv',
                 'report_type': 'promotional_content',
                 'capture_groups': {'app_package': 1, 'report_period': 2}
+            },
+            # Retained Installers (acquisition)
+            {
+                'regex': r'^acquisition/retained_installers/retained_installers_([\w\.]+)_(\d{6})(?:_(overview|channel|country|play_country|utm_source|utm_campaign|keyword))?\.csv$',
+                'table_overview': model_name('retained_installers_overview'),
+                'table_dimensioned': model_name('retained_installers_dimensioned'),
+                'type': 'csv',
+                'report_type': 'retained_installers',
+                'loader': 'acquisition',
+                'capture_groups': {'app_package': 1, 'report_period': 2, 'suffix': 3}
+            },
+            # Buyers 7d (acquisition)
+            {
+                'regex': r'^acquisition/buyers_7d/buyers_7d_([\w\.]+)_(\d{6})(?:_(overview|channel|country|play_country|utm_source|utm_campaign|keyword))?\.csv$',
+                'table_overview': model_name('buyers_7d_overview'),
+                'table_dimensioned': model_name('buyers_7d_dimensioned'),
+                'type': 'csv',
+                'report_type': 'buyers_7d',
+                'loader': 'acquisition',
+                'capture_groups': {'app_package': 1, 'report_period': 2, 'suffix': 3}
             }
         ]
 
@@ -256,7 +327,8 @@ class ProcessBucketService:
 
                 self.log_debug(f"[_get_report_info]   Info extraite: appPackage={info['appPackage']}, reportPeriod={info['reportPeriod']}, suffix={info['suffix']}")
 
-                dimension_suffixes = ("country", "device", "traffic_source", "os_version", "android_os_version", "app_version", "carrier", "language")
+                dimension_suffixes = ("country", "device", "traffic_source", "os_version", "android_os_version", "app_version", "carrier", "language",
+                                      "channel", "play_country", "utm_source", "utm_campaign", "keyword")
                 is_dimensioned = info["suffix"] in dimension_suffixes
                 is_overview = not is_dimensioned and (info["suffix"] == "overview" or info["suffix"] is None)
 
@@ -339,6 +411,10 @@ class ProcessBucketService:
         logging.info(f"process_csv_data: Début pour CSV: {local_path} -> Table: {report_info['preferredTableName']}")
         total_rows_inserted = 0
 
+        file_loader = report_info.get("mapping", {}).get("file_loader")
+        if file_loader:
+            return await self.load_file(file_loader, local_path, report_info)
+
         try:
             logging.info(f"process_csv_data: Appel de csv_service.process_by_batches pour {local_path}")
 
@@ -410,7 +486,7 @@ class ProcessBucketService:
             "message": "Analyse du bucket en cours...",
             "progress": 5
         })
-         files = await gcs_service.list_csv_files(gcs_uri)
+         files = await gcs_service.list_report_files(gcs_uri)
          total_files_count = len(files)
          self.log_stats(f"📁 {total_files_count} fichiers trouvés dans le bucket")
 
@@ -479,6 +555,8 @@ class ProcessBucketService:
                 })
                  error_count += 1
 
+         await self.run_post_sync_stages()
+
          duration = round(time.time() - start_time)
          success_rate = round((processed_count / total_files_count) * 100) if total_files_count else 0
          self.log_stats(f"✅ SYNCHRONISATION TERMINÉE en {duration}s")
@@ -568,14 +646,14 @@ class ProcessBucketService:
             file_type = report_info.get("fileType")
             if file_type == "zip":
                 temp_extract_dir = tempfile.mkdtemp(prefix="extract_")
-                with ZipFile(local_path, 'r') as zip_ref:
+                with zipfile.ZipFile(local_path, 'r') as zip_ref:
                     zip_ref.extractall(temp_extract_dir)
 
                 csv_found = False
-                for entry in os.listdir(temp_extract_dir):
+                regex = re.compile(mapping.get("inner_csv_regex") or r'\.csv$', re.IGNORECASE)
+                for entry in sorted(os.listdir(temp_extract_dir)):
                     entry_path = os.path.join(temp_extract_dir, entry)
-                    regex = mapping.get("innerCsvRegex")
-                    if regex and regex.search(entry):
+                    if regex.search(entry):
                         logger.info(f"Fichier CSV interne trouvé : {entry_path}")
                         total_rows_processed = await self.process_csv_data(entry_path, report_info)
                         csv_found = True
@@ -830,7 +908,45 @@ class ProcessBucketService:
     def _update_sync_history_sync(self, sync_history, updates):
         sync_history.save(update_fields=list(updates.keys()))
 
+    async def load_batch(self, loader_name, rows_batch, table_name, report_info):
+        """Délègue un lot à un chargeur dédié (ex: avis) au lieu de prepare_row_data."""
+        loader = self.loaders.get(loader_name)
+        if loader is None:
+            logger.error(f"load_batch: chargeur '{loader_name}' inconnu pour {table_name}")
+            return 0
+
+        tenant_id = report_info.get("tenantId") or self.tenant_id
+        rows = [row for row in rows_batch if isinstance(row, dict)]
+        try:
+            # Le chargeur peut choisir une autre table que celle du mapping (overview/dimensionnée)
+            written_table, inserted, updated = await sync_to_async(loader)(rows, tenant_id, report_info)
+        except Exception as e:
+            logger.error(f"load_batch: erreur du chargeur '{loader_name}' pour {table_name}: {e}")
+            return 0
+
+        # Aucune ligne nouvelle ou modifiée : les étapes post-sync ne sont pas relancées
+        if inserted or updated:
+            self.touched_tables.add(written_table)
+        return inserted + updated
+
+    async def load_file(self, loader_name, local_path, report_info):
+        """Délègue un fichier entier à un chargeur en flux (ex: ventes estimées)."""
+        loader = self.file_loaders.get(loader_name)
+        if loader is None:
+            raise ValueError(f"load_file: chargeur '{loader_name}' inconnu pour {report_info['preferredTableName']}")
+
+        tenant_id = report_info.get("tenantId") or self.tenant_id
+        # Une erreur remonte à process_file : le fichier est marqué en échec et rejoué
+        written_table, inserted, updated = await sync_to_async(loader)(local_path, tenant_id, report_info)
+        if inserted or updated:
+            self.touched_tables.add(written_table)
+        return inserted + updated
+
     async def insert_batch(self, rows_batch, table_name, report_info):
+        loader_name = report_info.get("mapping", {}).get("loader")
+        if loader_name:
+            return await self.load_batch(loader_name, rows_batch, table_name, report_info)
+
         try:
             ModelClass = apps.get_model('play_reports', table_name)
         except LookupError:
@@ -871,12 +987,31 @@ class ProcessBucketService:
             return 0
 
         try:
-            await ModelClass.objects.abulk_create(objects_to_create, ignore_conflicts=True)
+            # bulk_create, ou insertion dans <table>_facts pour une table encodée par dictionnaire
+            await sync_to_async(dimension_encoding_service.bulk_insert)(
+                ModelClass, objects_to_create, ignore_conflicts=True
+            )
+            self.touched_tables.add(table_name)
             logger.info(f"insert_batch: {len(objects_to_create)} lignes insérées pour {table_name}")
             return len(objects_to_create)
         except Exception as e:
             logger.error(f"insert_batch: erreur lors de l'insertion: {e}")
             return 0
+    async def run_post_sync_stages(self):
+        """
+        Exécute les étapes de post-traitement (dictionnaire de dimensions, ...)
+        pour chaque table alimentée pendant la synchronisation.
+        Une étape en échec est journalisée sans faire échouer la synchronisation.
+        """
+        for table_name in sorted(self.touched_tables):
+            for stage in self.post_sync_stages:
+                stage_name = getattr(stage, '__name__', str(stage))
+                try:
+                    await sync_to_async(stage)(self.tenant_id, table_name)
+                    logger.info(f"run_post_sync_stages: {stage_name} terminé pour {table_name}")
+                except Exception as stage_error:
+                    logger.error(f"run_post_sync_stages: {stage_name} échoué pour {table_name}: {stage_error}", exc_info=True)
+
     def log_stats(*args):
      logger.info("[PBS_STATS] " + " ".join(map(str, args)))        
 
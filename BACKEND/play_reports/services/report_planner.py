@@ -0,0 +1,315 @@
+import calendar
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import models
+from django.db.models import Avg, Count, Max, Min, Sum
+
+from play_reports.services.looker_query_builder import LookerQueryError, looker_query_builder
+from play_reports.services.report_registry import default_aggregation, get_definition, get_model
+
+
+AGGREGATES = {'sum': Sum, 'avg': Avg, 'min': Min, 'max': Max, 'count': Count}
+
+# Seules les sommes se recomposent à partir d'un agrégat précalculé
+ROLLUP_AGGREGATIONS = {'sum'}
+
+
+class ReportQueryError(ValueError):
+    """Requête de rapport invalide (rapport, dimension, métrique ou filtre inconnu)."""
+
+
+class ReportPlanner:
+    """
+    Planificateur de requêtes commun aux panneaux d'insights, au connecteur
+    et à l'endpoint de requête générique.
+
+    Une requête (rapport, dimensions, métriques, filtres, période) est
+    validée contre le registre des rapports puis planifiée : le premier
+    agrégat précalculé (rollup) qui couvre les dimensions, les filtres, les
+    métriques et le grain de la période est lu à la place de la table de
+    base. L'index le plus sélectif de la source retenue (égalités tenant,
+    package et filtres puis bornes de date) est indiqué dans le plan, avec
+    la possibilité d'un index-only scan. Les bornes d'un champ horodatage
+    sont exprimées en [début, fin + 1 jour[ (jours UTC) pour rester indexables.
+    """
+
+    # ------------------------------------------------------------------
+    # Registre
+    # ------------------------------------------------------------------
+
+    def _definition(self, report_type):
+        definition = get_definition(report_type)
+        if definition is None:
+            raise ReportQueryError(f"Type de rapport inconnu: {report_type}")
+        return definition
+
+    def _spec(self, definition):
+        try:
+            return looker_query_builder.get_spec(definition['model'])
+        except LookerQueryError as e:
+            raise ReportQueryError(str(e))
+
+    def _is_metric(self, definition, spec, name):
+        """Métrique du connecteur, ou colonne déclarée dans les agrégations du registre (ex. note en étoiles)."""
+        field = spec['fields'].get(name)
+        if field is None:
+            return False
+        return (
+            field['schema']['semantics']['conceptType'] == 'METRIC'
+            or name in (definition.get('aggregations') or {})
+        )
+
+    def describe(self, report_type):
+        """Dimensions, métriques (agrégation par défaut) et agrégats d'un rapport."""
+        definition = self._definition(report_type)
+        spec = self._spec(definition)
+        return {
+            'report': report_type,
+            'table': spec['table_name'],
+            'date_field': definition['date'],
+            'package_field': definition['package'],
+            'dimensions': list(definition['dimensions']),
+            'metrics': {
+                name: default_aggregation(definition, name)
+                for name in spec['fields']
+                if self._is_metric(definition, spec, name)
+            },
+            'rollups': [rollup['model'] for rollup in definition.get('rollups') or []],
+        }
+
+    def parse_metrics(self, report_type, metrics):
+        """
+        Métriques sous forme de noms, de « nom:agrégation » ou d'objets
+        {"name", "aggregation", "as"}. Retourne [(alias, nom, agrégation)].
+        """
+        definition = self._definition(report_type)
+        spec = self._spec(definition)
+        parsed = []
+        for metric in metrics or []:
+            if isinstance(metric, dict):
+                name, aggregation, alias = metric.get('name'), metric.get('aggregation'), metric.get('as')
+            else:
+                name, _, aggregation = str(metric).partition(':')
+                alias = None
+            if not self._is_metric(definition, spec, name):
+                raise ReportQueryError(f"Métrique inconnue: {name}")
+            aggregation = (aggregation or default_aggregation(definition, name)).lower()
+            if aggregation not in AGGREGATES:
+                raise ReportQueryError(f"Agrégation non supportée: {aggregation}")
+            parsed.append((alias or name, name, aggregation))
+        if not parsed:
+            raise ReportQueryError("Au moins une métrique est requise")
+        return parsed
+
+    # ------------------------------------------------------------------
+    # Planification
+    # ------------------------------------------------------------------
+
+    def _covers_period(self, grain, start, end):
+        if grain == 'day':
+            return True
+        # Grain mensuel : la période doit couvrir des mois entiers
+        if start is not None and start.day != 1:
+            return False
+        if end is not None and end.day != calendar.monthrange(end.year, end.month)[1]:
+            return False
+        return True
+
+    def _choose_rollup(self, definition, dimensions, metrics, filters, start, end):
+        for rollup in definition.get('rollups') or []:
+            if not self._covers_period(rollup['grain'], start, end):
+                continue
+            if any(name not in rollup['dimensions'] for name in list(dimensions) + list(filters)):
+                continue
+            if any(name not in rollup['metrics'] or aggregation not in ROLLUP_AGGREGATIONS
+                   for _, name, aggregation in metrics):
+                continue
+            if get_model(rollup['model']) is None:
+                continue
+            return rollup
+        return None
+
+    def _best_index(self, model, equalities, date_field, columns):
+        """Index dont le préfixe couvre le plus d'égalités avant la borne de date."""
+        best = None
+        for index in model._meta.indexes:
+            fields = [name.lstrip('-') for name in index.fields]
+            score = 0
+            for name in fields:
+                if name in equalities:
+                    score += 2
+                    continue
+                if name == date_field:
+                    score += 1
+                break
+            if not score:
+                continue
+            covering = set(columns) <= set(fields) | set(getattr(index, 'include', None) or ())
+            if best is None or (score, covering) > (best['score'], best['covering']):
+                best = {'name': index.name, 'fields': fields, 'covering': covering, 'score': score}
+        if best is not None:
+            best.pop('score')
+        return best
+
+    def plan(self, report_type, dimensions=(), metrics=(), filters=None, start=None, end=None):
+        """
+        Plan d'exécution d'une requête. `metrics` est le résultat de
+        parse_metrics ; `filters` un dict {dimension: valeur} (égalités).
+        """
+        definition = self._definition(report_type)
+        filters = filters or {}
+        dimensions = list(dict.fromkeys(dimensions or []))
+        unknown = [name for name in dimensions + list(filters) if name not in definition['dimensions']]
+        if unknown:
+            raise ReportQueryError(f"Dimension inconnue: {', '.join(unknown)}")
+        if not metrics:
+            raise ReportQueryError("Au moins une métrique est requise")
+
+        rollup = self._choose_rollup(definition, dimensions, metrics, filters, start, end)
+        if rollup is not None:
+            model = get_model(rollup['model'])
+            columns = rollup['dimensions']
+            metric_columns = rollup['metrics']
+            date_field = rollup['date']
+            grouped = {columns[name] for name in dimensions} | {columns[name] for name in filters}
+            totals = {
+                column: value for column, value in (rollup.get('totals') or {}).items()
+                if column not in grouped
+            }
+            exclude = {
+                column: value for column, value in (rollup.get('totals') or {}).items()
+                if column in {columns[name] for name in dimensions}
+            }
+            reason = f"agrégat {rollup['model']} (grain {rollup['grain']})"
+            package_field = rollup.get('package', 'package_name')
+        else:
+            model = self._spec(definition)['model']
+            columns = {name: name for name in definition['dimensions']}
+            metric_columns = {name: name for _, name, _ in metrics}
+            date_field = definition['date']
+            totals, exclude = {}, {}
+            reason = "table de base : aucun agrégat ne couvre la requête"
+            package_field = definition['package']
+
+        plan = {
+            'report': report_type,
+            'source': 'rollup' if rollup is not None else 'table',
+            'model': model,
+            'date_field': date_field,
+            'datetime': isinstance(model._meta.get_field(date_field), models.DateTimeField),
+            'package_field': package_field,
+            'dimensions': [(name, columns[name]) for name in dimensions],
+            'metrics': [(alias, metric_columns[name], aggregation) for alias, name, aggregation in metrics],
+            'filters': {columns[name]: value for name, value in filters.items()},
+            'totals': totals,
+            'exclude': exclude,
+            'reason': reason,
+        }
+        equalities = {'tenant', package_field} | set(plan['filters']) | set(totals)
+        read = {column for _, column in plan['dimensions']} | {column for _, column, _ in plan['metrics']}
+        plan['index'] = self._best_index(model, equalities, date_field, read | equalities | {date_field})
+        return plan
+
+    def explain(self, plan):
+        """Description sérialisable d'un plan."""
+        return {
+            'report': plan['report'],
+            'source': plan['source'],
+            'table': plan['model']._meta.db_table,
+            'reason': plan['reason'],
+            'index': plan['index'],
+        }
+
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+
+    def _utc_midnight(self, day):
+        return datetime.combine(day, datetime.min.time(), dt_timezone.utc)
+
+    def queryset(self, plan, tenant, package_name=None, start=None, end=None):
+        qs = plan['model'].objects.filter(tenant=tenant)
+        if package_name:
+            if not plan['package_field']:
+                raise ReportQueryError(f"package_name non disponible pour {plan['report']}")
+            qs = qs.filter(**{plan['package_field']: package_name})
+        date_field = plan['date_field']
+        if plan['datetime']:
+            if start:
+                qs = qs.filter(**{f'{date_field}__gte': self._utc_midnight(start)})
+            if end:
+                qs = qs.filter(**{f'{date_field}__lt': self._utc_midnight(end + timedelta(days=1))})
+        else:
+            if start:
+                qs = qs.filter(**{f'{date_field}__gte': start})
+            if end:
+                qs = qs.filter(**{f'{date_field}__lte': end})
+        qs = qs.filter(**plan['filters'], **plan['totals'])
+        if plan['exclude']:
+            qs = qs.exclude(**plan['exclude'])
+        return qs
+
+    def _expressions(self, plan):
+        # Alias internes : un alias égal à un nom de champ est refusé par l'ORM
+        return {
+            f'_m{position}': AGGREGATES[aggregation](column)
+            for position, (_, column, aggregation) in enumerate(plan['metrics'])
+        }
+
+    def _totals(self, plan, tenant, package_name, start, end):
+        row = self.queryset(plan, tenant, package_name, start, end).aggregate(**self._expressions(plan))
+        return {alias: row[f'_m{position}'] for position, (alias, _, _) in enumerate(plan['metrics'])}
+
+    def aggregate(self, report_type, tenant, metrics, package_name=None, start=None, end=None, filters=None):
+        """Totaux de la période : {alias: valeur}."""
+        parsed = self.parse_metrics(report_type, metrics)
+        plan = self.plan(report_type, (), parsed, filters, start, end)
+        return self._totals(plan, tenant, package_name, start, end)
+
+    def query(self, report_type, tenant, dimensions, metrics, package_name=None, start=None, end=None,
+              filters=None, order_by=None, limit=None):
+        """
+        Lignes regroupées par dimensions. `order_by` est un alias de métrique
+        ou une dimension (préfixe '-' pour un tri décroissant). Retourne
+        (lignes, plan).
+        """
+        parsed = self.parse_metrics(report_type, metrics)
+        plan = self.plan(report_type, dimensions, parsed, filters, start, end)
+        if not plan['dimensions']:
+            return [self._totals(plan, tenant, package_name, start, end)], plan
+        aliases = {alias: f'_m{position}' for position, (alias, _, _) in enumerate(plan['metrics'])}
+        aliases.update({name: column for name, column in plan['dimensions']})
+        qs = (
+            self.queryset(plan, tenant, package_name, start, end)
+            .values(*[column for _, column in plan['dimensions']])
+            .annotate(**self._expressions(plan))
+        )
+        if order_by:
+            descending = order_by.startswith('-')
+            key = aliases.get(order_by.lstrip('-'))
+            if key is None:
+                raise ReportQueryError(f"Tri inconnu: {order_by}")
+            qs = qs.order_by(f"{'-' if descending else ''}{key}")
+        if limit is not None:
+            qs = qs[:limit]
+        rows = [
+            {name: row[key] for name, key in aliases.items()}
+            for row in qs
+        ]
+        return rows, plan
+
+    def breakdown(self, report_type, tenant, dimension, metric, label, package_name=None, start=None, end=None,
+                  filters=None, aggregation=None, limit=5):
+        """Top N d'une dimension : [{dimension: valeur, label: métrique}] par métrique décroissante."""
+        rows, _ = self.query(
+            report_type, tenant, [dimension],
+            [{'name': metric, 'aggregation': aggregation, 'as': label}],
+            package_name=package_name, start=start, end=end, filters=filters,
+            order_by=f'-{label}', limit=limit,
+        )
+        return [{dimension: row[dimension], label: row[label]} for row in rows]
+
+
+report_planner = ReportPlanner()
+
+__all__ = ["report_planner", "ReportPlanner", "ReportQueryError", "AGGREGATES"]
@@ -0,0 +1,218 @@
+from django.apps import apps
+
+
+# Registre déclaratif des rapports : source unique des tables exposées par
+# les panneaux, le connecteur Looker Studio, les exports et l'ingestion.
+#
+#   model          : modèle Django (nom de classe dans play_reports)
+#   date           : champ date de la période
+#   package        : champ package (None si le rapport n'en a pas)
+#   dimensions     : colonnes de regroupement et de filtre autorisées
+#   aggregations   : agrégation par défaut des métriques (sinon AVG pour les
+#                    moyennes, SUM pour le reste) ; les métriques sont les
+#                    colonnes numériques du modèle
+#   default_fields : colonnes par défaut du connecteur (défaut : toutes)
+#   rollups        : agrégats précalculés utilisables à la place de la table,
+#                    par ordre de préférence (voir report_planner)
+REPORT_REGISTRY = {
+    'installs_overview': {
+        'model': 'google_play_installs_overview',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['country', 'language', 'device', 'app_version', 'os_version', 'carrier'],
+        'default_fields': [
+            'date', 'package_name', 'country', 'language', 'carrier',
+            'installs_on_active_devices',
+            'daily_device_installs', 'daily_user_installs', 'daily_user_uninstalls',
+        ],
+    },
+    'installs_dimensioned': {
+        'model': 'google_play_installs_dimensioned',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['country', 'device', 'app_version', 'carrier', 'language', 'os_version', 'android_os_version'],
+    },
+    'subscriptions_overview': {
+        'model': 'google_play_subscriptions_overview',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['product_id', 'country', 'base_plan_id', 'offer_id'],
+        'rollups': [
+            {
+                'model': 'SubscriptionMonthly',
+                'grain': 'month',
+                'date': 'month',
+                'dimensions': {'product_id': 'product_id', 'base_plan_id': 'base_plan_id'},
+                'metrics': {'new_subscribers': 'new_subscribers', 'cancelled_subscribers': 'cancelled_subscribers'},
+            },
+        ],
+    },
+    'subscriptions_dimensioned': {
+        'model': 'google_play_subscriptions_dimensioned',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['dimension_type', 'dimension_value'],
+    },
+    'retained_installers_overview': {
+        'model': 'google_play_retained_installers_overview',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['acquisition_channel', 'country'],
+    },
+    'retained_installers_dimensioned': {
+        'model': 'google_play_retained_installers_dimensioned',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['dimension_type', 'dimension_value'],
+    },
+    'crashes_overview': {
+        'model': 'google_play_crashes_overview',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['device', 'app_version', 'os_version', 'android_os_version'],
+        'default_fields': ['date', 'package_name', 'device', 'daily_crashes', 'daily_anrs'],
+        'rollups': [
+            {
+                # Lignes app_version = '' : totaux journaliers de la table overview
+                'model': 'CrashRateDaily',
+                'grain': 'day',
+                'date': 'date',
+                'dimensions': {},
+                'metrics': {'daily_crashes': 'crashes', 'daily_anrs': 'anrs'},
+                'totals': {'app_version': ''},
+            },
+        ],
+    },
+    'crashes_dimensioned': {
+        'model': 'google_play_crashes_dimensioned',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['app_version', 'device', 'os_version', 'android_os_version'],
+    },
+    'buyers_7d_overview': {
+        'model': 'google_play_buyers_7d_overview',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['acquisition_channel', 'country'],
+    },
+    'buyers_7d_dimensioned': {
+        'model': 'google_play_buyers_7d_dimensioned',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['dimension_type', 'dimension_value'],
+    },
+    'earnings': {
+        'model': 'google_play_earnings',
+        'date': 'transaction_date',
+        'package': None,
+        'dimensions': [
+            'transaction_type', 'product_id', 'product_type', 'sku_id',
+            'buyer_country', 'buyer_currency', 'merchant_currency',
+        ],
+    },
+    'estimated_sales': {
+        'model': 'google_play_estimatedSales',
+        'date': 'order_charged_date',
+        'package': None,
+        'dimensions': [
+            'financial_status', 'device_model', 'product_id', 'product_type', 'sku_id',
+            'currency_of_sale', 'country_of_buyer',
+        ],
+    },
+    'subscription_cancellations': {
+        'model': 'google_play_subscription_cancellation_reasons',
+        'date': 'cancellation_date',
+        'package': 'package_name',
+        'dimensions': ['subscription_id', 'sku_id', 'country', 'cancellation_reason', 'cancellation_sub_reason'],
+    },
+    'store_performance_overview': {
+        'model': 'google_play_store_performance_overview',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['country', 'traffic_source', 'search_term', 'utm_source', 'utm_campaign'],
+        'aggregations': {'store_listing_conversion_rate': 'avg'},
+    },
+    'store_performance_dimensioned': {
+        'model': 'google_play_store_performance_dimensioned',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['dimension_type', 'dimension_value'],
+    },
+    'ratings_overview': {
+        'model': 'google_play_ratings_overview',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['device'],
+        'default_fields': ['date', 'package_name', 'daily_average_rating', 'total_average_rating'],
+    },
+    'ratings_dimensioned': {
+        'model': 'google_play_ratings_dimensioned',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['app_version', 'carrier', 'country', 'device', 'language', 'os_version'],
+    },
+    'reviews': {
+        'model': 'google_play_reviews',
+        'date': 'review_submit_date',
+        'package': 'package_name',
+        'dimensions': ['app_version_code', 'app_version_name', 'reviewer_language', 'device'],
+        'aggregations': {'star_rating': 'avg'},
+    },
+    'promotional_content': {
+        'model': 'google_play_promotional_content',
+        'date': 'date',
+        'package': 'package_name',
+        'dimensions': ['promotional_content_id', 'promotional_content_name', 'country', 'outcome'],
+    },
+    'invoice': {
+        'model': 'google_play_invoice',
+        'date': 'transaction_date',
+        'package': 'package_id',
+        'dimensions': ['program', 'transaction_type', 'sku_type', 'sale_country', 'sale_currency', 'billing_currency'],
+    },
+}
+
+
+def get_definition(report_type):
+    """Définition d'un rapport (None s'il est inconnu)."""
+    return REPORT_REGISTRY.get(report_type)
+
+
+def model_name(report_type):
+    """Nom du modèle d'un rapport (utilisé comme nom de table par l'ingestion)."""
+    return REPORT_REGISTRY[report_type]['model']
+
+
+def get_model(name):
+    """Classe d'un modèle de play_reports (None si elle n'existe pas)."""
+    try:
+        return apps.get_model('play_reports', name)
+    except LookupError:
+        return None
+
+
+def definition_for_model(name):
+    """(type de rapport, définition) d'un modèle, nom de classe ou model_name."""
+    key = (name or '').lower()
+    for report_type, definition in REPORT_REGISTRY.items():
+        if definition['model'].lower() == key:
+            return report_type, definition
+    return None, None
+
+
+def default_aggregation(definition, metric):
+    """Agrégation par défaut d'une métrique : les moyennes ne s'additionnent pas."""
+    aggregation = ((definition or {}).get('aggregations') or {}).get(metric)
+    if aggregation:
+        return aggregation
+    return 'avg' if 'average' in metric else 'sum'
+
+
+__all__ = [
+    "REPORT_REGISTRY",
+    "get_definition",
+    "model_name",
+    "get_model",
+    "definition_for_model",
+    "default_aggregation",
+]
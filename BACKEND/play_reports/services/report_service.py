@@ -1,28 +1,10 @@
 from django.apps import apps
 
-# Dictionnaire central pour mapper les noms de rapports aux modèles Django
+from play_reports.services.report_registry import REPORT_REGISTRY
+
+# Rapport -> modèle Django, dérivé du registre déclaratif des rapports
 REPORT_MODEL_MAPPING = {
-    'installs_overview': 'google_play_installs_overview',
-    'installs_dimensioned': 'google_play_installs_dimensioned',
-    'subscriptions_overview': 'google_play_subscriptions_overview',
-    'subscriptions_dimensioned': 'google_play_subscriptions_dimensioned',
-    'retained_installers_overview': 'google_play_retained_installers_overview',
-    'retained_installers_dimensioned': 'google_play_retained_installers_dimensioned',
-    'crashes_overview': 'google_play_crashes_overview',
-    'crashes_dimensioned': 'google_play_crashes_dimensioned',
-    'buyers_7d_overview': 'google_play_buyers_7d_overview',
-    'buyers_7d_dimensioned': 'google_play_buyers_7d_dimensioned',
-    'earnings': 'google_play_earnings',
-    'estimated_sales': 'google_play_estimatedSales',
-    'subscription_cancellations': 'google_play_subscription_cancellation_reasons',
-    'store_performance_overview': 'google_play_store_performance_overview',
-    'store_performance_dimensioned': 'google_play_store_performance_dimensioned',
-    'ratings_overview': 'google_play_ratings_overview',
-    'ratings_dimensioned': 'google_play_ratings_dimensioned',
-    'reviews': 'google_play_reviews',
-    'promotional_content': 'google_play_promotional_content',
-    'sales': 'google_play_sales',
-    'invoice': 'google_play_invoice',
+    report_type: definition['model'] for report_type, definition in REPORT_REGISTRY.items()
 }
 
 def list_available_reports():
@@ -39,9 +21,12 @@ def get_model_for_report(report_type):
     except LookupError:
         return None
 
-def get_report_queryset(report_type):
-    """Retourne le queryset pour un type de rapport donné."""
+def get_report_queryset(report_type, tenant=None):
+    """Retourne le queryset pour un type de rapport donné (limité au tenant s'il est fourni)."""
     model_class = get_model_for_report(report_type)
     if model_class:
-        return model_class.objects.all()
+        queryset = model_class.objects.all()
+        if tenant is not None:
+            queryset = queryset.filter(tenant=tenant)
+        return queryset
     return None
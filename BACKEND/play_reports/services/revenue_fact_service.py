@@ -0,0 +1,231 @@
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+
+from play_reports.models import FxRate, RevenueDaily, google_play_earnings, google_play_estimatedSales
+
+logger = logging.getLogger(__name__)
+
+
+# Sources de revenus -> expressions SQL (alias s) en devise d'origine.
+# Les montants sont agrégés par (package, jour, pays, devise) puis convertis
+# une seule fois par groupe : le taux ne dépend que de (devise, jour).
+_EARNINGS_KIND = "LOWER(COALESCE(s.transaction_type, ''))"
+_EARNINGS_REFUND = f"({_EARNINGS_KIND} LIKE '%%refund%%' OR {_EARNINGS_KIND} LIKE '%%chargeback%%')"
+_EARNINGS_FEE = f"{_EARNINGS_KIND} LIKE '%%fee%%'"
+_EARNINGS_TAX = f"{_EARNINGS_KIND} LIKE '%%tax%%'"
+_SALES_REFUNDED = (
+    "(LOWER(s.financial_status) LIKE '%%refund%%' OR LOWER(s.financial_status) LIKE '%%cancel%%'"
+    " OR LOWER(s.financial_status) LIKE '%%chargeback%%')"
+)
+
+REVENUE_SOURCES = {
+    'google_play_earnings': {
+        'source': 'earnings',
+        'model': google_play_earnings,
+        'date': 's.transaction_date',
+        'package': 's.product_id',
+        'country': 's.buyer_country',
+        'currency': 's.merchant_currency',
+        'amounts': {
+            'gross_amount': f"CASE WHEN NOT ({_EARNINGS_REFUND} OR {_EARNINGS_FEE} OR {_EARNINGS_TAX})"
+                            f" THEN s.amount_merchant_currency ELSE 0 END",
+            'refund_amount': f"CASE WHEN {_EARNINGS_REFUND} AND NOT {_EARNINGS_FEE}"
+                             f" THEN s.amount_merchant_currency ELSE 0 END",
+            'tax_amount': f"CASE WHEN {_EARNINGS_TAX} THEN s.amount_merchant_currency ELSE 0 END"
+                          f" + COALESCE(s.tax_amount, 0)",
+            'fee_amount': f"CASE WHEN {_EARNINGS_FEE} THEN s.amount_merchant_currency ELSE 0 END"
+                          f" + COALESCE(s.service_fee_amount, 0)",
+            'net_amount': "s.amount_merchant_currency",
+        },
+    },
+    'google_play_estimatedSales': {
+        'source': 'estimated_sales',
+        'model': google_play_estimatedSales,
+        'date': 's.order_charged_date',
+        'package': 's.product_id',
+        'country': 's.country_of_buyer',
+        'currency': 's.currency_of_sale',
+        'amounts': {
+            'gross_amount': "s.item_price",
+            'refund_amount': f"CASE WHEN {_SALES_REFUNDED} THEN -s.item_price ELSE 0 END",
+            'tax_amount': f"CASE WHEN {_SALES_REFUNDED} THEN 0 ELSE s.taxes_collected END",
+            'fee_amount': "0",
+            'net_amount': f"CASE WHEN {_SALES_REFUNDED} THEN 0 ELSE s.item_price END",
+        },
+    },
+}
+
+AMOUNT_FIELDS = ('gross_amount', 'refund_amount', 'tax_amount', 'fee_amount', 'net_amount')
+
+
+class RevenueFactService:
+    """
+    Table de faits des revenus (RevenueDaily).
+
+    Étape post-sync des rapports earnings et ventes estimées : les jours dont
+    des lignes ont été écrites depuis la dernière construction (updated_at)
+    sont réagrégés par (package, jour, pays, devise), avec un package
+    normalisé et des montants convertis dans la devise de reporting à partir
+    de FxRate (dernier taux connu à la date). Les panneaux de revenus lisent
+    alors des plages indexées (tenant, package, date) sans mélanger les
+    devises.
+    """
+
+    def reporting_currency(self):
+        return getattr(settings, 'REPORTING_CURRENCY', 'USD').upper()
+
+    def normalize_package(self, value):
+        return (value or '').strip().lower()
+
+    # ------------------------------------------------------------------
+    # Taux de change
+    # ------------------------------------------------------------------
+
+    def load_rates(self, rates, source=''):
+        """
+        Upsert des taux [(date, devise, taux)] vers la devise de reporting
+        configurée (seule devise lue par la conversion) ; retourne le nombre
+        de taux écrits.
+        """
+        reporting_currency = self.reporting_currency()
+        objects = {}
+        for date, currency, rate in rates:
+            currency = currency.strip().upper()
+            if currency and currency != reporting_currency:
+                objects[(currency, date)] = FxRate(
+                    date=date, currency=currency, reporting_currency=reporting_currency,
+                    rate=rate, source=source,
+                )
+        FxRate.objects.bulk_create(
+            list(objects.values()), batch_size=2000, update_conflicts=True,
+            unique_fields=['currency', 'reporting_currency', 'date'], update_fields=['rate', 'source', 'updated_at'],
+        )
+        return len(objects)
+
+    # ------------------------------------------------------------------
+    # Construction des faits
+    # ------------------------------------------------------------------
+
+    def _changed_days(self, tenant_id, spec):
+        """Jours dont des lignes source ont été écrites depuis la dernière construction."""
+        watermark = (
+            RevenueDaily.objects.filter(tenant_id=tenant_id, source=spec['source'])
+            .aggregate(last=Max('updated_at'))['last']
+        )
+        qs = spec['model'].objects.filter(tenant_id=tenant_id)
+        if watermark is not None:
+            qs = qs.filter(updated_at__gt=watermark)
+        date_field = spec['date'].split('.', 1)[1]
+        return set(qs.values_list(date_field, flat=True).distinct().order_by())
+
+    def aggregate_days(self, tenant_id, table_name, days):
+        """Reconstruit les faits d'une source pour les jours donnés."""
+        spec = REVENUE_SOURCES[table_name]
+        days = sorted(days)
+        if not days:
+            return 0
+        qn = connection.ops.quote_name
+        source_table = qn(spec['model']._meta.db_table)
+        facts = qn(RevenueDaily._meta.db_table)
+        rates = qn(FxRate._meta.db_table)
+        amounts = spec['amounts']
+        params = {
+            'tenant': tenant_id,
+            'source': spec['source'],
+            'reporting': self.reporting_currency(),
+            'days': days,
+        }
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {facts} WHERE tenant_id = %(tenant)s AND source = %(source)s"
+                f" AND date = ANY(%(days)s::date[])",
+                params,
+            )
+            cursor.execute(
+                f"""
+                WITH agg AS (
+                    SELECT LOWER(BTRIM(COALESCE({spec['package']}, ''))) AS package_name,
+                           {spec['date']} AS date,
+                           LEFT(UPPER(COALESCE({spec['country']}, '')), 10) AS country,
+                           LEFT(UPPER(COALESCE({spec['currency']}, '')), 10) AS currency,
+                           COUNT(*) AS transactions,
+                           {', '.join(f"SUM({expression}) AS {name}" for name, expression in amounts.items())}
+                    FROM {source_table} s
+                    WHERE s.tenant_id = %(tenant)s AND {spec['date']} = ANY(%(days)s::date[])
+                    GROUP BY 1, 2, 3, 4
+                )
+                INSERT INTO {facts} (tenant_id, source, package_name, date, country, currency, reporting_currency,
+                                     transactions, unconverted_transactions, {', '.join(AMOUNT_FIELDS)}, updated_at)
+                SELECT %(tenant)s, %(source)s, a.package_name, a.date, a.country, a.currency, %(reporting)s,
+                       a.transactions, CASE WHEN fx.rate IS NULL THEN a.transactions ELSE 0 END,
+                       {', '.join(f"COALESCE(ROUND(a.{name} * fx.rate, 2), 0)" for name in AMOUNT_FIELDS)},
+                       NOW()
+                FROM agg a
+                LEFT JOIN LATERAL (
+                    SELECT CASE WHEN a.currency = %(reporting)s THEN 1::numeric ELSE (
+                        SELECT f.rate FROM {rates} f
+                        WHERE f.currency = a.currency AND f.reporting_currency = %(reporting)s AND f.date <= a.date
+                        ORDER BY f.date DESC LIMIT 1
+                    ) END AS rate
+                ) fx ON TRUE
+                """,
+                params,
+            )
+            written = cursor.rowcount
+
+        logger.info(f"Revenus tenant {tenant_id} ({spec['source']}): {len(days)} jour(s), {written} fait(s)")
+        return written
+
+    def refresh(self, tenant_id, table_name):
+        """Étape post-sync : réagrège les jours modifiés de la source alimentée."""
+        spec = REVENUE_SOURCES.get(table_name)
+        if spec is None:
+            return
+        days = self._changed_days(tenant_id, spec)
+        if days:
+            self.aggregate_days(tenant_id, table_name, days)
+
+    def rebuild(self, tenant_id=None, currencies=None, since=None):
+        """
+        Reconstruit les faits (tous les tenants par défaut). Avec currencies,
+        seuls les jours déjà agrégés dans ces devises (depuis since) sont
+        reconvertis, par exemple après un chargement de taux.
+        """
+        built = 0
+        for table_name, spec in REVENUE_SOURCES.items():
+            if currencies:
+                qs = RevenueDaily.objects.filter(source=spec['source'], currency__in=currencies)
+                if since is not None:
+                    qs = qs.filter(date__gte=since)
+                date_field = 'date'
+            else:
+                qs = spec['model'].objects.all()
+                date_field = spec['date'].split('.', 1)[1]
+            if tenant_id is not None:
+                qs = qs.filter(tenant_id=tenant_id)
+            days = {}
+            for tenant, day in qs.values_list('tenant_id', date_field).distinct().order_by().iterator():
+                days.setdefault(tenant, set()).add(day)
+            for tenant, tenant_days in days.items():
+                built += self.aggregate_days(tenant, table_name, tenant_days)
+        return built
+
+    def missing_rates(self, tenant_id=None):
+        """Devises ayant des transactions non converties : {devise: (premier jour, dernier jour)}."""
+        qs = RevenueDaily.objects.filter(unconverted_transactions__gt=0, reporting_currency=self.reporting_currency())
+        if tenant_id is not None:
+            qs = qs.filter(tenant_id=tenant_id)
+        missing = {}
+        for currency, day in qs.values_list('currency', 'date').distinct().order_by('currency', 'date'):
+            first, _ = missing.get(currency, (day, day))
+            missing[currency] = (first, day)
+        return missing
+
+
+revenue_fact_service = RevenueFactService()
+
+__all__ = ["revenue_fact_service", "RevenueFactService", "REVENUE_SOURCES"]
@@ -0,0 +1,122 @@
+import logging
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import Case, F, Value, When
+
+from play_reports.models import google_play_reviews
+
+logger = logging.getLogger(__name__)
+
+
+# Configuration PostgreSQL par langue d'avis (reviewer_language, code ISO) ;
+# les autres langues sont indexées sans racinisation ('simple')
+SEARCH_CONFIGS = {
+    'da': 'danish',
+    'de': 'german',
+    'en': 'english',
+    'es': 'spanish',
+    'fi': 'finnish',
+    'fr': 'french',
+    'hu': 'hungarian',
+    'it': 'italian',
+    'nl': 'dutch',
+    'no': 'norwegian',
+    'nb': 'norwegian',
+    'pt': 'portuguese',
+    'ro': 'romanian',
+    'ru': 'russian',
+    'sv': 'swedish',
+    'tr': 'turkish',
+}
+DEFAULT_CONFIG = 'simple'
+
+HEADLINE_OPTIONS = {
+    'start_sel': '<mark>',
+    'stop_sel': '</mark>',
+    'max_words': 20,
+    'min_words': 8,
+    'max_fragments': 2,
+}
+
+
+class ReviewSearchService:
+    """
+    Recherche plein texte sur google_play_reviews.
+
+    search_vector (tsvector, index GIN reviews_search_gin_idx) est calculé à
+    l'ingestion avec la configuration de la langue de l'avis : titre en
+    poids A, texte en poids B. Une recherche sans langue combine les requêtes
+    de toutes les configurations (expression constante, l'index GIN reste
+    utilisable) ; le classement (ts_rank_cd) et les extraits (ts_headline) ne
+    sont calculés que pour les lignes retenues.
+    """
+
+    def config_for(self, language):
+        return SEARCH_CONFIGS.get((language or '')[:2].lower(), DEFAULT_CONFIG)
+
+    def config_expression(self):
+        """Configuration de chaque ligne, dérivée de reviewer_language."""
+        return Case(
+            *[When(reviewer_language__istartswith=code, then=Value(config)) for code, config in SEARCH_CONFIGS.items()],
+            default=Value(DEFAULT_CONFIG),
+        )
+
+    def vector_expression(self):
+        config = self.config_expression()
+        return (
+            SearchVector('review_title', config=config, weight='A')
+            + SearchVector('review_text', config=config, weight='B')
+        )
+
+    def refresh(self, queryset=None, review_ids=None):
+        """(Re)calcule search_vector pour les avis donnés (par défaut : ceux sans vecteur)."""
+        if queryset is None:
+            queryset = google_play_reviews.objects.all()
+        if review_ids is not None:
+            if not review_ids:
+                return 0
+            queryset = queryset.filter(review_id__in=list(review_ids))
+        else:
+            queryset = queryset.filter(search_vector__isnull=True)
+        return queryset.update(search_vector=self.vector_expression())
+
+    def backfill(self, batch_size=10000):
+        """Remplit search_vector par lots d'id (avis existants)."""
+        total = 0
+        while True:
+            ids = list(
+                google_play_reviews.objects.filter(search_vector__isnull=True)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return total
+            total += self.refresh(google_play_reviews.objects.filter(id__in=ids))
+            logger.info(f"search_vector: {total} avis indexés")
+
+    def build_query(self, text, language=None):
+        """Requête websearch (guillemets, OR, -exclusion) pour une langue, ou toutes."""
+        if language:
+            return SearchQuery(text, search_type='websearch', config=self.config_for(language))
+        query = SearchQuery(text, search_type='websearch', config=DEFAULT_CONFIG)
+        for config in sorted(set(SEARCH_CONFIGS.values())):
+            query |= SearchQuery(text, search_type='websearch', config=config)
+        return query
+
+    def search(self, queryset, text, language=None):
+        """Filtre un queryset d'avis et l'annote de rank, title_headline et text_headline."""
+        query = self.build_query(text, language)
+        config = self.config_expression()
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(
+                rank=SearchRank(F('search_vector'), query, cover_density=True),
+                title_headline=SearchHeadline('review_title', query, config=config, **HEADLINE_OPTIONS),
+                text_headline=SearchHeadline('review_text', query, config=config, **HEADLINE_OPTIONS),
+            )
+            .order_by('-rank', '-review_submit_date')
+        )
+
+
+review_search_service = ReviewSearchService()
+
+__all__ = ["review_search_service", "ReviewSearchService", "SEARCH_CONFIGS"]
@@ -0,0 +1,327 @@
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, TruncDate
+
+from play_reports.models import google_play_reviews, ReviewDailySentiment, ReviewDailyKeyword
+
+logger = logging.getLogger(__name__)
+
+
+# Lexique pondéré (-3..3), anglais et français
+LEXICON = {
+    # en
+    'love': 3, 'loved': 3, 'amazing': 3, 'awesome': 3, 'excellent': 3, 'perfect': 3, 'fantastic': 3,
+    'great': 2, 'good': 2, 'nice': 2, 'best': 2, 'easy': 2, 'useful': 2, 'helpful': 2, 'fun': 2,
+    'smooth': 2, 'fast': 1, 'like': 1, 'fine': 1, 'thanks': 1, 'works': 1, 'recommend': 2,
+    'bad': -2, 'poor': -2, 'slow': -2, 'annoying': -2, 'useless': -3, 'worst': -3, 'terrible': -3,
+    'horrible': -3, 'awful': -3, 'hate': -3, 'broken': -2, 'bug': -2, 'bugs': -2, 'buggy': -2,
+    'crash': -2, 'crashes': -2, 'crashing': -2, 'crashed': -2, 'freeze': -2, 'freezes': -2,
+    'lag': -1, 'laggy': -2, 'error': -2, 'errors': -2, 'fail': -2, 'fails': -2, 'failed': -2,
+    'waste': -2, 'scam': -3, 'refund': -1, 'problem': -1, 'problems': -1, 'issue': -1, 'issues': -1,
+    'disappointed': -2, 'disappointing': -2, 'uninstall': -2, 'uninstalled': -2, 'expensive': -1,
+    # fr
+    'super': 2, 'génial': 3, 'genial': 3, 'parfait': 3, 'excellente': 3, 'top': 2, 'bien': 1,
+    'bon': 2, 'bonne': 2, 'pratique': 2, 'facile': 2, 'rapide': 1, 'merci': 1, 'adore': 3,
+    'recommande': 2, 'utile': 2,
+    'nul': -3, 'nulle': -3, 'mauvais': -2, 'mauvaise': -2, 'lent': -2, 'lente': -2,
+    'bugue': -2, 'plante': -2, 'inutile': -3, 'déçu': -2, 'decu': -2, 'déçue': -2,
+    'arnaque': -3, 'problème': -1, 'probleme': -1, 'erreur': -2, 'impossible': -2, 'pire': -3,
+    'désinstaller': -2, 'désinstallé': -2, 'cher': -1,
+}
+NEGATIONS = {'not', 'no', 'never', 'nothing', 'pas', 'jamais', 'rien', 'aucun', 'aucune'}
+INTENSIFIERS = {'very': 1.5, 'really': 1.5, 'so': 1.3, 'extremely': 2.0, 'too': 1.3,
+                'très': 1.5, 'tres': 1.5, 'vraiment': 1.5, 'trop': 1.3}
+STOPWORDS = {
+    'the', 'and', 'for', 'you', 'this', 'that', 'with', 'are', 'but', 'was', 'have', 'has', 'had',
+    'not', 'all', 'can', 'its', 'app', 'apps', 'just', 'get', 'one', 'when', 'they', 'from', 'out',
+    'what', 'there', 'will', 'would', 'your', 'more', 'even', 'now', 'use', 'using', 'been', 'very',
+    'really', 'about', 'only', 'after', 'time', 'because', 'also', 'than', 'then', 'some', 'any',
+    'les', 'des', 'une', 'est', 'pas', 'que', 'qui', 'pour', 'sur', 'dans', 'avec', 'mais', 'plus',
+    'tout', 'très', 'tres', 'cette', 'application', 'appli', 'elle', 'ils', 'nous', 'vous', 'par',
+    'aux', 'ont', 'son', 'ses', 'ces', 'même', 'quand', 'fait', 'faire', 'bien', 'trop',
+}
+TOKEN_RE = re.compile(r"[^\W\d_]+")
+
+# Au-delà de ces seuils, un avis est compté positif / négatif
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+# Part du texte dans le score final (le reste vient de la note en étoiles)
+TEXT_WEIGHT = 0.75
+MAX_KEYWORDS = 5
+
+DAILY_FIELDS = ('review_count', 'positive_count', 'neutral_count', 'negative_count', 'sentiment_sum', 'rating_sum')
+
+REVIEWS_TABLE = google_play_reviews._meta.model_name
+
+
+class ReviewSentimentService:
+    """
+    Sentiment lexical et mots-clés des avis, agrégés par jour.
+
+    Chaque avis est tokenisé une seule fois à l'ingestion (score -1..1 et
+    mots-clés stockés sur l'avis). Les jours concernés sont notés puis, en
+    étape post-synchronisation, réagrégés en SQL dans ReviewDailySentiment et
+    ReviewDailyKeyword à partir des scores stockés : les panneaux de tendance
+    et de plaintes ne lisent que ces petites tables.
+    """
+
+    def __init__(self):
+        self._dirty = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Analyse d'un avis
+    # ------------------------------------------------------------------
+
+    def tokenize(self, text):
+        if not text:
+            return []
+        text = text.lower().replace('’', "'").replace("n't", ' not')
+        return TOKEN_RE.findall(text)
+
+    def analyze(self, title, text, star_rating=None):
+        """Retourne (score -1..1, mots-clés) pour un avis."""
+        tokens = self.tokenize(title) + self.tokenize(text)
+        raw = 0.0
+        hits = 0
+        for index, token in enumerate(tokens):
+            weight = LEXICON.get(token)
+            if weight is None:
+                continue
+            hits += 1
+            window = tokens[max(0, index - 3):index]
+            if any(word in NEGATIONS for word in window):
+                weight = -weight * 0.75
+            if index and tokens[index - 1] in INTENSIFIERS:
+                weight *= INTENSIFIERS[tokens[index - 1]]
+            raw += weight
+
+        star_score = (star_rating - 3) / 2 if star_rating else 0.0
+        if hits:
+            # Normalisation bornée (type VADER)
+            text_score = raw / math.sqrt(raw * raw + 15)
+            score = TEXT_WEIGHT * text_score + (1 - TEXT_WEIGHT) * star_score
+        else:
+            score = star_score
+
+        counts = Counter(
+            token for token in tokens
+            if len(token) >= 3 and token not in STOPWORDS and token not in LEXICON
+            and token not in NEGATIONS and token not in INTENSIFIERS
+        )
+        keywords = [token for token, _ in counts.most_common(MAX_KEYWORDS)]
+        return round(score, 4), keywords
+
+    def day_of(self, submitted_at):
+        return submitted_at.astimezone(dt_timezone.utc).date()
+
+    # ------------------------------------------------------------------
+    # Agrégats journaliers
+    # ------------------------------------------------------------------
+
+    def mark(self, tenant_id, days):
+        """Note des (package, jour) à réagréger en fin de synchronisation."""
+        if not days:
+            return
+        with self._lock:
+            self._dirty.setdefault(tenant_id, set()).update(days)
+
+    def refresh(self, tenant_id, table_name):
+        """Étape post-sync : réagrège les jours notés pour ce tenant."""
+        if table_name != REVIEWS_TABLE:
+            return
+        with self._lock:
+            days = self._dirty.pop(tenant_id, set())
+        if days:
+            self.aggregate_days(tenant_id, days)
+
+    def aggregate_days(self, tenant_id, days):
+        """Recalcule les agrégats de (package, jour) depuis les scores stockés."""
+        days = sorted(days)
+        packages = [package for package, _ in days]
+        dates = [day for _, day in days]
+        qn = connection.ops.quote_name
+        reviews = qn(google_play_reviews._meta.db_table)
+        sentiment = qn(ReviewDailySentiment._meta.db_table)
+        keyword = qn(ReviewDailyKeyword._meta.db_table)
+        keys = "unnest(%s::text[], %s::date[]) AS k(package_name, day)"
+        source = (
+            f"FROM {reviews} r JOIN {keys} ON r.package_name = k.package_name"
+            f" AND r.review_submit_date >= k.day AND r.review_submit_date < k.day + 1"
+        )
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for table in (sentiment, keyword):
+                cursor.execute(
+                    f"DELETE FROM {table} t USING {keys}"
+                    f" WHERE t.tenant_id = %s AND t.package_name = k.package_name AND t.date = k.day",
+                    [packages, dates, tenant_id],
+                )
+            cursor.execute(
+                f"""
+                INSERT INTO {sentiment} (tenant_id, package_name, date, review_count, positive_count,
+                                         neutral_count, negative_count, sentiment_sum, rating_sum, updated_at)
+                SELECT r.tenant_id, r.package_name, k.day, COUNT(*),
+                       COUNT(*) FILTER (WHERE r.sentiment_score > %s),
+                       COUNT(*) FILTER (WHERE COALESCE(r.sentiment_score, 0) BETWEEN %s AND %s),
+                       COUNT(*) FILTER (WHERE r.sentiment_score < %s),
+                       COALESCE(SUM(r.sentiment_score), 0), SUM(r.star_rating), NOW()
+                {source}
+                WHERE r.tenant_id = %s
+                GROUP BY r.tenant_id, r.package_name, k.day
+                """,
+                [POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD, POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD,
+                 packages, dates, tenant_id],
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {keyword} (tenant_id, package_name, date, keyword, mentions,
+                                       positive_mentions, negative_mentions, sentiment_sum)
+                SELECT r.tenant_id, r.package_name, k.day, LEFT(kw.keyword, 100), COUNT(*),
+                       COUNT(*) FILTER (WHERE r.sentiment_score > %s),
+                       COUNT(*) FILTER (WHERE r.sentiment_score < %s),
+                       COALESCE(SUM(r.sentiment_score), 0)
+                {source}
+                CROSS JOIN LATERAL jsonb_array_elements_text(r.sentiment_keywords) AS kw(keyword)
+                WHERE r.tenant_id = %s
+                GROUP BY r.tenant_id, r.package_name, k.day, LEFT(kw.keyword, 100)
+                """,
+                [POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD, packages, dates, tenant_id],
+            )
+        logger.info(f"Sentiment des avis réagrégé: tenant {tenant_id}, {len(days)} jour(s)")
+
+    def rebuild(self, tenant_id=None, force=False, batch_size=2000):
+        """Score les avis non analysés (tous si force) puis réagrège leurs jours."""
+        qs = google_play_reviews.objects.all()
+        if tenant_id is not None:
+            qs = qs.filter(tenant_id=tenant_id)
+        pending = qs if force else qs.filter(sentiment_score__isnull=True)
+
+        scored = 0
+        last_id = 0
+        while True:
+            batch = list(
+                pending.filter(id__gt=last_id).order_by('id')
+                .only('id', 'review_title', 'review_text', 'star_rating')[:batch_size]
+            )
+            if not batch:
+                break
+            for review in batch:
+                review.sentiment_score, review.sentiment_keywords = self.analyze(
+                    review.review_title, review.review_text, review.star_rating
+                )
+            google_play_reviews.objects.bulk_update(batch, ['sentiment_score', 'sentiment_keywords'])
+            scored += len(batch)
+            last_id = batch[-1].id
+
+        days = {}
+        rows = (
+            qs.annotate(day=TruncDate('review_submit_date', tzinfo=dt_timezone.utc))
+            .values_list('tenant_id', 'package_name', 'day').distinct()
+        )
+        for tenant, package_name, day in rows.iterator():
+            days.setdefault(tenant, set()).add((package_name, day))
+        for tenant, tenant_days in days.items():
+            self.aggregate_days(tenant, tenant_days)
+        return scored
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def daily_from_reviews(self, tenant, package_name, start, end):
+        """
+        Agrégats journaliers au format de ReviewDailySentiment, calculés sur
+        google_play_reviews. Un avis non encore scoré prend le score de sa
+        note, comme analyze sans mot du lexique.
+        """
+        star_score = (Cast('star_rating', FloatField()) - 3) / 2
+        return list(
+            google_play_reviews.objects.filter(
+                tenant=tenant, package_name=package_name,
+                review_submit_date__gte=datetime.combine(start, datetime.min.time(), dt_timezone.utc),
+                review_submit_date__lt=datetime.combine(end + timedelta(days=1), datetime.min.time(), dt_timezone.utc),
+            )
+            .annotate(
+                date=TruncDate('review_submit_date', tzinfo=dt_timezone.utc),
+                score=Coalesce('sentiment_score', star_score, Value(0.0)),
+            )
+            .values('date')
+            .annotate(
+                review_count=Count('id'),
+                positive_count=Count('id', filter=Q(score__gt=POSITIVE_THRESHOLD)),
+                neutral_count=Count('id', filter=Q(score__gte=NEGATIVE_THRESHOLD, score__lte=POSITIVE_THRESHOLD)),
+                negative_count=Count('id', filter=Q(score__lt=NEGATIVE_THRESHOLD)),
+                sentiment_sum=Coalesce(Sum('score'), Value(0.0)),
+                rating_sum=Coalesce(Sum('star_rating'), Value(0)),
+            )
+            .order_by('date')
+        )
+
+    def daily(self, tenant, package_name, start, end):
+        """
+        Agrégats journaliers de la période depuis ReviewDailySentiment. Sans
+        aucune ligne pour la période (avis antérieurs au déploiement, avant
+        `python manage.py review_sentiment`), ils sont calculés sur les avis.
+        """
+        rows = list(
+            ReviewDailySentiment.objects.filter(
+                tenant=tenant, package_name=package_name, date__gte=start, date__lte=end
+            ).order_by('date').values('date', *DAILY_FIELDS)
+        )
+        return rows or self.daily_from_reviews(tenant, package_name, start, end)
+
+    def panel(self, tenant, package_name, start, end, limit=10):
+        """Tendance journalière, principales plaintes et points appréciés."""
+        daily = self.daily(tenant, package_name, start, end)
+        totals = {
+            name: sum(row[name] for row in daily)
+            for name in ('review_count', 'positive_count', 'neutral_count', 'negative_count')
+        }
+        score_sum = sum(row['sentiment_sum'] for row in daily)
+        trend = [
+            {
+                'date': str(row['date']),
+                'reviews': row['review_count'],
+                'positive': row['positive_count'],
+                'negative': row['negative_count'],
+                'sentiment': row['sentiment_sum'] / row['review_count'] if row['review_count'] else None,
+                'avg_rating': row['rating_sum'] / row['review_count'] if row['review_count'] else None,
+            }
+            for row in daily
+        ]
+
+        keywords = ReviewDailyKeyword.objects.filter(
+            tenant=tenant, package_name=package_name, date__gte=start, date__lte=end
+        ).values('keyword').annotate(
+            mentions=Sum('mentions'),
+            positive=Sum('positive_mentions'),
+            negative=Sum('negative_mentions'),
+        )
+        complaints = list(keywords.filter(negative__gt=0).order_by('-negative', '-mentions')[:limit])
+        praise = list(keywords.filter(positive__gt=0).order_by('-positive', '-mentions')[:limit])
+
+        return {
+            'package_name': package_name,
+            'start': str(start),
+            'end': str(end),
+            'totals': {
+                **totals,
+                'sentiment_score': score_sum / totals['review_count'] if totals['review_count'] else None,
+            },
+            'trend': trend,
+            'top_complaints': complaints,
+            'top_praise': praise,
+        }
+
+
+review_sentiment_service = ReviewSentimentService()
+
+__all__ = ["review_sentiment_service", "ReviewSentimentService", "DAILY_FIELDS"]
@@ -0,0 +1,223 @@
+import hashlib
+import logging
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import parse_qs, urlparse
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from play_reports.models import google_play_reviews
+from play_reports.services.review_search_service import review_search_service
+from play_reports.services.review_sentiment_service import review_sentiment_service
+
+logger = logging.getLogger(__name__)
+
+
+# Colonnes du CSV Play Console (en-têtes normalisés par csv_service) -> champs du modèle
+REVIEW_COLUMNS = {
+    'package_name': 'package_name',
+    'app_version_code': 'app_version_code',
+    'app_version_name': 'app_version_name',
+    'reviewer_language': 'reviewer_language',
+    'device': 'device',
+    'review_submit_date_and_time': 'review_submit_date',
+    'review_submit_date': 'review_submit_date',
+    'review_submit_millis_since_epoch': 'review_submit_millis_since_epoch',
+    'review_last_update_date_and_time': 'review_last_update_date',
+    'review_last_update_date': 'review_last_update_date',
+    'review_last_update_millis_since_epoch': 'review_last_update_millis_since_epoch',
+    'star_rating': 'star_rating',
+    'review_title': 'review_title',
+    'review_text': 'review_text',
+    'developer_reply_date_and_time': 'developer_reply_date',
+    'developer_reply_date': 'developer_reply_date',
+    'developer_reply_millis_since_epoch': 'developer_reply_millis_since_epoch',
+    'developer_reply_text': 'developer_reply_text',
+    'review_link': 'review_link',
+    'review_id': 'review_id',
+}
+
+# Colonnes recopiées dans device_metadata (clé JSON -> champ du modèle)
+METADATA_FIELDS = {
+    'device': 'device',
+    'language': 'reviewer_language',
+    'app_version_code': 'app_version_code',
+    'app_version_name': 'app_version_name',
+}
+
+# Champs réécrits lorsqu'un avis existant a été modifié
+UPDATABLE_FIELDS = (
+    'app_version_code', 'app_version_name', 'review_title', 'review_text', 'star_rating',
+    'review_last_update_date', 'review_last_update_millis_since_epoch',
+    'developer_reply_date', 'developer_reply_millis_since_epoch', 'developer_reply_text',
+    'reviewer_language', 'device', 'device_metadata', 'review_link',
+    'sentiment_score', 'sentiment_keywords', 'updated_at',
+)
+
+INTEGER_FIELDS = {
+    'star_rating', 'review_submit_millis_since_epoch',
+    'review_last_update_millis_since_epoch', 'developer_reply_millis_since_epoch',
+}
+DATETIME_FIELDS = {
+    'review_submit_date': 'review_submit_millis_since_epoch',
+    'review_last_update_date': 'review_last_update_millis_since_epoch',
+    'developer_reply_date': 'developer_reply_millis_since_epoch',
+}
+
+
+class ReviewsLoaderService:
+    """
+    Chargement dédié des avis (google_play_reviews).
+
+    Chaque ligne du CSV est convertie une seule fois en champs du modèle, avec
+    device_metadata construit à partir des colonnes appareil/langue/version
+    (et des colonnes non reconnues). Les review_id du lot sont confrontés à la
+    table en une requête (unnest + LEFT JOIN) : les avis absents sont insérés,
+    les avis existants ne sont réécrits que si
+    review_last_update_millis_since_epoch a changé. Une synchronisation
+    quotidienne ne coûte donc que les avis nouveaux ou modifiés.
+    """
+
+    def _clean(self, value):
+        if value is None:
+            return None
+        value = str(value).strip()
+        return value or None
+
+    def _to_int(self, value):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+    def _to_datetime(self, value, millis=None):
+        if value:
+            parsed = parse_datetime(value.replace('Z', '+00:00'))
+            if parsed is not None:
+                return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+        if millis is not None:
+            return datetime.fromtimestamp(millis / 1000, tz=dt_timezone.utc)
+        return None
+
+    def review_id_for(self, tenant_id, data):
+        """review_id du lien Play Console (reviewId=...), sinon identifiant stable dérivé."""
+        link = data.get('review_link')
+        if link:
+            review_id = parse_qs(urlparse(link).query).get('reviewId')
+            if review_id and review_id[0]:
+                return review_id[0]
+        base = f"{tenant_id}|{data['package_name']}|{data['review_submit_millis_since_epoch']}"
+        return 'derived:' + hashlib.sha1(base.encode('utf-8')).hexdigest()
+
+    def parse_row(self, row, tenant_id, default_package=None):
+        """Ligne CSV -> kwargs du modèle (None si la ligne est inexploitable)."""
+        data = {}
+        extra = {}
+        for column, value in row.items():
+            if not column:
+                continue
+            value = self._clean(value)
+            field = REVIEW_COLUMNS.get(column)
+            if field is None:
+                if value is not None:
+                    extra[column] = value
+                continue
+            data[field] = self._to_int(value) if field in INTEGER_FIELDS else value
+        for field in REVIEW_COLUMNS.values():
+            data.setdefault(field, None)
+
+        data['package_name'] = data.get('package_name') or default_package
+        for field, millis_field in DATETIME_FIELDS.items():
+            data[field] = self._to_datetime(data.get(field), data.get(millis_field))
+        if data['review_submit_millis_since_epoch'] is None and data['review_submit_date']:
+            data['review_submit_millis_since_epoch'] = int(data['review_submit_date'].timestamp() * 1000)
+
+        if not data['package_name'] or data['review_submit_date'] is None or data['star_rating'] not in range(1, 6):
+            return None
+
+        metadata = {key: data.get(field) for key, field in METADATA_FIELDS.items() if data.get(field)}
+        metadata.update(extra)
+        data['device_metadata'] = metadata
+        data['review_id'] = data['review_id'] or self.review_id_for(tenant_id, data)
+        data['tenant_id'] = tenant_id
+        return data
+
+    def existing(self, review_ids):
+        """{review_id: (id, tenant_id, review_last_update_millis_since_epoch)} en une requête."""
+        if not review_ids:
+            return {}
+        table = connection.ops.quote_name(google_play_reviews._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT k.review_id, r.id, r.tenant_id, r.review_last_update_millis_since_epoch
+                FROM unnest(%s::text[]) AS k(review_id)
+                LEFT JOIN {table} r ON r.review_id = k.review_id
+                """,
+                [list(review_ids)],
+            )
+            return {review_id: (pk, tenant, millis) for review_id, pk, tenant, millis in cursor.fetchall()}
+
+    def load(self, rows, tenant_id, default_package=None):
+        """Insère les nouveaux avis et met à jour les avis modifiés. Retourne (insérés, mis à jour)."""
+        parsed = {}
+        skipped = 0
+        for row in rows:
+            data = self.parse_row(row, tenant_id, default_package)
+            if data is None:
+                skipped += 1
+                continue
+            # Doublons dans le lot : la version la plus récente l'emporte
+            current = parsed.get(data['review_id'])
+            if current is None or (data['review_last_update_millis_since_epoch'] or 0) > (current['review_last_update_millis_since_epoch'] or 0):
+                parsed[data['review_id']] = data
+        if skipped:
+            logger.warning(f"Avis ignorés (lignes incomplètes): {skipped}")
+
+        known = self.existing(parsed.keys())
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for review_id, data in parsed.items():
+            pk, owner, last_update = known.get(review_id, (None, None, None))
+            if pk is not None and (owner != tenant_id or last_update == data['review_last_update_millis_since_epoch']):
+                continue
+            # Sentiment et mots-clés : calculés pour les seuls avis écrits
+            data['sentiment_score'], data['sentiment_keywords'] = review_sentiment_service.analyze(
+                data['review_title'], data['review_text'], data['star_rating']
+            )
+            if pk is None:
+                to_create.append(google_play_reviews(**data))
+            else:
+                data['updated_at'] = now
+                to_update.append(google_play_reviews(id=pk, **data))
+
+        with transaction.atomic():
+            if to_create:
+                # (tenant, package, millis) reste unique : un avis déjà chargé sous un autre id est ignoré
+                google_play_reviews.objects.bulk_create(to_create, ignore_conflicts=True)
+            if to_update:
+                google_play_reviews.objects.bulk_update(to_update, UPDATABLE_FIELDS, batch_size=500)
+            # Index plein texte des seuls avis écrits
+            review_search_service.refresh(review_ids=[review.review_id for review in to_create + to_update])
+
+        # Jours à réagréger par l'étape post-sync du sentiment
+        review_sentiment_service.mark(tenant_id, {
+            (review.package_name, review_sentiment_service.day_of(review.review_submit_date))
+            for review in to_create + to_update
+        })
+
+        logger.info(f"Avis tenant {tenant_id}: {len(to_create)} nouveaux, {len(to_update)} mis à jour, "
+                    f"{len(parsed) - len(to_create) - len(to_update)} inchangés")
+        return len(to_create), len(to_update)
+
+    def load_report(self, rows, tenant_id, report_info):
+        """Point d'entrée ProcessBucketService : (table, insérés, mis à jour)."""
+        inserted, updated = self.load(rows, tenant_id, report_info.get('appPackage'))
+        return report_info['preferredTableName'], inserted, updated
+
+
+reviews_loader_service = ReviewsLoaderService()
+
+__all__ = ["reviews_loader_service", "ReviewsLoaderService"]
@@ -0,0 +1,291 @@
+import hashlib
+import heapq
+import json
+import math
+import random
+import zlib
+
+
+class SpaceSaving:
+    """
+    Résumé « heavy hitters » Space-Saving (Metwally et al.), pondéré.
+
+    Au plus `capacity` compteurs sont conservés, quelle que soit la taille de
+    la longue traîne. Quand un élément inconnu arrive alors que le résumé est
+    plein, il remplace l'élément de plus petit compteur et hérite de ce
+    compteur comme erreur maximale : count - error est une borne inférieure
+    de la fréquence réelle, count une borne supérieure. Tout élément de
+    fréquence > total / capacity est garanti présent.
+
+    Chaque compteur porte aussi des métriques additionnelles (ex.
+    acquisitions) cumulées tant que l'élément est suivi.
+    """
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self.total = 0
+        # élément -> [compteur, erreur, {métrique: valeur}]
+        self.counters = {}
+        # Tas (compteur, élément) à invalidation paresseuse
+        self._heap = []
+
+    def _push(self, item):
+        heapq.heappush(self._heap, (self.counters[item][0], item))
+        if len(self._heap) > 4 * self.capacity + 64:
+            self._heap = [(entry[0], key) for key, entry in self.counters.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while self._heap:
+            count, item = heapq.heappop(self._heap)
+            entry = self.counters.get(item)
+            if entry is not None and entry[0] == count:
+                return item
+        return None
+
+    def update(self, item, weight=1, **metrics):
+        if not item or weight <= 0:
+            return
+        self.total += weight
+        entry = self.counters.get(item)
+        if entry is None:
+            if len(self.counters) < self.capacity:
+                entry = self.counters[item] = [0, 0, {}]
+            else:
+                evicted = self._pop_min()
+                floor = self.counters.pop(evicted)[0]
+                entry = self.counters[item] = [floor, floor, {}]
+        entry[0] += weight
+        for name, value in metrics.items():
+            entry[2][name] = entry[2].get(name, 0) + (value or 0)
+        self._push(item)
+
+    def merge(self, other):
+        """Fusion de deux résumés (compteurs additionnés, tronqués à la capacité)."""
+        merged = SpaceSaving(max(self.capacity, other.capacity))
+        merged.total = self.total + other.total
+        # Élément absent d'un résumé : au plus le plus petit compteur de ce résumé
+        floors = [
+            min((entry[0] for entry in sketch.counters.values()), default=0)
+            if len(sketch.counters) >= sketch.capacity else 0
+            for sketch in (self, other)
+        ]
+        combined = {}
+        for sketch in (self, other):
+            for item, (count, error, metrics) in sketch.counters.items():
+                entry = combined.setdefault(item, [0, 0, {}, 0])
+                entry[0] += count
+                entry[1] += error
+                entry[3] += 1
+                for name, value in metrics.items():
+                    entry[2][name] = entry[2].get(name, 0) + value
+        for item, entry in combined.items():
+            if entry[3] == 1:
+                # Présent d'un seul côté : l'autre côté a pu l'évincer
+                source = 0 if item in self.counters else 1
+                entry[0] += floors[1 - source]
+                entry[1] += floors[1 - source]
+        top = sorted(combined.items(), key=lambda pair: pair[1][0], reverse=True)[:merged.capacity]
+        merged.counters = {item: entry[:3] for item, entry in top}
+        merged._heap = [(entry[0], item) for item, entry in merged.counters.items()]
+        heapq.heapify(merged._heap)
+        return merged
+
+    def top(self, k=None):
+        """[(élément, compteur, erreur, métriques)] par compteur décroissant."""
+        rows = sorted(
+            ((item, entry[0], entry[1], entry[2]) for item, entry in self.counters.items()),
+            key=lambda row: row[1], reverse=True,
+        )
+        return rows[:k] if k else rows
+
+    def guaranteed_threshold(self):
+        """Fréquence au-delà de laquelle un élément est nécessairement suivi."""
+        return self.total / self.capacity if self.capacity else 0
+
+    def to_json(self):
+        return {
+            'capacity': self.capacity,
+            'total': self.total,
+            'counters': [[item, count, error, metrics] for item, count, error, metrics in self.top()],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        sketch = cls(data.get('capacity') or 200)
+        sketch.total = data.get('total') or 0
+        sketch.counters = {item: [count, error, metrics or {}] for item, count, error, metrics in data.get('counters') or []}
+        sketch._heap = [(entry[0], item) for item, entry in sketch.counters.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
+
+
+def _hash64(value):
+    """Hachage 64 bits stable entre processus (contrairement à hash())."""
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    """
+    Compteur de valeurs distinctes HyperLogLog (Flajolet et al.).
+
+    2**precision registres d'un octet ; fusion exacte par maximum registre à
+    registre, donc un résumé par jour se combine sur n'importe quelle plage.
+    Erreur type relative 1,04 / sqrt(2**precision) : 1,6 % pour la
+    précision 12 par défaut (environ 4,9 % au pire à 99 % de confiance).
+    Les petites cardinalités sont corrigées par comptage linéaire et sont
+    alors quasi exactes.
+    """
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    def update(self, value):
+        hashed = _hash64(value)
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Précisions HyperLogLog différentes")
+        merged = HyperLogLog(self.precision)
+        merged.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return merged
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return estimate
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def to_bytes(self):
+        return zlib.compress(bytes([self.precision]) + bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data):
+        raw = zlib.decompress(bytes(data))
+        sketch = cls(raw[0])
+        sketch.registers = bytearray(raw[1:])
+        return sketch
+
+
+class KLL:
+    """
+    Résumé de quantiles KLL (Karnin, Lang, Liberty).
+
+    Des compacteurs de capacité décroissante (facteur 2/3) conservent un
+    échantillon pondéré d'au plus ~3k valeurs. Fusionnable sur n'importe
+    quelle plage. Erreur de rang normalisée d'environ 1,65 % pour k = 200
+    (99 % de confiance) : le quantile 0,9 renvoyé a un rang réel compris
+    entre 0,8835 et 0,9165.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]
+        self._random = random.Random(seed)
+
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _size(self):
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def _max_size(self):
+        return sum(self._capacity(height) for height in range(len(self.compactors)))
+
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for height, compactor in enumerate(self.compactors):
+                if len(compactor) >= self._capacity(height):
+                    if height + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    compactor.sort()
+                    # Nombre pair d'éléments compactés : un élément isolé reste au niveau
+                    kept = [compactor.pop()] if len(compactor) % 2 else []
+                    offset = self._random.randint(0, 1)
+                    self.compactors[height + 1].extend(compactor[offset::2])
+                    self.compactors[height] = kept
+                    break
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other):
+        merged = KLL(max(self.k, other.k))
+        merged.n = self.n + other.n
+        height = max(len(self.compactors), len(other.compactors))
+        merged.compactors = [
+            (self.compactors[h] if h < len(self.compactors) else [])
+            + (other.compactors[h] if h < len(other.compactors) else [])
+            for h in range(height)
+        ]
+        merged._compress()
+        return merged
+
+    def _weighted(self):
+        items = sorted(
+            (value, 1 << height)
+            for height, compactor in enumerate(self.compactors)
+            for value in compactor
+        )
+        return items, sum(weight for _, weight in items)
+
+    def quantiles(self, fractions):
+        """Valeurs aux rangs normalisés demandés (None si le résumé est vide)."""
+        items, total = self._weighted()
+        if not items:
+            return [None for _ in fractions]
+        results = []
+        for fraction in fractions:
+            target, cumulative = fraction * total, 0
+            for value, weight in items:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            results.append(value)
+        return results
+
+    def histogram(self, values):
+        """Part estimée des observations égales à chaque valeur discrète."""
+        items, total = self._weighted()
+        counts = dict.fromkeys(values, 0)
+        for value, weight in items:
+            if value in counts:
+                counts[value] += weight
+        return {value: counts[value] / total if total else None for value in values}
+
+    def rank_error(self):
+        # Ordre de grandeur : l'erreur décroît comme 1/k
+        return 0.0165 * 200 / self.k
+
+    def to_bytes(self):
+        return zlib.compress(json.dumps({'k': self.k, 'n': self.n, 'compactors': self.compactors}).encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, data):
+        payload = json.loads(zlib.decompress(bytes(data)))
+        sketch = cls(payload['k'])
+        sketch.n = payload['n']
+        sketch.compactors = payload['compactors']
+        return sketch
+
+
+__all__ = ["SpaceSaving", "HyperLogLog", "KLL"]
@@ -0,0 +1,322 @@
+import logging
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncMonth
+
+from play_reports.models import (
+    google_play_store_performance_overview,
+    google_play_store_performance_dimensioned,
+    StorePerformanceMonthly,
+    SearchTermSketch,
+)
+from play_reports.services.sketch_service import SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+
+# Une écriture dans l'une de ces tables réagrège les mois concernés
+STORE_FUNNEL_SOURCES = {
+    'google_play_store_performance_overview': google_play_store_performance_overview,
+    'google_play_store_performance_dimensioned': google_play_store_performance_dimensioned,
+}
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class StoreFunnelService:
+    """
+    Entonnoir de la fiche Play Store et termes de recherche dominants.
+
+    Étape post-sync des rapports de performance du store : pour les mois
+    ayant reçu des lignes depuis la dernière construction, l'entonnoir
+    visiteurs -> acquisitions est réagrégé en SQL par (package, mois, source
+    de trafic) dans StorePerformanceMonthly, et les termes de recherche sont
+    résumés par un Space-Saving borné (SearchTermSketch). Les panneaux et les
+    listes d'options ne lisent ainsi que quelques centaines de compteurs,
+    quelle que soit la longueur de la traîne des termes.
+
+    Les fichiers overview (colonnes traffic_source / search_term) et les
+    fichiers dimensionnés portent les mêmes mesures : les premiers priment
+    lorsque les deux existent pour une même clé.
+    """
+
+    def capacity(self):
+        return getattr(settings, 'SEARCH_TERM_SKETCH_CAPACITY', 200)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def _changed_months(self, tenant_id):
+        watermark = (
+            StorePerformanceMonthly.objects.filter(tenant_id=tenant_id)
+            .aggregate(last=Max('updated_at'))['last']
+        )
+        months = set()
+        for model in STORE_FUNNEL_SOURCES.values():
+            qs = model.objects.filter(tenant_id=tenant_id)
+            if watermark is not None:
+                qs = qs.filter(updated_at__gt=watermark)
+            months.update(
+                qs.annotate(month=TruncMonth('date')).values_list('month', flat=True).distinct().order_by()
+            )
+        return months
+
+    def _scope(self, alias):
+        # Bornes de dates en plus du filtre par mois : les index (tenant, date) restent utilisables
+        return (
+            f"{alias}.tenant_id = %(tenant)s AND {alias}.date >= %(first)s AND {alias}.date < %(after)s"
+            f" AND date_trunc('month', {alias}.date)::date = ANY(%(months)s::date[])"
+        )
+
+    def aggregate_months(self, tenant_id, months):
+        """Recalcule l'entonnoir et les résumés de termes du tenant pour les mois donnés."""
+        months = sorted({month_start(month) for month in months})
+        if not months:
+            return 0
+        qn = connection.ops.quote_name
+        overview = qn(google_play_store_performance_overview._meta.db_table)
+        dimensioned = qn(google_play_store_performance_dimensioned._meta.db_table)
+        monthly = qn(StorePerformanceMonthly._meta.db_table)
+        params = {
+            'tenant': tenant_id,
+            'months': months,
+            'first': months[0],
+            'after': add_months(months[-1], 1),
+        }
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {monthly} WHERE tenant_id = %(tenant)s AND month = ANY(%(months)s::date[])",
+                    params,
+                )
+                cursor.execute(
+                    f"""
+                    WITH o AS (
+                        SELECT o.package_name, date_trunc('month', o.date)::date AS month,
+                               LEFT(COALESCE(o.traffic_source, ''), 100) AS traffic_source,
+                               SUM(COALESCE(o.store_listing_visitors, 0)) AS visitors,
+                               SUM(COALESCE(o.store_listing_acquisitions, 0)) AS acquisitions
+                        FROM {overview} o WHERE {self._scope('o')}
+                        GROUP BY 1, 2, 3
+                    ), d AS (
+                        SELECT d.package_name, date_trunc('month', d.date)::date AS month,
+                               CASE WHEN d.dimension_type = 'overview' THEN ''
+                                    ELSE LEFT(d.dimension_value, 100) END AS traffic_source,
+                               SUM(d.store_listing_visitors) AS visitors,
+                               SUM(d.store_listing_acquisitions) AS acquisitions
+                        FROM {dimensioned} d
+                        WHERE {self._scope('d')} AND d.dimension_type IN ('overview', 'traffic_source')
+                        GROUP BY 1, 2, 3
+                    )
+                    INSERT INTO {monthly} (tenant_id, package_name, month, traffic_source,
+                                           visitors, acquisitions, updated_at)
+                    SELECT %(tenant)s, COALESCE(o.package_name, d.package_name), COALESCE(o.month, d.month),
+                           COALESCE(o.traffic_source, d.traffic_source),
+                           GREATEST(COALESCE(o.visitors, d.visitors), 0),
+                           GREATEST(COALESCE(o.acquisitions, d.acquisitions), 0), NOW()
+                    FROM o
+                    FULL OUTER JOIN d
+                      ON d.package_name = o.package_name AND d.month = o.month AND d.traffic_source = o.traffic_source
+                    """,
+                    params,
+                )
+                written = cursor.rowcount
+            sketches = self._build_sketches(tenant_id, months, params, overview, dimensioned)
+
+        logger.info(
+            f"Entonnoir store tenant {tenant_id}: {len(months)} mois, {written} ligne(s), {sketches} résumé(s) de termes"
+        )
+        return written
+
+    def _build_sketches(self, tenant_id, months, params, overview, dimensioned):
+        """
+        Résume les termes de chaque (package, mois) par un Space-Saving.
+
+        Les totaux par terme sont calculés par PostgreSQL et lus en flux sur
+        un curseur serveur trié par (package, mois) : la mémoire Python reste
+        bornée par la capacité du résumé, pas par le nombre de termes.
+        """
+        SearchTermSketch.objects.filter(tenant_id=tenant_id, month__in=months).delete()
+        capacity = self.capacity()
+        objects = []
+        current, sketch, distinct = None, None, 0
+
+        def flush():
+            if sketch is not None and sketch.total:
+                objects.append(SearchTermSketch(
+                    tenant_id=tenant_id, package_name=current[0], month=current[1], capacity=capacity,
+                    total_visitors=sketch.total, distinct_terms=distinct,
+                    counters=sketch.to_json()['counters'],
+                ))
+
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH o AS (
+                    SELECT o.package_name, date_trunc('month', o.date)::date AS month, o.search_term AS term,
+                           SUM(COALESCE(o.store_listing_visitors, 0)) AS visitors,
+                           SUM(COALESCE(o.store_listing_acquisitions, 0)) AS acquisitions
+                    FROM {overview} o WHERE {self._scope('o')} AND COALESCE(o.search_term, '') <> ''
+                    GROUP BY 1, 2, 3
+                ), d AS (
+                    SELECT d.package_name, date_trunc('month', d.date)::date AS month, d.dimension_value AS term,
+                           SUM(d.store_listing_visitors) AS visitors,
+                           SUM(d.store_listing_acquisitions) AS acquisitions
+                    FROM {dimensioned} d
+                    WHERE {self._scope('d')} AND d.dimension_type = 'search_term' AND d.dimension_value <> ''
+                    GROUP BY 1, 2, 3
+                )
+                SELECT COALESCE(o.package_name, d.package_name), COALESCE(o.month, d.month),
+                       COALESCE(o.term, d.term), COALESCE(o.visitors, d.visitors),
+                       COALESCE(o.acquisitions, d.acquisitions)
+                FROM o
+                FULL OUTER JOIN d ON d.package_name = o.package_name AND d.month = o.month AND d.term = o.term
+                ORDER BY 1, 2
+                """,
+                params,
+            )
+            for package_name, month, term, visitors, acquisitions in cursor:
+                if (package_name, month) != current:
+                    flush()
+                    current, sketch, distinct = (package_name, month), SpaceSaving(capacity), 0
+                distinct += 1
+                sketch.update(term, visitors or 0, acquisitions=acquisitions or 0)
+            flush()
+
+        SearchTermSketch.objects.bulk_create(objects, batch_size=500)
+        return len(objects)
+
+    def refresh(self, tenant_id, table_name):
+        """Étape post-sync : réagrège les mois modifiés (overview ou dimensionné)."""
+        if table_name not in STORE_FUNNEL_SOURCES:
+            return
+        months = self._changed_months(tenant_id)
+        if months:
+            self.aggregate_months(tenant_id, months)
+
+    def rebuild(self, tenant_id=None):
+        """Reconstruit tous les mois (tous les tenants par défaut)."""
+        months = {}
+        for model in STORE_FUNNEL_SOURCES.values():
+            qs = model.objects.all()
+            if tenant_id is not None:
+                qs = qs.filter(tenant_id=tenant_id)
+            rows = qs.annotate(month=TruncMonth('date')).values_list('tenant_id', 'month').distinct().order_by()
+            for tenant, month in rows.iterator():
+                months.setdefault(tenant, set()).add(month)
+        return sum(self.aggregate_months(tenant, tenant_months) for tenant, tenant_months in months.items())
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def _conversion(self, row):
+        return row['acquisitions'] / row['visitors'] if row['visitors'] else None
+
+    def search_term_sketch(self, tenant, package_name, start, end):
+        """Fusion des résumés mensuels couvrant la période (None si aucun)."""
+        merged = None
+        for row in SearchTermSketch.objects.filter(
+            tenant=tenant, package_name=package_name, month__gte=month_start(start), month__lte=month_start(end),
+        ).values('capacity', 'total_visitors', 'counters'):
+            sketch = SpaceSaving.from_json({
+                'capacity': row['capacity'], 'total': row['total_visitors'], 'counters': row['counters'],
+            })
+            merged = sketch if merged is None else merged.merge(sketch)
+        return merged
+
+    def top_search_terms(self, tenant, package_name, start, end, limit=10):
+        """Termes dominants : visiteurs estimés (bornes basse/haute) et acquisitions suivies."""
+        sketch = self.search_term_sketch(tenant, package_name, start, end)
+        if sketch is None:
+            return []
+        return [
+            {
+                'search_term': term,
+                'visitors': count,
+                'visitors_min': count - error,
+                'acquisitions': metrics.get('acquisitions', 0),
+                'exact': error == 0,
+            }
+            for term, count, error, metrics in sketch.top(limit)
+        ]
+
+    def search_term_options(self, tenant, package_name=None, limit=100):
+        """Options de filtre bornées : termes dominants des résumés récents."""
+        qs = SearchTermSketch.objects.filter(tenant=tenant)
+        if package_name:
+            qs = qs.filter(package_name=package_name)
+        last = qs.aggregate(last=Max('month'))['last']
+        if last is None:
+            return []
+        scores = {}
+        for counters in qs.filter(month__gt=add_months(last, -12)).values_list('counters', flat=True):
+            for term, count, _error, _metrics in counters:
+                scores[term] = scores.get(term, 0) + count
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+    def panel(self, tenant, package_name, start, end, filters=None, limit=10):
+        """Entonnoir par mois et par source de trafic, totaux et termes dominants."""
+        filters = filters or {}
+        first, last = month_start(start), month_start(end)
+        qs = StorePerformanceMonthly.objects.filter(
+            tenant=tenant, package_name=package_name, month__gte=first, month__lte=last,
+        )
+        if filters.get('traffic_source'):
+            qs = qs.filter(traffic_source=filters['traffic_source'])
+
+        # La ligne '' (total de la fiche) ne s'additionne pas aux sources :
+        # elle fait foi pour un mois lorsqu'elle existe
+        sums = {'visitors': Sum('visitors'), 'acquisitions': Sum('acquisitions')}
+        by_source = [
+            {**row, 'conversion_rate': self._conversion(row)}
+            for row in qs.exclude(traffic_source='').values('traffic_source').annotate(**sums).order_by('-visitors')
+        ]
+        by_month, months = [], {}
+        for row in qs.order_by('month', '-visitors').values('month', 'traffic_source', 'visitors', 'acquisitions'):
+            by_month.append({
+                'month': row['month'].strftime('%Y-%m'),
+                'traffic_source': row['traffic_source'],
+                'visitors': row['visitors'],
+                'acquisitions': row['acquisitions'],
+                'conversion_rate': self._conversion(row),
+            })
+            month = months.setdefault(row['month'], [None, [0, 0]])
+            if row['traffic_source'] == '':
+                month[0] = (row['visitors'], row['acquisitions'])
+            else:
+                month[1][0] += row['visitors']
+                month[1][1] += row['acquisitions']
+        totals = {'visitors': 0, 'acquisitions': 0}
+        for listing, sources in months.values():
+            visitors, acquisitions = listing or sources
+            totals['visitors'] += visitors
+            totals['acquisitions'] += acquisitions
+        totals['conversion_rate'] = self._conversion(totals)
+
+        return {
+            'package_name': package_name,
+            'start': str(first),
+            'end': str(last),
+            'totals': totals,
+            'by_traffic_source': by_source,
+            'by_month': by_month,
+            'top_search_terms': self.top_search_terms(tenant, package_name, start, end, limit),
+        }
+
+
+store_funnel_service = StoreFunnelService()
+
+__all__ = ["store_funnel_service", "StoreFunnelService", "STORE_FUNNEL_SOURCES"]
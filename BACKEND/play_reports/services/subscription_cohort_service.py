@@ -0,0 +1,274 @@
+import logging
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncMonth
+
+from play_reports.models import (
+    google_play_subscriptions_overview,
+    google_play_subscription_cancellation_reasons,
+    SubscriptionMonthly,
+    SubscriptionChurnReason,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Tables sources -> champ date ; une écriture dans l'une ou l'autre
+# réagrège les mois concernés des deux tables de faits
+SUBSCRIPTION_SOURCES = {
+    'google_play_subscriptions_overview': (google_play_subscriptions_overview, 'date'),
+    'google_play_subscription_cancellation_reasons': (google_play_subscription_cancellation_reasons, 'cancellation_date'),
+}
+
+# Horizon par défaut des cohortes (mois suivant l'acquisition)
+DEFAULT_HORIZON = 12
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class SubscriptionCohortService:
+    """
+    Matrices de churn et de cohortes des abonnements.
+
+    Étape post-sync des rapports d'abonnements et de raisons d'annulation :
+    les mois ayant reçu des lignes depuis la dernière construction sont
+    réagrégés par (package, produit, plan de base, mois) en SQL. L'endpoint
+    de cohortes ne lit ensuite que quelques dizaines de lignes mensuelles.
+
+    Les rapports Play Console étant agrégés (sans identifiant d'abonné), la
+    rétention d'une cohorte est estimée en chaînant les taux de churn
+    mensuels : rétention(c, k) = Π (1 - churn(c + j)), j = 1..k.
+    """
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def _changed_months(self, tenant_id):
+        watermark = (
+            SubscriptionMonthly.objects.filter(tenant_id=tenant_id)
+            .aggregate(last=Max('updated_at'))['last']
+        )
+        months = set()
+        for model, date_field in SUBSCRIPTION_SOURCES.values():
+            qs = model.objects.filter(tenant_id=tenant_id)
+            if watermark is not None:
+                qs = qs.filter(updated_at__gt=watermark)
+            months.update(
+                qs.annotate(month=TruncMonth(date_field)).values_list('month', flat=True).distinct().order_by()
+            )
+        return months
+
+    def aggregate_months(self, tenant_id, months):
+        """Recalcule SubscriptionMonthly et SubscriptionChurnReason pour les mois donnés."""
+        months = sorted({month_start(month) for month in months})
+        if not months:
+            return 0
+        qn = connection.ops.quote_name
+        subscriptions = qn(google_play_subscriptions_overview._meta.db_table)
+        reasons = qn(google_play_subscription_cancellation_reasons._meta.db_table)
+        monthly = qn(SubscriptionMonthly._meta.db_table)
+        churn = qn(SubscriptionChurnReason._meta.db_table)
+        params = {
+            'tenant': tenant_id,
+            'months': months,
+            'first': months[0],
+            'after': add_months(months[-1], 1),
+        }
+        # Bornes de dates en plus du filtre par mois : les index (tenant, date) restent utilisables
+        subscription_rows = (
+            f"FROM {subscriptions} s WHERE s.tenant_id = %(tenant)s"
+            f" AND s.date >= %(first)s AND s.date < %(after)s"
+            f" AND date_trunc('month', s.date)::date = ANY(%(months)s::date[])"
+        )
+        reason_rows = (
+            f"FROM {reasons} c WHERE c.tenant_id = %(tenant)s"
+            f" AND c.cancellation_date >= %(first)s AND c.cancellation_date < %(after)s"
+            f" AND date_trunc('month', c.cancellation_date)::date = ANY(%(months)s::date[])"
+        )
+        reason_product = "COALESCE(NULLIF(c.subscription_id, ''), c.sku_id)"
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for table in (monthly, churn):
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE tenant_id = %(tenant)s AND month = ANY(%(months)s::date[])",
+                    params,
+                )
+            cursor.execute(
+                f"""
+                WITH daily AS (
+                    SELECT s.package_name, s.product_id, COALESCE(s.base_plan_id, '') AS base_plan_id,
+                           date_trunc('month', s.date)::date AS month, s.date,
+                           SUM(s.new_subscribers) AS new_subscribers,
+                           SUM(s.cancelled_subscribers) AS cancelled_subscribers,
+                           SUM(s.active_subscribers) AS active_subscribers
+                    {subscription_rows}
+                    GROUP BY 1, 2, 3, 4, 5
+                ), subs AS (
+                    SELECT package_name, product_id, base_plan_id, month,
+                           SUM(new_subscribers) AS new_subscribers,
+                           SUM(cancelled_subscribers) AS cancelled_subscribers,
+                           (array_agg(active_subscribers ORDER BY date))[1] AS active_start,
+                           (array_agg(active_subscribers ORDER BY date DESC))[1] AS active_end,
+                           COUNT(*) AS days_observed
+                    FROM daily
+                    GROUP BY 1, 2, 3, 4
+                ), cancels AS (
+                    SELECT c.package_name, {reason_product} AS product_id,
+                           date_trunc('month', c.cancellation_date)::date AS month,
+                           SUM(c.cancellation_count) AS cancellations
+                    {reason_rows}
+                    GROUP BY 1, 2, 3
+                )
+                INSERT INTO {monthly} (tenant_id, package_name, product_id, base_plan_id, month, new_subscribers,
+                                       cancelled_subscribers, active_start, active_end, days_observed,
+                                       reason_cancellations, updated_at)
+                SELECT %(tenant)s, COALESCE(s.package_name, r.package_name), COALESCE(s.product_id, r.product_id),
+                       COALESCE(s.base_plan_id, ''), COALESCE(s.month, r.month),
+                       COALESCE(s.new_subscribers, 0), COALESCE(s.cancelled_subscribers, 0),
+                       COALESCE(s.active_start, 0), COALESCE(s.active_end, 0), COALESCE(s.days_observed, 0),
+                       COALESCE(r.cancellations, 0), NOW()
+                FROM subs s
+                FULL OUTER JOIN cancels r
+                  ON r.package_name = s.package_name AND r.product_id = s.product_id
+                 AND r.month = s.month AND s.base_plan_id = ''
+                """,
+                params,
+            )
+            written = cursor.rowcount
+            cursor.execute(
+                f"""
+                INSERT INTO {churn} (tenant_id, package_name, product_id, month, cancellation_reason, cancellations)
+                SELECT %(tenant)s, c.package_name, {reason_product},
+                       date_trunc('month', c.cancellation_date)::date, c.cancellation_reason,
+                       SUM(c.cancellation_count)
+                {reason_rows}
+                GROUP BY 2, 3, 4, 5
+                """,
+                params,
+            )
+
+        logger.info(f"Abonnements tenant {tenant_id}: {len(months)} mois, {written} ligne(s) mensuelles")
+        return written
+
+    def refresh(self, tenant_id, table_name):
+        """Étape post-sync : réagrège les mois modifiés (abonnements ou annulations)."""
+        if table_name not in SUBSCRIPTION_SOURCES:
+            return
+        months = self._changed_months(tenant_id)
+        if months:
+            self.aggregate_months(tenant_id, months)
+
+    def rebuild(self, tenant_id=None):
+        """Reconstruit tous les mois (tous les tenants par défaut)."""
+        months = {}
+        for model, date_field in SUBSCRIPTION_SOURCES.values():
+            qs = model.objects.all()
+            if tenant_id is not None:
+                qs = qs.filter(tenant_id=tenant_id)
+            rows = qs.annotate(month=TruncMonth(date_field)).values_list('tenant_id', 'month').distinct().order_by()
+            for tenant, month in rows.iterator():
+                months.setdefault(tenant, set()).add(month)
+        return sum(self.aggregate_months(tenant, tenant_months) for tenant, tenant_months in months.items())
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def _churn_rate(self, row):
+        cancelled = row['cancelled_subscribers'] or row['reason_cancellations']
+        exposed = row['active_start'] + row['new_subscribers']
+        return cancelled / exposed if exposed else None
+
+    def panel(self, tenant, package_name, start, end, filters=None, horizon=DEFAULT_HORIZON):
+        """Churn mensuel, matrice de cohortes estimée, churn par produit et raisons."""
+        filters = filters or {}
+        first, last = month_start(start), month_start(end)
+        qs = SubscriptionMonthly.objects.filter(
+            tenant=tenant, package_name=package_name, month__gte=first, month__lte=last
+        )
+        reasons = SubscriptionChurnReason.objects.filter(
+            tenant=tenant, package_name=package_name, month__gte=first, month__lte=last
+        )
+        if filters.get('product_id'):
+            qs = qs.filter(product_id=filters['product_id'])
+            reasons = reasons.filter(product_id=filters['product_id'])
+        if filters.get('base_plan_id'):
+            qs = qs.filter(base_plan_id=filters['base_plan_id'])
+
+        sums = {
+            name: Sum(name) for name in (
+                'new_subscribers', 'cancelled_subscribers', 'active_start', 'active_end', 'reason_cancellations',
+            )
+        }
+        months = list(qs.values('month').annotate(**sums).order_by('month'))
+        churn = [
+            {
+                'month': row['month'].strftime('%Y-%m'),
+                'new_subscribers': row['new_subscribers'],
+                'cancelled_subscribers': row['cancelled_subscribers'] or row['reason_cancellations'],
+                'active_start': row['active_start'],
+                'active_end': row['active_end'],
+                'churn_rate': self._churn_rate(row),
+            }
+            for row in months
+        ]
+
+        # Cohortes : rétention estimée par chaînage des churns mensuels suivants
+        rates = {row['month']: self._churn_rate(row) for row in months}
+        cohorts = []
+        for row in months:
+            if not row['new_subscribers']:
+                continue
+            retention = [1.0]
+            for offset in range(1, horizon + 1):
+                month = add_months(row['month'], offset)
+                if month > last or rates.get(month) is None:
+                    break
+                retention.append(retention[-1] * max(0.0, 1 - rates[month]))
+            cohorts.append({
+                'cohort': row['month'].strftime('%Y-%m'),
+                'size': row['new_subscribers'],
+                'retention': retention,
+                'retained': [round(row['new_subscribers'] * value) for value in retention],
+            })
+
+        products = []
+        for row in qs.values('product_id', 'base_plan_id').annotate(**sums).order_by('-new_subscribers'):
+            products.append({
+                'product_id': row['product_id'],
+                'base_plan_id': row['base_plan_id'],
+                'new_subscribers': row['new_subscribers'],
+                'cancelled_subscribers': row['cancelled_subscribers'] or row['reason_cancellations'],
+                'avg_monthly_churn_rate': self._churn_rate(row),
+            })
+
+        top_reasons = list(
+            reasons.values('cancellation_reason')
+                   .annotate(count=Sum('cancellations'))
+                   .order_by('-count')[:10]
+        )
+
+        return {
+            'package_name': package_name,
+            'start': str(first),
+            'end': str(last),
+            'churn_by_month': churn,
+            'cohorts': cohorts,
+            'churn_by_product': products,
+            'top_reasons': top_reasons,
+        }
+
+
+subscription_cohort_service = SubscriptionCohortService()
+
+__all__ = ["subscription_cohort_service", "SubscriptionCohortService"]
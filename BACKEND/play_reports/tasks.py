@@ -0,0 +1,30 @@
+import logging
+
+from celery import shared_task
+
+from play_reports.services.anomaly_service import anomaly_service
+from play_reports.services.export_service import export_service
+from play_reports.services.partition_service import partition_service
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='play_reports.run_export_job')
+def run_export_job(job_id):
+    """Exécute un export de rapport asynchrone (ExportJob)."""
+    job = export_service.run_job(job_id)
+    logger.info("export %s: %s (%s lignes)", job.id, job.status, job.row_count)
+    return job.status
+
+
+@shared_task(name='play_reports.ensure_partitions')
+def ensure_partitions():
+    """Crée les partitions mensuelles à venir des tables de rapports partitionnées."""
+    created = partition_service.ensure_all()
+    return {table: [month.isoformat() for month in months] for table, months in created.items()}
+
+
+@shared_task(name='play_reports.detect_anomalies')
+def detect_anomalies(tenant_id=None):
+    """Détecte les anomalies des séries installs, crashes et notes (tous les tenants par défaut)."""
+    return anomaly_service.run_all(tenant_id)
@@ -0,0 +1,32 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.test import TestCase
+
+from play_reports.models import DataVersion, Tenant
+from play_reports.services.data_version_service import data_version_service
+
+TABLE = 'google_play_installs_overview'
+
+
+class DataVersionTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='tenant')
+
+    def bump_at(self, moment):
+        with mock.patch('django.utils.timezone.now', return_value=moment):
+            data_version_service.bump(self.tenant.id, TABLE)
+
+    def test_bump_moves_version_and_updated_at(self):
+        first = datetime(2025, 1, 1, 8, 0, tzinfo=dt_timezone.utc)
+        second = datetime(2025, 1, 2, 8, 0, tzinfo=dt_timezone.utc)
+        self.bump_at(first)
+        self.assertEqual(data_version_service.current(TABLE, self.tenant.id), f"1-{int(first.timestamp())}")
+
+        self.bump_at(second)
+        version = DataVersion.objects.get(tenant=self.tenant, table_name=TABLE)
+        self.assertEqual((version.version, version.updated_at), (2, second))
+        self.assertEqual(data_version_service.current(TABLE, self.tenant.id), f"2-{int(second.timestamp())}")
+
+    def test_current_without_versions(self):
+        self.assertEqual(data_version_service.current(TABLE, self.tenant.id), "0-0")
@@ -0,0 +1,61 @@
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+
+from play_reports.models import Tenant, google_play_installs_overview
+from play_reports.services.dimension_encoding_service import FACTS_SUFFIX, dimension_encoding_service
+
+TABLE = 'google_play_installs_overview'
+
+
+class EncodedTableTests(TestCase):
+    """Lecture et suppression au travers de la vue d'une table encodée."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='tenant')
+        self.other = Tenant.objects.create(name='other')
+        for tenant in (self.tenant, self.other):
+            for country in ('FR', 'DE'):
+                google_play_installs_overview.objects.create(
+                    tenant=tenant, package_name='com.example', date=date(2025, 1, 1),
+                    country=country, device='pixel', daily_user_installs=3,
+                )
+        with connection.cursor() as cursor:
+            # Clés étrangères différées de Django : vérifiées avant le ALTER d'encode
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        dimension_encoding_service.encode(TABLE)
+
+    def fact_count(self, tenant):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {connection.ops.quote_name(TABLE + FACTS_SUFFIX)} WHERE tenant_id = %s",
+                [tenant.id],
+            )
+            return cursor.fetchone()[0]
+
+    def test_view_exposes_original_values(self):
+        self.assertTrue(dimension_encoding_service.is_encoded(TABLE))
+        self.assertEqual(
+            sorted(google_play_installs_overview.objects.filter(tenant=self.tenant).values_list('country', 'device')),
+            [('DE', 'pixel'), ('FR', 'pixel')],
+        )
+
+    def test_queryset_delete_goes_to_facts(self):
+        google_play_installs_overview.objects.filter(tenant=self.tenant, country='FR').delete()
+
+        self.assertEqual(self.fact_count(self.tenant), 1)
+        self.assertEqual(self.fact_count(self.other), 2)
+
+    def test_tenant_cascade_delete(self):
+        self.tenant.delete()
+
+        self.assertEqual(self.fact_count(self.tenant), 0)
+        self.assertEqual(self.fact_count(self.other), 2)
+
+    def test_decode_restores_table(self):
+        dimension_encoding_service.decode(TABLE)
+
+        self.assertFalse(dimension_encoding_service.is_encoded(TABLE))
+        google_play_installs_overview.objects.filter(tenant=self.tenant).delete()
+        self.assertEqual(google_play_installs_overview.objects.count(), 2)
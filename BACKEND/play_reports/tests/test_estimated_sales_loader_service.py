@@ -0,0 +1,82 @@
+import csv
+import io
+
+from django.db import transaction
+from django.test import TestCase
+
+from play_reports.models import Tenant, google_play_estimatedSales
+from play_reports.services.estimated_sales_loader_service import estimated_sales_loader_service
+
+HEADER = ['Order Number', 'Order Charged Date', 'Order Charged Timestamp', 'Financial Status',
+          'Product ID', 'Charged Amount', 'Promotion ID']
+
+
+def report(*rows):
+    """CSV de ventes estimées : (commande, date, horodatage, statut)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for order, day, timestamp, status in rows:
+        writer.writerow([order, day, timestamp, status, 'premium', '4.99', ''])
+    buffer.seek(0)
+    return buffer
+
+
+class EstimatedSalesLoaderTests(TestCase):
+    """Déduplication ensembliste : nouvelles commandes et changements de statut."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='tenant')
+
+    def load(self, *rows):
+        return estimated_sales_loader_service.load_stream(report(*rows), self.tenant.id)
+
+    def statuses(self):
+        return dict(
+            google_play_estimatedSales.objects.filter(tenant=self.tenant)
+            .values_list('order_number', 'financial_status')
+        )
+
+    def test_insert_new_orders_then_update_statuses(self):
+        self.assertEqual(self.load(
+            ('GPA.1', '2025-04-01', '1743465600', 'Charged'),
+            ('GPA.2', '2025-04-01', '1743469200', 'Charged'),
+        ), (2, 2, 0))
+
+        self.assertEqual(self.load(
+            ('GPA.1', '2025-04-01', '1743465600', 'Refund'),
+            ('GPA.2', '2025-04-01', '1743469200', 'Charged'),
+            ('GPA.3', '2025-04-02', '1743552000', 'Charged'),
+        ), (3, 1, 1))
+        self.assertEqual(self.statuses(), {'GPA.1': 'Refund', 'GPA.2': 'Charged', 'GPA.3': 'Charged'})
+
+    def test_charge_and_refund_in_one_file(self):
+        for first, second in (('Charged', 'Refund'), ('Refund', 'Charged')):
+            with self.subTest(order=(first, second)):
+                google_play_estimatedSales.objects.filter(tenant=self.tenant).delete()
+                self.load(
+                    ('GPA.1', '2025-04-01', '1743465600', first),
+                    ('GPA.1', '2025-04-01', '1743465600', second),
+                )
+                self.assertEqual(self.statuses(), {'GPA.1': 'Refund'})
+
+    def test_refund_kept_when_charge_and_refund_reloaded(self):
+        self.load(('GPA.1', '2025-04-01', '1743465600', 'Charged'))
+        self.load(
+            ('GPA.1', '2025-04-01', '1743465600', 'Charged'),
+            ('GPA.1', '2025-04-01', '1743465600', 'Chargeback'),
+        )
+        self.assertEqual(self.statuses(), {'GPA.1': 'Chargeback'})
+
+    def test_empty_text_columns_are_not_null(self):
+        self.load(('GPA.1', '2025-04-01', '1743465600', 'Charged'))
+        sale = google_play_estimatedSales.objects.get(tenant=self.tenant)
+        self.assertEqual(sale.promotion_id, '')
+        self.assertEqual(sale.group_id, 0)
+        self.assertEqual(str(sale.charged_amount), '4.99')
+
+    def test_two_loads_in_one_transaction(self):
+        with transaction.atomic():
+            self.load(('GPA.1', '2025-04-01', '1743465600', 'Charged'))
+            self.load(('GPA.2', '2025-04-01', '1743469200', 'Charged'))
+        self.assertEqual(len(self.statuses()), 2)
@@ -0,0 +1,87 @@
+from datetime import date
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from play_reports.controllers import export_controller
+from play_reports.controllers.export_controller import _export_params, export_report
+from play_reports.services.export_service import ExportError, export_service
+
+
+class ExportParamsTests(SimpleTestCase):
+    def test_defaults(self):
+        self.assertEqual(_export_params({}), {
+            'start_date': None,
+            'end_date': None,
+            'package_name': None,
+            'fields': None,
+            'export_format': 'csv',
+        })
+
+    def test_query_string_values(self):
+        params = _export_params({
+            'start_date': '2025-01-01', 'end_date': '2025-01-31',
+            'fields': 'date, country,,daily_user_installs', 'export_format': 'parquet',
+        })
+        self.assertEqual(params['start_date'], date(2025, 1, 1))
+        self.assertEqual(params['end_date'], date(2025, 1, 31))
+        self.assertEqual(params['fields'], ['date', 'country', 'daily_user_installs'])
+        self.assertEqual(params['export_format'], 'parquet')
+
+    def test_json_body_fields_list(self):
+        self.assertEqual(_export_params({'fields': ['date', 'country']})['fields'], ['date', 'country'])
+
+    def test_invalid_date_rejected(self):
+        with self.assertRaises(ExportError):
+            _export_params({'start_date': '01/01/2025'})
+
+
+class ExportReportViewTests(SimpleTestCase):
+    """Le format choisi doit atteindre la vue (et non la négociation de contenu DRF)."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = SimpleNamespace(is_authenticated=True)
+        tenant = SimpleNamespace(id=7)
+        patcher = mock.patch.object(export_controller, '_resolve_tenant', return_value=(tenant, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, query=''):
+        request = self.factory.get(f'/api/exports/installs_overview{query}')
+        force_authenticate(request, user=self.user)
+        return export_report(request, report_type='installs_overview')
+
+    def test_each_format_is_streamed(self):
+        for export_format, content_type in export_controller.CONTENT_TYPES.items():
+            with self.subTest(export_format=export_format), \
+                    mock.patch.object(export_service, 'prepare', return_value=('SELECT 1', [], ['date'])) as prepare, \
+                    mock.patch.object(export_service, 'stream', return_value=iter([b'payload'])) as stream:
+                response = self.get(f'?export_format={export_format}&start_date=2025-01-01')
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertIn(f'installs_overview.{export_format}', response['Content-Disposition'])
+                self.assertEqual(b''.join(response.streaming_content), b'payload')
+                self.assertEqual(prepare.call_args.kwargs['export_format'], export_format)
+                stream.assert_called_once_with(export_format, 'SELECT 1', [], ['date'])
+
+    def test_default_format_is_csv(self):
+        with mock.patch.object(export_service, 'prepare', return_value=('SELECT 1', [], ['date'])), \
+                mock.patch.object(export_service, 'stream', return_value=iter([b''])):
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], export_controller.CONTENT_TYPES['csv'])
+
+    def test_unknown_format_returns_400(self):
+        response = self.get('?export_format=xlsx')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data['success'])
+
+    def test_parquet_without_pyarrow_returns_400(self):
+        with mock.patch.object(export_service, 'parquet_available', return_value=False):
+            response = self.get('?export_format=parquet')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pyarrow', response.data['error'])
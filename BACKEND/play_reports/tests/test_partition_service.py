@@ -0,0 +1,82 @@
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+
+from play_reports.models import Tenant, google_play_installs_overview
+from play_reports.services.partition_service import partition_service
+
+TABLE = 'google_play_installs_overview'
+JANUARY = date(2025, 1, 1)
+
+
+class SwapMonthTests(TestCase):
+    """Remplacement d'une partition mensuelle partagée par plusieurs tenants."""
+
+    def setUp(self):
+        self.reimported = Tenant.objects.create(name='reimported')
+        self.other = Tenant.objects.create(name='other')
+        for tenant in (self.reimported, self.other):
+            for day in (5, 20):
+                self.row(tenant, date(2025, 1, day), installs=1)
+        self.row(self.reimported, date(2025, 2, 3), installs=1)
+        with connection.cursor() as cursor:
+            # Clés étrangères différées de Django : vérifiées avant le ALTER de convert
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        partition_service.convert(TABLE)
+
+    def row(self, tenant, day, installs):
+        return google_play_installs_overview.objects.create(
+            tenant=tenant, package_name='com.example', date=day, daily_user_installs=installs,
+        )
+
+    def load(self, staging, tenant, day, installs):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {connection.ops.quote_name(staging)} "
+                f"(tenant_id, package_name, date, device, daily_user_installs, created_at, updated_at) "
+                f"VALUES (%s, 'com.example', %s, '', %s, now(), now())",
+                [tenant.id, day, installs],
+            )
+
+    def installs(self, tenant, year_month):
+        year, month = year_month
+        return sorted(
+            google_play_installs_overview.objects
+            .filter(tenant=tenant, date__year=year, date__month=month)
+            .values_list('date', 'daily_user_installs')
+        )
+
+    def test_tenant_reimport_keeps_other_tenants(self):
+        staging, copied = partition_service.create_staging(TABLE, JANUARY, tenant_id=self.reimported.id)
+        self.assertEqual(copied, 2)
+        self.load(staging, self.reimported, date(2025, 1, 7), installs=9)
+
+        partition_service.swap_month(TABLE, JANUARY, staging, tenant_id=self.reimported.id)
+
+        self.assertEqual(self.installs(self.reimported, (2025, 1)), [(date(2025, 1, 7), 9)])
+        self.assertEqual(self.installs(self.other, (2025, 1)), [(date(2025, 1, 5), 1), (date(2025, 1, 20), 1)])
+        self.assertEqual(self.installs(self.reimported, (2025, 2)), [(date(2025, 2, 3), 1)])
+        self.assertIn(partition_service.partition_name(TABLE, JANUARY),
+                      [partition['partition'] for partition in partition_service.status(TABLE)])
+
+    def test_swap_refused_when_staging_misses_a_tenant(self):
+        staging, copied = partition_service.create_staging(TABLE, JANUARY)
+        self.assertEqual(copied, 0)
+        self.load(staging, self.reimported, date(2025, 1, 7), installs=9)
+
+        with self.assertRaisesMessage(ValueError, str(self.other.id)):
+            partition_service.swap_month(TABLE, JANUARY, staging, tenant_id=self.reimported.id)
+
+        self.assertEqual(len(self.installs(self.other, (2025, 1))), 2)
+        self.assertEqual(len(self.installs(self.reimported, (2025, 1))), 2)
+
+    def test_full_month_reload_covering_every_tenant(self):
+        staging, _ = partition_service.create_staging(TABLE, JANUARY)
+        self.load(staging, self.reimported, date(2025, 1, 7), installs=9)
+        self.load(staging, self.other, date(2025, 1, 8), installs=4)
+
+        partition_service.swap_month(TABLE, JANUARY, staging)
+
+        self.assertEqual(self.installs(self.reimported, (2025, 1)), [(date(2025, 1, 7), 9)])
+        self.assertEqual(self.installs(self.other, (2025, 1)), [(date(2025, 1, 8), 4)])
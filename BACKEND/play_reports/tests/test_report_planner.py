@@ -0,0 +1,185 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.test import SimpleTestCase, TestCase
+
+from play_reports.models import (
+    CrashRateDaily,
+    SubscriptionMonthly,
+    Tenant,
+    google_play_crashes_overview,
+    google_play_installs_overview,
+    google_play_reviews,
+    google_play_subscriptions_overview,
+)
+from play_reports.services.report_planner import ReportQueryError, report_planner
+
+
+class ParseMetricsTests(SimpleTestCase):
+    def test_metric_forms(self):
+        parsed = report_planner.parse_metrics('installs_overview', [
+            'daily_user_installs',
+            'daily_user_uninstalls:max',
+            {'name': 'total_user_installs', 'aggregation': 'AVG', 'as': 'total'},
+        ])
+        self.assertEqual(parsed, [
+            ('daily_user_installs', 'daily_user_installs', 'sum'),
+            ('daily_user_uninstalls', 'daily_user_uninstalls', 'max'),
+            ('total', 'total_user_installs', 'avg'),
+        ])
+
+    def test_default_aggregations(self):
+        self.assertEqual(
+            report_planner.parse_metrics('ratings_overview', ['daily_average_rating']),
+            [('daily_average_rating', 'daily_average_rating', 'avg')],
+        )
+        self.assertEqual(
+            report_planner.parse_metrics('reviews', ['star_rating']),
+            [('star_rating', 'star_rating', 'avg')],
+        )
+
+    def test_invalid_metrics_rejected(self):
+        cases = [
+            ('unknown_report', ['daily_user_installs']),
+            ('installs_overview', ['nope']),
+            ('installs_overview', ['country']),
+            ('installs_overview', ['daily_user_installs:median']),
+            ('installs_overview', []),
+        ]
+        for report_type, metrics in cases:
+            with self.subTest(report_type=report_type, metrics=metrics), self.assertRaises(ReportQueryError):
+                report_planner.parse_metrics(report_type, metrics)
+
+
+class PlanTests(SimpleTestCase):
+    """Choix de la source (agrégat ou table de base) et de l'index."""
+
+    def plan(self, report_type, dimensions, metrics, filters=None, start=None, end=None):
+        parsed = report_planner.parse_metrics(report_type, metrics)
+        return report_planner.plan(report_type, dimensions, parsed, filters, start, end)
+
+    def test_monthly_rollup_for_whole_months(self):
+        plan = self.plan(
+            'subscriptions_overview', ['product_id'], ['new_subscribers'],
+            start=date(2025, 1, 1), end=date(2025, 3, 31),
+        )
+        self.assertEqual(plan['source'], 'rollup')
+        self.assertIs(plan['model'], SubscriptionMonthly)
+        self.assertEqual(plan['date_field'], 'month')
+        self.assertEqual(plan['metrics'], [('new_subscribers', 'new_subscribers', 'sum')])
+
+    def test_base_table_when_rollup_does_not_cover(self):
+        cases = [
+            # Période qui ne couvre pas des mois entiers
+            (['product_id'], ['new_subscribers'], None, date(2025, 1, 15), date(2025, 3, 31)),
+            (['product_id'], ['new_subscribers'], None, date(2025, 1, 1), date(2025, 3, 30)),
+            # Dimension, filtre ou métrique absents de l'agrégat
+            (['country'], ['new_subscribers'], None, None, None),
+            ([], ['new_subscribers'], {'country': 'FR'}, None, None),
+            ([], ['active_subscribers'], None, None, None),
+            # Seules les sommes se recomposent
+            ([], ['new_subscribers:avg'], None, None, None),
+        ]
+        for dimensions, metrics, filters, start, end in cases:
+            with self.subTest(dimensions=dimensions, metrics=metrics, filters=filters, start=start, end=end):
+                plan = self.plan('subscriptions_overview', dimensions, metrics, filters, start, end)
+                self.assertEqual(plan['source'], 'table')
+                self.assertIs(plan['model'], google_play_subscriptions_overview)
+
+    def test_daily_totals_rollup(self):
+        plan = self.plan('crashes_overview', [], ['daily_crashes', 'daily_anrs'])
+        self.assertIs(plan['model'], CrashRateDaily)
+        self.assertEqual(plan['metrics'], [('daily_crashes', 'crashes', 'sum'), ('daily_anrs', 'anrs', 'sum')])
+        self.assertEqual(plan['totals'], {'app_version': ''})
+
+        plan = self.plan('crashes_overview', ['app_version'], ['daily_crashes'])
+        self.assertIs(plan['model'], google_play_crashes_overview)
+
+    def test_unknown_dimension_or_filter_rejected(self):
+        with self.assertRaisesMessage(ReportQueryError, 'nope'):
+            self.plan('installs_overview', ['nope'], ['daily_user_installs'])
+        with self.assertRaises(ReportQueryError):
+            self.plan('installs_overview', [], ['daily_user_installs'], filters={'package_id': 'x'})
+        with self.assertRaises(ReportQueryError):
+            report_planner.plan('installs_overview', ['country'], [])
+
+    def test_covering_index(self):
+        plan = self.plan('installs_overview', [], ['daily_user_installs'])
+        self.assertEqual(plan['index']['name'], 'installs_ov_tpd_cover_idx')
+        self.assertTrue(plan['index']['covering'])
+
+        plan = self.plan('installs_overview', ['country'], ['daily_user_installs'])
+        self.assertFalse(plan['index']['covering'])
+
+    def test_datetime_date_field(self):
+        self.assertTrue(self.plan('reviews', [], ['star_rating'])['datetime'])
+        self.assertFalse(self.plan('installs_overview', [], ['daily_user_installs'])['datetime'])
+
+
+class QueryTests(TestCase):
+    """Exécution des plans sur la table de base et sur un agrégat."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='tenant')
+        other = Tenant.objects.create(name='other')
+        for tenant, country, day, installs in (
+            (self.tenant, 'FR', date(2025, 1, 1), 5),
+            (self.tenant, 'FR', date(2025, 1, 2), 7),
+            (self.tenant, 'DE', date(2025, 1, 2), 4),
+            (self.tenant, 'US', date(2025, 1, 3), 20),
+            (other, 'FR', date(2025, 1, 2), 100),
+        ):
+            google_play_installs_overview.objects.create(
+                tenant=tenant, package_name='com.example', date=day, country=country, daily_user_installs=installs,
+            )
+
+    def test_grouped_query_ordered_and_limited(self):
+        rows, plan = report_planner.query(
+            'installs_overview', self.tenant, ['country'], ['daily_user_installs:sum'],
+            package_name='com.example', start=date(2025, 1, 1), end=date(2025, 1, 2),
+            order_by='-daily_user_installs', limit=1,
+        )
+        self.assertEqual(plan['source'], 'table')
+        self.assertEqual(rows, [{'daily_user_installs': 12, 'country': 'FR'}])
+
+    def test_aggregate_with_filter(self):
+        totals = report_planner.aggregate(
+            'installs_overview', self.tenant, ['daily_user_installs'], filters={'country': 'FR'},
+        )
+        self.assertEqual(totals, {'daily_user_installs': 12})
+
+    def test_unknown_order_rejected(self):
+        with self.assertRaises(ReportQueryError):
+            report_planner.query('installs_overview', self.tenant, ['country'], ['daily_user_installs'],
+                                 order_by='-nope')
+
+    def test_datetime_end_date_inclusive(self):
+        for review_id, submitted_at in (
+            ('a', datetime(2025, 1, 31, 23, 0, tzinfo=dt_timezone.utc)),
+            ('b', datetime(2025, 2, 1, 0, 0, tzinfo=dt_timezone.utc)),
+        ):
+            google_play_reviews.objects.create(
+                tenant=self.tenant, package_name='com.example', review_id=review_id, star_rating=4,
+                review_submit_date=submitted_at,
+                review_submit_millis_since_epoch=int(submitted_at.timestamp() * 1000),
+            )
+        totals = report_planner.aggregate(
+            'reviews', self.tenant, ['star_rating:count'], start=date(2025, 1, 1), end=date(2025, 1, 31),
+        )
+        self.assertEqual(totals, {'star_rating': 1})
+
+    def test_rollup_read(self):
+        for product_id, month, new in (('gold', date(2025, 1, 1), 3), ('gold', date(2025, 2, 1), 4),
+                                       ('silver', date(2025, 1, 1), 2)):
+            SubscriptionMonthly.objects.create(
+                tenant=self.tenant, package_name='com.example', product_id=product_id,
+                month=month, new_subscribers=new,
+            )
+        rows, plan = report_planner.query(
+            'subscriptions_overview', self.tenant, ['product_id'], ['new_subscribers'],
+            start=date(2025, 1, 1), end=date(2025, 2, 28), order_by='product_id',
+        )
+        self.assertEqual(plan['source'], 'rollup')
+        self.assertEqual(rows, [
+            {'new_subscribers': 7, 'product_id': 'gold'},
+            {'new_subscribers': 2, 'product_id': 'silver'},
+        ])
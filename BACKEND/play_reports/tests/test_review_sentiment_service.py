@@ -0,0 +1,77 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.test import TestCase
+
+from play_reports.models import ReviewDailySentiment, Tenant, google_play_reviews
+from play_reports.services.comparison_service import comparison_service
+from play_reports.services.insights_service import insights_service
+from play_reports.services.review_sentiment_service import review_sentiment_service
+
+PACKAGE = 'com.example'
+DAY_1 = date(2025, 3, 10)
+DAY_2 = date(2025, 3, 11)
+
+
+class ReviewDailyFallbackTests(TestCase):
+    """Lecture des avis avant et après le remplissage de ReviewDailySentiment."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='tenant')
+        # Avis antérieurs au déploiement : non scorés
+        self.review('a', datetime(2025, 3, 10, 2, 0, tzinfo=dt_timezone.utc), stars=5)
+        self.review('b', datetime(2025, 3, 10, 12, 0, tzinfo=dt_timezone.utc), stars=1)
+        self.review('c', datetime(2025, 3, 10, 23, 30, tzinfo=dt_timezone.utc), stars=3)
+        self.review('d', datetime(2025, 3, 11, 9, 0, tzinfo=dt_timezone.utc), stars=4, score=0.8)
+
+    def review(self, review_id, submitted_at, stars, score=None):
+        google_play_reviews.objects.create(
+            tenant=self.tenant, package_name=PACKAGE, review_id=review_id,
+            star_rating=stars, review_submit_date=submitted_at,
+            review_submit_millis_since_epoch=int(submitted_at.timestamp() * 1000),
+            sentiment_score=score,
+        )
+
+    def totals(self, rows):
+        return {
+            name: sum(row[name] for row in rows)
+            for name in ('review_count', 'positive_count', 'neutral_count', 'negative_count', 'rating_sum')
+        }
+
+    def test_daily_falls_back_to_reviews_without_aggregates(self):
+        rows = review_sentiment_service.daily(self.tenant, PACKAGE, DAY_1, DAY_2)
+
+        self.assertFalse(ReviewDailySentiment.objects.exists())
+        self.assertEqual([row['date'] for row in rows], [DAY_1, DAY_2])
+        self.assertEqual(rows[0]['review_count'], 3)
+        self.assertEqual(self.totals(rows), {
+            'review_count': 4, 'positive_count': 2, 'neutral_count': 1, 'negative_count': 1, 'rating_sum': 13,
+        })
+        self.assertAlmostEqual(sum(row['sentiment_sum'] for row in rows), 0.8)
+
+    def test_aggregates_match_fallback_after_rebuild(self):
+        fallback = review_sentiment_service.daily_from_reviews(self.tenant, PACKAGE, DAY_1, DAY_2)
+        review_sentiment_service.rebuild(tenant_id=self.tenant.id)
+        rows = review_sentiment_service.daily(self.tenant, PACKAGE, DAY_1, DAY_2)
+
+        self.assertEqual(ReviewDailySentiment.objects.filter(tenant=self.tenant).count(), 2)
+        self.assertEqual(self.totals(rows), self.totals(fallback))
+        for row, expected in zip(rows, fallback):
+            self.assertEqual(row['date'], expected['date'])
+            self.assertAlmostEqual(row['sentiment_sum'], expected['sentiment_sum'])
+
+    def test_reviews_metrics_without_aggregates(self):
+        metrics = insights_service.reviews_metrics(self.tenant, PACKAGE, DAY_1, DAY_2)
+
+        self.assertEqual(metrics['total_reviews'], 4)
+        self.assertEqual(metrics['positive_reviews'], 2)
+        self.assertEqual(metrics['negative_reviews'], 1)
+        self.assertAlmostEqual(metrics['avg_rating'], 3.25)
+        self.assertAlmostEqual(metrics['sentiment_score'], 0.2)
+
+    def test_comparison_without_aggregates(self):
+        metrics = comparison_service.compare('reviews', self.tenant, PACKAGE, DAY_2, DAY_2, DAY_1, DAY_1)
+
+        self.assertEqual(metrics['reviews']['current'], 1)
+        self.assertEqual(metrics['reviews']['previous'], 3)
+        self.assertAlmostEqual(metrics['avg_rating']['current'], 4.0)
+        self.assertAlmostEqual(metrics['avg_rating']['previous'], 3.0)
@@ -0,0 +1,157 @@
+import bisect
+import random
+from collections import Counter
+
+from django.test import SimpleTestCase
+
+from play_reports.services.sketch_service import HyperLogLog, KLL, SpaceSaving
+
+
+def merge_all(sketches):
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged = merged.merge(sketch)
+    return merged
+
+
+class HyperLogLogTests(SimpleTestCase):
+    """Erreur relative des valeurs distinctes, résumés journaliers fusionnés."""
+
+    DAYS = 10
+
+    def daily_sketches(self, cardinality):
+        sketches = []
+        for day in range(self.DAYS):
+            sketch = HyperLogLog()
+            # Chaque jour voit un tiers de la population ; l'union la couvre entièrement
+            for value in range(day % 3, cardinality, 3):
+                sketch.update(f"device-{value}")
+            sketches.append(sketch)
+        return sketches
+
+    def test_relative_error_within_bound_after_daily_merges(self):
+        bound = 3 * HyperLogLog().relative_error()
+        for cardinality in (50, 5_000, 100_000):
+            merged = merge_all(self.daily_sketches(cardinality))
+            error = merged.count() / cardinality - 1
+            self.assertLessEqual(abs(error), bound, f"{cardinality} distincts : erreur {error:+.2%}")
+
+    def test_merge_equals_sketch_of_union(self):
+        direct = HyperLogLog()
+        for value in range(5_000):
+            direct.update(f"device-{value}")
+        merged = merge_all(self.daily_sketches(5_000))
+        self.assertEqual(merged.registers, direct.registers)
+
+    def test_serialization_round_trip(self):
+        sketch = merge_all(self.daily_sketches(1_000))
+        self.assertEqual(HyperLogLog.from_bytes(sketch.to_bytes()).count(), sketch.count())
+
+    def test_incompatible_precisions_rejected(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+
+
+class KLLTests(SimpleTestCase):
+    """Erreur de rang des quantiles, résumés journaliers fusionnés."""
+
+    FRACTIONS = (0.1, 0.5, 0.9, 0.99)
+
+    def rank_error(self, values, fraction, estimate):
+        # Rang réel : intervalle [premier, dernier] des valeurs égales à l'estimation
+        low = bisect.bisect_left(values, estimate) / len(values)
+        high = bisect.bisect_right(values, estimate) / len(values)
+        return 0 if low <= fraction <= high else min(abs(low - fraction), abs(high - fraction))
+
+    def check_distribution(self, draw):
+        rng = random.Random(11)
+        values, sketches = [], []
+        for day in range(10):
+            sketch = KLL(seed=day)
+            for _ in range(5_000):
+                value = draw(rng)
+                values.append(value)
+                sketch.update(value)
+            sketches.append(sketch)
+        merged = merge_all(sketches)
+        values.sort()
+
+        self.assertEqual(merged.n, len(values))
+        for fraction, estimate in zip(self.FRACTIONS, merged.quantiles(self.FRACTIONS)):
+            error = self.rank_error(values, fraction, estimate)
+            self.assertLessEqual(error, merged.rank_error(), f"p{fraction * 100:g} : erreur de rang {error:.2%}")
+        return merged
+
+    def test_rank_error_within_bound_continuous(self):
+        self.check_distribution(lambda rng: rng.lognormvariate(3, 1))
+
+    def test_rank_error_within_bound_discrete_ratings(self):
+        merged = self.check_distribution(
+            lambda rng: float(rng.choices([1, 2, 3, 4, 5], [10, 5, 8, 20, 57])[0])
+        )
+        histogram = merged.histogram([1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertAlmostEqual(histogram[5.0], 0.57, delta=merged.rank_error())
+        self.assertAlmostEqual(sum(histogram.values()), 1.0)
+
+    def test_serialization_round_trip(self):
+        sketch = KLL()
+        for value in range(10_000):
+            sketch.update(float(value))
+        restored = KLL.from_bytes(sketch.to_bytes())
+        self.assertEqual(restored.quantiles(self.FRACTIONS), sketch.quantiles(self.FRACTIONS))
+
+    def test_empty_sketch(self):
+        self.assertEqual(KLL().quantiles((0.5,)), [None])
+
+
+class SpaceSavingTests(SimpleTestCase):
+    """Garanties heavy hitters, y compris après fusion de résumés journaliers."""
+
+    CAPACITY = 50
+
+    def stream(self, rng, size):
+        # Quelques termes fréquents et une longue traîne
+        heavy = [f"heavy-{i}" for i in range(10)]
+        return [
+            rng.choice(heavy) if rng.random() < 0.5 else f"tail-{rng.randrange(5_000)}"
+            for _ in range(size)
+        ]
+
+    def assert_guarantees(self, sketch, truth):
+        self.assertEqual(sketch.total, sum(truth.values()))
+        self.assertLessEqual(len(sketch.counters), sketch.capacity)
+        for item, count, error, _ in sketch.top():
+            # count - error <= fréquence réelle <= count
+            self.assertLessEqual(count - error, truth[item], item)
+            self.assertGreaterEqual(count, truth[item], item)
+        threshold = sketch.guaranteed_threshold()
+        for item, frequency in truth.items():
+            if frequency > threshold:
+                self.assertIn(item, sketch.counters, f"{item} ({frequency} > {threshold:.0f}) absent")
+
+    def test_guarantees_single_stream(self):
+        rng = random.Random(3)
+        items = self.stream(rng, 20_000)
+        sketch = SpaceSaving(self.CAPACITY)
+        for item in items:
+            sketch.update(item)
+        self.assert_guarantees(sketch, Counter(items))
+
+    def test_guarantees_after_daily_merges(self):
+        rng = random.Random(5)
+        truth, sketches = Counter(), []
+        for _ in range(10):
+            items = self.stream(rng, 3_000)
+            truth.update(items)
+            sketch = SpaceSaving(self.CAPACITY)
+            for item in items:
+                sketch.update(item)
+            sketches.append(sketch)
+        self.assert_guarantees(merge_all(sketches), truth)
+
+    def test_metrics_accumulated_and_json_round_trip(self):
+        sketch = SpaceSaving(self.CAPACITY)
+        sketch.update('term', weight=10, acquisitions=2)
+        sketch.update('term', weight=5, acquisitions=1)
+        restored = SpaceSaving.from_json(sketch.to_json())
+        self.assertEqual(restored.top(1), [('term', 15, 0, {'acquisitions': 3})])